@@ -5,8 +5,19 @@ Business Intelligence & System Management Tools for LitLabs OS
 
 import json
 import re
+import threading
+import time
 from typing import Any
-from dataclasses import dataclass
+from dataclasses import dataclass, replace
+
+from litbot_alerts import AlertEngine, AlertRule
+from litbot_anomaly import DEFAULT_WINDOW, GOOD_STATUSES, AnomalyScore, health_percent, score_batch
+from litbot_embeddings import SemanticRetriever
+from litbot_ingest import MetricIngestor
+from litbot_reports import DAILY_REPORT, WEEKLY_REPORT, ReportDefinition, ReportEngine
+from litbot_search import KnowledgeIndex
+from litbot_status import StatusSnapshot
+from litbot_timeseries import RESOLUTIONS, TimeSeriesStore, parse_period
 
 @dataclass
 class SystemMetric:
@@ -15,24 +26,117 @@ class SystemMetric:
     value: float
     unit: str
     status: str
+    higher_is_better: bool = True
 
 class LitBotToolbox:
     """Toolbox for LITBOT 4.0 Agent"""
     
-    def __init__(self):
+    # Trend queries use the finest rollup with at most this many buckets
+    MAX_TREND_BUCKETS = 1500
+    
+    # Passages returned per knowledge-base query
+    KNOWLEDGE_RESULTS = 5
+    
+    def __init__(self, store: TimeSeriesStore | None = None, knowledge_index: KnowledgeIndex | None = None):
         self.metrics = self._load_mock_metrics()
+        self.activity = self._load_mock_activity()
+        self.store = store if store is not None else TimeSeriesStore()
+        self._seed_store()
+        self.reports = self._create_report_engine()
+        self.status = StatusSnapshot(self.store, self._status_line, order=list(self.metrics))
+        self.alerts = AlertEngine(self.store, self._default_alert_rules())
+        self.ingestor: MetricIngestor | None = None
         self.knowledge_base = self._load_knowledge_base()
+        self.knowledge_index = knowledge_index if knowledge_index is not None else KnowledgeIndex()
+        for doc_id, text in self.knowledge_base.items():
+            self.knowledge_index.add_document(doc_id, text)
+        # Built on first semantic/hybrid query
+        self._retriever: SemanticRetriever | None = None
+        self._retriever_lock = threading.Lock()
+        self._watch_components()
     
     def _load_mock_metrics(self) -> dict[str, SystemMetric]:
         """Load mock system metrics"""
         return {
             "revenue_mrr": SystemMetric("MRR", 12500.00, "USD", "healthy"),
             "active_users": SystemMetric("Active Users", 1450, "users", "growing"),
-            "churn_rate": SystemMetric("Churn Rate", 2.1, "%", "stable"),
-            "server_load": SystemMetric("Server Load", 45, "%", "optimal"),
-            "api_latency": SystemMetric("API Latency", 120, "ms", "good")
+            "churn_rate": SystemMetric("Churn Rate", 2.1, "%", "stable", higher_is_better=False),
+            "server_load": SystemMetric("Server Load", 45, "%", "optimal", higher_is_better=False),
+            "api_latency": SystemMetric("API Latency", 120, "ms", "good", higher_is_better=False)
+        }
+
+    def _load_mock_activity(self) -> dict[str, tuple[str, float]]:
+        """Load mock daily activity counters (key -> display name, count)"""
+        return {
+            "new_users": ("New Users", 12),
+            "feature_usage.ai_mockup_generator": ("AI Mockup Generator", 420),
+            "feature_usage.money_plays": ("Money Plays", 310),
+            "feature_usage.content_calendar": ("Content Calendar", 180),
         }
 
+    def _seed_store(self):
+        """Record configured metric values as the first point of empty series"""
+        now = time.time()
+        seeds = {key: metric.value for key, metric in self.metrics.items()}
+        seeds.update({key: count for key, (_, count) in self.activity.items()})
+        for key, value in seeds.items():
+            if key not in self.store:
+                self.store.append(key, value, ts=now)
+
+    def _default_alert_rules(self) -> list[AlertRule]:
+        """Built-in alert rules for the system metrics"""
+        return [
+            AlertRule("high_latency", "api_latency", op=">", value=500),
+            AlertRule("server_overload", "server_load", op=">", value=85, severity="critical"),
+            AlertRule("churn_spike", "churn_rate", op=">", value=5),
+            AlertRule("mrr_drop", "revenue_mrr", kind="rate", op="<", value=-0.1, window="1d", cooldown="1d", severity="critical"),
+        ]
+
+    def _create_report_engine(self) -> ReportEngine:
+        labels = {key: metric.name for key, metric in self.metrics.items()}
+        labels.update({key: name for key, (name, _) in self.activity.items()})
+        engine = ReportEngine(self.store, labels)
+        engine.register(replace(DAILY_REPORT, extras={"health": self._system_health}))
+        engine.register(WEEKLY_REPORT)
+        return engine
+
+    def _system_health(self, start: float, end: float) -> str:
+        """Share of system metrics whose assessed status is not a problem"""
+        scores = self.score_metrics(list(self.metrics))
+        return f"{health_percent([score.status or self.metrics[score.metric].status for score in scores]):.0f}"
+
+    def record_metric(self, metric_name: str, value: float, ts: float | None = None) -> bool:
+        """Append a data point to a metric's history"""
+        return self.store.append(metric_name, value, ts)
+
+    def start_ingestion(self, http_port: int | None = None, udp_port: int | None = None, host: str = "127.0.0.1") -> MetricIngestor:
+        """Start buffering live points into the store, optionally via HTTP/UDP listeners"""
+        if self.ingestor is None:
+            self.ingestor = MetricIngestor(self.store).start()
+            # Absence rules need a clock while points stream in
+            self.alerts.start()
+        if http_port is not None:
+            self.ingestor.serve_http(host, http_port)
+        if udp_port is not None:
+            self.ingestor.serve_udp(host, udp_port)
+        return self.ingestor
+
+    def stop_ingestion(self):
+        """Stop listeners and flush buffered points"""
+        if self.ingestor is not None:
+            self.ingestor.stop()
+            self.ingestor = None
+            self.alerts.stop()
+
+    def current_value(self, metric_name: str) -> float | int | None:
+        """Latest recorded value of a metric (whole numbers as int)"""
+        latest = self.store.latest(metric_name)
+        if latest is None:
+            metric = self.metrics.get(metric_name)
+            return metric.value if metric else None
+        value = latest[1]
+        return int(value) if value.is_integer() else round(value, 4)
+
     def _load_knowledge_base(self) -> dict[str, str]:
         """Load business knowledge base"""
         return {
@@ -42,12 +146,75 @@ class LitBotToolbox:
             "tech_stack": "Next.js 16, Firebase, Stripe, DeepSeek-R1, Gemini 1.5 Pro."
         }
 
+    def _status_line(self, metric_name: str) -> str:
+        metric = self.metrics.get(metric_name)
+        if metric is None:
+            return f"{metric_name}: {self.current_value(metric_name)}"
+        # The configured status only stands in until there is enough history to assess
+        status = self.score_metrics([metric_name])[0].status or metric.status
+        return f"{metric.name}: {self.current_value(metric_name)}{metric.unit} ({status})"
+
+    def _watch_components(self):
+        """Version the live state of ingestion, the indexes and alerting with the metric lines"""
+        self.status.watch("store", lambda: f"Time-Series Store: {len(self.store.metrics())} metrics")
+        self.status.watch("ingestion", self._ingestion_status)
+        self.status.watch("knowledge_index", lambda: (
+            f"Knowledge Index: {len(self.knowledge_index)} documents, "
+            f"{len(self.knowledge_index.passages)} passages (revision {self.knowledge_index.revision})"
+        ))
+        self.status.watch("vector_index", self._vector_status)
+        self.status.watch("alerts", lambda: (
+            f"Alerts: {'running' if self.alerts.running else 'stopped'}, {len(self.alerts.active())} firing"
+        ))
+
+    def _ingestion_status(self) -> str:
+        ingestor = self.ingestor
+        if ingestor is None:
+            return "Ingestion: stopped"
+        state = "running" if ingestor.running else "flush thread not running"
+        line = (
+            f"Ingestion: {state}, {ingestor.pending()} queued, "
+            f"{ingestor.points_flushed} flushed, {ingestor.points_rejected} rejected"
+        )
+        if ingestor.flush_errors:
+            line += f", {ingestor.flush_errors} flush errors"
+        if ingestor.listener_errors:
+            line += f", {ingestor.listener_errors} listener errors"
+        if ingestor.flush_errors or ingestor.listener_errors:
+            line += f" (last: {ingestor.last_error})"
+        return line
+
+    def _vector_status(self) -> str:
+        retriever = self._retriever
+        if retriever is None:
+            return "Vector Index: not built"
+        return f"Vector Index: {len(retriever.vectors)} vectors ({'resync pending' if retriever.stale else 'in sync'})"
+
     def get_system_status(self) -> str:
         """Get current system status overview"""
-        status = []
-        for key, metric in self.metrics.items():
-            status.append(f"{metric.name}: {metric.value}{metric.unit} ({metric.status})")
-        return "\n".join(status)
+        return self.status.render()
+
+    def get_status_delta(self, since_version: int = 0) -> str:
+        """Status lines that changed after ``since_version`` (ETag-style polling)"""
+        version, changes = self.status.changes_since(since_version)
+        if not changes:
+            return f"Status version {version}: no changes since version {since_version}."
+        return f"Status version {version}: {len(changes)} changed since version {since_version}\n" + "\n".join(changes.values())
+
+    def score_metrics(self, metric_names: list[str] | None = None, window: int = DEFAULT_WINDOW) -> list[AnomalyScore]:
+        """Score the latest value of each metric against its recent history"""
+        names = self.store.metrics() if metric_names is None else metric_names
+        lower_is_better = {name for name, metric in self.metrics.items() if not metric.higher_is_better}
+        return score_batch(names, [self.store.tail(name, window) for name in names], window, lower_is_better)
+
+    @staticmethod
+    def _recommendation(status: str) -> str:
+        if status == "growing":
+            return "Recommendation: Monitor for scaling bottlenecks."
+        elif status in GOOD_STATUSES:
+            return "Recommendation: Maintain current trajectory."
+        else:
+            return "Recommendation: Investigate immediately."
 
     def analyze_metric(self, metric_name: str) -> str:
         """Analyze a specific system metric"""
@@ -55,50 +222,134 @@ class LitBotToolbox:
         if not metric:
             return f"Metric {metric_name} not found."
         
+        score = self.score_metrics([metric_name])[0]
+        # Too little history to judge: fall back to the configured status
+        status = score.status or metric.status
         analysis = f"Analysis of {metric.name}:\n"
-        analysis += f"Current Value: {metric.value}{metric.unit}\n"
-        analysis += f"Status: {metric.status.upper()}\n"
+        analysis += f"Current Value: {self.current_value(metric_name)}{metric.unit}\n"
+        analysis += f"Status: {status.upper()}\n"
+        if score.status:
+            unit = metric.unit
+            analysis += (
+                f"Baseline ({score.points} points): mean {score.mean:.2f}{unit} ± {score.std:.2f}, "
+                f"EWMA {score.ewma:.2f}{unit}, p5-p95 {score.p05:.2f}-{score.p95:.2f}{unit}\n"
+            )
+            analysis += f"Z-score: {score.zscore:+.2f}  Trend: {score.change * 100:+.1f}%"
+            if score.trend_break:
+                analysis += "  (trend break)"
+            analysis += "\n"
+        alerts = self.alerts.active(metric_name)
+        for alert in alerts:
+            analysis += f"Alert: {alert.message}\n"
         
-        if metric.status == "healthy" or metric.status == "optimal":
-            analysis += "Recommendation: Maintain current trajectory."
-        elif metric.status == "growing":
-            analysis += "Recommendation: Monitor for scaling bottlenecks."
+        analysis += self._recommendation("alerting" if alerts else status)
+        return analysis
+
+    def add_alert_rule(self, rule: AlertRule):
+        """Add or replace an alert rule"""
+        self.alerts.add_rule(rule)
+
+    def get_alerts(self) -> str:
+        """Firing alerts plus the most recent alert events"""
+        self.alerts.tick()
+        active = self.alerts.active()
+        if not active:
+            report = "No active alerts."
         else:
-            analysis += "Recommendation: Investigate immediately."
-            
+            report = f"{len(active)} active alert(s):\n" + "\n".join(alert.message for alert in active)
+        recent = self.alerts.recent(5)
+        if recent:
+            report += "\nRecent:\n" + "\n".join(
+                f"{time.strftime('%H:%M:%S', time.gmtime(alert.ts))} {alert.message}" for alert in recent
+            )
+        return report
+
+    def health_sweep(self, window: int = DEFAULT_WINDOW) -> str:
+        """Score every tracked metric in one pass and list the ones needing attention"""
+        scores = self.score_metrics(window=window)
+        flagged = [s for s in scores if s.status is not None and s.status not in GOOD_STATUSES]
+        scored = sum(1 for s in scores if s.status is not None)
+        report = f"Health sweep: {len(scores)} metrics, {scored} scored, {len(flagged)} flagged"
+        # Worst deviations first
+        for score in sorted(flagged, key=lambda s: -abs(s.zscore)):
+            metric = self.metrics.get(score.metric)
+            name = metric.name if metric else score.metric
+            report += f"\n- {name}: {score.status.upper()} (value {score.value:.2f}, z {score.zscore:+.2f}, trend {score.change * 100:+.1f}%)"
+        return report
+
+    def analyze_trend(self, metric_name: str, period: str = "30d") -> str:
+        """Summarize how a metric moved over a period (e.g. 12h, 30d, 26w)"""
+        metric = self.metrics.get(metric_name)
+        if not metric and metric_name not in self.store:
+            return f"Metric {metric_name} not found."
+        try:
+            seconds = parse_period(period)
+        except ValueError as e:
+            return str(e)
+
+        resolution = next(
+            (name for name, size in RESOLUTIONS.items() if seconds / size <= self.MAX_TREND_BUCKETS),
+            "1d",
+        )
+        now = time.time()
+        values = self.store.values(metric_name, now - seconds, None, resolution)
+        name = metric.name if metric else metric_name
+        unit = metric.unit if metric else ""
+        if len(values) < 2:
+            return f"Not enough history for {name} over {period} to determine a trend."
+
+        start, end = float(values[0]), float(values[-1])
+        change = (end - start) / abs(start) * 100 if start else 0.0
+        analysis = f"Trend of {name} over {period} ({len(values)} x {resolution} buckets):\n"
+        analysis += f"Start: {start:.2f}{unit}  End: {end:.2f}{unit}  Change: {change:+.1f}%\n"
+        analysis += f"Min: {values.min():.2f}{unit}  Max: {values.max():.2f}{unit}  Mean: {values.mean():.2f}{unit}"
         return analysis
 
-    def query_knowledge_base(self, topic: str) -> str:
-        """Query the internal business knowledge base"""
-        # Simple keyword search
-        results = []
-        for key, value in self.knowledge_base.items():
-            if topic.lower() in key.lower() or topic.lower() in value.lower():
-                results.append(f"[{key.upper()}]: {value}")
-        
-        if not results:
-            return "No specific knowledge found on this topic."
-        return "\n\n".join(results)
-
-    def generate_business_report(self, report_type: str) -> str:
-        """Generate a business report"""
-        if report_type == "daily":
-            return f"""
-DAILY BUSINESS REPORT
----------------------
-MRR: ${self.metrics["revenue_mrr"].value}
-New Users: +12
-Active Users: {self.metrics["active_users"].value}
-System Health: 98%
-            """
-        elif report_type == "weekly":
-            return f"""
-WEEKLY PERFORMANCE REVIEW
--------------------------
-Revenue Growth: +5%
-Churn: {self.metrics["churn_rate"].value}%
-Top Feature: AI Mockup Generator
-            """
+    @property
+    def retriever(self) -> SemanticRetriever:
+        if self._retriever is None:
+            with self._retriever_lock:
+                if self._retriever is None:
+                    self._retriever = SemanticRetriever(self.knowledge_index)
+        return self._retriever
+
+    def query_knowledge_base(self, topic: str, mode: str = "keyword") -> str:
+        """Query the internal business knowledge base (mode: keyword, semantic or hybrid)"""
+        if mode == "keyword":
+            hits = self.knowledge_index.search(topic, k=self.KNOWLEDGE_RESULTS)
+        elif mode == "semantic":
+            hits = self.retriever.search(topic, k=self.KNOWLEDGE_RESULTS)
+        elif mode == "hybrid":
+            hits = self.retriever.hybrid_search(topic, k=self.KNOWLEDGE_RESULTS)
         else:
-            return "Unknown report type. Available: daily, weekly"
+            return f"Unknown search mode: {mode}. Available: keyword, semantic, hybrid"
+        if not hits:
+            return "No specific knowledge found on this topic."
+        return "\n\n".join(f"[{hit.doc_id.upper()}]: {hit.snippet}" for hit in hits)
+
+    def add_knowledge(self, doc_id: str, text: str) -> bool:
+        """Add or update a knowledge-base document"""
+        self.knowledge_base[doc_id] = text
+        return self.knowledge_index.add_document(doc_id, text)
+
+    def remove_knowledge(self, doc_id: str) -> bool:
+        """Remove a knowledge-base document"""
+        self.knowledge_base.pop(doc_id, None)
+        return self.knowledge_index.remove_document(doc_id)
+
+    def load_knowledge_directory(self, path: str) -> int:
+        """Index every .md/.txt file under ``path`` (e.g. an exported wiki)"""
+        return self.knowledge_index.load_directory(path)
+
+    def generate_business_report(self, report_type: str, period: str | None = None) -> str:
+        """Generate a business report, optionally over a custom period (e.g. 90d)"""
+        if report_type not in self.reports.definitions:
+            return f"Unknown report type. Available: {', '.join(self.reports.definitions)}"
+        try:
+            return self.reports.render(report_type, period)
+        except ValueError as e:
+            return str(e)
 
+    def register_report(self, definition: ReportDefinition):
+        """Add a custom report definition"""
+        self.reports.register(definition)
@@ -0,0 +1,339 @@
+"""
+LITBOT 4.0 Alerting
+Threshold, rate-of-change and absence rules declared per metric (or per
+metric prefix), compiled into a per-metric evaluation plan and evaluated as
+points reach the store: a batch only re-runs the rules of its own metric.
+Each rule fires once per incident (deduplicated until it resolves) and not
+again within its cooldown.
+"""
+
+import heapq
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Callable
+
+import numpy as np
+
+from litbot_timeseries import TimeSeriesStore, parse_period
+
+RULE_KINDS = ("threshold", "rate", "absence")
+OPERATORS = (">", ">=", "<", "<=")
+# Alerts kept for ``AlertEngine.recent``
+HISTORY_SIZE = 1000
+
+
+@dataclass
+class AlertRule:
+    """One alert condition
+
+    ``metric`` is a metric key, or a prefix ending in ``*`` matching many.
+    threshold: the value compared (``op``) with ``value``;
+    rate: the fractional change over ``window`` compared with ``value``
+    (``"<", -0.1`` fires on a 10% drop);
+    absence: no point for ``window``.
+    ``window`` and ``cooldown`` are seconds or periods such as "15m".
+    """
+    name: str
+    metric: str
+    kind: str = "threshold"
+    op: str = ">"
+    value: float = 0.0
+    window: float | str = 300.0
+    cooldown: float | str = 300.0
+    severity: str = "warning"
+
+    def __post_init__(self):
+        if self.kind not in RULE_KINDS:
+            raise ValueError(f"Unknown rule kind: {self.kind}. Available: {', '.join(RULE_KINDS)}")
+        if self.op not in OPERATORS:
+            raise ValueError(f"Unknown operator: {self.op}. Available: {' '.join(OPERATORS)}")
+        if isinstance(self.window, str):
+            self.window = parse_period(self.window)
+        if isinstance(self.cooldown, str):
+            self.cooldown = parse_period(self.cooldown)
+
+    def matches(self, metric: str) -> bool:
+        if self.metric.endswith("*"):
+            return metric.startswith(self.metric[:-1])
+        return metric == self.metric
+
+    def describe(self, value: float | None) -> str:
+        if self.kind == "absence":
+            return f"no data for {self.window:.0f}s"
+        if self.kind == "rate":
+            return f"changed {value * 100:+.1f}% over {self.window:.0f}s ({self.op} {self.value * 100:+.1f}%)"
+        return f"{value:.2f} ({self.op} {self.value:g})"
+
+
+@dataclass
+class Alert:
+    """A rule starting (``firing``) or stopping (``resolved``) for one metric"""
+    rule: str
+    metric: str
+    state: str
+    severity: str
+    ts: float
+    value: float | None
+    message: str
+
+
+class _Comparisons:
+    """Rules sharing one input value, checked with a few vector ops"""
+
+    def __init__(self, rules: list[AlertRule]):
+        self.rules = rules
+        self.positions = {rule.name: i for i, rule in enumerate(rules)}
+        self.limits = np.array([rule.value for rule in rules], dtype="f8")
+        self.above = np.array([rule.op in (">", ">=") for rule in rules])
+        self.inclusive = np.array([rule.op in (">=", "<=") for rule in rules])
+
+    def check(self, high: float, low: float) -> tuple[np.ndarray, np.ndarray]:
+        """(breached mask, probed value) for input ranging over ``[low, high]``"""
+        probe = np.where(self.above, high, low)
+        margin = np.where(self.above, probe - self.limits, self.limits - probe)
+        return (margin > 0) | (self.inclusive & (margin == 0)), probe
+
+
+class _MetricPlan:
+    """The compiled rules of one metric"""
+
+    def __init__(self, rules: list[AlertRule]):
+        thresholds = [rule for rule in rules if rule.kind == "threshold"]
+        self.thresholds = _Comparisons(thresholds) if thresholds else None
+        # One history lookup per distinct window
+        windows: dict[float, list[AlertRule]] = {}
+        for rule in rules:
+            if rule.kind == "rate":
+                windows.setdefault(rule.window, []).append(rule)
+        self.rates = [(window, _Comparisons(group)) for window, group in windows.items()]
+        self.absences = [rule for rule in rules if rule.kind == "absence"]
+
+    def __bool__(self) -> bool:
+        return bool(self.thresholds or self.rates or self.absences)
+
+
+class AlertEngine:
+    """Evaluates alert rules against a store as points arrive
+
+    Threshold and rate rules run on the writing thread from a store
+    listener; absence rules are checked by ``tick`` (or the thread started
+    with ``start``) using a heap of deadlines, so neither path scans all
+    rules.
+    """
+
+    def __init__(self, store: TimeSeriesStore, rules: list[AlertRule] | None = None):
+        self.store = store
+        self.rules: dict[str, AlertRule] = {}
+        # Rules by exact metric, and the ``prefix*`` ones
+        self._exact: dict[str, list[AlertRule]] = {}
+        self._prefixed: list[AlertRule] = []
+        self._plans: dict[str, _MetricPlan] = {}
+        # metric -> rule name -> firing alert
+        self._firing: dict[str, dict[str, Alert]] = {}
+        self._last_fired: dict[tuple[str, str], float] = {}
+        # Absence tracking: metric -> newest point ts, heap of (deadline, rule, metric)
+        self._last_seen: dict[str, float] = {}
+        self._deadlines: list[tuple[float, str, str]] = []
+        self._scheduled: set[tuple[str, str]] = set()
+        self._subscribers: list[Callable[[Alert], None]] = []
+        self.history: deque[Alert] = deque(maxlen=HISTORY_SIZE)
+        self._lock = threading.RLock()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        self.evaluations = 0
+        self.fired = 0
+        self.resolved = 0
+        self.deduplicated = 0
+        self.suppressed = 0
+        for rule in rules or []:
+            self.add_rule(rule)
+        store.add_listener(self._on_points)
+
+    def add_rule(self, rule: AlertRule):
+        """Add or replace a rule (by name)"""
+        with self._lock:
+            self.rules[rule.name] = rule
+            self._recompile()
+            if rule.kind == "absence":
+                now = time.time()
+                metrics = [rule.metric] if not rule.metric.endswith("*") else self.store.metrics()
+                for metric in metrics:
+                    if rule.matches(metric):
+                        latest = self.store.latest(metric)
+                        self._last_seen.setdefault(metric, latest[0] if latest else now)
+                        self._schedule(rule, metric)
+
+    def remove_rule(self, name: str) -> bool:
+        """Drop a rule; its open alerts are discarded without a resolve event"""
+        with self._lock:
+            if self.rules.pop(name, None) is None:
+                return False
+            for alerts in self._firing.values():
+                alerts.pop(name, None)
+            self._recompile()
+            return True
+
+    def _recompile(self):
+        self._exact.clear()
+        self._prefixed = []
+        for rule in self.rules.values():
+            if rule.metric.endswith("*"):
+                self._prefixed.append(rule)
+            else:
+                self._exact.setdefault(rule.metric, []).append(rule)
+        # Plans are rebuilt lazily, per metric, on its next batch
+        self._plans.clear()
+
+    def plan(self, metric: str) -> _MetricPlan:
+        """The compiled rules for ``metric``"""
+        plan = self._plans.get(metric)
+        if plan is None:
+            rules = self._exact.get(metric, []) + [rule for rule in self._prefixed if rule.matches(metric)]
+            plan = self._plans[metric] = _MetricPlan(rules)
+        return plan
+
+    def subscribe(self, callback: Callable[[Alert], None]):
+        """Call ``callback(alert)`` for every fired or resolved alert"""
+        self._subscribers.append(callback)
+
+    def _on_points(self, metric: str, timestamps: np.ndarray, values: np.ndarray):
+        plan = self._plans.get(metric)
+        if plan is None:
+            with self._lock:
+                plan = self.plan(metric)
+        if not plan:
+            return
+        ts, last = float(timestamps[-1]), float(values[-1])
+        # Looked up before taking the lock: it takes the series lock
+        references = [(self.store.value_at(metric, ts - window), comparisons) for window, comparisons in plan.rates]
+        events = []
+        with self._lock:
+            self.evaluations += 1
+            if plan.thresholds:
+                # Fire on any point of the batch, resolve on the newest
+                breached, probe = plan.thresholds.check(float(values.max()), float(values.min()))
+                still, _ = plan.thresholds.check(last, last)
+                self._update(plan.thresholds, metric, ts, breached, still, probe, last, events)
+            for reference, comparisons in references:
+                if not reference:
+                    continue
+                change = (last - reference) / abs(reference)
+                breached, probe = comparisons.check(change, change)
+                self._update(comparisons, metric, ts, breached, breached, probe, change, events)
+            if plan.absences:
+                self._last_seen[metric] = ts
+                firing = self._firing.get(metric, {})
+                for rule in plan.absences:
+                    if firing.pop(rule.name, None):
+                        events.append(self._resolve(rule, metric, ts, None))
+                    self._schedule(rule, metric)
+        self._emit(events)
+
+    def _update(self, comparisons, metric, ts, breached, still, probe, current, events):
+        """Fire rules breached by the batch, resolve firing ones ``current`` no longer breaches"""
+        for i in np.flatnonzero(breached):
+            events.extend(self._fire(comparisons.rules[i], metric, ts, float(probe[i])))
+        # Only firing rules can resolve, so neither loop visits every rule
+        firing = self._firing.get(metric)
+        if firing:
+            for name in [name for name in firing if name in comparisons.positions]:
+                if not still[comparisons.positions[name]]:
+                    del firing[name]
+                    events.append(self._resolve(self.rules[name], metric, ts, current))
+
+    def _fire(self, rule: AlertRule, metric: str, ts: float, value: float | None) -> list[Alert]:
+        key = (rule.name, metric)
+        firing = self._firing.setdefault(metric, {})
+        if rule.name in firing:
+            self.deduplicated += 1
+            return []
+        last = self._last_fired.get(key)
+        if last is not None and ts - last < rule.cooldown:
+            self.suppressed += 1
+            return []
+        alert = Alert(rule.name, metric, "firing", rule.severity, ts, value,
+                      f"[{rule.severity.upper()}] {rule.name}: {metric} {rule.describe(value)}")
+        firing[rule.name] = alert
+        self._last_fired[key] = ts
+        self.fired += 1
+        return [alert]
+
+    def _resolve(self, rule: AlertRule, metric: str, ts: float, value: float | None) -> Alert:
+        self.resolved += 1
+        return Alert(rule.name, metric, "resolved", rule.severity, ts, value, f"[RESOLVED] {rule.name}: {metric}")
+
+    def _schedule(self, rule: AlertRule, metric: str):
+        key = (rule.name, metric)
+        if key not in self._scheduled:
+            self._scheduled.add(key)
+            heapq.heappush(self._deadlines, (self._last_seen[metric] + rule.window, rule.name, metric))
+
+    def tick(self, now: float | None = None) -> list[Alert]:
+        """Fire absence rules whose deadline passed; returns the new alerts"""
+        now = time.time() if now is None else now
+        events = []
+        with self._lock:
+            while self._deadlines and self._deadlines[0][0] <= now:
+                _, name, metric = heapq.heappop(self._deadlines)
+                self._scheduled.discard((name, metric))
+                rule = self.rules.get(name)
+                if rule is None or rule.kind != "absence":
+                    continue
+                deadline = self._last_seen[metric] + rule.window
+                if deadline > now:
+                    # Data arrived since this entry was pushed
+                    self._schedule(rule, metric)
+                else:
+                    # Rescheduled by the metric's next point
+                    events.extend(self._fire(rule, metric, now, None))
+        self._emit(events)
+        return events
+
+    def _emit(self, events: list[Alert]):
+        for alert in events:
+            self.history.append(alert)
+            for callback in self._subscribers:
+                callback(alert)
+
+    def active(self, metric: str | None = None) -> list[Alert]:
+        """Currently firing alerts, oldest first"""
+        with self._lock:
+            if metric is None:
+                alerts = [alert for firing in self._firing.values() for alert in firing.values()]
+            else:
+                alerts = list(self._firing.get(metric, {}).values())
+        return sorted(alerts, key=lambda a: a.ts)
+
+    def recent(self, n: int = 20) -> list[Alert]:
+        """The last ``n`` fired or resolved alerts, oldest first"""
+        return list(self.history)[-n:]
+
+    def start(self, interval: float = 1.0) -> "AlertEngine":
+        """Check absence rules on a background thread"""
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, args=(interval,), name="litbot-alerts", daemon=True)
+            self._thread.start()
+        return self
+
+    def _run(self, interval: float):
+        while not self._stop.wait(interval):
+            self.tick()
+
+    @property
+    def running(self) -> bool:
+        """Whether the background checking thread is alive"""
+        return self._thread is not None and self._thread.is_alive()
+
+    def stop(self):
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+
+    def close(self):
+        """Stop evaluating and detach from the store"""
+        self.stop()
+        self.store.remove_listener(self._on_points)
@@ -0,0 +1,200 @@
+"""
+LITBOT 4.0 Anomaly Detection
+Vectorized baselines (rolling mean/stddev, EWMA, percentiles) and trend-break
+detection over metric history windows, scoring many series in one pass
+"""
+
+from collections.abc import Collection
+from dataclasses import dataclass
+
+import numpy as np
+
+# Points of history scored per metric
+DEFAULT_WINDOW = 288
+# Fewer points than this and the configured status is used instead
+MIN_POINTS = 8
+Z_THRESHOLD = 3.0
+EWMA_ALPHA = 0.1
+# Relative change across the window that counts as a trend
+TREND_THRESHOLD = 0.05
+# Fraction of the window treated as "recent" for trend-break detection
+RECENT_FRACTION = 0.25
+# Statuses (computed or configured) that do not need attention
+GOOD_STATUSES = frozenset({"healthy", "optimal", "growing", "improving", "stable", "good"})
+# Metrics where a rise is bad news; trends on these read improving/worsening
+LOWER_IS_BETTER = frozenset({"churn_rate", "server_load", "api_latency"})
+
+
+@dataclass
+class AnomalyScore:
+    """Data-driven assessment of one metric's latest value"""
+    metric: str
+    points: int
+    value: float
+    mean: float
+    std: float
+    zscore: float
+    ewma: float
+    p05: float
+    p95: float
+    change: float  # Relative change of the fitted trend across the window
+    trend_break: bool
+    status: str | None  # None when there is not enough history
+
+    @property
+    def anomalous(self) -> bool:
+        return self.status in ("spike", "drop")
+
+
+def stack_tails(series_values: list[np.ndarray], window: int = DEFAULT_WINDOW) -> np.ndarray:
+    """Right-align the last ``window`` values of each series in a NaN-padded matrix"""
+    matrix = np.full((len(series_values), window), np.nan)
+    for row, values in enumerate(series_values):
+        tail = values[-window:]
+        if len(tail):
+            matrix[row, window - len(tail):] = tail
+    return matrix
+
+
+def _masked_slope(x: np.ndarray, y: np.ndarray, mask: np.ndarray) -> np.ndarray:
+    """Least-squares slope per row using only masked-in points"""
+    n = mask.sum(axis=1)
+    safe_n = np.maximum(n, 1)
+    x_mean = np.where(mask, x, 0).sum(axis=1) / safe_n
+    y_mean = np.where(mask, y, 0).sum(axis=1) / safe_n
+    dx = np.where(mask, x - x_mean[:, None], 0)
+    dy = np.where(mask, y - y_mean[:, None], 0)
+    denominator = (dx * dx).sum(axis=1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        slope = (dx * dy).sum(axis=1) / denominator
+    return np.where((n >= 2) & (denominator > 0), slope, 0.0)
+
+
+def score_matrix(matrix: np.ndarray) -> dict[str, np.ndarray]:
+    """Score the last column of every row against the rest of that row
+
+    ``matrix`` is NaN-padded on the left (see ``stack_tails``). Returns one
+    array per statistic, each with one entry per row.
+    """
+    rows, window = matrix.shape
+    current = matrix[:, -1]
+    history = matrix[:, :-1]
+    valid = ~np.isnan(history)
+    points = valid.sum(axis=1) + ~np.isnan(current)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        count = np.maximum(valid.sum(axis=1), 1)
+        mean = np.where(valid, history, 0).sum(axis=1) / count
+        deviation = np.where(valid, history - mean[:, None], 0)
+        std = np.sqrt((deviation * deviation).sum(axis=1) / count)
+        # A flat baseline gets a small floor so any real move still scores
+        scale = np.maximum(std, np.abs(mean) * 1e-3 + 1e-9)
+        zscore = (current - mean) / scale
+
+        # EWMA as a weighted mean: newest history point has the largest weight
+        exponents = np.arange(window - 2, -1, -1, dtype=float)
+        weights = np.where(valid, EWMA_ALPHA * (1 - EWMA_ALPHA) ** exponents, 0)
+        ewma = (weights * np.nan_to_num(history)).sum(axis=1) / weights.sum(axis=1)
+
+    all_nan = ~valid.any(axis=1)
+    filled = np.where(all_nan[:, None], 0.0, history)
+    p05, p95 = np.nanpercentile(filled, [5, 95], axis=1) if window > 1 else (mean, mean)
+
+    # Trend over the whole window vs the recent part of it
+    x = np.broadcast_to(np.arange(window, dtype=float), matrix.shape)
+    full_mask = ~np.isnan(matrix)
+    y = np.nan_to_num(matrix)
+    slope = _masked_slope(x, y, full_mask)
+    recent = max(3, int(window * RECENT_FRACTION))
+    recent_mask = full_mask & (x >= window - recent)
+    baseline_mask = full_mask & (x < window - recent)
+    recent_slope = _masked_slope(x, y, recent_mask)
+    baseline_slope = _masked_slope(x, y, baseline_mask)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        span = points.astype(float)
+        change = np.where(np.abs(mean) > 0, slope * span / np.abs(mean), 0.0)
+        # Break: the recent slope departs from the baseline slope by more than
+        # two standard deviations over the recent stretch, or flips direction
+        slope_gap = np.abs(recent_slope - baseline_slope) * recent
+        flipped = (np.sign(recent_slope) != np.sign(baseline_slope)) & (slope_gap > std)
+        trend_break = (points >= 2 * MIN_POINTS) & ((slope_gap > 2 * scale) | flipped)
+
+    return {
+        "points": points,
+        "value": current,
+        "mean": mean,
+        "std": std,
+        "zscore": np.nan_to_num(zscore),
+        "ewma": np.nan_to_num(ewma),
+        "p05": p05,
+        "p95": p95,
+        "change": np.nan_to_num(change),
+        "trend_break": trend_break,
+    }
+
+
+def classify(stats: dict[str, np.ndarray], lower_is_better: np.ndarray | None = None) -> np.ndarray:
+    """Status per row: spike, drop, trend_break, growing/declining (or
+    improving/worsening where ``lower_is_better``), healthy"""
+    rows = len(stats["value"])
+    inverted = np.zeros(rows, dtype=bool) if lower_is_better is None else lower_is_better
+    status = np.full(rows, "healthy", dtype=object)
+    rising = stats["change"] > TREND_THRESHOLD
+    falling = stats["change"] < -TREND_THRESHOLD
+    status[rising] = np.where(inverted[rising], "worsening", "growing")
+    status[falling] = np.where(inverted[falling], "improving", "declining")
+    status[stats["trend_break"]] = "trend_break"
+    outside = (stats["value"] > stats["p95"]) | (stats["value"] < stats["p05"])
+    status[(stats["zscore"] > Z_THRESHOLD) & outside] = "spike"
+    status[(stats["zscore"] < -Z_THRESHOLD) & outside] = "drop"
+    status[stats["points"] < MIN_POINTS] = None
+    return status
+
+
+def score_batch(
+    metrics: list[str],
+    series_values: list[np.ndarray],
+    window: int = DEFAULT_WINDOW,
+    lower_is_better: Collection[str] = LOWER_IS_BETTER,
+) -> list[AnomalyScore]:
+    """Score many metrics in one vectorized pass
+
+    Trends on metrics named in ``lower_is_better`` are judged inverted: a
+    rise is "worsening" and a fall "improving".
+    """
+    if not metrics:
+        return []
+    stats = score_matrix(stack_tails(series_values, window))
+    status = classify(stats, np.array([metric in lower_is_better for metric in metrics], dtype=bool))
+    return [
+        AnomalyScore(
+            metric=metric,
+            points=int(stats["points"][i]),
+            value=float(stats["value"][i]),
+            mean=float(stats["mean"][i]),
+            std=float(stats["std"][i]),
+            zscore=float(stats["zscore"][i]),
+            ewma=float(stats["ewma"][i]),
+            p05=float(stats["p05"][i]),
+            p95=float(stats["p95"][i]),
+            change=float(stats["change"][i]),
+            trend_break=bool(stats["trend_break"][i]),
+            status=status[i],
+        )
+        for i, metric in enumerate(metrics)
+    ]
+
+
+def score_series(
+    metric: str, values: np.ndarray, window: int = DEFAULT_WINDOW, lower_is_better: Collection[str] = LOWER_IS_BETTER
+) -> AnomalyScore:
+    """Score a single metric"""
+    return score_batch([metric], [values], window, lower_is_better)[0]
+
+
+def health_percent(statuses: list[str]) -> float:
+    """Share of ``statuses`` in ``GOOD_STATUSES``, in percent (100 when empty)"""
+    if not statuses:
+        return 100.0
+    return sum(status in GOOD_STATUSES for status in statuses) / len(statuses) * 100
@@ -0,0 +1,229 @@
+"""
+LITBOT 4.0 Batch Reports
+Renders reports for many tenant workspaces on a process pool. All tenants'
+rollups are packed once into a shared-memory block that workers map
+read-only, so tasks carry only a tenant id instead of pickled metric data.
+
+Usage: python litbot_batch.py STORES_DIR --out OUTPUT_DIR [--reports daily weekly] [--workers N]
+(STORES_DIR holds one ``<tenant>.npz`` saved with ``TimeSeriesStore.save``)
+"""
+
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field, replace
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from litbot_anomaly import DEFAULT_WINDOW, health_percent, score_batch
+from litbot_reports import DAILY_REPORT, WEEKLY_REPORT, ReportDefinition, ReportEngine
+from litbot_timeseries import RESOLUTIONS, ROLLUP_DTYPE, TimeSeriesStore
+
+DEFAULT_REPORTS = {"daily": DAILY_REPORT, "weekly": WEEKLY_REPORT}
+
+
+class SharedRollups:
+    """Rollups of many tenants packed into one structured array
+
+    ``index`` maps ``(tenant, metric, resolution)`` to ``(offset, length)``
+    in ``rows``. The parent builds it with ``pack``; workers ``attach`` to
+    the same shared-memory block by name.
+    """
+
+    def __init__(self, shm: shared_memory.SharedMemory, rows: np.ndarray, index: dict[tuple[str, str, str], tuple[int, int]]):
+        self.shm = shm
+        self.rows = rows
+        self.index = index
+
+    @classmethod
+    def pack(cls, stores: dict[str, TimeSeriesStore]) -> "SharedRollups":
+        parts, index, offset = [], {}, 0
+        for tenant, store in stores.items():
+            for metric in store.metrics():
+                for resolution in RESOLUTIONS:
+                    rows = store.range(metric, resolution=resolution)
+                    index[(tenant, metric, resolution)] = (offset, len(rows))
+                    parts.append(rows)
+                    offset += len(rows)
+        shm = shared_memory.SharedMemory(create=True, size=max(1, offset * ROLLUP_DTYPE.itemsize))
+        rows = np.ndarray(offset, dtype=ROLLUP_DTYPE, buffer=shm.buf)
+        if parts:
+            np.concatenate(parts, out=rows)
+        return cls(shm, rows, index)
+
+    @classmethod
+    def attach(cls, name: str, size: int, index: dict) -> "SharedRollups":
+        # Pool workers share the parent's resource tracker, so attaching does
+        # not schedule a second unlink; only the parent unlinks the block
+        shm = shared_memory.SharedMemory(name=name)
+        rows = np.ndarray(size, dtype=ROLLUP_DTYPE, buffer=shm.buf)
+        rows.flags.writeable = False
+        return cls(shm, rows, index)
+
+    def view(self, tenant: str) -> "TenantView":
+        return TenantView(self, tenant)
+
+    def close(self, unlink: bool = False):
+        self.rows = None
+        self.shm.close()
+        if unlink:
+            self.shm.unlink()
+
+
+class TenantView:
+    """Read-only, store-like access to one tenant's shared rollups"""
+
+    # A snapshot never changes (see TimeSeriesStore.version)
+    version = 0
+
+    def __init__(self, rollups: SharedRollups, tenant: str):
+        self.rollups = rollups
+        self.tenant = tenant
+        self._metrics = sorted({metric for t, metric, _ in rollups.index if t == tenant})
+
+    def metrics(self) -> list[str]:
+        return list(self._metrics)
+
+    def range(self, metric: str, start: float | None = None, end: float | None = None, resolution: str = "1m") -> np.ndarray:
+        """Buckets with ``start <= ts < end`` (rollup resolutions only)"""
+        offset, length = self.rollups.index.get((self.tenant, metric, resolution), (0, 0))
+        rows = self.rollups.rows[offset:offset + length]
+        lo = 0 if start is None else np.searchsorted(rows["ts"], start, side="left")
+        hi = length if end is None else np.searchsorted(rows["ts"], end, side="left")
+        return rows[lo:hi]
+
+
+@dataclass
+class BatchResult:
+    """Outcome of one batch run"""
+    reports: dict[str, dict[str, str]] = field(default_factory=dict)  # tenant -> report -> text
+    timings: dict[str, float] = field(default_factory=dict)  # tenant -> seconds
+    errors: dict[str, str] = field(default_factory=dict)
+    wall_seconds: float = 0.0
+    output_path: str | None = None
+
+
+# Worker-process state, set once by the pool initializer
+_rollups: SharedRollups | None = None
+_definitions: dict[str, ReportDefinition] = {}
+
+
+def _init_worker(name: str, size: int, index: dict, definitions: dict[str, ReportDefinition]):
+    global _rollups, _definitions
+    _rollups = SharedRollups.attach(name, size, index)
+    _definitions = definitions
+
+
+def _health(view: TenantView) -> str:
+    """Share of a tenant's metrics in a good state, scored on 1m bucket means"""
+    metrics = [m for m in view.metrics() if not m.startswith("feature_usage.")]
+    series = []
+    for metric in metrics:
+        rows = view.range(metric, resolution="1m")[-DEFAULT_WINDOW:]
+        series.append(rows["sum"] / np.maximum(rows["count"], 1))
+    # Series too short to score count as healthy
+    statuses = [score.status or "healthy" for score in score_batch(metrics, series)]
+    return f"{health_percent(statuses):.0f}"
+
+
+def render_tenant(tenant: str, report_names: list[str], end: float) -> tuple[str, dict[str, str], float, str | None]:
+    """Render ``report_names`` for one tenant (runs in a worker)"""
+    start = time.perf_counter()
+    try:
+        view = _rollups.view(tenant)
+        engine = ReportEngine(view)
+        for name in report_names:
+            definition = _definitions[name]
+            if "health" in definition.compiled.get_identifiers() and "health" not in definition.extras:
+                definition = replace(definition, extras={**definition.extras, "health": lambda s, e: _health(view)})
+            engine.register(definition)
+        reports = {name: engine.render(name, end=end) for name in report_names}
+        return tenant, reports, time.perf_counter() - start, None
+    except Exception as e:
+        return tenant, {}, time.perf_counter() - start, f"{type(e).__name__}: {e}"
+
+
+def run_batch(
+    stores: dict[str, TimeSeriesStore],
+    report_names: list[str] | None = None,
+    output_dir: str | None = None,
+    workers: int | None = None,
+    end: float | None = None,
+    definitions: dict[str, ReportDefinition] | None = None,
+) -> BatchResult:
+    """Render reports for every tenant on a process pool
+
+    Reports cover the periods ending at ``end`` (default: end of the current
+    UTC day). With ``output_dir`` they are written in one pass to
+    ``reports-<YYYY-MM-DD>.jsonl`` (one line per tenant and report).
+    """
+    definitions = {**DEFAULT_REPORTS, **(definitions or {})}
+    report_names = report_names or list(DEFAULT_REPORTS)
+    end = ReportEngine.period_end() if end is None else end
+    result = BatchResult()
+    wall_start = time.perf_counter()
+
+    rollups = SharedRollups.pack(stores)
+    try:
+        init_args = (rollups.shm.name, len(rollups.rows), rollups.index, definitions)
+        tenants = list(stores)
+        workers = workers or os.cpu_count() or 1
+        chunksize = max(1, len(tenants) // (workers * 4))
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=init_args) as pool:
+            outcomes = pool.map(render_tenant, tenants, [report_names] * len(tenants), [end] * len(tenants), chunksize=chunksize)
+            for tenant, reports, seconds, error in outcomes:
+                result.timings[tenant] = seconds
+                if error:
+                    result.errors[tenant] = error
+                else:
+                    result.reports[tenant] = reports
+    finally:
+        rollups.close(unlink=True)
+
+    if output_dir:
+        result.output_path = write_reports(result.reports, output_dir, end)
+    result.wall_seconds = time.perf_counter() - wall_start
+    return result
+
+
+def write_reports(reports: dict[str, dict[str, str]], output_dir: str, end: float) -> str:
+    """Write all reports to one JSON-lines file with a single write"""
+    os.makedirs(output_dir, exist_ok=True)
+    day = time.strftime("%Y-%m-%d", time.gmtime(end - 1))
+    path = os.path.join(output_dir, f"reports-{day}.jsonl")
+    lines = [
+        json.dumps({"tenant": tenant, "report": name, "period_end": end, "text": text})
+        for tenant, by_name in reports.items()
+        for name, text in by_name.items()
+    ]
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("\n".join(lines) + "\n")
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Render LitBot reports for every tenant store in a directory")
+    parser.add_argument("stores_dir")
+    parser.add_argument("--out", required=True)
+    parser.add_argument("--reports", nargs="+", default=list(DEFAULT_REPORTS), choices=list(DEFAULT_REPORTS))
+    parser.add_argument("--workers", type=int)
+    args = parser.parse_args()
+
+    stores = {
+        os.path.splitext(name)[0]: TimeSeriesStore.load(os.path.join(args.stores_dir, name))
+        for name in sorted(os.listdir(args.stores_dir))
+        if name.endswith(".npz")
+    }
+    result = run_batch(stores, args.reports, args.out, args.workers)
+    for tenant, seconds in sorted(result.timings.items(), key=lambda item: -item[1]):
+        print(f"{tenant}: {seconds * 1000:.1f}ms")
+    for tenant, error in result.errors.items():
+        print(f"{tenant}: ERROR {error}")
+    print(f"{len(result.reports)} tenants in {result.wall_seconds:.2f}s -> {result.output_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,311 @@
+"""
+LITBOT 4.0 Semantic Retrieval
+Local embeddings for knowledge-base passages, a contiguous float32 vector
+index (optionally memory-mapped, with an optional IVF coarse quantizer) and
+hybrid BM25 + cosine ranking.
+"""
+
+import heapq
+import json
+import os
+import re
+import threading
+import zlib
+
+import numpy as np
+
+from litbot_search import KnowledgeIndex, SearchHit, tokenize
+
+DEFAULT_DIM = 512
+# Weight of the vector score in hybrid ranking (BM25 gets the rest)
+HYBRID_ALPHA = 0.5
+# Candidates pulled from each ranker before fusing
+HYBRID_CANDIDATES = 50
+# Cosine below this counts as unrelated
+MIN_SIMILARITY = 0.1
+
+_WORD = re.compile(r"[a-z0-9]+")
+
+
+class HashingEmbedder:
+    """CPU-only embeddings from hashed word stems and character trigrams
+
+    Needs no model download. Stems match inflections, trigrams catch
+    partial overlaps ("subscription" vs "subscribe"); true synonyms need a
+    learned model (see ``SentenceTransformerEmbedder``).
+    """
+
+    def __init__(self, dim: int = DEFAULT_DIM, ngram: int = 3, word_weight: float = 2.0):
+        self.dim = dim
+        self.ngram = ngram
+        self.word_weight = word_weight
+        self._cache: dict[str, tuple[int, float]] = {}
+
+    def _feature(self, feature: str) -> tuple[int, float]:
+        hashed = self._cache.get(feature)
+        if hashed is None:
+            h = zlib.crc32(feature.encode("utf-8"))
+            # Low bits pick the slot, one high bit the sign (limits collisions' bias)
+            hashed = self._cache[feature] = (h % self.dim, 1.0 if h & 0x80000000 else -1.0)
+        return hashed
+
+    def _features(self, text: str) -> dict[tuple[int, float], float]:
+        counts: dict[tuple[int, float], float] = {}
+        for term in tokenize(text):
+            key = self._feature("w:" + term)
+            counts[key] = counts.get(key, 0.0) + self.word_weight
+        for word in _WORD.findall(text.lower()):
+            padded = f"<{word}>"
+            for i in range(len(padded) - self.ngram + 1):
+                key = self._feature(padded[i:i + self.ngram])
+                counts[key] = counts.get(key, 0.0) + 1.0
+        return counts
+
+    def embed(self, texts: list[str]) -> np.ndarray:
+        """L2-normalized ``(len(texts), dim)`` float32 matrix"""
+        matrix = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for (slot, sign), count in self._features(text).items():
+                # Sublinear term frequency
+                matrix[row, slot] += sign * (1.0 + np.log(count))
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        np.divide(matrix, norms, out=matrix, where=norms > 0)
+        return matrix
+
+
+class SentenceTransformerEmbedder:
+    """Small local transformer model (requires ``sentence-transformers``)"""
+
+    def __init__(self, model_name: str = "all-MiniLM-L6-v2"):
+        try:
+            from sentence_transformers import SentenceTransformer
+        except ImportError as e:
+            raise RuntimeError("sentence-transformers is not installed; use HashingEmbedder instead") from e
+        self.model = SentenceTransformer(model_name, device="cpu")
+        self.dim = self.model.get_sentence_embedding_dimension()
+
+    def embed(self, texts: list[str]) -> np.ndarray:
+        return self.model.encode(texts, normalize_embeddings=True, convert_to_numpy=True).astype(np.float32)
+
+
+class VectorIndex:
+    """Rows of unit vectors in one contiguous float32 matrix, searched by matmul
+
+    With ``path`` the matrix lives in a memory-mapped ``.npy`` file and the
+    row keys in ``<path>.keys.json``. ``build_ivf`` adds an inverted-file
+    quantizer so queries only score the rows of the closest clusters.
+    ``build`` names the key space the rows belong to (see ``KnowledgeIndex.build``).
+    """
+
+    def __init__(self, dim: int, path: str | None = None, capacity: int = 1024):
+        self.dim = dim
+        self.path = path
+        self.build: str | None = None
+        self.keys: list[int] = []
+        self._rows: dict[int, int] = {}
+        self.matrix = self._allocate(capacity)
+        self.centroids: np.ndarray | None = None
+        self.assignments = np.zeros(capacity, dtype=np.int32)
+        self.nprobe = 4
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def __contains__(self, key: int) -> bool:
+        return key in self._rows
+
+    def _allocate(self, capacity: int) -> np.ndarray:
+        if self.path is None:
+            return np.zeros((capacity, self.dim), dtype=np.float32)
+        tmp_path = self.path + ".tmp"
+        matrix = np.lib.format.open_memmap(tmp_path, mode="w+", dtype=np.float32, shape=(capacity, self.dim))
+        if getattr(self, "matrix", None) is not None:
+            matrix[:len(self.keys)] = self.matrix[:len(self.keys)]
+            del self.matrix
+        os.replace(tmp_path, self.path)
+        return matrix
+
+    def add(self, keys: list[int], vectors: np.ndarray):
+        """Append rows (keys must not already be present)"""
+        n = len(self.keys)
+        needed = n + len(keys)
+        if needed > len(self.matrix):
+            capacity = max(needed, 2 * len(self.matrix))
+            self.matrix = self._allocate(capacity)
+            self.assignments = np.resize(self.assignments, capacity)
+        self.matrix[n:needed] = vectors
+        if self.centroids is not None:
+            self.assignments[n:needed] = np.argmax(vectors @ self.centroids.T, axis=1)
+        for i, key in enumerate(keys):
+            self._rows[key] = n + i
+        self.keys.extend(keys)
+
+    def remove(self, key: int) -> bool:
+        """Drop a row by moving the last row into its slot"""
+        row = self._rows.pop(key, None)
+        if row is None:
+            return False
+        last = len(self.keys) - 1
+        if row != last:
+            moved = self.keys[last]
+            self.matrix[row] = self.matrix[last]
+            self.assignments[row] = self.assignments[last]
+            self.keys[row] = moved
+            self._rows[moved] = row
+        self.keys.pop()
+        return True
+
+    def clear(self):
+        """Drop every row, keeping the allocated matrix"""
+        self.keys = []
+        self._rows = {}
+        self.centroids = None
+
+    def vector(self, key: int) -> np.ndarray:
+        return self.matrix[self._rows[key]]
+
+    def build_ivf(self, nlist: int | None = None, iterations: int = 10, seed: int = 0):
+        """Cluster rows with spherical k-means for approximate search"""
+        n = len(self.keys)
+        nlist = nlist or max(1, int(np.sqrt(n)))
+        if n < nlist:
+            self.centroids = None
+            return
+        data = self.matrix[:n]
+        rng = np.random.default_rng(seed)
+        centroids = data[rng.choice(n, nlist, replace=False)].copy()
+        for _ in range(iterations):
+            assignments = np.argmax(data @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assignments, data)
+            norms = np.linalg.norm(sums, axis=1, keepdims=True)
+            # Empty clusters keep their previous centroid
+            centroids = np.where(norms > 0, sums / np.maximum(norms, 1e-12), centroids)
+        self.centroids = centroids.astype(np.float32)
+        self.assignments[:n] = np.argmax(data @ self.centroids.T, axis=1)
+
+    def search(self, query: np.ndarray, k: int = 5) -> list[tuple[int, float]]:
+        """Top-``k`` (key, cosine) pairs for a unit-length query vector"""
+        n = len(self.keys)
+        if not n:
+            return []
+        if self.centroids is not None:
+            probes = np.argsort(self.centroids @ query)[-self.nprobe:]
+            rows = np.flatnonzero(np.isin(self.assignments[:n], probes))
+            scores = self.matrix[rows] @ query
+        else:
+            rows = None
+            scores = self.matrix[:n] @ query
+        k = min(k, len(scores))
+        if not k:
+            return []
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        found = top if rows is None else rows[top]
+        return [(self.keys[row], float(scores[i])) for row, i in zip(found, top)]
+
+    def flush(self):
+        """Persist the row keys (and pending matrix writes) next to ``path``"""
+        if self.path is None:
+            return
+        self.matrix.flush()
+        with open(self.path + ".keys.json", "w", encoding="utf-8") as f:
+            json.dump({"keys": self.keys, "dim": self.dim, "build": self.build}, f)
+
+    @classmethod
+    def open(cls, path: str) -> "VectorIndex":
+        """Reopen an index saved with ``flush`` (the matrix stays memory-mapped)"""
+        with open(path + ".keys.json", encoding="utf-8") as f:
+            meta = json.load(f)
+        index = cls.__new__(cls)
+        index.dim = meta["dim"]
+        index.path = path
+        index.build = meta.get("build")
+        index.keys = meta["keys"]
+        index._rows = {key: row for row, key in enumerate(index.keys)}
+        index.matrix = np.load(path, mmap_mode="r+")
+        index.centroids = None
+        index.assignments = np.zeros(len(index.matrix), dtype=np.int32)
+        index.nprobe = 4
+        return index
+
+
+class SemanticRetriever:
+    """Vector and hybrid search over the passages of a ``KnowledgeIndex``
+
+    Passages are embedded once; the vector index is resynced lazily when the
+    knowledge index's revision changes, and rebuilt when it holds rows of
+    another knowledge index build. Safe to share between threads.
+    """
+
+    def __init__(self, knowledge_index: KnowledgeIndex, embedder=None, vectors: VectorIndex | None = None):
+        self.knowledge_index = knowledge_index
+        self.embedder = embedder or HashingEmbedder()
+        self.vectors = vectors if vectors is not None else VectorIndex(self.embedder.dim)
+        self._revision = -1
+        self._lock = threading.RLock()
+
+    @property
+    def stale(self) -> bool:
+        """Whether the knowledge index changed since the last sync"""
+        return self._revision != self.knowledge_index.revision
+
+    def sync(self) -> int:
+        """Embed new passages and drop removed ones; returns rows changed"""
+        with self._lock, self.knowledge_index.lock:
+            return self._sync()
+
+    def _sync(self) -> int:
+        if self._revision == self.knowledge_index.revision:
+            return 0
+        changed = 0
+        if self.vectors.build != self.knowledge_index.build:
+            # Passage ids restart with every build, so rows from another build are meaningless
+            changed = len(self.vectors)
+            self.vectors.clear()
+            self.vectors.build = self.knowledge_index.build
+        passages = self.knowledge_index.passages
+        stale = [key for key in self.vectors.keys if key not in passages]
+        for key in stale:
+            self.vectors.remove(key)
+        new = [pid for pid in passages if pid not in self.vectors]
+        if new:
+            # Prefix the document id so it counts as a title, as in BM25
+            texts = [f"{passages[pid][0]} {passages[pid][1]}" for pid in new]
+            self.vectors.add(new, self.embedder.embed(texts))
+        self._revision = self.knowledge_index.revision
+        return changed + len(stale) + len(new)
+
+    def search(self, query: str, k: int = 5) -> list[SearchHit]:
+        """Top-``k`` passages by cosine similarity"""
+        terms = set(tokenize(query))
+        query_vector = self.embedder.embed([query])[0]
+        with self._lock, self.knowledge_index.lock:
+            self._sync()
+            return [
+                self.knowledge_index.hit(pid, score, terms)
+                for pid, score in self.vectors.search(query_vector, k)
+                if score >= MIN_SIMILARITY
+            ]
+
+    def hybrid_search(self, query: str, k: int = 5, alpha: float = HYBRID_ALPHA) -> list[SearchHit]:
+        """Fuse max-normalized BM25 and cosine scores: ``alpha * cos + (1 - alpha) * bm25``"""
+        terms = set(tokenize(query))
+        query_vector = self.embedder.embed([query])[0]
+        with self._lock, self.knowledge_index.lock:
+            self._sync()
+            bm25 = dict(heapq.nlargest(HYBRID_CANDIDATES, self.knowledge_index.score(terms).items(), key=lambda item: item[1]))
+            cosine = dict(self.vectors.search(query_vector, HYBRID_CANDIDATES))
+            for pid in bm25.keys() - cosine.keys():
+                cosine[pid] = float(self.vectors.vector(pid) @ query_vector)
+        top_bm25 = max(bm25.values(), default=0.0) or 1.0
+        top_cosine = max(max(cosine.values(), default=0.0), 1e-9)
+        fused = {
+            pid: alpha * max(cosine[pid], 0.0) / top_cosine + (1 - alpha) * bm25.get(pid, 0.0) / top_bm25
+            for pid in cosine
+            if pid in bm25 or cosine[pid] >= MIN_SIMILARITY
+        }
+        best = heapq.nlargest(k, fused.items(), key=lambda item: item[1])
+        with self.knowledge_index.lock:
+            # Drop passages removed since scoring
+            return [self.knowledge_index.hit(pid, score, terms) for pid, score in best if pid in self.knowledge_index.passages]
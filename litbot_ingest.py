@@ -0,0 +1,294 @@
+"""
+LITBOT 4.0 Metric Ingestion
+Buffers live metric points per metric and flushes them into a TimeSeriesStore
+on a background thread. Points arrive through the Python API, an HTTP
+endpoint (JSON batches) or a UDP listener (one ``metric:value[|ts]`` per line).
+"""
+
+import json
+import math
+import socket
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Iterable
+
+import numpy as np
+
+from litbot_timeseries import TimeSeriesStore
+
+# UDP datagrams larger than this are truncated by the kernel anyway
+MAX_DATAGRAM = 65535
+
+
+def _finite(number: Any, field: str) -> float:
+    """``float(number)``, rejecting NaN and infinities"""
+    number = float(number)
+    if not math.isfinite(number):
+        raise ValueError(f"Invalid {field}: {number}")
+    return number
+
+
+def parse_line(line: str) -> tuple[str, float, float | None]:
+    """Parse ``metric:value`` or ``metric:value|ts`` (line protocol)"""
+    name, _, rest = line.strip().partition(":")
+    value, _, ts = rest.partition("|")
+    if not name or not value:
+        raise ValueError(f"Invalid metric line: {line!r}")
+    return name, _finite(value, "value"), _finite(ts, "timestamp") if ts else None
+
+
+def _point(item: Any) -> tuple[str, float, float | None]:
+    """Normalize a JSON point: {"metric", "value", "ts"} or [metric, value, ts]"""
+    if isinstance(item, dict):
+        metric, value, ts = item["metric"], item["value"], item.get("ts")
+    else:
+        metric, value, *rest = item
+        ts = rest[0] if rest else None
+    if not isinstance(metric, str) or not metric:
+        raise ValueError(f"Invalid metric name: {metric!r}")
+    return metric, _finite(value, "value"), None if ts is None else _finite(ts, "timestamp")
+
+
+def _numeric(point: Any) -> bool:
+    """Whether a buffered (ts, value) pair converts to finite floats"""
+    try:
+        ts, value = point
+        _finite(ts, "timestamp"), _finite(value, "value")
+    except (TypeError, ValueError):
+        return False
+    return True
+
+
+class MetricIngestor:
+    """Per-metric point buffers flushed in bulk into a store
+
+    Producers only append to a ``deque`` (atomic, no lock taken); the flush
+    thread drains each buffer and writes it with one vectorized
+    ``store.append_points`` call, so readers of the store are never blocked by
+    ingestion.
+    """
+
+    def __init__(self, store: TimeSeriesStore, flush_interval: float = 0.05, max_buffered: int = 1_000_000):
+        self.store = store
+        self.flush_interval = flush_interval
+        # Per-metric cap; the oldest unflushed points are dropped beyond it
+        self.max_buffered = max_buffered
+        self._buffers: dict[str, deque] = {}
+        self._buffers_lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._servers: list[Any] = []
+        # Best-effort counters (not synchronized across producer threads)
+        self.points_received = 0
+        self.points_flushed = 0
+        self.points_rejected = 0
+        # Batches that could not be written (their points are counted as rejected)
+        self.flush_errors = 0
+        # Store listener failures after a batch was written (its points still count as flushed)
+        self.listener_errors = 0
+        self.last_error: str | None = None
+
+    def _buffer(self, metric: str) -> deque:
+        buffer = self._buffers.get(metric)
+        if buffer is None:
+            with self._buffers_lock:
+                buffer = self._buffers.get(metric)
+                if buffer is None:
+                    buffer = self._buffers[metric] = deque(maxlen=self.max_buffered)
+        return buffer
+
+    def submit(self, metric: str, value: float, ts: float | None = None):
+        """Queue one point (``ts`` defaults to now); NaN or infinite numbers raise ValueError"""
+        point = (time.time() if ts is None else _finite(ts, "timestamp"), _finite(value, "value"))
+        self._buffer(metric).append(point)
+        self.points_received += 1
+
+    def submit_batch(self, points: Iterable[tuple[str, float, float | None]]) -> int:
+        """Queue many ``(metric, value, ts)`` points; returns how many"""
+        now = time.time()
+        count = 0
+        buffer, last_metric = None, None
+        for metric, value, ts in points:
+            if metric != last_metric:
+                buffer, last_metric = self._buffer(metric), metric
+            buffer.append((now if ts is None else ts, value))
+            count += 1
+        self.points_received += count
+        return count
+
+    def pending(self) -> int:
+        """Points buffered but not yet written to the store"""
+        return sum(len(buffer) for buffer in list(self._buffers.values()))
+
+    def flush(self) -> int:
+        """Drain every buffer into the store; returns points written"""
+        written = 0
+        with self._flush_lock:
+            for metric, buffer in list(self._buffers.items()):
+                n = len(buffer)
+                if not n:
+                    continue
+                # popleft is atomic, so producers can keep appending meanwhile
+                batch = [buffer.popleft() for _ in range(n)]
+                try:
+                    try:
+                        points = np.array(batch, dtype="f8").reshape(n, 2)
+                    except (TypeError, ValueError) as e:
+                        # Python API callers are not validated: drop only the malformed points
+                        self.flush_errors += 1
+                        self.last_error = f"{metric}: {type(e).__name__}: {e}"
+                        points = np.array([point for point in batch if _numeric(point)], dtype="f8").reshape(-1, 2)
+                    timestamps, values = self.store.append_points(metric, points[:, 0], points[:, 1])
+                except Exception as e:
+                    # Never let one metric's batch stop the others from flushing
+                    self.flush_errors += 1
+                    self.last_error = f"{metric}: {type(e).__name__}: {e}"
+                    self.points_rejected += n
+                    continue
+                # Count the batch as stored before listeners run, so their failures cannot undo it
+                written += len(timestamps)
+                self.points_flushed += len(timestamps)
+                self.points_rejected += n - len(timestamps)
+                self.store.notify(metric, timestamps, values, on_error=lambda e: self._listener_failed(metric, e))
+        return written
+
+    def _listener_failed(self, metric: str, error: Exception):
+        self.listener_errors += 1
+        self.last_error = f"{metric}: listener {type(error).__name__}: {error}"
+
+    def _flush_loop(self):
+        while not self._stop.wait(self.flush_interval):
+            self._flush_safely()
+        self._flush_safely()
+
+    def _flush_safely(self):
+        """One flush of the background loop; an unexpected error must not end ingestion"""
+        try:
+            self.flush()
+        except Exception as e:
+            self.flush_errors += 1
+            self.last_error = f"{type(e).__name__}: {e}"
+
+    @property
+    def running(self) -> bool:
+        """Whether the background flush thread is alive"""
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> "MetricIngestor":
+        """Start the background flush thread"""
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._flush_loop, name="litbot-ingest", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        """Stop listeners and the flush thread, writing out anything buffered"""
+        for server in self._servers:
+            server.shutdown()
+            server.server_close()
+        self._servers.clear()
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+        self.flush()
+
+    def __enter__(self) -> "MetricIngestor":
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+        return False
+
+    def serve_http(self, host: str = "127.0.0.1", port: int = 9470) -> ThreadingHTTPServer:
+        """Accept ``POST /ingest`` with a JSON list of points (or ``{"points": [...]}``)"""
+        ingestor = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True
+
+            def do_POST(self):
+                if self.path != "/ingest":
+                    self._reply(404, {"error": "not found"})
+                    return
+                try:
+                    body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+                    items = body["points"] if isinstance(body, dict) else body
+                    if not isinstance(items, list):
+                        raise TypeError("expected a list of points")
+                    # Validate the whole batch first: a 400 means nothing was queued
+                    points = [_point(item) for item in items]
+                    accepted = ingestor.submit_batch(points)
+                except (ValueError, KeyError, TypeError) as e:
+                    self._reply(400, {"error": str(e)})
+                    return
+                self._reply(202, {"accepted": accepted})
+
+            def _reply(self, status: int, payload: dict):
+                body = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        httpd = ThreadingHTTPServer((host, port), Handler)
+        httpd.daemon_threads = True
+        threading.Thread(target=httpd.serve_forever, name="litbot-ingest-http", daemon=True).start()
+        self._servers.append(httpd)
+        return httpd
+
+    def serve_udp(self, host: str = "127.0.0.1", port: int = 9471) -> "_UdpListener":
+        """Accept newline-separated ``metric:value[|ts]`` datagrams"""
+        listener = _UdpListener(self, host, port)
+        self._servers.append(listener)
+        return listener
+
+
+class _UdpListener:
+    """Datagram receiver feeding an ingestor; malformed lines are skipped"""
+
+    def __init__(self, ingestor: MetricIngestor, host: str, port: int):
+        self.ingestor = ingestor
+        self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 4 * 1024 * 1024)
+        self.socket.bind((host, port))
+        self.socket.settimeout(0.2)
+        self.server_address = self.socket.getsockname()
+        self.malformed = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._serve, name="litbot-ingest-udp", daemon=True)
+        self._thread.start()
+
+    def _serve(self):
+        while not self._stop.is_set():
+            try:
+                data = self.socket.recv(MAX_DATAGRAM)
+            except socket.timeout:
+                continue
+            except OSError:
+                break
+            points = []
+            for line in data.decode("utf-8", errors="replace").splitlines():
+                if not line.strip():
+                    continue
+                try:
+                    points.append(parse_line(line))
+                except ValueError:
+                    self.malformed += 1
+            self.ingestor.submit_batch(points)
+
+    def shutdown(self):
+        self._stop.set()
+        self._thread.join()
+
+    def server_close(self):
+        self.socket.close()
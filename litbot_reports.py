@@ -0,0 +1,205 @@
+"""
+LITBOT 4.0 Report Engine
+Business reports computed from the time-series store's rollups, rendered
+through precompiled templates and cached per (report, period, period end)
+until the store receives new points.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from string import Template
+from typing import Callable
+
+import numpy as np
+
+from litbot_timeseries import RESOLUTIONS, TimeSeriesStore, parse_period
+
+# Rollups are read at the finest resolution with at most this many buckets
+MAX_REPORT_BUCKETS = 1500
+DAY = 86400
+
+
+@dataclass
+class ReportField:
+    """One template value: an aggregate of a metric over the report period
+
+    Aggregates: last, first_mean (mean of the earliest rollup bucket; rollups
+    keep no first value), mean, min, max, sum, count, delta (last minus the
+    previous period's last), growth (delta as a fraction of the previous
+    last; pair it with a ``%`` format) and top (the ``limit`` highest-sum
+    series whose names start with ``metric``).
+    """
+    metric: str
+    aggregate: str = "last"
+    format: str = ",.2f"
+    limit: int = 1
+
+
+@dataclass
+class ReportDefinition:
+    """Named report: a default period, a ``string.Template`` body and its fields"""
+    name: str
+    template: str
+    fields: dict[str, ReportField]
+    period: str = "1d"
+    # Values computed by callables (start, end) -> str, e.g. derived health scores
+    extras: dict[str, Callable[[float, float], str]] = field(default_factory=dict)
+
+    def __post_init__(self):
+        self.compiled = Template(self.template)
+
+
+def _aggregate_rows(rows: np.ndarray) -> dict[str, float] | None:
+    if not len(rows):
+        return None
+    count = int(rows["count"].sum())
+    return {
+        "first_mean": float(rows["sum"][0] / max(rows["count"][0], 1)),
+        "last": float(rows["last"][-1]),
+        "mean": float(rows["sum"].sum() / max(count, 1)),
+        "min": float(rows["min"].min()),
+        "max": float(rows["max"].max()),
+        "sum": float(rows["sum"].sum()),
+        "count": count,
+    }
+
+
+class ReportEngine:
+    """Renders report definitions against a store, caching finished reports"""
+
+    def __init__(self, store: TimeSeriesStore, labels: dict[str, str] | None = None, max_cached: int = 256):
+        self.store = store
+        # Display names for metrics (used by "top")
+        self.labels = dict(labels or {})
+        self.definitions: dict[str, ReportDefinition] = {}
+        self.max_cached = max_cached
+        self._cache: OrderedDict[tuple, str] = OrderedDict()
+        self._lock = threading.Lock()
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    def register(self, definition: ReportDefinition):
+        """Add or replace a report definition"""
+        self.definitions[definition.name] = definition
+        self.invalidate(definition.name)
+
+    def invalidate(self, name: str | None = None):
+        """Drop cached renders (of one report, or all)"""
+        with self._lock:
+            for key in [key for key in self._cache if name is None or key[0] == name]:
+                del self._cache[key]
+
+    @staticmethod
+    def period_end(now: float | None = None) -> float:
+        """End of the current UTC day; reports cover the period up to it"""
+        now = time.time() if now is None else now
+        return (now // DAY + 1) * DAY
+
+    def render(self, name: str, period: str | None = None, end: float | None = None) -> str:
+        """Render a report; cached per (name, period, period end, store version)"""
+        definition = self.definitions[name]
+        period = period or definition.period
+        end = self.period_end() if end is None else end
+        # Read before computing: a point landing mid-render makes the next call recompute
+        key = (name, period, end, self.store.version)
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached is not None:
+                self._cache.move_to_end(key)
+                self.cache_hits += 1
+                return cached
+            self.cache_misses += 1
+
+        seconds = parse_period(period)
+        values = self.compute(definition, end - seconds, end)
+        text = definition.compiled.safe_substitute(values)
+        with self._lock:
+            self._cache[key] = text
+            if len(self._cache) > self.max_cached:
+                self._cache.popitem(last=False)
+        return text
+
+    def compute(self, definition: ReportDefinition, start: float, end: float) -> dict[str, str]:
+        """Formatted template values for the period ``[start, end)``"""
+        resolution = self._resolution(2 * (end - start))
+        summaries: dict[tuple[str, float, float], dict | None] = {}
+
+        def summary(metric: str, lo: float, hi: float) -> dict | None:
+            key = (metric, lo, hi)
+            if key not in summaries:
+                summaries[key] = _aggregate_rows(self.store.range(metric, lo, hi, resolution))
+            return summaries[key]
+
+        values = {}
+        for placeholder, spec in definition.fields.items():
+            if spec.aggregate == "top":
+                values[placeholder] = self._top(spec, summary, start, end)
+                continue
+            current = summary(spec.metric, start, end)
+            value = None
+            if spec.aggregate in ("delta", "growth"):
+                previous = summary(spec.metric, 2 * start - end, start)
+                if current and previous:
+                    value = current["last"] - previous["last"]
+                    if spec.aggregate == "growth":
+                        value = value / abs(previous["last"]) if previous["last"] else None
+            elif current:
+                value = current[spec.aggregate]
+            values[placeholder] = "n/a" if value is None else format(value, spec.format)
+        for placeholder, extra in definition.extras.items():
+            values[placeholder] = extra(start, end)
+        return values
+
+    def _top(self, spec: ReportField, summary, start: float, end: float) -> str:
+        totals = []
+        for metric in self.store.metrics():
+            if metric.startswith(spec.metric):
+                s = summary(metric, start, end)
+                if s:
+                    totals.append((s["sum"], metric))
+        if not totals:
+            return "n/a"
+        best = sorted(totals, reverse=True)[:spec.limit]
+        return ", ".join(self.labels.get(metric, metric[len(spec.metric):]) for _, metric in best)
+
+    @staticmethod
+    def _resolution(seconds: float) -> str:
+        return next((name for name, size in RESOLUTIONS.items() if seconds / size <= MAX_REPORT_BUCKETS), "1d")
+
+
+DAILY_REPORT = ReportDefinition(
+    name="daily",
+    period="1d",
+    template="""
+DAILY BUSINESS REPORT
+---------------------
+MRR: $$$mrr
+New Users: +$new_users
+Active Users: $active_users
+System Health: $health%
+""",
+    fields={
+        "mrr": ReportField("revenue_mrr", "last", ",.2f"),
+        "new_users": ReportField("new_users", "sum", ",.0f"),
+        "active_users": ReportField("active_users", "last", ",.0f"),
+    },
+)
+
+WEEKLY_REPORT = ReportDefinition(
+    name="weekly",
+    period="7d",
+    template="""
+WEEKLY PERFORMANCE REVIEW
+-------------------------
+Revenue Growth: $revenue_growth
+Churn: $churn%
+Top Feature: $top_feature
+""",
+    fields={
+        "revenue_growth": ReportField("revenue_mrr", "growth", "+.1%"),
+        "churn": ReportField("churn_rate", "mean", ".1f"),
+        "top_feature": ReportField("feature_usage.", "top"),
+    },
+)
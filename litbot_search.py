@@ -0,0 +1,289 @@
+"""
+LITBOT 4.0 Knowledge Search
+Inverted index over knowledge-base documents: tokenization, light stemming,
+BM25 ranking of passages and snippets. Documents can be added, updated and
+removed incrementally and the whole index saved to / loaded from disk.
+"""
+
+import hashlib
+import heapq
+import json
+import math
+import os
+import re
+import threading
+import uuid
+from dataclasses import dataclass
+from functools import lru_cache
+from itertools import chain
+
+import numpy as np
+
+_WORD = re.compile(r"[A-Za-z0-9]+")
+
+STOPWORDS = frozenset(
+    "a an and are as at be but by do does for from how i in is it of on or our "
+    "so that the their this to was we what when where which who why will with you your".split()
+)
+
+# (suffix, replacement), first match wins
+_SUFFIX_RULES = (
+    ("sses", "ss"), ("ies", "y"), ("ss", "ss"), ("ness", ""), ("ment", ""),
+    ("ing", ""), ("ed", ""), ("ly", ""), ("es", ""), ("s", ""),
+)
+
+# Long paragraphs are split into passages of at most this many words
+PASSAGE_WORDS = 80
+SNIPPET_WORDS = 40
+
+
+@lru_cache(maxsize=65536)
+def stem(word: str) -> str:
+    """Light suffix-stripping stemmer (pricing/priced/prices -> pric)"""
+    if len(word) <= 3 or word.isdigit():
+        return word
+    for suffix, replacement in _SUFFIX_RULES:
+        if word.endswith(suffix) and len(word) - len(suffix) >= 3:
+            word = word[:len(word) - len(suffix)] + replacement
+            if suffix in ("ing", "ed") and len(word) > 3 and word[-1] == word[-2] and word[-1] not in "lsz":
+                word = word[:-1]
+            break
+    if word.endswith("e") and len(word) > 4:
+        word = word[:-1]
+    return word
+
+
+def tokenize(text: str) -> list[str]:
+    """Lowercased, stemmed terms with stopwords removed"""
+    return [stem(w) for w in (m.group().lower() for m in _WORD.finditer(text)) if w not in STOPWORDS]
+
+
+def split_passages(text: str, max_words: int = PASSAGE_WORDS) -> list[str]:
+    """Paragraphs, with long ones cut into ``max_words`` chunks"""
+    passages = []
+    for paragraph in re.split(r"\n\s*\n", text):
+        words = paragraph.split()
+        for i in range(0, len(words), max_words):
+            passages.append(" ".join(words[i:i + max_words]))
+    return passages
+
+
+def title_terms(doc_id: str) -> list[str]:
+    # The document id doubles as a title, so "pricing" finds pricing_strategy
+    return tokenize(os.path.splitext(doc_id)[0])
+
+
+@dataclass
+class SearchHit:
+    """One ranked passage"""
+    doc_id: str
+    passage: str
+    score: float
+    snippet: str
+
+
+class KnowledgeIndex:
+    """BM25 inverted index over document passages"""
+
+    K1 = 1.2
+    B = 0.75
+
+    def __init__(self):
+        # doc_id -> {"text", "digest", "passages": [passage ids], "source": directory or None}
+        self.documents: dict[str, dict] = {}
+        # passage id -> (doc_id, text, length in terms)
+        self.passages: dict[int, tuple[str, str, int]] = {}
+        # term -> {passage id: term frequency}
+        self.postings: dict[str, dict[int, int]] = {}
+        self._next_id = 0
+        self._total_length = 0
+        # Bumped on every change so derived indexes know when to resync
+        self.revision = 0
+        # Passage ids are only meaningful within this build of the index (kept by save/load)
+        self.build = uuid.uuid4().hex
+        # Guards every read and write of the dicts above; tool calls run on
+        # threads. Held by callers that combine several reads (score, then hit)
+        self.lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self.documents)
+
+    def __contains__(self, doc_id: str) -> bool:
+        return doc_id in self.documents
+
+    @staticmethod
+    def _digest(text: str) -> str:
+        return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+    def add_document(self, doc_id: str, text: str, source: str | None = None) -> bool:
+        """Index (or re-index) a document; False if it was already up to date"""
+        digest = self._digest(text)
+        existing = self.documents.get(doc_id)
+        if existing and existing["digest"] == digest:
+            # Skip tokenizing unchanged documents; _add checks again under the lock
+            return False
+        title = title_terms(doc_id)
+        chunks = [(passage, title + tokenize(passage)) for passage in split_passages(text) or [""]]
+        with self.lock:
+            return self._add(doc_id, text, source, digest, chunks)
+
+    def _add(self, doc_id: str, text: str, source: str | None, digest: str, chunks: list[tuple[str, list[str]]]) -> bool:
+        existing = self.documents.get(doc_id)
+        if existing and existing["digest"] == digest:
+            return False
+        if existing:
+            self._remove(doc_id)
+
+        passage_ids = []
+        for passage, terms in chunks:
+            passage_id = self._next_id
+            self._next_id += 1
+            counts: dict[str, int] = {}
+            for term in terms:
+                counts[term] = counts.get(term, 0) + 1
+            for term, tf in counts.items():
+                self.postings.setdefault(term, {})[passage_id] = tf
+            self.passages[passage_id] = (doc_id, passage, len(terms))
+            self._total_length += len(terms)
+            passage_ids.append(passage_id)
+        self.documents[doc_id] = {"text": text, "digest": digest, "passages": passage_ids, "source": source}
+        self.revision += 1
+        return True
+
+    def remove_document(self, doc_id: str) -> bool:
+        """Drop a document and its postings"""
+        with self.lock:
+            return self._remove(doc_id)
+
+    def _remove(self, doc_id: str) -> bool:
+        document = self.documents.pop(doc_id, None)
+        if document is None:
+            return False
+        for passage_id in document["passages"]:
+            _, passage, length = self.passages.pop(passage_id)
+            self._total_length -= length
+            for term in set(title_terms(doc_id) + tokenize(passage)):
+                postings = self.postings.get(term)
+                if postings is not None:
+                    postings.pop(passage_id, None)
+                    if not postings:
+                        del self.postings[term]
+        self.revision += 1
+        return True
+
+    def search(self, query: str, k: int = 5) -> list[SearchHit]:
+        """Top-``k`` passages for ``query`` by BM25"""
+        terms = set(tokenize(query))
+        with self.lock:
+            scores = self.score(terms)
+            return [self.hit(pid, score, terms) for pid, score in heapq.nlargest(k, scores.items(), key=lambda item: item[1])]
+
+    def score(self, terms: set[str]) -> dict[int, float]:
+        """BM25 score of every passage containing at least one of ``terms``"""
+        scores: dict[int, float] = {}
+        with self.lock:
+            if not terms or not self.passages:
+                return scores
+            n = len(self.passages)
+            average_length = self._total_length / n
+            for term in terms:
+                postings = self.postings.get(term)
+                if not postings:
+                    continue
+                idf = math.log(1 + (n - len(postings) + 0.5) / (len(postings) + 0.5))
+                for passage_id, tf in postings.items():
+                    length = self.passages[passage_id][2]
+                    norm = self.K1 * (1 - self.B + self.B * length / average_length)
+                    scores[passage_id] = scores.get(passage_id, 0.0) + idf * tf * (self.K1 + 1) / (tf + norm)
+        return scores
+
+    def hit(self, passage_id: int, score: float, terms: set[str]) -> SearchHit:
+        """Build a result for one passage, with a snippet around ``terms``"""
+        with self.lock:
+            doc_id, passage, _ = self.passages[passage_id]
+        return SearchHit(doc_id, passage, score, snippet(passage, terms))
+
+    def load_directory(self, path: str, extensions: tuple[str, ...] = (".md", ".txt")) -> int:
+        """Sync the index with text files under ``path``; returns documents changed
+
+        Document ids are paths relative to ``path``. Unchanged files are
+        skipped and files that disappeared are removed from the index.
+        """
+        seen = set()
+        changed = 0
+        for root, _, files in os.walk(path):
+            for name in files:
+                if not name.endswith(extensions):
+                    continue
+                full_path = os.path.join(root, name)
+                doc_id = os.path.relpath(full_path, path).replace(os.sep, "/")
+                seen.add(doc_id)
+                with open(full_path, encoding="utf-8", errors="replace") as f:
+                    changed += self.add_document(doc_id, f.read(), source=path)
+        with self.lock:
+            stale = [doc_id for doc_id, doc in self.documents.items() if doc.get("source") == path and doc_id not in seen]
+        for doc_id in stale:
+            changed += self.remove_document(doc_id)
+        return changed
+
+    def save(self, path: str):
+        """Write the index to an ``.npz`` file
+
+        Postings are stored column-wise (terms, offsets, passage ids, term
+        frequencies) so loading does not re-tokenize any document.
+        """
+        with self.lock:
+            terms = list(self.postings)
+            sizes = np.fromiter((len(self.postings[t]) for t in terms), dtype=np.int64, count=len(terms))
+            total = int(sizes.sum())
+            passage_ids = np.fromiter(chain.from_iterable(self.postings[t].keys() for t in terms), dtype=np.int64, count=total)
+            frequencies = np.fromiter(chain.from_iterable(self.postings[t].values() for t in terms), dtype=np.int32, count=total)
+            meta = json.dumps({
+                "documents": self.documents,
+                "passages": {str(pid): list(p) for pid, p in self.passages.items()},
+                "terms": terms,
+                "next_id": self._next_id,
+                "build": self.build,
+            })
+        with open(path, "wb") as f:
+            # Uncompressed: posting ids barely compress and zlib dominates save time
+            np.savez(
+                f,
+                meta=np.frombuffer(meta.encode("utf-8"), dtype=np.uint8),
+                sizes=sizes,
+                passage_ids=passage_ids,
+                frequencies=frequencies,
+            )
+
+    @classmethod
+    def load(cls, path: str) -> "KnowledgeIndex":
+        """Read an index written by ``save``"""
+        with np.load(path) as data:
+            meta = json.loads(data["meta"].tobytes().decode("utf-8"))
+            offsets = np.r_[0, np.cumsum(data["sizes"])].tolist()
+            passage_ids = data["passage_ids"].tolist()
+            frequencies = data["frequencies"].tolist()
+        index = cls()
+        index.documents = meta["documents"]
+        index.passages = {int(pid): tuple(p) for pid, p in meta["passages"].items()}
+        index.postings = {
+            term: dict(zip(passage_ids[offsets[i]:offsets[i + 1]], frequencies[offsets[i]:offsets[i + 1]]))
+            for i, term in enumerate(meta["terms"])
+        }
+        index._next_id = meta["next_id"]
+        # Passage ids survive the round trip, so vectors saved for this build still apply
+        index.build = meta.get("build", index.build)
+        index._total_length = sum(p[2] for p in index.passages.values())
+        return index
+
+
+def snippet(passage: str, terms: set[str], words: int = SNIPPET_WORDS) -> str:
+    """Window of ``passage`` around the first word matching one of ``terms``"""
+    matches = list(_WORD.finditer(passage))
+    if len(matches) <= words:
+        return passage
+    first = next((i for i, m in enumerate(matches) if stem(m.group().lower()) in terms), 0)
+    start = max(0, min(first - words // 4, len(matches) - words))
+    end = start + words
+    text = passage[matches[start].start():matches[end - 1].end()]
+    return ("..." if start else "") + text + ("..." if end < len(matches) else "")
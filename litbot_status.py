@@ -0,0 +1,102 @@
+"""
+LITBOT 4.0 Status Snapshot
+System status text kept up to date incrementally: metrics written to the
+store are marked dirty and only their lines are re-rendered. Each change
+bumps a version number so pollers can fetch just what changed since the
+version they last saw. Component lines (state not stored as points) are
+re-rendered on every refresh and versioned the same way.
+"""
+
+import threading
+from collections import OrderedDict
+from typing import Callable
+
+import numpy as np
+
+from litbot_timeseries import TimeSeriesStore
+
+
+class StatusSnapshot:
+    """Incrementally maintained ``metric -> status line`` view of a store"""
+
+    def __init__(self, store: TimeSeriesStore, render_line: Callable[[str], str], order: list[str] | None = None):
+        self.store = store
+        self.render_line = render_line
+        # Lines in display order; ``order`` pins metrics to the top
+        self._lines: dict[str, str] = {metric: "" for metric in order or []}
+        # metric -> version of its last change, least recently changed first
+        self._changed: OrderedDict[str, int] = OrderedDict()
+        self._dirty: set[str] = set(self._lines) | set(store.metrics())
+        # key -> render() for component lines, shown after the metric lines
+        self._components: dict[str, Callable[[], str]] = {}
+        self._text: str | None = None
+        self._lock = threading.Lock()
+        self.version = 0
+        store.add_listener(self._on_points)
+
+    def _on_points(self, metric: str, timestamps: np.ndarray, values: np.ndarray):
+        # Runs on the writer's thread: just note the metric (set.add is atomic)
+        self._dirty.add(metric)
+
+    def mark_dirty(self, metric: str):
+        """Force a metric's line to be re-rendered (e.g. its config changed)"""
+        self._dirty.add(metric)
+
+    def watch(self, key: str, render: Callable[[], str]):
+        """Add a component line, re-rendered on every refresh and versioned on change"""
+        with self._lock:
+            self._components[key] = render
+            self._text = None
+        self._dirty.add(key)
+
+    def close(self):
+        """Stop tracking the store"""
+        self.store.remove_listener(self._on_points)
+
+    def refresh(self) -> int:
+        """Re-render dirty lines; returns the (possibly bumped) version"""
+        if not self._dirty and not self._components:
+            return self.version
+        with self._lock:
+            self._dirty.update(self._components)
+            while self._dirty:
+                metric = self._dirty.pop()
+                component = self._components.get(metric)
+                line = component() if component is not None else self.render_line(metric)
+                if self._lines.get(metric) == line:
+                    continue
+                self._lines[metric] = line
+                self.version += 1
+                self._changed[metric] = self.version
+                self._changed.move_to_end(metric)
+                self._text = None
+            return self.version
+
+    def render(self) -> str:
+        """Full status text (re-joined only after a line changed)"""
+        self.refresh()
+        text = self._text
+        if text is None:
+            with self._lock:
+                metrics = [line for key, line in self._lines.items() if line and key not in self._components]
+                components = [self._lines[key] for key in self._components if self._lines.get(key)]
+                text = "\n".join(metrics)
+                if components:
+                    text += "\n\n" + "\n".join(components)
+                self._text = text
+        return text
+
+    def changes_since(self, version: int) -> tuple[int, dict[str, str]]:
+        """(current version, lines of metrics changed after ``version``)
+
+        Cost is proportional to the number of changes, not the number of
+        metrics.
+        """
+        current = self.refresh()
+        changes = {}
+        with self._lock:
+            for metric in reversed(self._changed):
+                if self._changed[metric] <= version:
+                    break
+                changes[metric] = self._lines[metric]
+        return current, dict(reversed(list(changes.items())))
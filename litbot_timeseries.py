@@ -0,0 +1,358 @@
+"""
+LITBOT 4.0 Time-Series Store
+Append-only ring buffers per metric with 1m/1h/1d rollups and range queries
+"""
+
+import json
+import re
+import itertools
+import threading
+import time
+from typing import Callable, Iterable
+
+import numpy as np
+
+# Rollup resolutions in seconds
+RESOLUTIONS = {"1m": 60, "1h": 3600, "1d": 86400}
+
+RAW_DTYPE = np.dtype([("ts", "f8"), ("value", "f8")])
+ROLLUP_DTYPE = np.dtype([
+    ("ts", "f8"),      # Bucket start (epoch seconds)
+    ("count", "i8"),
+    ("sum", "f8"),
+    ("min", "f8"),
+    ("max", "f8"),
+    ("last", "f8"),
+])
+
+# Default retention: ~1 week of 1m buckets, ~13 months of 1h, 10 years of 1d
+DEFAULT_RAW_CAPACITY = 100_000
+DEFAULT_ROLLUP_CAPACITY = {"1m": 7 * 24 * 60, "1h": 400 * 24, "1d": 3650}
+
+_PERIOD_UNITS = {"s": 1, "m": 60, "h": 3600, "d": 86400, "w": 7 * 86400}
+
+
+def parse_period(period: str) -> float:
+    """Convert a period such as "90m", "12h", "30d" or "2w" to seconds"""
+    match = re.fullmatch(r"\s*(\d+(?:\.\d+)?)\s*([smhdw])\s*", period.lower())
+    if not match:
+        raise ValueError(f"Invalid period: {period!r}. Use e.g. 90m, 12h, 30d, 2w")
+    return float(match.group(1)) * _PERIOD_UNITS[match.group(2)]
+
+
+class RingBuffer:
+    """Fixed-capacity ring of structured records ordered by their ``ts`` field
+
+    Once full, each append overwrites the oldest record. Records are stored
+    in one contiguous array; reads stitch at most two slices together.
+    """
+
+    def __init__(self, capacity: int, dtype: np.dtype):
+        self.capacity = capacity
+        self.data = np.zeros(capacity, dtype=dtype)
+        self.start = 0  # Index of the oldest record
+        self.size = 0
+
+    def __len__(self) -> int:
+        return self.size
+
+    def _end(self) -> int:
+        return (self.start + self.size) % self.capacity
+
+    def append(self, record: tuple):
+        """Append one record, evicting the oldest when full"""
+        self.data[self._end()] = record
+        if self.size < self.capacity:
+            self.size += 1
+        else:
+            self.start = (self.start + 1) % self.capacity
+
+    def extend(self, records: np.ndarray):
+        """Append many records with at most two vectorized copies"""
+        n = len(records)
+        if n >= self.capacity:
+            self.data[:] = records[-self.capacity:]
+            self.start, self.size = 0, self.capacity
+            return
+        end = self._end()
+        first = min(n, self.capacity - end)
+        self.data[end:end + first] = records[:first]
+        self.data[:n - first] = records[first:]
+        overflow = max(0, self.size + n - self.capacity)
+        self.size = min(self.capacity, self.size + n)
+        self.start = (self.start + overflow) % self.capacity
+
+    def last(self) -> np.void | None:
+        """Most recent record (a view, so it can be updated in place)"""
+        if not self.size:
+            return None
+        return self.data[(self.start + self.size - 1) % self.capacity]
+
+    def segments(self) -> list[np.ndarray]:
+        """Chronologically ordered views covering all records"""
+        if not self.size:
+            return []
+        end = self.start + self.size
+        if end <= self.capacity:
+            return [self.data[self.start:end]]
+        return [self.data[self.start:], self.data[:end - self.capacity]]
+
+    def ordered(self) -> np.ndarray:
+        """All records in chronological order (copied)"""
+        segments = self.segments()
+        return np.concatenate(segments) if segments else self.data[:0].copy()
+
+    def at(self, ts: float) -> np.void | None:
+        """Newest record with ``record.ts <= ts`` (a view, no copy)"""
+        for segment in reversed(self.segments()):
+            i = np.searchsorted(segment["ts"], ts, side="right")
+            if i:
+                return segment[i - 1]
+        return None
+
+    def range(self, start: float | None = None, end: float | None = None) -> np.ndarray:
+        """Records with ``start <= ts < end`` found by binary search"""
+        parts = []
+        for segment in self.segments():
+            ts = segment["ts"]
+            lo = 0 if start is None else np.searchsorted(ts, start, side="left")
+            hi = len(ts) if end is None else np.searchsorted(ts, end, side="left")
+            if hi > lo:
+                parts.append(segment[lo:hi])
+        return np.concatenate(parts) if parts else self.data[:0].copy()
+
+
+class MetricSeries:
+    """Raw points of one metric plus its downsampled rollups"""
+
+    def __init__(self, raw_capacity: int = DEFAULT_RAW_CAPACITY, rollup_capacity: dict[str, int] | None = None):
+        capacities = {**DEFAULT_ROLLUP_CAPACITY, **(rollup_capacity or {})}
+        self.raw = RingBuffer(raw_capacity, RAW_DTYPE)
+        self.rollups = {name: RingBuffer(capacities[name], ROLLUP_DTYPE) for name in RESOLUTIONS}
+        # (ts, value) of the newest point; replaced atomically for lock-free readers
+        self.latest: tuple[float, float] | None = None
+        self.lock = threading.Lock()
+
+    def extend(self, timestamps: np.ndarray, values: np.ndarray) -> int:
+        """Append points in time order; returns how many were accepted
+
+        Points older than the newest stored point are dropped, since the
+        series is append-only, and so are NaN or infinite timestamps and values.
+        """
+        return len(self.append_points(timestamps, values)[0])
+
+    def append_points(self, timestamps: np.ndarray, values: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """Like ``extend`` but returns the accepted (timestamps, values)"""
+        timestamps = np.asarray(timestamps, dtype="f8")
+        values = np.asarray(values, dtype="f8")
+        finite = np.isfinite(timestamps) & np.isfinite(values)
+        if not finite.all():
+            # A NaN timestamp as ``latest`` would reject every later point
+            timestamps, values = timestamps[finite], values[finite]
+        if len(timestamps) > 1 and np.any(np.diff(timestamps) < 0):
+            order = np.argsort(timestamps, kind="stable")
+            timestamps, values = timestamps[order], values[order]
+        with self.lock:
+            if self.latest is not None:
+                keep = timestamps >= self.latest[0]
+                if not keep.all():
+                    timestamps, values = timestamps[keep], values[keep]
+            if not len(timestamps):
+                return timestamps, values
+
+            records = np.empty(len(timestamps), dtype=RAW_DTYPE)
+            records["ts"] = timestamps
+            records["value"] = values
+            self.raw.extend(records)
+            for name, seconds in RESOLUTIONS.items():
+                self._roll_up(self.rollups[name], seconds, timestamps, values)
+            self.latest = (float(timestamps[-1]), float(values[-1]))
+        return timestamps, values
+
+    @staticmethod
+    def _roll_up(ring: RingBuffer, seconds: int, timestamps: np.ndarray, values: np.ndarray):
+        buckets = np.floor(timestamps / seconds) * seconds
+        # Sorted input, so each bucket is one contiguous run
+        starts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+        ends = np.r_[starts[1:], len(buckets)]
+
+        rows = np.empty(len(starts), dtype=ROLLUP_DTYPE)
+        rows["ts"] = buckets[starts]
+        rows["count"] = ends - starts
+        rows["sum"] = np.add.reduceat(values, starts)
+        rows["min"] = np.minimum.reduceat(values, starts)
+        rows["max"] = np.maximum.reduceat(values, starts)
+        rows["last"] = values[ends - 1]
+
+        # Merge into the still-open bucket instead of starting a new one
+        open_bucket = ring.last()
+        if open_bucket is not None and open_bucket["ts"] == rows[0]["ts"]:
+            first = rows[0]
+            open_bucket["count"] += first["count"]
+            open_bucket["sum"] += first["sum"]
+            open_bucket["min"] = min(open_bucket["min"], first["min"])
+            open_bucket["max"] = max(open_bucket["max"], first["max"])
+            open_bucket["last"] = first["last"]
+            rows = rows[1:]
+        if len(rows):
+            ring.extend(rows)
+
+
+class TimeSeriesStore:
+    """Time-series store keyed by metric name"""
+
+    def __init__(self, raw_capacity: int = DEFAULT_RAW_CAPACITY, rollup_capacity: dict[str, int] | None = None):
+        self.raw_capacity = raw_capacity
+        self.rollup_capacity = {**DEFAULT_ROLLUP_CAPACITY, **(rollup_capacity or {})}
+        self._series: dict[str, MetricSeries] = {}
+        self._lock = threading.Lock()
+        self._listeners: list[Callable[[str, np.ndarray, np.ndarray], None]] = []
+        # Changes with every accepted batch, so caches can tell when data moved on
+        self._versions = itertools.count(1)
+        self.version = 0
+
+    def series(self, metric: str) -> MetricSeries:
+        """Get or create the series for ``metric``"""
+        series = self._series.get(metric)
+        if series is None:
+            with self._lock:
+                series = self._series.get(metric)
+                if series is None:
+                    series = self._series[metric] = MetricSeries(self.raw_capacity, self.rollup_capacity)
+        return series
+
+    def metrics(self) -> list[str]:
+        return list(self._series)
+
+    def __contains__(self, metric: str) -> bool:
+        return metric in self._series
+
+    def append(self, metric: str, value: float, ts: float | None = None) -> bool:
+        """Append one point (``ts`` defaults to now); False if it was too old"""
+        ts = time.time() if ts is None else ts
+        return self.extend(metric, [ts], [value]) == 1
+
+    def extend(self, metric: str, timestamps: Iterable[float], values: Iterable[float]) -> int:
+        """Append a batch of points; returns how many were accepted"""
+        timestamps, values = self.append_points(metric, timestamps, values)
+        self.notify(metric, timestamps, values)
+        return len(timestamps)
+
+    def append_points(self, metric: str, timestamps: Iterable[float], values: Iterable[float]) -> tuple[np.ndarray, np.ndarray]:
+        """Like ``extend`` but returns the accepted (timestamps, values) without calling listeners"""
+        timestamps, values = self.series(metric).append_points(np.asarray(timestamps), np.asarray(values))
+        if len(timestamps):
+            self.version = next(self._versions)
+        return timestamps, values
+
+    def notify(
+        self,
+        metric: str,
+        timestamps: np.ndarray,
+        values: np.ndarray,
+        on_error: Callable[[Exception], None] | None = None,
+    ):
+        """Pass accepted points to the listeners
+
+        Without ``on_error`` the first listener exception propagates; with it,
+        each exception is handed to ``on_error`` and the remaining listeners
+        still run.
+        """
+        if not len(timestamps):
+            return
+        for listener in list(self._listeners):
+            try:
+                listener(metric, timestamps, values)
+            except Exception as e:
+                if on_error is None:
+                    raise
+                on_error(e)
+
+    def add_listener(self, listener: Callable[[str, np.ndarray, np.ndarray], None]):
+        """Call ``listener(metric, timestamps, values)`` with every accepted batch
+
+        Listeners run on the writing thread and should only do cheap work.
+        """
+        self._listeners.append(listener)
+
+    def remove_listener(self, listener: Callable[[str, np.ndarray, np.ndarray], None]):
+        self._listeners.remove(listener)
+
+    def latest(self, metric: str) -> tuple[float, float] | None:
+        """(ts, value) of the newest point without taking any lock"""
+        series = self._series.get(metric)
+        return series.latest if series else None
+
+    def range(self, metric: str, start: float | None = None, end: float | None = None, resolution: str = "raw") -> np.ndarray:
+        """Points (raw) or buckets (1m/1h/1d) with ``start <= ts < end``"""
+        series = self._series.get(metric)
+        if series is None:
+            dtype = RAW_DTYPE if resolution == "raw" else ROLLUP_DTYPE
+            return np.empty(0, dtype=dtype)
+        ring = series.raw if resolution == "raw" else series.rollups[resolution]
+        with series.lock:
+            return ring.range(start, end)
+
+    def values(self, metric: str, start: float | None = None, end: float | None = None, resolution: str = "raw") -> np.ndarray:
+        """Values only: raw values, or per-bucket means for rollups"""
+        rows = self.range(metric, start, end, resolution)
+        if resolution == "raw":
+            return rows["value"]
+        return rows["sum"] / np.maximum(rows["count"], 1)
+
+    def value_at(self, metric: str, ts: float) -> float | None:
+        """Value of the newest raw point at or before ``ts``"""
+        series = self._series.get(metric)
+        if series is None:
+            return None
+        with series.lock:
+            record = series.raw.at(ts)
+            return None if record is None else float(record["value"])
+
+    def tail(self, metric: str, n: int) -> np.ndarray:
+        """Values of the newest ``n`` raw points, oldest first"""
+        series = self._series.get(metric)
+        if series is None or n <= 0:
+            return np.empty(0)
+        with series.lock:
+            parts, remaining = [], n
+            for segment in reversed(series.raw.segments()):
+                take = segment["value"][-remaining:]
+                parts.append(take)
+                remaining -= len(take)
+                if not remaining:
+                    break
+            return np.concatenate(parts[::-1]) if parts else np.empty(0)
+
+    def save(self, path: str):
+        """Write all series to a compressed ``.npz`` file"""
+        arrays = {}
+        for metric, series in list(self._series.items()):
+            with series.lock:
+                arrays[f"{metric}::raw"] = series.raw.ordered()
+                for name, ring in series.rollups.items():
+                    arrays[f"{metric}::{name}"] = ring.ordered()
+        meta = {"raw_capacity": self.raw_capacity, "rollup_capacity": self.rollup_capacity}
+        arrays["__meta__"] = np.frombuffer(json.dumps(meta).encode("utf-8"), dtype=np.uint8)
+        with open(path, "wb") as f:
+            np.savez_compressed(f, **arrays)
+
+    @classmethod
+    def load(cls, path: str) -> "TimeSeriesStore":
+        """Read a store written by ``save``"""
+        with np.load(path) as data:
+            meta = json.loads(data["__meta__"].tobytes().decode("utf-8"))
+            store = cls(meta["raw_capacity"], meta["rollup_capacity"])
+            for key in data.files:
+                if key == "__meta__":
+                    continue
+                metric, name = key.rsplit("::", 1)
+                series = store.series(metric)
+                records = data[key]
+                if name == "raw":
+                    series.raw.extend(records)
+                    if len(records):
+                        series.latest = (float(records["ts"][-1]), float(records["value"][-1]))
+                else:
+                    series.rollups[name].extend(records)
+        return store
@@ -0,0 +1,324 @@
+"""
+Model backends for the Cooking AI Agent
+Pluggable chat-completion backends that answer with text or OpenAI-style tool calls
+"""
+
+import importlib.util
+import json
+import os
+import re
+import sys
+from dataclasses import dataclass, field
+from typing import Any
+
+from recipe_tags import DIETS
+
+
+@dataclass
+class ToolCall:
+    """A tool invocation requested by the model"""
+    id: str
+    name: str
+    arguments: dict[str, Any] = field(default_factory=dict)
+    # Why the model's arguments could not be used; the call then fails with it
+    error: str | None = None
+
+    def to_dict(self) -> dict[str, Any]:
+        """OpenAI wire format (arguments are a JSON string)"""
+        return {
+            "id": self.id,
+            "type": "function",
+            "function": {"name": self.name, "arguments": json.dumps(self.arguments)},
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> "ToolCall":
+        """Parse an OpenAI ``tool_calls`` entry"""
+        function = data.get("function", {})
+        name = function.get("name", "")
+        arguments = function.get("arguments") or "{}"
+        error = None
+        if isinstance(arguments, str):
+            try:
+                arguments = json.loads(arguments)
+            except json.JSONDecodeError as e:
+                arguments, error = {}, f"Invalid JSON arguments for {name}: {e}"
+        if not isinstance(arguments, dict):
+            arguments, error = {}, f"Arguments for {name} must be a JSON object"
+        return cls(id=data.get("id", ""), name=name, arguments=arguments, error=error)
+
+
+@dataclass
+class BackendReply:
+    """One model completion: final text, or tool calls to execute first"""
+    content: str | None = None
+    tool_calls: list[ToolCall] = field(default_factory=list)
+
+    def to_message(self) -> dict[str, Any]:
+        """Assistant message to append to the conversation"""
+        message: dict[str, Any] = {"role": "assistant", "content": self.content}
+        if self.tool_calls:
+            message["tool_calls"] = [call.to_dict() for call in self.tool_calls]
+        return message
+
+    @classmethod
+    def from_message(cls, message: dict[str, Any]) -> "BackendReply":
+        """Parse an OpenAI assistant message"""
+        return cls(
+            content=message.get("content"),
+            tool_calls=[ToolCall.from_dict(c) for c in message.get("tool_calls") or []],
+        )
+
+
+class AgentBackend:
+    """Base class for chat-completion backends"""
+
+    name = "base"
+
+    def warm_up(self):
+        """Load anything expensive ahead of the first request (optional)"""
+
+    def complete(self, messages: list[dict[str, Any]], tools: list[dict[str, Any]]) -> BackendReply:
+        """Return the next assistant reply for ``messages``"""
+        raise NotImplementedError
+
+
+class RuleBasedBackend(AgentBackend):
+    """Deterministic keyword router, usable fully offline
+
+    Maps the latest user message to a tool call and returns the tool output
+    verbatim as the final answer once the results come back.
+    """
+
+    name = "rules"
+
+    def complete(self, messages: list[dict[str, Any]], tools: list[dict[str, Any]]) -> BackendReply:
+        """Route the latest user message, or answer with the tool results"""
+        if messages and messages[-1]["role"] == "tool":
+            results = []
+            for message in reversed(messages):
+                if message["role"] != "tool":
+                    break
+                results.append(message["content"])
+            return BackendReply(content="\n\n".join(reversed(results)))
+
+        user_message = next(m["content"] for m in reversed(messages) if m["role"] == "user")
+        tool_call = self._route(user_message)
+        if tool_call is None:
+            return BackendReply(content=self._generate_default_response(user_message))
+
+        name, arguments = tool_call
+        return BackendReply(tool_calls=[ToolCall(id=f"call_{len(messages)}_0", name=name, arguments=arguments)])
+
+    def _route(self, content: str) -> tuple[str, dict[str, Any]] | None:
+        """Determine which tool to use based on user input"""
+        user_message = content.lower()
+        diet = self._diet(user_message)
+
+        if any(word in user_message for word in ["substitut", "instead of", "replacement for", "swap"]):
+            # The tool finds the ingredient in the message itself
+            return "substitute_ingredient", {"ingredient": content, "diet": diet}
+
+        elif diet and self._sample_recipe(user_message) and any(
+            word in user_message for word in ["make", "adapt", "convert", "version"]
+        ):
+            return "adapt_recipe", {"recipe_name": self._sample_recipe(user_message), "diet": diet}
+
+        elif any(word in user_message for word in ["calorie", "nutrition", "nutrient", "macro", "protein", "carbs"]):
+            if self._sample_recipe(user_message):
+                return "get_nutrition", {"recipe_name": self._sample_recipe(user_message)}
+            return "filter_by_nutrition", {"ranges": content}
+
+        elif any(word in user_message for word in ["search", "find", "look for", "recipe"]):
+            # Extract search query
+            query = content
+            if "search" in user_message or "find" in user_message:
+                # Remove command words
+                query = query.replace("search", "").replace("find", "").replace("for", "").strip()
+            return "search_recipes", {"query": query}
+
+        elif any(word in user_message for word in ["extract", "parse", "ingredients from"]):
+            return "extract_ingredients", {"text": content}
+
+        elif any(word in user_message for word in ["list", "show", "available recipes"]):
+            return "list_recipes", {}
+
+        elif any(word in user_message for word in ["tip", "advice", "technique"]):
+            # Extract topic
+            topic = "general"
+            for t in ["pasta", "stir-fry", "baking"]:
+                if t in user_message:
+                    topic = t
+                    break
+            return "cooking_tips", {"topic": topic}
+
+        elif self._sample_recipe(user_message):
+            # Get recipe details
+            return "get_recipe_details", {"recipe_name": self._sample_recipe(user_message)}
+
+        return None
+
+    @staticmethod
+    def _sample_recipe(user_message: str) -> str:
+        """Name of the sample recipe mentioned in the message, or ""."""
+        if "carbonara" in user_message:
+            return "Pasta Carbonara"
+        elif "stir fry" in user_message:
+            return "Vegetable Stir Fry"
+        elif "cookies" in user_message:
+            return "Chocolate Chip Cookies"
+        return ""
+
+    @staticmethod
+    def _diet(user_message: str) -> str:
+        """First diet named in the message ("gluten free" counts as gluten-free)"""
+        text = re.sub(r"\s+free\b", "-free", user_message)
+        return next((diet for diet in DIETS if diet in text), "")
+
+    def _generate_default_response(self, user_input: str) -> str:
+        """Generate a helpful default response"""
+        responses = {
+            "hello": "👋 Hello! I'm your cooking assistant. I can help you search for recipes, extract ingredients, and provide cooking tips. What would you like to cook today?",
+            "help": "I can help you with:\n• 🔍 Search recipes\n• 📖 Get recipe details\n• 🥘 Extract ingredients\n• 📋 List available recipes\n• 💡 Get cooking tips\n\nWhat can I help you with?",
+            "thanks": "You're welcome! Happy cooking! 🍳",
+        }
+
+        for key, response in responses.items():
+            if key in user_input.lower():
+                return response
+
+        return "I'm a cooking assistant. I can help you search for recipes, extract ingredients, and provide cooking tips. Try asking me to search for a recipe or get cooking tips!"
+
+
+class OpenAICompatibleBackend(AgentBackend):
+    """Backend for any OpenAI-compatible ``/chat/completions`` endpoint"""
+
+    name = "openai"
+
+    def __init__(self, base_url: str, api_key: str, model: str, timeout: int = 60):
+        self.base_url = base_url.rstrip("/")
+        self.api_key = api_key
+        self.model = model
+        self.timeout = timeout
+        self._session = None
+
+    def warm_up(self):
+        """Import requests and open a pooled HTTP session"""
+        import requests
+        if self._session is None:
+            self._session = requests.Session()
+            self._session.headers.update({
+                "Authorization": f"Bearer {self.api_key}",
+                "Content-Type": "application/json",
+            })
+
+    def complete(self, messages: list[dict[str, Any]], tools: list[dict[str, Any]]) -> BackendReply:
+        """POST the conversation and parse the first choice"""
+        import requests
+        self.warm_up()
+
+        payload: dict[str, Any] = {"model": self.model, "messages": messages}
+        if tools:
+            payload["tools"] = [{"type": "function", "function": tool} for tool in tools]
+
+        try:
+            response = self._session.post(
+                f"{self.base_url}/chat/completions", json=payload, timeout=self.timeout
+            )
+        except requests.RequestException as e:
+            raise RuntimeError(f"{self.name} request failed: {str(e)}")
+
+        if response.status_code >= 400:
+            raise RuntimeError(f"{self.name} API error {response.status_code}: {response.text}")
+
+        choices = response.json().get("choices") or [{}]
+        return BackendReply.from_message(choices[0].get("message", {}))
+
+
+class GitHubModelsBackend(OpenAICompatibleBackend):
+    """GitHub Models (Azure AI inference) free tier"""
+
+    name = "github"
+    API_BASE = "https://models.inference.ai.azure.com"
+
+    def __init__(self, github_token: str, model: str = "gpt-4o-mini", timeout: int = 60):
+        super().__init__(self.API_BASE, github_token, model, timeout)
+
+
+# Shared client next to this package (python-agents/deepseek_client.py)
+DEEPSEEK_CLIENT_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "deepseek_client.py"
+)
+
+
+def load_deepseek_client() -> type:
+    """Import ``DeepSeekClient`` by file path, leaving ``sys.path`` untouched"""
+    module = sys.modules.get("deepseek_client")
+    if module is None:
+        spec = importlib.util.spec_from_file_location("deepseek_client", DEEPSEEK_CLIENT_PATH)
+        module = importlib.util.module_from_spec(spec)
+        sys.modules["deepseek_client"] = module
+        try:
+            spec.loader.exec_module(module)
+        except BaseException:
+            del sys.modules["deepseek_client"]
+            raise
+    return module.DeepSeekClient
+
+
+class DeepSeekBackend(AgentBackend):
+    """DeepSeek via the shared ``DeepSeekClient`` in ``python-agents/``"""
+
+    name = "deepseek"
+
+    def __init__(self, client: Any = None, model: str = "deepseek-chat"):
+        if client is None:
+            from metrics import REGISTRY
+            from tracing import TRACER
+            client = load_deepseek_client()(metrics=REGISTRY, tracer=TRACER)
+        self.client = client
+        self.model = model
+
+    def complete(self, messages: list[dict[str, Any]], tools: list[dict[str, Any]]) -> BackendReply:
+        """Delegate to ``DeepSeekClient.chat_completion``"""
+        message = self.client.chat_completion(
+            messages,
+            model=self.model,
+            tools=[{"type": "function", "function": tool} for tool in tools] or None,
+        )
+        return BackendReply.from_message(message)
+
+
+# Default address of the local stub server (see stub_server.py)
+STUB_SERVER_URL = "http://127.0.0.1:8089/v1"
+
+
+# Names accepted by create_backend / COOKING_AGENT_BACKEND
+BACKENDS = ("rules", "github", "deepseek", "stub")
+
+
+def create_backend(name: str | None = None) -> AgentBackend:
+    """Create a backend by name (defaults to ``COOKING_AGENT_BACKEND``)
+
+    - ``rules``: offline keyword router (default)
+    - ``github``: GitHub Models, requires ``GITHUB_TOKEN``
+    - ``deepseek``: DeepSeek API, requires ``DEEPSEEK_API_KEY``
+    - ``stub``: local stub server at ``STUB_SERVER_URL``
+    """
+    name = (name or os.getenv("COOKING_AGENT_BACKEND", "rules")).lower()
+
+    if name == "rules":
+        return RuleBasedBackend()
+    elif name == "github":
+        github_token = os.getenv("GITHUB_TOKEN")
+        if not github_token or github_token == "your_github_token_here":
+            raise RuntimeError("GITHUB_TOKEN is not configured")
+        return GitHubModelsBackend(github_token)
+    elif name == "deepseek":
+        return DeepSeekBackend()
+    elif name == "stub":
+        return OpenAICompatibleBackend(
+            os.getenv("STUB_SERVER_URL", STUB_SERVER_URL), api_key="stub", model="cooking-stub"
+        )
+    else:
+        raise ValueError(f"Unknown backend: {name}. Available: {', '.join(BACKENDS)}")
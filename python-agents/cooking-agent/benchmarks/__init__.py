@@ -0,0 +1,4 @@
+"""
+Performance benchmarks for the Cooking AI Agent
+Run individual benchmarks with: python -m benchmarks.<name>
+"""
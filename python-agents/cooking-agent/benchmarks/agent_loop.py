@@ -0,0 +1,99 @@
+"""
+End-to-end agent loop benchmark, fully offline
+Drives CookingAIAgent.chat against the in-process rule-based backend and the
+local stub server, reporting turns/sec and time spent executing tools
+Run with: python -m benchmarks.agent_loop --turns 500 --latency 0.01
+"""
+
+import argparse
+import time
+from dataclasses import dataclass
+
+from backends import AgentBackend, OpenAICompatibleBackend, RuleBasedBackend
+from main import CookingAIAgent
+from stub_server import StubModelServer
+
+# A mix of turns exercising every tool plus the no-tool default reply
+PROMPTS = [
+    "search for pasta",
+    "how do I cook carbonara?",
+    "give me baking tips",
+    "what recipes are available? list them",
+    "extract ingredients from 2 cups flour",
+    "hello",
+]
+
+
+@dataclass
+class LoopResult:
+    """Outcome of one benchmark run"""
+    backend: str
+    turns: int
+    elapsed: float
+    tool_calls: int
+    tool_seconds: float
+
+    @property
+    def turns_per_second(self) -> float:
+        return self.turns / self.elapsed if self.elapsed else 0.0
+
+    @property
+    def tool_overhead(self) -> float:
+        """Fraction of wall time spent inside tool execution"""
+        return self.tool_seconds / self.elapsed if self.elapsed else 0.0
+
+
+def run_loop(backend: AgentBackend, turns: int) -> LoopResult:
+    """Run ``turns`` chat turns and time them"""
+    agent = CookingAIAgent(backend=backend, background_init=False)
+    tool_calls = 0
+    tool_seconds = 0.0
+    process_tool_calls = agent.process_tool_calls
+
+    def timed_tool_calls(calls):
+        nonlocal tool_calls, tool_seconds
+        start = time.perf_counter()
+        try:
+            return process_tool_calls(calls)
+        finally:
+            tool_calls += len(calls)
+            tool_seconds += time.perf_counter() - start
+
+    agent.process_tool_calls = timed_tool_calls
+
+    start = time.perf_counter()
+    for i in range(turns):
+        agent.chat(PROMPTS[i % len(PROMPTS)])
+        # Keep history bounded so every turn costs the same
+        agent.conversation_history.clear()
+    elapsed = time.perf_counter() - start
+
+    return LoopResult(backend.name, turns, elapsed, tool_calls, tool_seconds)
+
+
+def main():
+    """Benchmark the rule-based backend and the stub server"""
+    parser = argparse.ArgumentParser(description="Offline agent loop benchmark")
+    parser.add_argument("--turns", type=int, default=300)
+    parser.add_argument("--latency", type=float, default=0.0, help="Stub server latency in seconds")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Stub server jitter in seconds")
+    args = parser.parse_args()
+
+    results = [run_loop(RuleBasedBackend(), args.turns)]
+    with StubModelServer(latency=args.latency, jitter=args.jitter) as server:
+        backend = OpenAICompatibleBackend(server.url, api_key="stub", model="cooking-stub")
+        backend.name = "stub"
+        results.append(run_loop(backend, args.turns))
+
+    print("🍳 Cooking AI Agent - Agent Loop Benchmark")
+    print("=" * 60)
+    print(f"{'backend':<10} {'turns':>7} {'turns/s':>10} {'ms/turn':>9} {'tool calls':>11} {'tool time':>10}")
+    for r in results:
+        print(
+            f"{r.backend:<10} {r.turns:>7} {r.turns_per_second:>10.1f} "
+            f"{r.elapsed / r.turns * 1000:>9.2f} {r.tool_calls:>11} {r.tool_overhead:>9.1%}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+"""
+Latency, throughput and peak-memory benchmarks for the agent's hot paths
+Run with: python -m pytest benchmarks/bench_hot_paths.py
+(see benchmarks/conftest.py for sizes, thresholds and baselines)
+"""
+
+import pytest
+
+from backends import RuleBasedBackend
+from benchmarks.catalogue import catalogue, ingredient_text, sizes_from_env
+from benchmarks.conftest import peak_memory
+from cooking_tools import CookingToolbox, IngredientExtractor, Recipe, SearchCache
+from main import CookingAIAgent
+from nutrition import NutritionIndex, parse_ranges
+
+SIZES = sizes_from_env()
+
+
+def _toolbox(db) -> CookingToolbox:
+    toolbox = CookingToolbox()
+    toolbox.recipe_db = db
+    return toolbox
+
+
+@pytest.mark.parametrize("size", SIZES)
+@pytest.mark.parametrize("query", ["chickpeas", "saffron"])
+def test_search_recipes(benchmark, baselines, catalogues, size, query):
+    """Substring search over names and ingredients (hit and miss)"""
+    db = catalogues(size)
+    benchmark.extra_info["recipes"] = len(db.recipes)
+    results = benchmark(db.search_recipes, query)
+    assert (len(results) > 0) == (query == "chickpeas")
+    baselines.check(benchmark, peak_memory(db.search_recipes, query))
+
+
+@pytest.mark.parametrize("size", SIZES)
+def test_update_recipe(benchmark, baselines, size):
+    """One recipe edit committed while the catalogue is live"""
+    db = catalogue(size)  # Own copy: edits leave an overlay the other benchmarks should not see
+    recipe = db.get_recipe("pasta_carbonara")
+    edited = Recipe(recipe.name, recipe.ingredients + ["1 tbsp olive oil"], recipe.instructions)
+    versions = iter(range(10 ** 9))
+
+    def edit():
+        db.update_recipe("pasta_carbonara", edited if next(versions) % 2 else recipe)
+
+    benchmark(edit)
+    assert db.get_recipe("pasta_carbonara") in (recipe, edited)
+    baselines.check(benchmark, peak_memory(edit))
+
+
+@pytest.mark.parametrize("size", SIZES)
+@pytest.mark.parametrize("tags", [("vegan",), ("vegetarian", "quick", "italian")])
+def test_filter_by_tags(benchmark, baselines, catalogues, size, tags):
+    """Combined tag filter: bitmap intersection over the whole catalogue"""
+    db = catalogues(size)
+    results = benchmark(db.filter_ids, tags)
+    assert results
+    baselines.check(benchmark, peak_memory(db.filter_ids, tags))
+
+
+@pytest.mark.parametrize("size", SIZES)
+def test_nutrition_batch(benchmark, baselines, catalogues, size):
+    """Per-serving nutrients of the whole catalogue: one blocked matrix product"""
+    db = catalogues(size)
+    index = benchmark(NutritionIndex, db.recipes)
+    assert len(index) == len(db.recipes)
+    baselines.check(benchmark, peak_memory(NutritionIndex, db.recipes))
+
+
+@pytest.mark.parametrize("size", SIZES)
+def test_filter_by_nutrition(benchmark, baselines, catalogues, size):
+    """Macro range filter: column comparisons over the precomputed nutrient matrix"""
+    index = NutritionIndex(catalogues(size).recipes)
+    ranges = parse_ranges("under 500 calories, at least 20g protein")
+    results = benchmark(index.filter_ids, ranges)
+    assert results
+    baselines.check(benchmark, peak_memory(index.filter_ids, ranges))
+
+
+@pytest.mark.parametrize("ingredient", ["butter", "2 cups softened butter"])
+def test_substitute_ingredient(benchmark, baselines, ingredient):
+    """Substitution lookup: phrase match plus one adjacency-index access"""
+    toolbox = CookingToolbox()
+    result = benchmark(toolbox.substitute_ingredient, ingredient, "vegan")
+    assert "vegan butter" in result
+    baselines.check(benchmark, peak_memory(toolbox.substitute_ingredient, ingredient, "vegan"))
+
+
+def test_adapt_recipe(benchmark, baselines):
+    """Rewriting a whole recipe (ingredients, steps, name) for two diets"""
+    toolbox = CookingToolbox()
+    result = benchmark(toolbox.adapt_recipe, "carbonara", "vegan, gluten-free")
+    assert "smoked tofu" in result
+    baselines.check(benchmark, peak_memory(toolbox.adapt_recipe, "carbonara", "vegan, gluten-free"))
+
+
+@pytest.mark.parametrize("lines", [10, 1000])
+def test_extract_ingredients(benchmark, baselines, lines):
+    """Parsing a pasted ingredient list"""
+    text = ingredient_text(lines)
+    ingredients = benchmark(IngredientExtractor.extract_ingredients, text)
+    assert len(ingredients) == lines + 1  # Plus the "Ingredients:" header line
+    baselines.check(benchmark, peak_memory(IngredientExtractor.extract_ingredients, text))
+
+
+@pytest.mark.parametrize("size", SIZES)
+def test_search_results_formatting(benchmark, baselines, catalogues, size):
+    """Search plus rendering every hit, bypassing the result cache"""
+    toolbox = _toolbox(catalogues(size))
+    toolbox.search_cache = SearchCache(max_entries=0)
+    result = benchmark(toolbox.search_recipes, "garlic")
+    assert result.startswith("Found")
+    baselines.check(benchmark, peak_memory(toolbox.search_recipes, "garlic"))
+
+
+@pytest.mark.parametrize("size", SIZES)
+def test_search_cached(benchmark, baselines, catalogues, size):
+    """A repeated search served from the result cache"""
+    toolbox = _toolbox(catalogues(size))
+    toolbox.search_recipes("garlic")
+    result = benchmark(toolbox.search_recipes, "Garlic")
+    assert result.startswith("Found") and toolbox.search_cache.stats()["misses"] == 1
+    baselines.check(benchmark, peak_memory(toolbox.search_recipes, "Garlic"))
+
+
+@pytest.mark.parametrize("size", SIZES)
+def test_list_available_recipes(benchmark, baselines, catalogues, size):
+    """Rendering the full catalogue listing"""
+    toolbox = _toolbox(catalogues(size))
+    result = benchmark(toolbox.list_available_recipes)
+    assert f"Total: {size + 3} recipes" in result
+    baselines.check(benchmark, peak_memory(toolbox.list_available_recipes))
+
+
+def test_format_recipe(benchmark, baselines, catalogues):
+    """Rendering one recipe's details"""
+    toolbox = _toolbox(catalogues(SIZES[0]))
+    recipe = toolbox.recipe_db.get_recipe("pasta_carbonara")
+    result = benchmark(toolbox._format_recipe, recipe)
+    assert "### Instructions:" in result
+    baselines.check(benchmark, peak_memory(toolbox._format_recipe, recipe))
+
+
+@pytest.mark.parametrize("size", SIZES)
+def test_chat_routing(benchmark, baselines, catalogues, size):
+    """One rule-backend turn: routing, tool execution and the reply"""
+    agent = CookingAIAgent(backend=RuleBasedBackend(), background_init=False)
+    agent.toolbox.recipe_db = catalogues(size)
+
+    def turn():
+        # Fresh history so every round costs the same
+        agent.conversation_history.clear()
+        return agent.chat("how do I cook carbonara?")
+
+    assert "Carbonara" in benchmark(turn)
+    baselines.check(benchmark, peak_memory(turn))
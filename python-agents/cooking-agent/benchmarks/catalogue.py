@@ -0,0 +1,111 @@
+"""
+Synthetic recipe catalogues for benchmarks
+Deterministic recipes built from realistic ingredient, unit and dish
+vocabularies. Ingredient lines and instruction lists are drawn from shared
+pools, so a 1M-recipe catalogue costs a few hundred bytes per recipe.
+"""
+
+import os
+import random
+
+from cooking_tools import Recipe, RecipeDatabase
+
+# Catalogue sizes benchmarked by default (COOKING_BENCH_SIZES=1000,100000,1000000 adds 1M)
+DEFAULT_SIZES = (1_000, 100_000)
+
+INGREDIENTS = [
+    "all-purpose flour", "bread flour", "granulated sugar", "brown sugar", "honey", "maple syrup",
+    "unsalted butter", "olive oil", "vegetable oil", "sesame oil", "coconut oil", "eggs", "egg yolks",
+    "whole milk", "heavy cream", "sour cream", "greek yogurt", "buttermilk", "cream cheese",
+    "parmesan cheese", "pecorino romano", "mozzarella", "cheddar cheese", "feta cheese", "ricotta",
+    "chicken breast", "chicken thighs", "ground beef", "beef chuck", "pork shoulder", "bacon",
+    "guanciale", "pancetta", "italian sausage", "salmon fillets", "shrimp", "cod", "tuna", "tofu",
+    "tempeh", "chickpeas", "black beans", "kidney beans", "lentils", "arborio rice", "basmati rice",
+    "jasmine rice", "spaghetti", "penne", "rigatoni", "egg noodles", "rice noodles", "quinoa",
+    "rolled oats", "breadcrumbs", "panko", "garlic", "shallots", "yellow onion", "red onion",
+    "scallions", "leeks", "carrots", "celery", "bell pepper", "jalapeno", "tomatoes", "cherry tomatoes",
+    "tomato paste", "crushed tomatoes", "zucchini", "eggplant", "broccoli florets", "cauliflower",
+    "spinach", "kale", "mushrooms", "potatoes", "sweet potatoes", "butternut squash", "corn kernels",
+    "green peas", "avocado", "lemon juice", "lime juice", "orange zest", "fresh ginger", "fresh basil",
+    "fresh parsley", "cilantro", "thyme", "rosemary", "oregano", "bay leaves", "ground cumin",
+    "smoked paprika", "chili flakes", "turmeric", "garam masala", "cinnamon", "nutmeg", "black pepper",
+    "kosher salt", "soy sauce", "fish sauce", "rice vinegar", "balsamic vinegar", "dijon mustard",
+    "worcestershire sauce", "chicken stock", "vegetable stock", "coconut milk", "peanut butter",
+    "baking soda", "baking powder", "vanilla extract", "cocoa powder", "dark chocolate", "chocolate chips",
+    "walnuts", "almonds", "pine nuts", "cornstarch", "white wine", "red wine",
+]
+UNITS = ["g", "kg", "ml", "tsp", "tbsp", "cup", "cups", "oz", "lb", "cloves", "pinch", "can", ""]
+QUANTITIES = ["1", "2", "3", "4", "1/2", "1/4", "3/4", "1 1/2", "100", "200", "250", "400", "500"]
+NOTES = ["", "", "", "chopped", "minced", "sliced", "diced", "softened", "to taste", "divided", "at room temperature"]
+
+DISHES = [
+    "Pasta", "Risotto", "Stir Fry", "Curry", "Soup", "Stew", "Salad", "Tacos", "Pizza", "Pie", "Tart",
+    "Cookies", "Cake", "Bread", "Casserole", "Bowl", "Skewers", "Burger", "Frittata", "Noodles",
+]
+STYLES = [
+    "Classic", "Spicy", "Creamy", "Roasted", "Grilled", "Smoky", "Lemony", "Garlicky", "Herbed",
+    "Crispy", "Rustic", "Quick", "Weeknight", "Sunday", "Thai", "Italian", "Mexican", "Indian",
+]
+STEPS = [
+    "Preheat the oven to {temp}°F", "Bring a large pot of salted water to a boil",
+    "Heat the oil in a large pan over medium-high heat", "Whisk the {a} and {b} in a bowl",
+    "Add the {a} and cook for {minutes} minutes", "Stir in the {b} until combined",
+    "Season with salt and pepper", "Simmer gently for {minutes} minutes",
+    "Bake until golden, about {minutes} minutes", "Let rest for 5 minutes before serving",
+    "Garnish with fresh herbs and serve",
+]
+
+
+def sizes_from_env(default: tuple[int, ...] = DEFAULT_SIZES) -> list[int]:
+    """Catalogue sizes from ``COOKING_BENCH_SIZES`` (comma-separated)"""
+    raw = os.getenv("COOKING_BENCH_SIZES")
+    if not raw:
+        return list(default)
+    return [int(size.replace("_", "")) for size in raw.split(",") if size.strip()]
+
+
+def ingredient_line(rng: random.Random) -> str:
+    """One realistic ingredient line, e.g. "2 tbsp olive oil, divided" """
+    parts = [rng.choice(QUANTITIES), rng.choice(UNITS), rng.choice(INGREDIENTS)]
+    line = " ".join(part for part in parts if part)
+    note = rng.choice(NOTES)
+    return f"{line}, {note}" if note else line
+
+
+def ingredient_text(lines: int, seed: int = 0) -> str:
+    """Free-form ingredient list as a user would paste it"""
+    rng = random.Random(seed)
+    bullets = ["- ", "• ", "* ", ""]
+    return "Ingredients:\n" + "\n".join(rng.choice(bullets) + ingredient_line(rng) for _ in range(lines))
+
+
+def generate_recipes(count: int, seed: int = 0, pool_size: int = 20_000) -> dict[str, Recipe]:
+    """``count`` recipes keyed like the sample database (``snake_case_name``)"""
+    rng = random.Random(seed)
+    lines = [ingredient_line(rng) for _ in range(pool_size)]
+    methods = []
+    for _ in range(512):
+        a, b = rng.sample(INGREDIENTS, 2)
+        methods.append([
+            step.format(temp=rng.choice((350, 375, 400, 425)), minutes=rng.randint(3, 45), a=a, b=b)
+            for step in rng.sample(STEPS, rng.randint(4, 8))
+        ])
+    recipes = {}
+    for i in range(count):
+        name = f"{rng.choice(STYLES)} {rng.choice(INGREDIENTS).title()} {rng.choice(DISHES)} {i}"
+        recipes[name.lower().replace(" ", "_")] = Recipe(
+            name=name,
+            ingredients=[lines[rng.randrange(pool_size)] for _ in range(rng.randint(5, 14))],
+            instructions=methods[rng.randrange(len(methods))],
+            prep_time=f"{rng.randint(5, 40)} minutes",
+            cook_time=f"{rng.randint(5, 120)} minutes",
+            servings=rng.choice((1, 2, 4, 6, 8, 12, 24)),
+        )
+    return recipes
+
+
+def catalogue(count: int, seed: int = 0) -> RecipeDatabase:
+    """A ``RecipeDatabase`` holding the samples plus ``count`` synthetic recipes"""
+    db = RecipeDatabase()
+    db.add_recipes(generate_recipes(count, seed))
+    return db
@@ -0,0 +1,138 @@
+"""
+Fixtures for the pytest-benchmark suite
+Benchmark files are named bench_*.py so the default test run skips them.
+Run with: python -m pytest benchmarks/bench_hot_paths.py
+
+Baselines are recorded on the machine that checks them (they are not
+committed): run once with --update-baselines, then later runs compare.
+
+Environment:
+  COOKING_BENCH_SIZES      catalogue sizes, e.g. 1000,100000,1000000
+  COOKING_BENCH_THRESHOLD  allowed slowdown / memory growth vs baseline (default 0.5)
+  COOKING_BENCH_MIN_DELTA_US  slowdowns smaller than this are noise (default 10)
+  COOKING_BENCH_BASELINES  baseline file (default benchmarks/baselines.json)
+  COOKING_BENCH_UPDATE=1   same as --update-baselines
+"""
+
+import json
+import os
+import platform
+import tracemalloc
+from pathlib import Path
+
+import pytest
+
+from benchmarks.catalogue import catalogue
+
+# Shared machines easily vary by a third between runs
+DEFAULT_THRESHOLD = 0.5
+# Microsecond benchmarks jitter by several microseconds whatever the threshold
+DEFAULT_MIN_DELTA_US = 10
+# Allocation jitter (interned strings, dict resizes) below this is ignored
+MIN_DELTA_KIB = 16
+
+
+def peak_memory(function, *args) -> int:
+    """Peak bytes allocated by Python during one call (tracemalloc)"""
+    tracemalloc.start()
+    try:
+        function(*args)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def machine() -> dict[str, str]:
+    """What a baseline was recorded on; baselines from elsewhere are not compared"""
+    return {"node": platform.node(), "machine": platform.machine(), "python": platform.python_version()}
+
+
+class Baselines:
+    """Latency and peak memory per benchmark, recorded locally as JSON
+
+    A benchmark regressed only when its fastest round *and* its median are
+    both beyond the threshold, and the median moved by more than the noise
+    seen while recording (its interquartile range) and an absolute floor.
+    One noisy round, or a few microseconds on a tiny benchmark, do not fail.
+    """
+
+    def __init__(self, path: Path, threshold: float, update: bool, min_delta_s: float = DEFAULT_MIN_DELTA_US / 1e6):
+        self.path = path
+        self.threshold = threshold
+        self.update = update
+        self.min_delta_s = min_delta_s
+        data = json.loads(path.read_text(encoding="utf-8")) if path.exists() and not update else {}
+        # Files recorded on another machine (or before machine tagging) are ignored
+        self.entries = data.get("benchmarks", {}) if data.get("machine") == machine() else {}
+
+    def check(self, benchmark, peak_bytes: int | None = None):
+        """Record this run, or fail if it regressed beyond the threshold"""
+        if benchmark.stats is None:
+            return  # --benchmark-disable
+        stats = benchmark.stats.stats
+        current = {"min_s": stats.min, "median_s": stats.median, "iqr_s": stats.iqr}
+        if peak_bytes is not None:
+            current["peak_kib"] = round(peak_bytes / 1024, 1)
+            benchmark.extra_info["peak_kib"] = current["peak_kib"]
+        if self.update:
+            self.entries[benchmark.name] = current
+            return
+        baseline = self.entries.get(benchmark.name)
+        if baseline is None:
+            return
+        regressions = []
+        limit = 1 + self.threshold
+        if (
+            current["min_s"] > baseline["min_s"] * limit
+            and current["median_s"] > baseline["median_s"] * limit
+            and current["median_s"] - baseline["median_s"] > max(self.min_delta_s, baseline["iqr_s"])
+        ):
+            regressions.append(
+                f"median {current['median_s']:.6g}s vs baseline {baseline['median_s']:.6g}s"
+                f" (min {current['min_s']:.6g}s vs {baseline['min_s']:.6g}s)"
+            )
+        if (
+            "peak_kib" in current and "peak_kib" in baseline
+            and current["peak_kib"] > baseline["peak_kib"] * limit
+            and current["peak_kib"] - baseline["peak_kib"] > MIN_DELTA_KIB
+        ):
+            regressions.append(f"peak_kib {current['peak_kib']:.6g} vs baseline {baseline['peak_kib']:.6g}")
+        if regressions:
+            pytest.fail(f"{benchmark.name} regressed more than {self.threshold:.0%}: " + "; ".join(regressions))
+
+    def save(self):
+        data = {"machine": machine(), "benchmarks": self.entries}
+        self.path.write_text(json.dumps(data, indent=2, sort_keys=True) + "\n", encoding="utf-8")
+
+
+def pytest_addoption(parser):
+    parser.addoption(
+        "--update-baselines", action="store_true", default=False,
+        help="Record this run as the local benchmark baseline instead of checking against it",
+    )
+
+
+@pytest.fixture(scope="session")
+def baselines(request):
+    path = Path(os.getenv("COOKING_BENCH_BASELINES", Path(__file__).with_name("baselines.json")))
+    threshold = float(os.getenv("COOKING_BENCH_THRESHOLD", DEFAULT_THRESHOLD))
+    min_delta_s = float(os.getenv("COOKING_BENCH_MIN_DELTA_US", DEFAULT_MIN_DELTA_US)) / 1e6
+    update = request.config.getoption("--update-baselines") or os.getenv("COOKING_BENCH_UPDATE") == "1"
+    store = Baselines(path, threshold, update, min_delta_s)
+    yield store
+    if store.update:
+        store.save()
+
+
+@pytest.fixture(scope="session")
+def catalogues():
+    """Synthetic databases by size, generated once per session"""
+    seed = int(os.getenv("COOKING_BENCH_SEED", "0"))
+    cache = {}
+
+    def get(size: int):
+        if size not in cache:
+            cache[size] = catalogue(size, seed)
+        return cache[size]
+
+    return get
@@ -0,0 +1,218 @@
+"""
+Load test for DeepSeekClient against a local fake DeepSeek API
+Starts stub_server.py in a child process (so client CPU and memory are
+measured on their own), then drives DeepSeekClient at a target request rate
+and reports throughput, p50/p95/p99 latency, errors and client resource use.
+Run with: python -m benchmarks.load_deepseek --rps 200 --duration 10 --latency 0.05
+          [--distribution lognormal --jitter 0.5] [--error-rate 0.01] [--rate-limit 150] [--stream]
+          (--url points it at an already running OpenAI-compatible server instead)
+"""
+
+import argparse
+import os
+import re
+import subprocess
+import sys
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+AGENT_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(AGENT_DIR.parent))
+
+from deepseek_client import DeepSeekClient  # noqa: E402
+
+PROMPTS = ["hello", "how do I cook carbonara?", "give me baking tips", "search for pasta"]
+
+
+@dataclass
+class LoadResult:
+    """Outcome of one load run"""
+    target_rps: float
+    duration: float
+    latencies: list[float] = field(default_factory=list)  # Successful requests, seconds
+    first_tokens: list[float] = field(default_factory=list)  # Streaming only
+    errors: Counter = field(default_factory=Counter)
+    cpu_seconds: float = 0.0
+    peak_rss_mib: float | None = None
+
+    @property
+    def requests(self) -> int:
+        return len(self.latencies) + sum(self.errors.values())
+
+    @property
+    def throughput(self) -> float:
+        """Successful requests per second"""
+        return len(self.latencies) / self.duration if self.duration else 0.0
+
+    @property
+    def cpu_percent(self) -> float:
+        return 100 * self.cpu_seconds / self.duration if self.duration else 0.0
+
+
+def percentile(values: list[float], p: float) -> float:
+    """Nearest-rank percentile (``p`` in 0-100)"""
+    if not values:
+        return float("nan")
+    ordered = sorted(values)
+    rank = max(1, round(p / 100 * len(ordered)))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+def error_kind(error: Exception) -> str:
+    """``http_<status>`` for API errors, else the failure class"""
+    match = re.search(r"DeepSeek API error (\d{3})", str(error))
+    if match:
+        return f"http_{match.group(1)}"
+    if "malformed stream chunk" in str(error):
+        return "malformed_chunk"
+    return "request_failed" if "request failed" in str(error) else type(error).__name__
+
+
+def _peak_rss_mib() -> float | None:
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # KiB on Linux, bytes on macOS
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def run_load(client: DeepSeekClient, rps: float, duration: float, concurrency: int = 64, stream: bool = False) -> LoadResult:
+    """Send ``rps * duration`` requests on a fixed schedule (open loop)
+
+    Latency is measured from each request's scheduled start, so a backed-up
+    client is charged for the queueing it causes instead of hiding it.
+    """
+    result = LoadResult(rps, duration)
+    lock = threading.Lock()
+    total = int(rps * duration)
+
+    def send(i: int, scheduled: float):
+        messages = [{"role": "user", "content": PROMPTS[i % len(PROMPTS)]}]
+        try:
+            if stream:
+                first = None
+                for _ in client.chat_stream(messages):
+                    if first is None:
+                        first = time.perf_counter() - scheduled
+            else:
+                client.chat_completion(messages)
+            latency = time.perf_counter() - scheduled
+        except Exception as e:
+            # Anything that fails the request counts, not just API errors
+            with lock:
+                result.errors[error_kind(e)] += 1
+            return
+        with lock:
+            result.latencies.append(latency)
+            if stream and first is not None:
+                result.first_tokens.append(first)
+
+    cpu_start = time.process_time()
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for i in range(total):
+            scheduled = start + i / rps
+            delay = scheduled - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            pool.submit(send, i, scheduled)
+    result.duration = time.perf_counter() - start
+    result.cpu_seconds = time.process_time() - cpu_start
+    result.peak_rss_mib = _peak_rss_mib()
+    return result
+
+
+class FakeApiProcess:
+    """``stub_server.py`` in a child process, configured from CLI flags"""
+
+    def __init__(self, *server_args: str):
+        env = dict(os.environ, PYTHONUNBUFFERED="1", PYTHONIOENCODING="utf-8")
+        self.process = subprocess.Popen(
+            [sys.executable, "stub_server.py", "--port", "0", *server_args],
+            cwd=AGENT_DIR,
+            env=env,
+            stdout=subprocess.PIPE,
+            text=True,
+            encoding="utf-8",
+        )
+        line = self.process.stdout.readline()
+        match = re.search(r"(http://\S+)", line)
+        if not match:
+            self.close()
+            raise RuntimeError(f"Fake API did not start: {line!r}")
+        self.url = match.group(1)
+
+    def close(self):
+        self.process.kill()
+        self.process.wait()
+
+
+def report(result: LoadResult, stream: bool = False) -> str:
+    lines = [
+        "🍳 DeepSeekClient Load Test",
+        "=" * 60,
+        f"target: {result.target_rps:.0f} rps   sent: {result.requests}   wall: {result.duration:.2f}s",
+        f"throughput: {result.throughput:.1f} ok/s",
+        "latency (ms): " + "  ".join(
+            f"p{p}={percentile(result.latencies, p) * 1000:.1f}" for p in (50, 95, 99)
+        ),
+    ]
+    if stream:
+        lines.append("first token (ms): " + "  ".join(
+            f"p{p}={percentile(result.first_tokens, p) * 1000:.1f}" for p in (50, 95, 99)
+        ))
+    errors = ", ".join(f"{kind}: {count}" for kind, count in result.errors.most_common()) or "none"
+    lines.append(f"errors: {errors}")
+    rss = f"{result.peak_rss_mib:.1f} MiB peak RSS" if result.peak_rss_mib is not None else "RSS n/a"
+    lines.append(f"client: {result.cpu_seconds:.2f}s CPU ({result.cpu_percent:.0f}%), {rss}")
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test DeepSeekClient against a local fake API")
+    parser.add_argument("--rps", type=float, default=100)
+    parser.add_argument("--duration", type=float, default=10, help="Seconds")
+    parser.add_argument("--concurrency", type=int, default=64, help="Client threads (and pooled connections)")
+    parser.add_argument("--stream", action="store_true", help="Use chat_stream and report time to first token")
+    parser.add_argument("--url", help="Existing server base URL (e.g. http://127.0.0.1:8089/v1)")
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--distribution", default="uniform")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--rate-limit", type=float)
+    parser.add_argument("--token-latency", type=float, default=0.0)
+    args = parser.parse_args()
+
+    server = None
+    url = args.url
+    if url is None:
+        server_args = [
+            "--latency", str(args.latency), "--jitter", str(args.jitter),
+            "--distribution", args.distribution, "--error-rate", str(args.error_rate),
+            "--token-latency", str(args.token_latency),
+        ]
+        if args.rate_limit:
+            server_args += ["--rate-limit", str(args.rate_limit)]
+        server = FakeApiProcess(*server_args)
+        url = server.url
+    client = DeepSeekClient(api_key="load-test", api_url=f"{url.rstrip('/')}/chat/completions", pool_size=args.concurrency)
+    try:
+        result = run_load(client, args.rps, args.duration, args.concurrency, args.stream)
+    finally:
+        client.close()
+        if server is not None:
+            server.close()
+    print(report(result, args.stream))
+
+
+if __name__ == "__main__":
+    main()
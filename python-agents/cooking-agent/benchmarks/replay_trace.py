@@ -0,0 +1,96 @@
+"""
+Replay benchmark: re-drive the agent from recorded conversations
+Each recorded session runs on a fresh CookingAIAgent whose model replies are
+served from the trace, reporting turns/sec, per-stage latency next to the
+recorded latency, and turns whose output no longer matches the recording.
+Record with COOKING_AGENT_RECORD=trace.jsonl python main.py, then run:
+python -m benchmarks.replay_trace trace.jsonl [--repeat 5] [--latency-scale 1.0]
+"""
+
+import argparse
+import time
+from dataclasses import dataclass, field
+
+from benchmarks.load_deepseek import percentile
+from main import CookingAIAgent
+from replay import RecordedSession, ReplayBackend, TraceRecorder, digest, load_trace
+
+STAGES = ("turn", "llm", "tools", "agent")
+
+
+@dataclass
+class ReplayResult:
+    """Per-stage latencies (seconds) of the replayed and the recorded turns"""
+    turns: int = 0
+    elapsed: float = 0.0
+    replayed: dict[str, list[float]] = field(default_factory=lambda: {stage: [] for stage in STAGES})
+    recorded: dict[str, list[float]] = field(default_factory=lambda: {stage: [] for stage in STAGES})
+    mismatches: list[str] = field(default_factory=list)
+
+    @property
+    def turns_per_second(self) -> float:
+        return self.turns / self.elapsed if self.elapsed else 0.0
+
+
+def _add_stages(stages: dict[str, list[float]], turn: float, llm: float, tools: float):
+    stages["turn"].append(turn)
+    stages["llm"].append(llm)
+    stages["tools"].append(tools)
+    # Everything else: prompt assembly, history, dispatch, formatting
+    stages["agent"].append(max(0.0, turn - llm - tools))
+
+
+def replay_session(session: RecordedSession, result: ReplayResult, latency_scale: float = 0.0):
+    """Replay one session, timing stages with an in-memory recorder"""
+    recorder = TraceRecorder()
+    agent = CookingAIAgent(backend=ReplayBackend(session, latency_scale), background_init=False, recorder=recorder)
+    start = time.perf_counter()
+    for index, turn in enumerate(session.turns):
+        output = agent.chat(turn.input)
+        if digest(output) != turn.output_digest:
+            result.mismatches.append(f"{session.id} turn {index}: {turn.input[:60]!r}")
+        _add_stages(result.recorded, turn.seconds, sum(turn.llm_seconds), turn.tool_seconds)
+    result.elapsed += time.perf_counter() - start
+    result.turns += len(session.turns)
+
+    for turn in load_trace(recorder.records)[0].turns:
+        _add_stages(result.replayed, turn.seconds, sum(turn.llm_seconds), turn.tool_seconds)
+
+
+def replay(sessions: list[RecordedSession], repeat: int = 1, latency_scale: float = 0.0) -> ReplayResult:
+    """Replay every session ``repeat`` times"""
+    result = ReplayResult()
+    for _ in range(repeat):
+        for session in sessions:
+            replay_session(session, result, latency_scale)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay recorded conversations against the agent")
+    parser.add_argument("trace", help="JSON-lines trace written with COOKING_AGENT_RECORD")
+    parser.add_argument("--repeat", type=int, default=1)
+    parser.add_argument("--latency-scale", type=float, default=0.0, help="Sleep recorded model latency x this (0: none)")
+    args = parser.parse_args()
+
+    sessions = load_trace(args.trace)
+    result = replay(sessions, args.repeat, args.latency_scale)
+
+    print("🍳 Cooking AI Agent - Replay Benchmark")
+    print("=" * 60)
+    print(f"{len(sessions)} session(s), {result.turns} turns in {result.elapsed:.2f}s: {result.turns_per_second:.1f} turns/s")
+    print(f"{'stage':<8} {'replay p50':>11} {'replay p95':>11} {'recorded p50':>13} {'recorded p95':>13}  (ms)")
+    for stage in STAGES:
+        replayed, recorded = result.replayed[stage], result.recorded[stage]
+        print(
+            f"{stage:<8} {percentile(replayed, 50) * 1000:>11.2f} {percentile(replayed, 95) * 1000:>11.2f} "
+            f"{percentile(recorded, 50) * 1000:>13.2f} {percentile(recorded, 95) * 1000:>13.2f}"
+        )
+    if result.mismatches:
+        print(f"\n⚠️  {len(result.mismatches)} turn(s) differ from the recording:")
+        for mismatch in result.mismatches[:20]:
+            print(f"  {mismatch}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""
+Session storage benchmark: append and resume latency at scale
+Fills a store with ``--sessions`` conversations, then times single-message
+appends through ConversationHistory (batched writes included), resuming a
+session's recent window, paging in older messages, and bulk expiry.
+Run with: python -m benchmarks.session_store --sessions 100000 --messages 50
+          [--store memory] [--path sessions.db] [--window 40]
+"""
+
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from benchmarks.load_deepseek import percentile
+from sessions import ConversationHistory, MemorySessionStore, SessionStore, SQLiteSessionStore
+
+PROMPTS = ["search for pasta", "how do I cook carbonara?", "give me baking tips", "what can I make with chickpeas?"]
+
+
+def message(i: int) -> dict:
+    """A user or assistant message of typical size"""
+    if i % 2 == 0:
+        return {"role": "user", "content": PROMPTS[i // 2 % len(PROMPTS)]}
+    return {"role": "assistant", "content": f"Here is what I found ({i}):\n" + "- a recipe line\n" * 12}
+
+
+def populate(store: SessionStore, sessions: int, messages: int, first: int = 0) -> float:
+    """Write ``messages`` messages to each session; return seconds taken"""
+    conversation = [message(i) for i in range(messages)]
+    start = time.perf_counter()
+    for s in range(first, first + sessions):
+        store.append(f"session-{s}", 0, conversation)
+    store.flush()
+    return time.perf_counter() - start
+
+
+def _latencies(run, count: int) -> list[float]:
+    latencies = []
+    for i in range(count):
+        start = time.perf_counter()
+        run(i)
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+def _summary(name: str, latencies: list[float]) -> str:
+    stats = "  ".join(f"p{p}={percentile(latencies, p) * 1e6:.0f}" for p in (50, 95, 99))
+    return f"{name:<10} {stats} µs"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark conversation session storage")
+    parser.add_argument("--store", choices=["sqlite", "memory"], default="sqlite")
+    parser.add_argument("--path", help="SQLite file (default: a temporary file)")
+    parser.add_argument("--sessions", type=int, default=100_000)
+    parser.add_argument("--messages", type=int, default=50, help="Messages per session")
+    parser.add_argument("--window", type=int, default=40, help="Messages kept in memory per session")
+    parser.add_argument("--samples", type=int, default=5_000)
+    parser.add_argument("--batch-size", type=int, default=256)
+    args = parser.parse_args()
+
+    tmp = None
+    if args.store == "memory":
+        store = MemorySessionStore()
+    else:
+        path = args.path
+        if path is None:
+            tmp = tempfile.TemporaryDirectory()
+            path = os.path.join(tmp.name, "sessions.db")
+        store = SQLiteSessionStore(path, batch_size=args.batch_size)
+
+    rng = random.Random(0)
+    half = args.sessions // 2
+    fill = populate(store, half, args.messages)
+    cutoff = time.time()
+    fill += populate(store, args.sessions - half, args.messages, first=half)
+    total = args.sessions * args.messages
+
+    # Appends to the newer half, so expiry below removes exactly the older one
+    ids = [f"session-{rng.randrange(half, args.sessions)}" for _ in range(args.samples)]
+    histories = {session_id: ConversationHistory(store, session_id, args.window) for session_id in set(ids)}
+    appends = _latencies(lambda i: histories[ids[i]].append(message(i)), args.samples)
+    store.flush()
+    resumes = _latencies(lambda i: ConversationHistory(store, ids[i], args.window), args.samples)
+    pages = _latencies(lambda i: histories[ids[i]].older(args.window), args.samples)
+
+    start = time.perf_counter()
+    expired = store.expire(0, now=cutoff)
+    expire_seconds = time.perf_counter() - start
+
+    print("🍳 Cooking AI Agent - Session Storage Benchmark")
+    print("=" * 60)
+    print(f"store: {args.store}   sessions: {args.sessions}   messages: {total}   window: {args.window}")
+    print(f"fill: {total / fill:,.0f} messages/s ({fill:.2f}s)")
+    print(_summary("append", appends))
+    print(_summary("resume", resumes))
+    print(_summary("older", pages))
+    print(f"expire: {expired} sessions in {expire_seconds * 1000:.0f} ms")
+    if args.store == "sqlite":
+        print(f"database: {os.path.getsize(store.path) / 2 ** 20:.1f} MiB")
+    store.close()
+    if tmp is not None:
+        tmp.cleanup()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""
+Sharded search benchmark: query throughput by number of worker processes
+Compares RecipeDatabase in this process with ShardedRecipeSearch at 1, 2, 4,
+... shards (up to the core count) on a synthetic catalogue.
+Run with: python -m benchmarks.sharded_search --recipes 200000 [--shards 1,2,4,8] [--limit 20]
+"""
+
+import argparse
+import os
+import random
+import time
+
+from benchmarks.catalogue import DISHES, INGREDIENTS, generate_recipes
+from cooking_tools import RecipeDatabase
+from recipe_shards import ShardedRecipeSearch, match_ids
+
+
+def make_queries(count: int, seed: int = 0) -> list[str]:
+    """Ingredient and dish searches as users type them"""
+    rng = random.Random(seed)
+    vocabulary = INGREDIENTS + [dish.lower() for dish in DISHES]
+    return [rng.choice(vocabulary) for _ in range(count)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark sharded recipe search")
+    parser.add_argument("--recipes", type=int, default=200_000)
+    parser.add_argument("--queries", type=int, default=256)
+    parser.add_argument("--batch", type=int, default=32, help="Queries per scatter")
+    parser.add_argument("--limit", type=int, default=20, help="Top-k per query (0: all matches)")
+    parser.add_argument("--shards", help="Comma-separated shard counts (default: powers of two up to the core count)")
+    args = parser.parse_args()
+
+    cores = os.cpu_count() or 1
+    if args.shards:
+        counts = [int(count) for count in args.shards.split(",")]
+    else:
+        counts = [1 << i for i in range(cores.bit_length()) if 1 << i <= cores]
+        if counts[-1] != cores:
+            counts.append(cores)
+    limit = args.limit or None
+    queries = make_queries(args.queries)
+
+    print("🍳 Cooking AI Agent - Sharded Search Benchmark")
+    print("=" * 60)
+    start = time.perf_counter()
+    db = RecipeDatabase(generate_recipes(args.recipes))
+    snapshot = db.snapshot()
+    print(f"{args.recipes} recipes indexed in {time.perf_counter() - start:.1f}s, {cores} core(s)")
+
+    start = time.perf_counter()
+    for query in queries:
+        match_ids(snapshot, query, limit=limit)
+    single = args.queries / (time.perf_counter() - start)
+    print(f"{'in-process':<12} {single:>10.1f} queries/s")
+
+    for shards in counts:
+        start = time.perf_counter()
+        with ShardedRecipeSearch(snapshot, shards) as search:
+            ready = time.perf_counter() - start
+            start = time.perf_counter()
+            for i in range(0, len(queries), args.batch):
+                search.search_many(queries[i:i + args.batch], limit=limit)
+            rate = args.queries / (time.perf_counter() - start)
+        print(f"{f'{shards} shard(s)':<12} {rate:>10.1f} queries/s  {rate / single:5.2f}x  (startup {ready:.1f}s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""
+Startup benchmark for the Cooking AI Agent
+Measures the import cost of main.py and the wall time to the first response
+Run with: python -m benchmarks.startup
+"""
+
+import os
+import subprocess
+import sys
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+
+AGENT_DIR = Path(__file__).resolve().parent.parent
+
+
+@dataclass
+class ImportTiming:
+    """One line of ``python -X importtime`` output"""
+    module: str
+    self_us: int
+    cumulative_us: int
+
+
+def _benchmark_env() -> dict[str, str]:
+    """Environment for child processes: unbuffered, UTF-8, token configured"""
+    env = dict(os.environ)
+    env.setdefault("GITHUB_TOKEN", "startup-benchmark-token")
+    env["PYTHONUNBUFFERED"] = "1"
+    env["PYTHONIOENCODING"] = "utf-8"
+    return env
+
+
+def importtime_breakdown(module: str = "main") -> list[ImportTiming]:
+    """Import ``module`` in a fresh interpreter and return its import timings"""
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=AGENT_DIR,
+        env=_benchmark_env(),
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    
+    timings = []
+    for line in completed.stderr.splitlines():
+        # Format: "import time: <self us> | <cumulative us> | <indented name>"
+        if not line.startswith("import time:"):
+            continue
+        fields = line[len("import time:"):].split("|")
+        if len(fields) != 3 or not fields[0].strip().isdigit():
+            continue  # Header line
+        timings.append(ImportTiming(
+            module=fields[2].strip(),
+            self_us=int(fields[0]),
+            cumulative_us=int(fields[1]),
+        ))
+    return timings
+
+
+def time_to_first_response(prompt: str = "hello", timeout: float = 30.0) -> float:
+    """Start ``main.py``, send one prompt and return seconds until the reply"""
+    start = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "main.py"],
+        cwd=AGENT_DIR,
+        env=_benchmark_env(),
+        stdin=subprocess.PIPE,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL,
+        text=True,
+        encoding="utf-8",
+    )
+    # Guard against a hung child: killing it ends the read loop below
+    watchdog = threading.Timer(timeout, process.kill)
+    watchdog.start()
+    try:
+        # Type ahead like a user would; the REPL must accept it immediately
+        process.stdin.write(prompt + "\n")
+        process.stdin.flush()
+        
+        for line in process.stdout:
+            if line.startswith("Assistant:"):
+                return time.perf_counter() - start
+        raise RuntimeError("Agent exited before answering the first prompt")
+    finally:
+        watchdog.cancel()
+        process.kill()
+        process.wait()
+
+
+def main():
+    """Print the import breakdown and time to first response"""
+    timings = importtime_breakdown("main")
+    total = next((t for t in timings if t.module == "main"), None)
+    
+    print("🍳 Cooking AI Agent - Startup Benchmark")
+    print("=" * 60)
+    print(f"{'cumulative (ms)':>16} {'self (ms)':>10}  module")
+    for timing in sorted(timings, key=lambda t: t.cumulative_us, reverse=True)[:15]:
+        print(f"{timing.cumulative_us / 1000:16.2f} {timing.self_us / 1000:10.2f}  {timing.module}")
+    if total:
+        print(f"\nimport main: {total.cumulative_us / 1000:.2f} ms")
+    print(f"Time to first response: {time_to_first_response() * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
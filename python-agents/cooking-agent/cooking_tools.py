@@ -3,10 +3,23 @@ Cooking AI Agent using Microsoft Agent Framework
 Interactive cooking assistant with recipe search and ingredient extraction
 """
 
+import bisect
 import json
+import os
 import re
-from typing import Any
-from dataclasses import dataclass
+import sys
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from itertools import compress
+from typing import Any, Iterable, Iterator, Mapping
+from dataclasses import dataclass, field, replace
+
+from metrics import REGISTRY
+from recipe_tags import DIETS, TAGS, parse_tags, tags_for
+from substitutions import default_graph, format_ratio
+
+SEARCH_CACHE_REQUESTS = REGISTRY.counter("cooking_search_cache_requests_total", "Recipe searches by cache result (hit or miss)")
 
 
 @dataclass
@@ -18,6 +31,8 @@ class Recipe:
     prep_time: str = "Unknown"
     cook_time: str = "Unknown"
     servings: int = 4
+    # Extra tags; dietary, cuisine and meal tags are derived from the ingredients
+    tags: list[str] = field(default_factory=list)
 
 
 @dataclass
@@ -29,11 +44,368 @@ class IngredientInfo:
     notes: str = ""
 
 
-class RecipeDatabase:
-    """In-memory recipe database with search capabilities"""
+def _search_texts(recipe: Recipe) -> set[str]:
+    """Lowercased strings a search matches against: the name and each ingredient"""
+    return {recipe.name.lower(), *(ingredient.lower() for ingredient in recipe.ingredients)}
+
+
+def _bitmap(positions: list[int]) -> int:
+    """Integer with the bits at ``positions`` set"""
+    bits = bytearray(max(positions) // 8 + 1)
+    for position in positions:
+        bits[position >> 3] |= 1 << (position & 7)
+    return int.from_bytes(bits, "little")
+
+
+# Turns the binary digits of a bitmap into selectors for itertools.compress
+_SELECTORS = bytes.maketrans(b"01", b"\x00\x01")
+
+
+class _RecipeIndex:
+    """Recipes and their search index, never changed once built
+
+    Every distinct name and ingredient line is stored once, and all of them
+    are concatenated into one haystack string that a query is located in
+    with ``str.find``; each matching text maps to the recipes using it.
+    Texts no recipe uses any more stay in the haystack until it is rebuilt.
+    Tags are bitmaps over catalogue positions, one integer per tag.
+    """
+    
+    # Separates texts in the haystack; never part of a query
+    SEPARATOR = "\x00"
     
     def __init__(self):
-        self.recipes = self._load_sample_recipes()
+        # recipe id -> Recipe, in catalogue (position) order
+        self.recipes: dict[str, Recipe] = {}
+        # recipe id -> catalogue position, and the positions in order
+        self.positions: dict[str, int] = {}
+        self.order: list[int] = []
+        # recipe id at each catalogue position (None for positions no longer used)
+        self.slots: list[str | None] = []
+        # tag -> bitmap with the positions of the recipes having it, and of all recipes
+        self.tags: dict[str, int] = {}
+        self.live = 0
+        # lowercased name or ingredient line -> ids of recipes containing it
+        self.texts: dict[str, set[str]] = {}
+        self.haystack = ""
+        # Start offset of each haystack entry, and its text
+        self.starts: list[int] = []
+        self.entries: list[str] = []
+    
+    def search(self, query: str) -> list[str]:
+        """Ids of matching recipes in catalogue order (``query`` is lowercased)"""
+        if not query:
+            matched = self.texts.keys()
+        elif self.SEPARATOR in query:
+            return []
+        else:
+            matched = set()
+            haystack, starts, entries = self.haystack, self.starts, self.entries
+            offset = haystack.find(query)
+            while offset != -1:
+                slot = bisect.bisect_right(starts, offset) - 1
+                matched.add(entries[slot])
+                # Continue after this entry: one hit per text is enough
+                offset = haystack.find(query, starts[slot + 1]) if slot + 1 < len(starts) else -1
+        ids: set[str] = set()
+        for text in matched:
+            ids.update(self.texts.get(text, ()))
+        if len(ids) > len(self.recipes) // 8:
+            return [recipe_id for recipe_id in self.recipes if recipe_id in ids]
+        return sorted(ids, key=self.positions.__getitem__)
+    
+    def ids_at(self, bitmap: int) -> list[str]:
+        """Ids of the recipes at the set bits of ``bitmap``, in catalogue order"""
+        selectors = format(bitmap, "b")[::-1].encode().translate(_SELECTORS)
+        return list(compress(self.slots, selectors))
+    
+    def merged(self, changes: dict[str, tuple[int, Recipe | None, set[str], frozenset[str]]]) -> "_RecipeIndex":
+        """A new index with ``changes`` applied
+        
+        The maps are copied; a recipe-id set is copied the first time the
+        merge changes it and shared with this index otherwise. New texts
+        are appended to the haystack, which is rebuilt once more than half
+        of it is unused. Each tag bitmap changes by one clear and one set.
+        """
+        index = _RecipeIndex()
+        recipes, positions, texts = index.recipes, index.positions, index.texts
+        recipes.update(self.recipes)
+        positions.update(self.positions)
+        texts.update(self.texts)
+        slots = index.slots = list(self.slots)
+        copied: set[str] = set()
+        added: list[str] = []
+        # tag -> positions whose bit is cleared, and set afterwards
+        cleared: dict[str, list[int]] = {}
+        tagged: dict[str, list[int]] = {}
+        vacated: list[int] = []
+        occupied: list[int] = []
+        
+        def own(text: str) -> set[str]:
+            if text not in copied:
+                texts[text] = set(texts.get(text, ()))
+                copied.add(text)
+            return texts[text]
+        
+        # New positions are appended, so apply in position order
+        for recipe_id, (position, recipe, after, tags) in sorted(changes.items(), key=lambda item: item[1][0]):
+            current = recipes.get(recipe_id)
+            before = _search_texts(current) if current is not None else set()
+            for text in before - after:
+                ids = own(text)
+                ids.discard(recipe_id)
+                if not ids:
+                    del texts[text]
+                    copied.discard(text)
+            for text in after - before:
+                if text not in texts:
+                    added.append(text)
+                own(text).add(recipe_id)
+            if current is not None:
+                for tag in tags_for(current):
+                    cleared.setdefault(tag, []).append(positions[recipe_id])
+                vacated.append(positions[recipe_id])
+                slots[positions[recipe_id]] = None
+                if recipe is None or positions[recipe_id] != position:
+                    del recipes[recipe_id]
+                    del positions[recipe_id]
+            if recipe is not None:
+                recipes[recipe_id] = recipe
+                positions[recipe_id] = position
+                if position >= len(slots):
+                    slots.extend([None] * (position + 1 - len(slots)))
+                slots[position] = recipe_id
+                occupied.append(position)
+                for tag in tags:
+                    tagged.setdefault(tag, []).append(position)
+        
+        index.order = list(positions.values())
+        index.tags = dict(self.tags)
+        for tag, cleared_positions in cleared.items():
+            index.tags[tag] = index.tags.get(tag, 0) & ~_bitmap(cleared_positions)
+        for tag, tagged_positions in tagged.items():
+            index.tags[tag] = index.tags.get(tag, 0) | _bitmap(tagged_positions)
+        index.tags = {tag: bitmap for tag, bitmap in index.tags.items() if bitmap}
+        index.live = self.live
+        if vacated:
+            index.live &= ~_bitmap(vacated)
+        if occupied:
+            index.live |= _bitmap(occupied)
+        if len(self.entries) + len(added) > 2 * len(texts):
+            index._extend("", [], [], list(texts))
+        else:
+            index._extend(self.haystack, self.starts, self.entries, [text for text in added if text in texts])
+        return index
+    
+    def _extend(self, haystack: str, starts: list[int], entries: list[str], texts: list[str]):
+        """Set the haystack to ``haystack`` followed by ``texts``"""
+        self.starts = list(starts)
+        self.entries = entries + texts
+        offset = len(haystack)
+        for text in texts:
+            self.starts.append(offset)
+            offset += len(text) + 1
+        self.haystack = haystack + "".join(text + self.SEPARATOR for text in texts)
+
+
+class RecipeSnapshot(Mapping[str, Recipe]):
+    """Immutable view of the catalogue: recipe id -> Recipe, in catalogue order
+
+    Recent changes sit in a small overlay on top of a shared index; they
+    are matched directly until the database folds them into a new index.
+    """
+    
+    def __init__(
+        self,
+        version: int = 0,
+        index: _RecipeIndex | None = None,
+        changes: dict[str, tuple[int, Recipe | None, set[str], frozenset[str]]] | None = None,
+        next_position: int = 0,
+    ):
+        self.version = version
+        self.index = index if index is not None else _RecipeIndex()
+        # recipe id -> (position, recipe or None if deleted, search texts, tags), changed since ``index``
+        self.changes = changes if changes is not None else {}
+        self.next_position = next_position
+        # (position, id, recipe, search texts, tags) of live changed recipes, by position
+        self._changed = sorted(
+            (
+                (position, recipe_id, recipe, texts, tags)
+                for recipe_id, (position, recipe, texts, tags) in self.changes.items() if recipe is not None
+            ),
+            key=lambda change: change[0],
+        )
+        base = sum(1 for recipe_id in self.changes if recipe_id in self.index.recipes)
+        self._length = len(self.index.recipes) - base + len(self._changed)
+    
+    def __getitem__(self, recipe_id: str) -> Recipe:
+        change = self.changes.get(recipe_id)
+        recipe = change[1] if change is not None else self.index.recipes.get(recipe_id)
+        if recipe is None:
+            raise KeyError(recipe_id)
+        return recipe
+    
+    def __iter__(self) -> Iterator[str]:
+        if not self.changes:
+            return iter(self.index.recipes)
+        return iter(self._patched(list(self.index.recipes), lambda recipe_id, recipe: recipe_id))
+    
+    def __len__(self) -> int:
+        return self._length
+    
+    def values(self) -> list[Recipe]:
+        if not self.changes:
+            return list(self.index.recipes.values())
+        return self._patched(list(self.index.recipes.values()), lambda recipe_id, recipe: recipe)
+    
+    def _patched(self, items: list, item) -> list:
+        """Base ``items`` (in index order) with the overlay applied
+        
+        Changed base recipes are patched in place by position; recipes added
+        since the index have the highest positions and go at the end.
+        """
+        index = self.index
+        removed = False
+        for recipe_id, (position, recipe, *_) in self.changes.items():
+            base_position = index.positions.get(recipe_id)
+            if base_position is None:
+                continue
+            slot = bisect.bisect_left(index.order, base_position)
+            if recipe is not None and position == base_position:
+                items[slot] = item(recipe_id, recipe)
+            else:
+                items[slot] = None
+                removed = True
+        if removed:
+            items = [entry for entry in items if entry is not None]
+        items += [item(recipe_id, recipe) for position, recipe_id, recipe, *_ in self._changed
+                  if index.positions.get(recipe_id) != position]
+        return items
+    
+    def search(self, query: str) -> list[Recipe]:
+        """Recipes whose name or an ingredient contains ``query``, or tagged ``query`` (case-insensitive)"""
+        recipes = self.index.recipes if not self.changes else self
+        return [recipes[recipe_id] for recipe_id in self.search_ids(query)]
+    
+    def search_ids(self, query: str) -> list[str]:
+        """Ids of the recipes ``search`` returns, in the same order"""
+        query = query.lower()
+        ids = self._overlaid(self.index.search(query), lambda texts, tags: any(query in text for text in texts))
+        tag = query.strip()
+        if tag in self.index.tags or (tag and self.changes):
+            tagged = set(self.filter_ids([tag])).difference(ids)
+            if tagged:
+                ids = sorted([*ids, *tagged], key=self.position)
+        return ids
+    
+    def filter_ids(self, tags: Iterable[str], exclude: Iterable[str] = ()) -> list[str]:
+        """Ids of recipes having every tag in ``tags`` and none in ``exclude``, in catalogue order"""
+        tags = {tag.lower() for tag in tags}
+        exclude = {tag.lower() for tag in exclude}
+        index = self.index
+        bitmap = index.live
+        for tag in tags:
+            bitmap &= index.tags.get(tag, 0)
+        for tag in exclude:
+            bitmap &= ~index.tags.get(tag, 0)
+        return self._overlaid(
+            index.ids_at(bitmap) if bitmap else [],
+            lambda texts, recipe_tags: tags <= recipe_tags and exclude.isdisjoint(recipe_tags),
+        )
+    
+    def filter(self, tags: Iterable[str], exclude: Iterable[str] = ()) -> list[Recipe]:
+        """Recipes having every tag in ``tags`` and none in ``exclude``"""
+        return [self[recipe_id] for recipe_id in self.filter_ids(tags, exclude)]
+    
+    def tags(self, recipe_id: str) -> frozenset[str]:
+        """All tags of a recipe, its own and the derived ones"""
+        change = self.changes.get(recipe_id)
+        if change is not None and change[1] is not None:
+            return change[3]
+        return tags_for(self[recipe_id])
+    
+    def position(self, recipe_id: str) -> int:
+        """Catalogue position of a recipe; positions only grow"""
+        change = self.changes.get(recipe_id)
+        return change[0] if change is not None else self.index.positions[recipe_id]
+    
+    def _overlaid(self, ids: list[str], matches) -> list[str]:
+        """Index matches ``ids`` with the overlay applied
+        
+        ``matches(texts, tags)`` tells whether a changed recipe belongs in
+        the result; it keeps its catalogue position.
+        """
+        if not self.changes:
+            return ids
+        index = self.index
+        ids = [recipe_id for recipe_id in ids if recipe_id not in self.changes]
+        positions = None
+        added = []
+        for position, recipe_id, _, texts, tags in self._changed:
+            if not matches(texts, tags):
+                continue
+            if index.positions.get(recipe_id) != position:
+                added.append(recipe_id)
+                continue
+            # Edited in place: keep its catalogue position
+            if positions is None:
+                positions = [index.positions[recipe_id] for recipe_id in ids]
+            slot = bisect.bisect_left(positions, position)
+            positions.insert(slot, position)
+            ids.insert(slot, recipe_id)
+        return ids + added
+
+
+class RecipeTransaction:
+    """Changes applied together by ``RecipeDatabase.transaction``"""
+    
+    def __init__(self):
+        self.operations: list[tuple[str, str, Recipe | None]] = []
+    
+    def add(self, recipe_id: str, recipe: Recipe):
+        self.operations.append(("add", recipe_id, recipe))
+    
+    def update(self, recipe_id: str, recipe: Recipe):
+        self.operations.append(("update", recipe_id, recipe))
+    
+    def delete(self, recipe_id: str):
+        self.operations.append(("delete", recipe_id, None))
+
+
+class RecipeDatabase:
+    """In-memory recipe database with search capabilities
+    
+    Readers use the current ``RecipeSnapshot`` without locking. A commit
+    copies the snapshot's small overlay of recent changes, adds its own and
+    publishes the result with a single assignment, so edits never block or
+    disturb searches in flight. Once the overlay exceeds ``COMPACT_AFTER``
+    recipes the writer folds it into a new index, touching only the index
+    entries of the changed recipes. Recipes are replaced, not edited in
+    place: use ``update_recipe`` after changing one.
+    """
+    
+    # Changed recipes matched without the index before a compaction
+    COMPACT_AFTER = 256
+    
+    def __init__(self, recipes: Mapping[str, Recipe] | None = None):
+        """Start with ``recipes``, or the sample recipes when not given"""
+        self._snapshot = RecipeSnapshot()
+        self._write_lock = threading.Lock()
+        self.add_recipes(recipes if recipes is not None else self._load_sample_recipes())
+    
+    @property
+    def recipes(self) -> RecipeSnapshot:
+        """Read-only view of the current recipes by id"""
+        return self._snapshot
+    
+    @property
+    def version(self) -> int:
+        """Incremented by every committed change"""
+        return self._snapshot.version
+    
+    def snapshot(self) -> RecipeSnapshot:
+        """The current snapshot, for several reads that must agree"""
+        return self._snapshot
     
     def _load_sample_recipes(self) -> dict[str, Recipe]:
         """Load sample recipes for demonstration"""
@@ -121,26 +493,91 @@ class RecipeDatabase:
     
     def search_recipes(self, query: str) -> list[Recipe]:
         """Search recipes by name or ingredients"""
-        query = query.lower()
-        results = []
-        
-        for recipe in self.recipes.values():
-            # Search by recipe name
-            if query in recipe.name.lower():
-                results.append(recipe)
-            # Search by ingredients
-            elif any(query in ingredient.lower() for ingredient in recipe.ingredients):
-                results.append(recipe)
-        
-        return results
+        return self._snapshot.search(query)
+    
+    def search_ids(self, query: str) -> list[str]:
+        """Ids of the recipes ``search_recipes`` returns"""
+        return self._snapshot.search_ids(query)
+    
+    def filter_recipes(self, tags: Iterable[str], exclude: Iterable[str] = ()) -> list[Recipe]:
+        """Recipes having every tag in ``tags`` and none in ``exclude``"""
+        return self._snapshot.filter(tags, exclude)
+    
+    def filter_ids(self, tags: Iterable[str], exclude: Iterable[str] = ()) -> list[str]:
+        """Ids of the recipes ``filter_recipes`` returns"""
+        return self._snapshot.filter_ids(tags, exclude)
+    
+    def get_tags(self, recipe_id: str) -> list[str]:
+        """Sorted tags of a recipe; ValueError if it does not exist"""
+        if recipe_id not in self._snapshot:
+            raise ValueError(f"Unknown recipe: {recipe_id}")
+        return sorted(self._snapshot.tags(recipe_id))
     
     def get_recipe(self, recipe_id: str) -> Recipe | None:
         """Get a specific recipe by ID"""
-        return self.recipes.get(recipe_id)
+        return self._snapshot.get(recipe_id)
     
     def list_all_recipes(self) -> list[Recipe]:
         """List all available recipes"""
-        return list(self.recipes.values())
+        return self._snapshot.values()
+    
+    def add_recipe(self, recipe_id: str, recipe: Recipe):
+        """Add a new recipe; ValueError if the id is taken"""
+        self._commit([("add", recipe_id, recipe)])
+    
+    def add_recipes(self, recipes: Mapping[str, Recipe]):
+        """Add many new recipes in one commit"""
+        self._commit([("add", recipe_id, recipe) for recipe_id, recipe in recipes.items()])
+    
+    def update_recipe(self, recipe_id: str, recipe: Recipe):
+        """Replace an existing recipe, keeping its place in the catalogue"""
+        self._commit([("update", recipe_id, recipe)])
+    
+    def delete_recipe(self, recipe_id: str):
+        """Remove a recipe; ValueError if it does not exist"""
+        self._commit([("delete", recipe_id, None)])
+    
+    @contextmanager
+    def transaction(self) -> Iterator[RecipeTransaction]:
+        """Collect changes and commit them as one snapshot when the block exits
+        
+        Nothing is applied if the block raises or any change is invalid.
+        """
+        transaction = RecipeTransaction()
+        yield transaction
+        self._commit(transaction.operations)
+    
+    def _commit(self, operations: list[tuple[str, str, Recipe | None]]):
+        """Validate and apply ``operations`` on top of the current snapshot, then publish"""
+        if not operations:
+            return
+        with self._write_lock:
+            old = self._snapshot
+            changes = dict(old.changes)
+            next_position = old.next_position
+            for operation, recipe_id, recipe in operations:
+                change = changes.get(recipe_id)
+                current = change[1] if change is not None else old.index.recipes.get(recipe_id)
+                if operation == "add" and current is not None:
+                    raise ValueError(f"Recipe already exists: {recipe_id}")
+                if operation != "add" and current is None:
+                    raise ValueError(f"Unknown recipe: {recipe_id}")
+                if current is not None:
+                    position = change[0] if change is not None else old.index.positions[recipe_id]
+                else:
+                    position, next_position = next_position, next_position + 1
+                if recipe is None and recipe_id not in old.index.recipes:
+                    del changes[recipe_id]
+                else:
+                    changes[recipe_id] = (
+                        (position, recipe, _search_texts(recipe), tags_for(recipe))
+                        if recipe is not None else (position, None, set(), frozenset())
+                    )
+            
+            index = old.index
+            if len(changes) > self.COMPACT_AFTER:
+                index, changes = index.merged(changes), {}
+            self._snapshot = RecipeSnapshot(old.version + 1, index, changes, next_position)
 
 
 class IngredientExtractor:
@@ -151,7 +588,9 @@ class IngredientExtractor:
         'g', 'kg', 'mg', 'oz', 'lb', 'ml', 'l', 'tsp', 'tbsp',
         'cup', 'cups', 'pint', 'quart', 'gallon', 'pinch', 'dash',
         'clove', 'cloves', 'slice', 'slices', 'piece', 'pieces',
-        'can', 'jar', 'package'
+        'can', 'jar', 'package', 'cans', 'jars', 'packages',
+        'tablespoon', 'tablespoons', 'teaspoon', 'teaspoons',
+        'ounce', 'ounces', 'pound', 'pounds', 'lbs', 'gram', 'grams'
     }
     
     @classmethod
@@ -179,8 +618,8 @@ class IngredientExtractor:
         line = re.sub(r'^[-•*]\s*', '', line).strip()
         
         # Try to match: quantity unit ingredient (notes)
-        # Example: "2 cups flour, sifted"
-        pattern = r'(\d+(?:\s*[/-]\s*\d+)?)\s*([a-z]*)\s+(.+?)(?:\s*,\s*(.+))?$'
+        # Example: "2 cups flour, sifted", "1 1/2 cups milk", "2-3 cloves garlic"
+        pattern = r'(\d+\s+\d+/\d+|\d+(?:\.\d+)?(?:\s*[/-]\s*\d+(?:\.\d+)?)?)\s*([a-z]*)\s+(.+?)(?:\s*,\s*(.+))?$'
         match = re.match(pattern, line, re.IGNORECASE)
         
         if match:
@@ -188,6 +627,10 @@ class IngredientExtractor:
             unit = match.group(2).lower() if match.group(2) else ""
             name = match.group(3).strip()
             notes = match.group(4).strip() if match.group(4) else ""
+            # "4 large eggs": a word that is not a unit belongs to the name
+            if unit and unit not in cls.UNITS:
+                name = f"{match.group(2)} {name}"
+                unit = ""
             
             return IngredientInfo(
                 name=name,
@@ -219,20 +662,137 @@ class IngredientExtractor:
         return "\n".join(lines)
 
 
+# COOKING_AGENT_SEARCH_CACHE_MB when unset or invalid
+DEFAULT_SEARCH_CACHE_MB = 16.0
+
+
+class SearchCache:
+    """LRU cache of normalized search query -> (result ids, rendered text)
+    
+    Entries belong to one database at one version: any commit, or pointing
+    the toolbox at another database, empties the cache on the next lookup.
+    Bounded by entry count and by an estimate of the bytes entries hold.
+    """
+    
+    def __init__(self, max_entries: int = 1024, max_bytes: int = 16 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries: OrderedDict[str, tuple[tuple[str, ...], str, int]] = OrderedDict()
+        self._lock = threading.Lock()
+        # The (database, version) entries were computed against
+        self._source: tuple[Any, int] | None = None
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+    
+    @classmethod
+    def from_env(cls) -> "SearchCache":
+        """Sized by ``COOKING_AGENT_SEARCH_CACHE_MB`` (default 16, 0 disables)"""
+        value = os.getenv("COOKING_AGENT_SEARCH_CACHE_MB")
+        megabytes = DEFAULT_SEARCH_CACHE_MB
+        if value is not None:
+            try:
+                megabytes = float(value)
+                if not 0 <= megabytes < float("inf"):
+                    raise ValueError(value)
+            except ValueError:
+                print(f"⚠️  Ignoring COOKING_AGENT_SEARCH_CACHE_MB={value!r}: not a size in MB, using {DEFAULT_SEARCH_CACHE_MB:g}")
+                megabytes = DEFAULT_SEARCH_CACHE_MB
+        return cls(max_entries=1024 if megabytes > 0 else 0, max_bytes=int(megabytes * 1024 * 1024))
+    
+    @staticmethod
+    def normalize(query: str) -> str:
+        """Case- and whitespace-insensitive form searched and used as the key"""
+        return " ".join(query.lower().split())
+    
+    def get(self, db: Any, version: int, query: str) -> tuple[tuple[str, ...], str] | None:
+        """Cached (ids, text) for ``query`` against ``db`` at ``version``, or None"""
+        with self._lock:
+            if not self._is_source(db, version):
+                if self._entries:
+                    self.invalidations += 1
+                self._entries.clear()
+                self.bytes = 0
+                self._source = (db, version)
+            entry = self._entries.get(query)
+            if entry is None:
+                self.misses += 1
+                SEARCH_CACHE_REQUESTS.inc(result="miss")
+                return None
+            self._entries.move_to_end(query)
+            self.hits += 1
+        SEARCH_CACHE_REQUESTS.inc(result="hit")
+        return entry[0], entry[1]
+    
+    def _is_source(self, db: Any, version: int) -> bool:
+        return self._source is not None and self._source[0] is db and self._source[1] == version
+    
+    def put(self, db: Any, version: int, query: str, ids: list[str], text: str):
+        """Store a result computed against ``db`` at ``version``"""
+        size = sys.getsizeof(query) + sys.getsizeof(text) + 8 * len(ids)
+        with self._lock:
+            # A commit landed while searching: the result is already stale
+            if not self._is_source(db, version) or size > self.max_bytes or not self.max_entries:
+                return
+            previous = self._entries.pop(query, None)
+            if previous is not None:
+                self.bytes -= previous[2]
+            self._entries[query] = (tuple(ids), text, size)
+            self.bytes += size
+            while len(self._entries) > self.max_entries or self.bytes > self.max_bytes:
+                _, (_, _, evicted) = self._entries.popitem(last=False)
+                self.bytes -= evicted
+                self.evictions += 1
+    
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            requests = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self.bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / requests if requests else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
+
+
 class CookingToolbox:
     """Tools for the cooking AI agent"""
     
     def __init__(self):
         self.recipe_db = RecipeDatabase()
         self.extractor = IngredientExtractor()
+        self.search_cache = SearchCache.from_env()
+        self.substitutions = default_graph()
+        # (database, version, NutritionIndex) for macro filters, built on first use
+        self._nutrition: tuple[Any, int, Any] | None = None
+        self._nutrition_lock = threading.Lock()
     
     def search_recipes(self, query: str) -> str:
         """Search for recipes"""
-        recipes = self.recipe_db.search_recipes(query)
+        db = self.recipe_db
+        # Read before searching, so a concurrent commit can only make the entry stale
+        version = getattr(db, "version", 0)
+        key = SearchCache.normalize(query)
+        cached = self.search_cache.get(db, version, key)
+        if cached is None:
+            ids = db.search_ids(key)
+            recipes = [recipe for recipe in map(db.get_recipe, ids) if recipe is not None]
+            text = self._format_search_results(recipes) if recipes else ""
+            self.search_cache.put(db, version, key, ids, text)
+        else:
+            text = cached[1]
         
-        if not recipes:
+        if not text:
             return f"No recipes found for '{query}'. Try searching for common ingredients or dish names."
-        
+        return text
+    
+    def _format_search_results(self, recipes: list[Recipe]) -> str:
+        """Format search hits for display"""
         result = f"Found {len(recipes)} recipe(s):\n\n"
         for recipe in recipes:
             result += f"📖 **{recipe.name}**\n"
@@ -241,21 +801,148 @@ class CookingToolbox:
         
         return result
     
+    def filter_recipes(self, tags: str) -> str:
+        """Find recipes by tags, e.g. "vegan, quick, italian" or "gluten free, not dessert" """
+        required, excluded = parse_tags(tags)
+        if not required and not excluded:
+            return f"No tags given. Available tags: {', '.join(TAGS)}"
+        recipes = self.recipe_db.filter_recipes(required, excluded)
+        if not recipes:
+            return f"No recipes tagged '{tags}'. Available tags: {', '.join(TAGS)}"
+        return self._format_search_results(recipes)
+    
     def get_recipe_details(self, recipe_name: str) -> str:
         """Get full recipe details"""
-        # Find recipe by name
+        recipe = self._find_recipe(recipe_name)
+        if recipe is None:
+            return f"Recipe '{recipe_name}' not found."
+        return self._format_recipe(recipe)
+    
+    def _find_recipe(self, recipe_name: str) -> Recipe | None:
+        """First recipe whose name contains ``recipe_name`` (case-insensitive)"""
         for recipe in self.recipe_db.list_all_recipes():
             if recipe_name.lower() in recipe.name.lower():
-                return self._format_recipe(recipe)
+                return recipe
+        return None
+    
+    def _parse_diets(self, diet: str) -> list[str]:
+        """Diets named in ``diet``; ValueError for an unknown one"""
+        diets, _ = parse_tags(diet)
+        unknown = [name for name in diets if name not in DIETS]
+        if unknown:
+            raise ValueError(f"Unknown diet: {', '.join(unknown)}. Available: {', '.join(DIETS)}")
+        return diets
+    
+    def substitute_ingredient(self, ingredient: str, diet: str = "") -> str:
+        """Substitutes for an ingredient, optionally only those suiting a diet"""
+        try:
+            diets = self._parse_diets(diet)
+        except ValueError as e:
+            return str(e)
+        found = self.substitutions.lookup(ingredient, diets)
+        if found is None:
+            return f"No substitutes known for '{ingredient}'."
+        name, substitutes = found
+        label = f" ({', '.join(diets)})" if diets else ""
+        if not substitutes:
+            return f"No{label} substitutes known for {name}."
+        
+        result = f"### Substitutes for {name.title()}{label}:\n\n"
+        for substitute in substitutes:
+            result += f"🔄 **{substitute.name}** - {format_ratio(substitute.ratio)}, {substitute.confidence:.0%} confidence\n"
+            if substitute.context:
+                result += f"   💡 {substitute.context}\n"
+        return result
+    
+    def adapt_recipe(self, recipe_name: str, diet: str) -> str:
+        """A recipe rewritten for a diet, with the substitutions listed"""
+        recipe = self._find_recipe(recipe_name)
+        if recipe is None:
+            return f"Recipe '{recipe_name}' not found."
+        try:
+            diets = self._parse_diets(diet)
+        except ValueError as e:
+            return str(e)
+        if not diets:
+            return f"Name a diet to adapt {recipe.name} for: {', '.join(DIETS)}"
+        
+        adapted, rewrite = self.substitutions.adapt(recipe, diets)
+        label = ", ".join(diets)
+        if not rewrite.changes and not rewrite.unresolved:
+            return f"{recipe.name} is already {label}; no substitutions needed."
+        result = self._format_recipe(replace(adapted, name=f"{adapted.name} ({label})"))
+        if rewrite.changes:
+            result += "\n### Substitutions:\n"
+            for original, rewritten, substitutes in rewrite.changes:
+                result += f"🔄 {original} → {rewritten}\n"
+                for context in dict.fromkeys(substitute.context for substitute in substitutes if substitute.context):
+                    result += f"   💡 {context}\n"
+        if rewrite.unresolved:
+            result += f"\n⚠️  No {label} substitute known for: {'; '.join(rewrite.unresolved)}\n"
+        return result
+    
+    def get_nutrition(self, recipe_name: str) -> str:
+        """Estimated calories and nutrients of a recipe, per serving and in total"""
+        # numpy is only imported once nutrition is asked for, keeping it off the startup path
+        from nutrition import default_table, format_amount, format_macros
+        
+        recipe = self._find_recipe(recipe_name)
+        if recipe is None:
+            return f"Recipe '{recipe_name}' not found."
+        nutrition = default_table().nutrients(recipe)
+        
+        result = f"### Nutrition for {recipe.name} (per serving, {nutrition.servings} servings):\n\n"
+        for name, value in nutrition.as_dict().items():
+            result += f"• {name.title()}: {format_amount(name, value)}\n"
+        result += f"\n🍽️  Whole recipe: {format_macros(nutrition.as_dict(per_serving=False))}\n"
+        if nutrition.uncounted:
+            result += f"\n⚠️  Not counted: {'; '.join(nutrition.uncounted)}\n"
+        result += "\n📊 Estimated from average nutrient values per ingredient\n"
+        return result
+    
+    def filter_by_nutrition(self, ranges: str) -> str:
+        """Recipes whose per-serving nutrients fall in ranges such as "under 500 calories, at least 20g protein" """
+        from nutrition import describe_ranges, format_macros, parse_ranges
+        
+        try:
+            bounds = parse_ranges(ranges)
+        except ValueError as e:
+            return str(e)
+        if not bounds:
+            return "No nutrient ranges given, e.g. 'under 500 calories, at least 20g protein'."
+        index = self.nutrition_index()
+        ids = index.filter_ids(bounds)
+        if not ids:
+            return f"No recipes with {describe_ranges(bounds)} per serving."
+        
+        result = f"Found {len(ids)} recipe(s) with {describe_ranges(bounds)} per serving:\n\n"
+        for recipe_id in ids:
+            result += f"📖 **{index.recipes[recipe_id].name}**\n"
+            result += f"   🔥 {format_macros(index.get(recipe_id))} per serving\n\n"
+        return result
+    
+    def nutrition_index(self):
+        """Per-serving nutrients of the whole catalogue; edits recompute only the recipes they touch"""
+        from nutrition import NutritionIndex
         
-        return f"Recipe '{recipe_name}' not found."
+        recipes = self.recipe_db.recipes
+        version = getattr(recipes, "version", 0)
+        with self._nutrition_lock:
+            cached = self._nutrition
+            if cached is None or cached[0] is not self.recipe_db:
+                cached = (self.recipe_db, version, NutritionIndex(recipes))
+            elif cached[1] != version:
+                cached = (self.recipe_db, version, cached[2].refresh(recipes))
+            self._nutrition = cached
+        return cached[2]
     
     def _format_recipe(self, recipe: Recipe) -> str:
         """Format recipe for display"""
         result = f"## {recipe.name}\n\n"
         result += f"⏱️  Prep Time: {recipe.prep_time}\n"
         result += f"🔥 Cook Time: {recipe.cook_time}\n"
-        result += f"🍽️  Servings: {recipe.servings}\n\n"
+        result += f"🍽️  Servings: {recipe.servings}\n"
+        result += f"🏷️  Tags: {', '.join(sorted(tags_for(recipe)))}\n\n"
         
         result += "### Ingredients:\n"
         for ingredient in recipe.ingredients:
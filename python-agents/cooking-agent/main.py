@@ -1,64 +1,137 @@
 """
 Main Cooking AI Agent Application
-Uses Microsoft Agent Framework with GitHub Models
+Runs the cooking agent loop against a pluggable model backend
+(GitHub Models, DeepSeek, or an offline rule-based/stub backend)
 """
 
 import os
 import sys
 import json
-from typing import Any
-from dotenv import load_dotenv
-
-# Import agent framework
-try:
-    from azure.ai.agent import Agent, AgentContext, ClientError
-    from azure.ai.projects import AIProjectClient
-    from azure.identity import DefaultAzureCredential
-except ImportError:
-    print("Error: Agent Framework not installed.")
-    print("Install with: pip install agent-framework-azure-ai --pre")
-    sys.exit(1)
+import threading
+import uuid
+from typing import TYPE_CHECKING, Any
 
+from backends import BACKENDS, AgentBackend, ToolCall, create_backend
 from cooking_tools import CookingToolbox
+from metrics import REGISTRY
+from tracing import TRACER
+
+# Replay, sessions (sqlite3), the tool executor (asyncio) and the tool host
+# (socketserver) are imported where they are first used to keep startup fast
+if TYPE_CHECKING:
+    from replay import TraceRecorder
+    from sessions import SessionStore
+    from tool_executor import ToolTask
+
+TURN_LATENCY = REGISTRY.histogram("cooking_agent_turn_seconds", "Wall time of one chat turn")
+BACKEND_LATENCY = REGISTRY.histogram("cooking_backend_request_seconds", "Model backend completion latency by backend")
+AGENT_ERRORS = REGISTRY.counter("cooking_agent_errors_total", "Chat turns that failed with an error")
 
 
 class CookingAIAgent:
     """Interactive Cooking AI Agent"""
     
-    def __init__(self):
-        """Initialize the cooking AI agent"""
+    # Upper bound on model → tool → model round trips within one turn
+    MAX_TOOL_ROUNDS = 5
+    # Seconds a single tool may run before its result is replaced by an error
+    DEFAULT_TOOL_TIMEOUT = 30.0
+    
+    def __init__(
+        self,
+        backend: AgentBackend | None = None,
+        background_init: bool = True,
+        recorder: "TraceRecorder | None" = None,
+        sessions: "SessionStore | None" = None,
+        session_id: str | None = None,
+    ):
+        """Initialize the cooking AI agent
+
+        Only cheap configuration happens here. The recipe toolbox and the
+        backend's client are built by a warm-up thread so the REPL can
+        accept input immediately; pass ``background_init=False`` to build
+        them synchronously. Turns are recorded to ``recorder`` (default:
+        COOKING_AGENT_RECORD) for later replay.
+
+        With a session store (default: COOKING_AGENT_SESSIONS) the history
+        is persisted and only its recent window stays in memory; passing an
+        existing ``session_id`` resumes that conversation.
+        """
+        from dotenv import load_dotenv
+        from replay import RecordingBackend, TraceRecorder
+        from sessions import DEFAULT_WINDOW, ConversationHistory, create_session_store
+        from tool_executor import ToolExecutor
         load_dotenv()
         
-        self.toolbox = CookingToolbox()
-        self.conversation_history = []
+        if sessions is None:
+            sessions = create_session_store()
+        self.session_id = session_id or os.getenv("COOKING_AGENT_SESSION_ID") or uuid.uuid4().hex
+        if sessions is not None:
+            window = int(os.getenv("COOKING_AGENT_HISTORY_WINDOW", DEFAULT_WINDOW))
+            self.conversation_history = ConversationHistory(sessions, self.session_id, window)
+        else:
+            self.conversation_history = []
         self.debug = os.getenv("DEBUG", "false").lower() == "true"
+        self.backend = backend or self._create_backend()
         
-        # Initialize agent with GitHub Models
-        self.agent = self._init_agent()
+        self._toolbox = None
+        self._toolbox_ready = threading.Event()
+        self.executor = ToolExecutor(default_timeout=self.DEFAULT_TOOL_TIMEOUT)
         self.setup_tools()
-    
-    def _init_agent(self) -> Agent:
-        """Initialize the agent with GitHub Models"""
-        github_token = os.getenv("GITHUB_TOKEN")
-        
-        if not github_token or github_token == "your_github_token_here":
-            print("⚠️  GitHub token not configured!")
-            print("Please set your GITHUB_TOKEN in .env file")
-            print("Get a token from: https://github.com/settings/tokens?type=beta")
-            sys.exit(1)
         
-        # Create agent with GitHub Models endpoint
-        # Using gpt-4o-mini model available on GitHub Models free tier
-        agent = Agent(
-            name="Cooking Assistant",
-            model="gpt-4o-mini",  # GitHub Models free tier
-            instructions=self._get_system_prompt(),
-            # GitHub Models endpoint configuration
-            api_key=github_token,
-            api_base="https://models.inference.ai.azure.com",
-        )
+        recorder = recorder or TraceRecorder.from_env()
+        self.recorder = None
+        if recorder is not None:
+            self.recorder = recorder.session(self.backend.name, [tool["name"] for tool in self.tools])
+            self.backend = RecordingBackend(self.backend, self.recorder)
         
-        return agent
+        if background_init:
+            threading.Thread(
+                target=self._warm_up, name="cooking-agent-warmup", daemon=True
+            ).start()
+        else:
+            self._warm_up()
+    
+    def _create_backend(self) -> AgentBackend:
+        """Create the backend selected by COOKING_AGENT_BACKEND"""
+        try:
+            return create_backend()
+        except RuntimeError as e:
+            if "GITHUB_TOKEN" in str(e):
+                print("⚠️  GitHub token not configured!")
+                print("Please set your GITHUB_TOKEN in .env file")
+                print("Get a token from: https://github.com/settings/tokens?type=beta")
+            else:
+                print(f"⚠️  {str(e)}")
+            sys.exit(1)
+        except ValueError as e:
+            print(f"⚠️  {str(e)}")
+            print(f"Set COOKING_AGENT_BACKEND to one of: {', '.join(BACKENDS)}")
+            sys.exit(1)
+    
+    def _warm_up(self):
+        """Build the toolbox, then warm up the backend client"""
+        try:
+            self._toolbox = CookingToolbox()
+        finally:
+            self._toolbox_ready.set()
+        try:
+            self.backend.warm_up()
+        except Exception as e:
+            if self.debug:
+                print(f"Debug: backend warm-up failed: {str(e)}")
+    
+    @property
+    def toolbox(self) -> CookingToolbox:
+        """Cooking toolbox, waiting for the warm-up thread if needed"""
+        self._toolbox_ready.wait()
+        if self._toolbox is None:
+            raise RuntimeError("Cooking toolbox failed to initialize")
+        return self._toolbox
+    
+    @toolbox.setter
+    def toolbox(self, toolbox: CookingToolbox):
+        self._toolbox = toolbox
+        self._toolbox_ready.set()
     
     def _get_system_prompt(self) -> str:
         """Get the system prompt for the cooking agent"""
@@ -86,116 +159,84 @@ Use emojis to make responses more engaging and organized.
 
 Available tools:
 - Search recipes by name or ingredients
+- Filter recipes by dietary, cuisine and meal tags
 - Get detailed recipe information
+- Suggest ingredient substitutions and adapt recipes for a diet
+- Estimate calories and nutrients per serving, and find recipes by nutrient ranges
 - Extract ingredients from text
 - List all available recipes
 - Provide cooking tips for different techniques"""
     
     def setup_tools(self):
-        """Setup tools for the agent"""
-        # Define tool schemas for the agent
-        self.tools = [
-            {
-                "name": "search_recipes",
-                "description": "Search for recipes by name or ingredients",
-                "parameters": {
-                    "type": "object",
-                    "properties": {
-                        "query": {
-                            "type": "string",
-                            "description": "Search query (recipe name or ingredient)"
-                        }
-                    },
-                    "required": ["query"]
-                }
-            },
-            {
-                "name": "get_recipe_details",
-                "description": "Get full details of a specific recipe including ingredients and instructions",
-                "parameters": {
-                    "type": "object",
-                    "properties": {
-                        "recipe_name": {
-                            "type": "string",
-                            "description": "Name of the recipe to retrieve"
-                        }
-                    },
-                    "required": ["recipe_name"]
-                }
-            },
-            {
-                "name": "extract_ingredients",
-                "description": "Extract and organize ingredients from provided recipe text",
-                "parameters": {
-                    "type": "object",
-                    "properties": {
-                        "text": {
-                            "type": "string",
-                            "description": "Recipe text containing ingredients"
-                        }
-                    },
-                    "required": ["text"]
-                }
-            },
-            {
-                "name": "list_recipes",
-                "description": "List all available recipes in the database",
-                "parameters": {
-                    "type": "object",
-                    "properties": {}
-                }
-            },
-            {
-                "name": "cooking_tips",
-                "description": "Get cooking tips for specific techniques or topics",
-                "parameters": {
-                    "type": "object",
-                    "properties": {
-                        "topic": {
-                            "type": "string",
-                            "description": "Cooking topic (e.g., pasta, stir-fry, baking, general)"
-                        }
-                    },
-                    "required": ["topic"]
-                }
-            }
-        ]
+        """Setup tools for the agent
+
+        Tools run in-process unless COOKING_AGENT_TOOL_HOST points at a
+        shared tool host (see tool_host.py).
+        """
+        from tool_host import ToolClient, cooking_toolset, remote_toolset
+        host_address = os.getenv("COOKING_AGENT_TOOL_HOST")
+        if host_address:
+            toolset = remote_toolset(ToolClient(host_address), "cooking")
+        else:
+            toolset = cooking_toolset(lambda: self.toolbox)
+        # Tool schemas for the model; handlers take the tool's argument dict
+        # (async handlers are allowed)
+        self.tools = list(toolset.schemas)
+        self._tool_handlers = dict(toolset.handlers)
+        # Per-tool timeout overrides in seconds
+        self.tool_timeouts: dict[str, float] = dict(toolset.timeouts)
+    
+    def register_tool(self, schema: dict, handler: Any, timeout: float | None = None):
+        """Add a tool: its schema for the model and a handler taking the argument dict"""
+        self.tools.append(schema)
+        self._tool_handlers[schema["name"]] = handler
+        if timeout is not None:
+            self.tool_timeouts[schema["name"]] = timeout
+    
+    def _tool_task(self, tool_name: str, tool_input: dict, error: str | None = None) -> "ToolTask":
+        """Build an executor task for one tool call"""
+        from tool_executor import TOOL_ERRORS, ToolTask
+        handler = self._tool_handlers.get(tool_name)
+        if handler is None:
+            TOOL_ERRORS.inc(tool=tool_name, kind="unknown")
+            handler = lambda args: f"Unknown tool: {tool_name}"
+        elif error is not None:
+            # Malformed arguments from the model: report back instead of running the tool
+            TOOL_ERRORS.inc(tool=tool_name, kind="arguments")
+            handler = lambda args: f"Error executing tool: {error}"
+        return ToolTask(tool_name, handler, tool_input, self.tool_timeouts.get(tool_name))
     
     def process_tool_call(self, tool_name: str, tool_input: dict) -> str:
-        """Process tool calls from the agent"""
-        try:
-            if tool_name == "search_recipes":
-                return self.toolbox.search_recipes(tool_input.get("query", ""))
-            elif tool_name == "get_recipe_details":
-                return self.toolbox.get_recipe_details(tool_input.get("recipe_name", ""))
-            elif tool_name == "extract_ingredients":
-                return self.toolbox.extract_ingredients_from_text(tool_input.get("text", ""))
-            elif tool_name == "list_recipes":
-                return self.toolbox.list_available_recipes()
-            elif tool_name == "cooking_tips":
-                return self.toolbox.get_cooking_tips(tool_input.get("topic", "general"))
-            else:
-                return f"Unknown tool: {tool_name}"
-        except Exception as e:
-            return f"Error executing tool: {str(e)}"
+        """Process a single tool call from the agent"""
+        return self.executor.run([self._tool_task(tool_name, tool_input)])[0]
+    
+    def process_tool_calls(self, calls: list[ToolCall]) -> list[str]:
+        """Process one turn's tool calls concurrently, results in call order"""
+        tasks = [self._tool_task(c.name, c.arguments, c.error) for c in calls]
+        if self.recorder is not None:
+            return self.recorder.tools(calls, lambda: self.executor.run(tasks))
+        return self.executor.run(tasks)
     
     def chat(self, user_message: str) -> str:
         """Send a message to the agent and get a response"""
+        with TURN_LATENCY.time(), TRACER.span("agent.turn", backend=self.backend.name):
+            if self.recorder is not None:
+                return self.recorder.turn(user_message, self._chat)
+            return self._chat(user_message)
+    
+    def _chat(self, user_message: str) -> str:
+        """Run one turn: record the message, get and record the reply"""
         # Add user message to history
         self.conversation_history.append({
             "role": "user",
             "content": user_message
         })
         
-        # Get response from agent
-        # Note: Actual implementation depends on Agent Framework API
-        # This is a simplified version showing the concept
+        # Get response from the backend (may involve several tool rounds)
         try:
             # Create messages for the agent
             messages = self.conversation_history.copy()
             
-            # Simple implementation: pass to agent and get response
-            # In production, this would use proper agent execution
             response = self._get_agent_response(messages)
             
             # Add assistant response to history
@@ -206,71 +247,40 @@ Available tools:
             
             return response
         except Exception as e:
+            AGENT_ERRORS.inc()
             error_msg = f"Error getting response: {str(e)}"
             if self.debug:
                 print(f"Debug: {error_msg}")
             return error_msg
     
     def _get_agent_response(self, messages: list) -> str:
-        """Get response from the agent"""
-        # This is a simplified implementation
-        # In production, use proper Agent Framework execution
-        
-        # For now, use a rule-based approach with tool calling
-        user_message = messages[-1]["content"].lower()
-        
-        # Determine which tool to use based on user input
-        if any(word in user_message for word in ["search", "find", "look for", "recipe"]):
-            # Extract search query
-            query = messages[-1]["content"]
-            if "search" in user_message or "find" in user_message:
-                # Remove command words
-                query = query.replace("search", "").replace("find", "").replace("for", "").strip()
-            return self.process_tool_call("search_recipes", {"query": query})
-        
-        elif any(word in user_message for word in ["extract", "parse", "ingredients from"]):
-            text = messages[-1]["content"]
-            return self.process_tool_call("extract_ingredients", {"text": text})
-        
-        elif any(word in user_message for word in ["list", "show", "available recipes"]):
-            return self.process_tool_call("list_recipes", {})
-        
-        elif any(word in user_message for word in ["tip", "advice", "technique"]):
-            # Extract topic
-            topic = "general"
-            for t in ["pasta", "stir-fry", "baking"]:
-                if t in user_message:
-                    topic = t
-                    break
-            return self.process_tool_call("cooking_tips", {"topic": topic})
-        
-        elif any(word in user_message for word in ["carbonara", "stir fry", "cookies"]):
-            # Get recipe details
-            recipe_name = ""
-            if "carbonara" in user_message:
-                recipe_name = "Pasta Carbonara"
-            elif "stir fry" in user_message:
-                recipe_name = "Vegetable Stir Fry"
-            elif "cookies" in user_message:
-                recipe_name = "Chocolate Chip Cookies"
-            return self.process_tool_call("get_recipe_details", {"recipe_name": recipe_name})
-        
-        # Default response
-        return self._generate_default_response(messages[-1]["content"])
+        """Run the model/tool loop for one turn and return the final answer"""
+        with TRACER.span("agent.response", messages=len(messages)) as span:
+            return self._run_tool_loop(messages, span)
     
-    def _generate_default_response(self, user_input: str) -> str:
-        """Generate a helpful default response"""
-        responses = {
-            "hello": "👋 Hello! I'm your cooking assistant. I can help you search for recipes, extract ingredients, and provide cooking tips. What would you like to cook today?",
-            "help": "I can help you with:\n• 🔍 Search recipes\n• 📖 Get recipe details\n• 🥘 Extract ingredients\n• 📋 List available recipes\n• 💡 Get cooking tips\n\nWhat can I help you with?",
-            "thanks": "You're welcome! Happy cooking! 🍳",
-        }
+    def _run_tool_loop(self, messages: list, span: Any) -> str:
+        """Alternate model completions and tool batches until a final answer"""
+        turn = [{"role": "system", "content": self._get_system_prompt()}] + messages
         
-        for key, response in responses.items():
-            if key in user_input.lower():
-                return response
+        for round_number in range(self.MAX_TOOL_ROUNDS):
+            span.set_attribute("rounds", round_number + 1)
+            with BACKEND_LATENCY.time(backend=self.backend.name), \
+                    TRACER.span("llm.complete", backend=self.backend.name) as llm_span:
+                reply = self.backend.complete(turn, self.tools)
+                llm_span.set_attribute("tool_calls", len(reply.tool_calls))
+            if not reply.tool_calls:
+                return reply.content or ""
+            
+            turn.append(reply.to_message())
+            outputs = self.process_tool_calls(reply.tool_calls)
+            for call, output in zip(reply.tool_calls, outputs):
+                turn.append({
+                    "role": "tool",
+                    "tool_call_id": call.id,
+                    "content": output,
+                })
         
-        return "I'm a cooking assistant. I can help you search for recipes, extract ingredients, and provide cooking tips. Try asking me to search for a recipe or get cooking tips!"
+        return "Sorry, I couldn't finish that request. Please try rephrasing it."
     
     def run_interactive(self):
         """Run the agent in interactive mode"""
@@ -282,7 +292,11 @@ Available tools:
         print("  • 📖 Get detailed recipe instructions")
         print("  • 🥘 Extract and organize ingredients")
         print("  • 💡 Get cooking tips and techniques")
+        print("  • 🔄 Substitute ingredients and adapt recipes for a diet")
+        print("  • 🔥 Estimate calories and macros per serving")
         print("\nType 'help' for more options or 'quit' to exit.\n")
+        if not isinstance(self.conversation_history, list):
+            print(f"Session {self.session_id} (resume with COOKING_AGENT_SESSION_ID={self.session_id})\n")
         
         while True:
             try:
@@ -302,6 +316,9 @@ Available tools:
                     print("  🥘 Extract ingredients: 'extract ingredients from [recipe text]'")
                     print("  📋 List all: 'what recipes do you have?'")
                     print("  💡 Tips: 'give me pasta cooking tips'")
+                    print("  🔄 Substitutes: 'what can I use instead of butter?'")
+                    print("  🌱 Adapt: 'make the carbonara vegan'")
+                    print("  🔥 Nutrition: 'how many calories in the carbonara?' or 'recipes under 500 calories'")
                     print()
                     continue
                 
@@ -321,8 +338,25 @@ Available tools:
 
 def main():
     """Main entry point"""
-    agent = CookingAIAgent()
-    agent.run_interactive()
+    from dotenv import load_dotenv
+    from sessions import create_session_store
+    load_dotenv()
+    
+    sessions = create_session_store()
+    session_ttl = os.getenv("COOKING_AGENT_SESSION_TTL")
+    if sessions is not None and session_ttl:
+        sessions.expire(float(session_ttl))
+    agent = CookingAIAgent(sessions=sessions)
+    
+    metrics_port = os.getenv("COOKING_AGENT_METRICS_PORT")
+    if REGISTRY.enabled and metrics_port:
+        REGISTRY.serve(port=int(metrics_port))
+    
+    try:
+        agent.run_interactive()
+    finally:
+        if sessions is not None:
+            sessions.close()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,279 @@
+"""
+Lightweight metrics for the Cooking AI Agent
+Counters and latency/size histograms with Prometheus text and JSON export.
+Disabled by default; enable with COOKING_AGENT_METRICS=true. While disabled,
+recording a value is a single attribute check.
+"""
+
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from http.server import ThreadingHTTPServer
+
+# Seconds; covers in-process tools (sub-ms) up to slow model round trips
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+# Bytes
+SIZE_BUCKETS = (64, 256, 1024, 4096, 16384, 65536, 262144, 1048576)
+
+
+def _label_key(labels: dict[str, Any]) -> tuple[tuple[str, str], ...]:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _escape(value: str, quote: bool = True) -> str:
+    """Escape for the text exposition format (HELP text leaves quotes alone)"""
+    value = value.replace("\\", "\\\\").replace("\n", "\\n")
+    return value.replace('"', '\\"') if quote else value
+
+
+def _format_labels(key: tuple[tuple[str, str], ...], extra: str = "") -> str:
+    parts = [f'{k}="{_escape(v)}"' for k, v in key]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class _NullTimer:
+    """Shared no-op context manager returned while metrics are disabled"""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+class _Timer:
+    def __init__(self, histogram: "Histogram", labels: dict[str, Any]):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.histogram.observe(time.perf_counter() - self.start, **self.labels)
+        return False
+
+
+class Counter:
+    """Monotonic counter, one value per label set"""
+
+    kind = "counter"
+
+    def __init__(self, registry: "MetricsRegistry", name: str, help: str):
+        self._registry = registry
+        self.name = name
+        self.help = help
+        self._values: dict[tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels):
+        """Add ``amount`` to the counter for ``labels``"""
+        if not self._registry.enabled:
+            return
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(_label_key(labels), 0)
+
+    def _render(self) -> list[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(key)} {value:g}" for key, value in values]
+
+    def _to_dict(self) -> list[dict[str, Any]]:
+        with self._lock:
+            values = sorted(self._values.items())
+        return [{"labels": dict(key), "value": value} for key, value in values]
+
+
+class Histogram:
+    """Bucketed distribution, one set of buckets per label set"""
+
+    kind = "histogram"
+
+    def __init__(self, registry: "MetricsRegistry", name: str, help: str, buckets: tuple = LATENCY_BUCKETS):
+        self._registry = registry
+        self.name = name
+        self.help = help
+        self.buckets = tuple(sorted(buckets))
+        # label key -> [per-bucket counts (+Inf last), sum, count]
+        self._series: dict[tuple, list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        """Record one observation for ``labels``"""
+        if not self._registry.enabled:
+            return
+        key = _label_key(labels)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def time(self, **labels):
+        """Context manager observing the elapsed seconds of its block"""
+        if not self._registry.enabled:
+            return _NULL_TIMER
+        return _Timer(self, labels)
+
+    def count(self, **labels) -> int:
+        series = self._series.get(_label_key(labels))
+        return series[2] if series else 0
+
+    def quantile(self, q: float, **labels) -> float | None:
+        """Estimate a quantile by linear interpolation within its bucket"""
+        series = self._series.get(_label_key(labels))
+        if not series or not series[2]:
+            return None
+        return self._quantile(series, q)
+
+    def _quantile(self, series: list, q: float) -> float:
+        counts, _, total = series
+        rank = q * total
+        seen = 0
+        for i, bucket_count in enumerate(counts):
+            if seen + bucket_count >= rank and bucket_count:
+                lower = self.buckets[i - 1] if i > 0 else 0.0
+                upper = self.buckets[i] if i < len(self.buckets) else self.buckets[-1]
+                return lower + (upper - lower) * (rank - seen) / bucket_count
+            seen += bucket_count
+        return self.buckets[-1]
+
+    def _snapshot(self) -> list[tuple[tuple, list]]:
+        with self._lock:
+            return sorted((key, [list(s[0]), s[1], s[2]]) for key, s in self._series.items())
+
+    def _render(self) -> list[str]:
+        lines = []
+        for key, (counts, total, count) in self._snapshot():
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                le = "+Inf" if bound == float("inf") else f"{bound:g}"
+                labels = _format_labels(key, f'le="{le}"')
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(key)} {total:g}")
+            lines.append(f"{self.name}_count{_format_labels(key)} {count}")
+        return lines
+
+    def _to_dict(self) -> list[dict[str, Any]]:
+        series = []
+        for key, s in self._snapshot():
+            counts, total, count = s
+            series.append({
+                "labels": dict(key),
+                "count": count,
+                "sum": total,
+                "mean": total / count if count else None,
+                "p50": self._quantile(s, 0.50),
+                "p95": self._quantile(s, 0.95),
+                "p99": self._quantile(s, 0.99),
+            })
+        return series
+
+
+class MetricsRegistry:
+    """Collection of named metrics sharing one enabled switch"""
+
+    def __init__(self, enabled: bool = False):
+        self.enabled = enabled
+        self._metrics: dict[str, Counter | Histogram] = {}
+        self._lock = threading.Lock()
+
+    def counter(self, name: str, help: str = "") -> Counter:
+        """Get or create a counter"""
+        return self._get_or_create(name, lambda: Counter(self, name, help))
+
+    def histogram(self, name: str, help: str = "", buckets: tuple = LATENCY_BUCKETS) -> Histogram:
+        """Get or create a histogram"""
+        return self._get_or_create(name, lambda: Histogram(self, name, help, buckets))
+
+    def _get_or_create(self, name: str, factory):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = factory()
+            return metric
+
+    def get(self, name: str) -> Counter | Histogram | None:
+        return self._metrics.get(name)
+
+    def reset(self):
+        """Drop all recorded values (metric definitions are kept)"""
+        for metric in list(self._metrics.values()):
+            with metric._lock:
+                if isinstance(metric, Counter):
+                    metric._values.clear()
+                else:
+                    metric._series.clear()
+
+    def render_prometheus(self) -> str:
+        """Prometheus text exposition format (version 0.0.4)"""
+        lines = []
+        for name, metric in sorted(self._metrics.items()):
+            lines.append(f"# HELP {name} {_escape(metric.help, quote=False)}")
+            lines.append(f"# TYPE {name} {metric.kind}")
+            lines.extend(metric._render())
+        return "\n".join(lines) + "\n"
+
+    def to_dict(self) -> dict[str, Any]:
+        """All metrics as plain data, with estimated histogram quantiles"""
+        return {
+            name: {"type": metric.kind, "help": metric.help, "series": metric._to_dict()}
+            for name, metric in sorted(self._metrics.items())
+        }
+
+    def to_json(self, indent: int | None = 2) -> str:
+        return json.dumps(self.to_dict(), indent=indent)
+
+    def serve(self, host: str = "127.0.0.1", port: int = 9464) -> "ThreadingHTTPServer":
+        """Serve ``/metrics`` (Prometheus) and ``/metrics.json`` on a daemon thread"""
+        # http.server is only needed when metrics are exposed
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+        registry = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path == "/metrics":
+                    body = registry.render_prometheus().encode("utf-8")
+                    content_type = "text/plain; version=0.0.4; charset=utf-8"
+                elif self.path == "/metrics.json":
+                    body = registry.to_json().encode("utf-8")
+                    content_type = "application/json"
+                else:
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        httpd = ThreadingHTTPServer((host, port), Handler)
+        httpd.daemon_threads = True
+        threading.Thread(target=httpd.serve_forever, name="metrics-server", daemon=True).start()
+        return httpd
+
+
+# Process-wide registry used by the agent, tools and backends
+REGISTRY = MetricsRegistry(enabled=os.getenv("COOKING_AGENT_METRICS", "false").lower() == "true")
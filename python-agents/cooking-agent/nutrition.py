@@ -0,0 +1,477 @@
+"""
+Nutrition estimates from a bundled nutrient table
+Ingredient lines are parsed into IngredientInfo, matched to a food of the
+table by longest phrase and converted to grams. A recipe's nutrients are its
+food quantity vector times the foods x nutrients matrix, and a catalogue is
+done in one batch: (recipes x foods grams) @ (foods x nutrients).
+"""
+
+import re
+from dataclasses import dataclass
+from fractions import Fraction
+from functools import lru_cache
+from itertools import chain
+from typing import Iterable, Mapping, Sequence
+
+import numpy as np
+
+from cooking_tools import IngredientExtractor, IngredientInfo, Recipe
+from recipe_tags import PhraseTable
+
+NUTRIENTS = ("calories", "protein", "fat", "carbs", "fiber", "sugar", "sodium")
+NUTRIENT_UNITS = {"calories": "kcal", "protein": "g", "fat": "g", "carbs": "g", "fiber": "g", "sugar": "g", "sodium": "mg"}
+
+# food -> per 100 g: calories, protein, fat, carbs, fiber, sugar, sodium (USDA-style
+# averages; meat and fish raw, pasta and grains dry, legumes cooked)
+FOODS = {
+    # Flour, sugar and baking
+    "flour":               (364, 10.3, 1.0, 76.3, 2.7, 0.3, 2),
+    "bread flour":         (361, 12.0, 1.7, 72.8, 2.4, 0.3, 2),
+    "cornstarch":          (381, 0.3, 0.1, 91.3, 0.9, 0.0, 9),
+    "sugar":               (387, 0.0, 0.0, 100.0, 0.0, 100.0, 1),
+    "brown sugar":         (380, 0.1, 0.0, 98.1, 0.0, 97.0, 28),
+    "honey":               (304, 0.3, 0.0, 82.4, 0.2, 82.1, 4),
+    "maple syrup":         (260, 0.0, 0.1, 67.0, 0.0, 60.5, 12),
+    "agave syrup":         (310, 0.1, 0.5, 76.4, 0.2, 68.0, 4),
+    "baking soda":         (0, 0.0, 0.0, 0.0, 0.0, 0.0, 27360),
+    "baking powder":       (53, 0.0, 0.0, 27.7, 0.2, 0.0, 10600),
+    "vanilla extract":     (288, 0.1, 0.1, 12.7, 0.0, 12.7, 9),
+    "cocoa powder":        (228, 19.6, 13.7, 57.9, 37.0, 1.8, 21),
+    "chocolate":           (546, 4.9, 31.3, 61.2, 7.0, 48.0, 24),
+    "chocolate chip":      (480, 4.2, 30.0, 63.9, 5.9, 54.5, 11),
+    # Fats and oils
+    "butter":              (717, 0.9, 81.1, 0.1, 0.0, 0.1, 11),
+    "vegan butter":        (714, 0.3, 79.0, 0.7, 0.0, 0.0, 571),
+    "ghee":                (876, 0.3, 99.5, 0.0, 0.0, 0.0, 2),
+    "oil":                 (884, 0.0, 100.0, 0.0, 0.0, 0.0, 0),
+    "mayonnaise":          (680, 1.0, 75.0, 0.6, 0.0, 0.6, 635),
+    # Eggs and dairy
+    "egg":                 (143, 12.6, 9.5, 0.7, 0.0, 0.4, 142),
+    "egg yolk":            (322, 15.9, 26.5, 3.6, 0.0, 0.6, 48),
+    "egg white":           (52, 10.9, 0.2, 0.7, 0.0, 0.7, 166),
+    "flax egg":            (98, 3.5, 8.1, 5.0, 5.3, 0.3, 6),
+    "aquafaba":            (18, 1.0, 0.1, 3.0, 0.0, 0.0, 100),
+    "milk":                (61, 3.2, 3.3, 4.8, 0.0, 5.1, 43),
+    "oat milk":            (48, 1.0, 2.8, 5.1, 0.8, 4.0, 42),
+    "soy milk":            (54, 3.3, 1.8, 6.3, 0.6, 4.0, 51),
+    "almond milk":         (15, 0.6, 1.2, 0.6, 0.2, 0.0, 72),
+    "buttermilk":          (40, 3.3, 0.9, 4.8, 0.0, 4.8, 105),
+    "cream":               (340, 2.8, 36.1, 2.7, 0.0, 2.9, 27),
+    "coconut cream":       (330, 3.6, 34.7, 6.7, 2.2, 3.3, 4),
+    "sour cream":          (198, 2.4, 19.4, 4.6, 0.0, 3.4, 31),
+    "yogurt":              (97, 9.0, 5.0, 3.9, 0.0, 3.2, 35),
+    "coconut milk":        (197, 2.0, 21.3, 2.8, 0.0, 3.3, 13),
+    "cream cheese":        (342, 6.0, 34.0, 4.1, 0.0, 3.2, 321),
+    "cheese":              (403, 24.9, 33.1, 1.3, 0.0, 0.5, 621),
+    "parmesan":            (431, 38.5, 28.6, 4.1, 0.0, 0.9, 1529),
+    "pecorino":            (387, 31.8, 26.9, 3.6, 0.0, 0.8, 1200),
+    "mozzarella":          (280, 27.5, 17.1, 3.1, 0.0, 1.2, 619),
+    "feta":                (264, 14.2, 21.3, 4.1, 0.0, 4.1, 917),
+    "ricotta":             (174, 11.3, 13.0, 3.0, 0.0, 0.3, 84),
+    "nutritional yeast":   (325, 50.0, 4.0, 36.0, 20.0, 0.0, 50),
+    # Meat and fish
+    "chicken":             (120, 22.5, 2.6, 0.0, 0.0, 0.0, 45),
+    "chicken thigh":       (121, 19.7, 4.1, 0.0, 0.0, 0.0, 86),
+    "ground beef":         (254, 17.2, 20.0, 0.0, 0.0, 0.0, 66),
+    "beef":                (200, 19.0, 13.0, 0.0, 0.0, 0.0, 65),
+    "pork":                (236, 17.0, 18.0, 0.0, 0.0, 0.0, 62),
+    "bacon":               (417, 13.0, 40.0, 1.3, 0.0, 0.0, 833),
+    "guanciale":           (655, 7.0, 69.0, 0.0, 0.0, 0.0, 1200),
+    "pancetta":            (458, 15.0, 45.0, 0.0, 0.0, 0.0, 1700),
+    "sausage":             (301, 14.0, 27.0, 2.0, 0.0, 1.0, 749),
+    "salmon":              (208, 20.4, 13.4, 0.0, 0.0, 0.0, 59),
+    "cod":                 (82, 17.8, 0.7, 0.0, 0.0, 0.0, 54),
+    "tuna":                (109, 24.4, 0.5, 0.0, 0.0, 0.0, 45),
+    "shrimp":              (85, 20.1, 0.5, 0.0, 0.0, 0.0, 119),
+    # Plant proteins, grains and pasta
+    "tofu":                (144, 17.3, 8.7, 2.8, 2.3, 0.6, 14),
+    "tempeh":              (192, 20.3, 10.8, 7.6, 0.0, 0.0, 9),
+    "chickpea":            (164, 8.9, 2.6, 27.4, 7.6, 4.8, 7),
+    "bean":                (132, 8.9, 0.5, 23.7, 8.7, 0.3, 2),
+    "lentil":              (116, 9.0, 0.4, 20.1, 7.9, 1.8, 2),
+    "rice":                (365, 7.1, 0.7, 80.0, 1.3, 0.1, 5),
+    "pasta":               (371, 13.0, 1.5, 74.7, 3.2, 2.7, 6),
+    "spaghetti":           (371, 13.0, 1.5, 74.7, 3.2, 2.7, 6),
+    "penne":               (371, 13.0, 1.5, 74.7, 3.2, 2.7, 6),
+    "rigatoni":            (371, 13.0, 1.5, 74.7, 3.2, 2.7, 6),
+    "egg noodle":          (384, 14.2, 4.4, 71.3, 3.3, 1.9, 21),
+    "rice noodle":         (364, 6.0, 0.6, 80.2, 1.6, 0.1, 182),
+    "quinoa":              (368, 14.1, 6.1, 64.2, 7.0, 0.0, 5),
+    "oat":                 (379, 13.2, 6.5, 67.7, 10.1, 1.0, 6),
+    "breadcrumb":          (395, 13.4, 5.3, 71.9, 4.5, 6.2, 732),
+    "panko":               (395, 13.4, 5.3, 71.9, 4.5, 6.2, 732),
+    # Vegetables and fruit
+    "garlic":              (149, 6.4, 0.5, 33.1, 2.1, 1.0, 17),
+    "shallot":             (72, 2.5, 0.1, 16.8, 3.2, 7.9, 12),
+    "onion":               (40, 1.1, 0.1, 9.3, 1.7, 4.2, 4),
+    "scallion":            (32, 1.8, 0.2, 7.3, 2.6, 2.3, 16),
+    "leek":                (61, 1.5, 0.3, 14.2, 1.8, 3.9, 20),
+    "carrot":              (41, 0.9, 0.2, 9.6, 2.8, 4.7, 69),
+    "celery":              (14, 0.7, 0.2, 3.0, 1.6, 1.3, 80),
+    "bell pepper":         (26, 1.0, 0.3, 6.0, 2.1, 4.2, 4),
+    "jalapeno":            (29, 0.9, 0.4, 6.5, 2.8, 4.1, 3),
+    "tomato":              (18, 0.9, 0.2, 3.9, 1.2, 2.6, 5),
+    "cherry tomato":       (18, 0.9, 0.2, 3.9, 1.2, 2.6, 5),
+    "tomato paste":        (82, 4.3, 0.5, 18.9, 4.1, 12.2, 59),
+    "crushed tomato":      (32, 1.6, 0.3, 7.3, 1.9, 4.4, 132),
+    "zucchini":            (17, 1.2, 0.3, 3.1, 1.0, 2.5, 8),
+    "eggplant":            (25, 1.0, 0.2, 5.9, 3.0, 3.5, 2),
+    "broccoli":            (34, 2.8, 0.4, 6.6, 2.6, 1.7, 33),
+    "cauliflower":         (25, 1.9, 0.3, 5.0, 2.0, 1.9, 30),
+    "spinach":             (23, 2.9, 0.4, 3.6, 2.2, 0.4, 79),
+    "kale":                (49, 4.3, 0.9, 8.8, 3.6, 2.3, 38),
+    "mushroom":            (22, 3.1, 0.3, 3.3, 1.0, 2.0, 5),
+    "potato":              (77, 2.0, 0.1, 17.5, 2.1, 0.8, 6),
+    "sweet potato":        (86, 1.6, 0.1, 20.1, 3.0, 4.2, 55),
+    "butternut squash":    (45, 1.0, 0.1, 11.7, 2.0, 2.2, 4),
+    "corn":                (86, 3.3, 1.4, 19.0, 2.7, 6.3, 15),
+    "pea":                 (81, 5.4, 0.4, 14.5, 5.7, 5.7, 5),
+    "avocado":             (160, 2.0, 14.7, 8.5, 6.7, 0.7, 7),
+    "lemon":               (29, 1.1, 0.3, 9.3, 2.8, 2.5, 2),
+    "lemon juice":         (22, 0.4, 0.2, 6.9, 0.3, 2.5, 1),
+    "lime":                (30, 0.7, 0.2, 10.5, 2.8, 1.7, 2),
+    "lime juice":          (25, 0.4, 0.1, 8.4, 0.4, 1.7, 2),
+    "orange":              (47, 0.9, 0.1, 11.8, 2.4, 9.4, 0),
+    "orange zest":         (97, 1.5, 0.2, 25.0, 10.6, 0.0, 3),
+    "ginger":              (80, 1.8, 0.8, 17.8, 2.0, 1.7, 13),
+    # Nuts
+    "walnut":              (654, 15.2, 65.2, 13.7, 6.7, 2.6, 2),
+    "almond":              (579, 21.2, 49.9, 21.6, 12.5, 4.4, 1),
+    "pine nut":            (673, 13.7, 68.4, 13.1, 3.7, 3.6, 2),
+    "peanut butter":       (588, 25.1, 50.4, 19.6, 6.0, 9.2, 17),
+    # Herbs and spices
+    "basil":               (23, 3.2, 0.6, 2.7, 1.6, 0.3, 4),
+    "parsley":             (36, 3.0, 0.8, 6.3, 3.3, 0.9, 56),
+    "cilantro":            (23, 2.1, 0.5, 3.7, 2.8, 0.9, 46),
+    "thyme":               (101, 5.6, 1.7, 24.5, 14.0, 0.0, 9),
+    "rosemary":            (131, 3.3, 5.9, 20.7, 14.1, 0.0, 26),
+    "oregano":             (265, 9.0, 4.3, 68.9, 42.5, 4.1, 25),
+    "bay leaf":            (313, 7.6, 8.4, 75.0, 26.3, 0.0, 23),
+    "cumin":               (375, 17.8, 22.3, 44.2, 10.5, 2.3, 168),
+    "paprika":             (282, 14.1, 12.9, 54.0, 34.9, 10.3, 68),
+    "chili flake":         (318, 12.0, 17.3, 56.6, 27.2, 10.3, 30),
+    "turmeric":            (312, 9.7, 3.3, 67.1, 22.7, 3.2, 27),
+    "garam masala":        (379, 15.0, 15.0, 50.0, 18.0, 2.0, 80),
+    "cinnamon":            (247, 4.0, 1.2, 80.6, 53.1, 2.2, 10),
+    "nutmeg":              (525, 5.8, 36.3, 49.3, 20.8, 3.0, 16),
+    "pepper":              (251, 10.4, 3.3, 64.0, 25.3, 0.6, 20),
+    "salt":                (0, 0.0, 0.0, 0.0, 0.0, 0.0, 38758),
+    # Sauces, stocks and wine
+    "soy sauce":           (53, 8.1, 0.6, 4.9, 0.8, 0.4, 5493),
+    "tamari":              (60, 10.5, 0.1, 5.6, 0.8, 1.7, 5586),
+    "fish sauce":          (35, 5.1, 0.0, 3.6, 0.0, 3.6, 7851),
+    "worcestershire sauce": (78, 0.0, 0.0, 19.5, 0.0, 10.0, 980),
+    "vinegar":             (18, 0.0, 0.0, 0.0, 0.0, 0.0, 2),
+    "balsamic vinegar":    (88, 0.5, 0.0, 17.0, 0.0, 15.0, 23),
+    "mustard":             (60, 3.7, 3.3, 5.8, 4.0, 0.9, 1104),
+    "stock":               (6, 0.6, 0.2, 0.4, 0.0, 0.3, 343),
+    "broth":               (6, 0.6, 0.2, 0.4, 0.0, 0.3, 343),
+    "wine":                (83, 0.1, 0.0, 2.6, 0.0, 0.8, 5),
+    "water":               (0, 0.0, 0.0, 0.0, 0.0, 0.0, 0),
+}
+
+# Grams in one cup, for volume measures; foods not listed weigh like water
+CUP_GRAMS = {
+    "flour": 125, "bread flour": 127, "cornstarch": 128, "sugar": 200, "brown sugar": 220, "honey": 340,
+    "maple syrup": 315, "agave syrup": 330, "baking soda": 220, "baking powder": 221, "vanilla extract": 208,
+    "cocoa powder": 86, "chocolate": 170, "chocolate chip": 168, "butter": 227, "vegan butter": 227,
+    "ghee": 205, "oil": 216, "mayonnaise": 220, "egg": 243, "sour cream": 230, "cream cheese": 232,
+    "cheese": 113, "parmesan": 100, "pecorino": 100, "mozzarella": 113, "feta": 150, "nutritional yeast": 60,
+    "chicken": 140, "chicken thigh": 140, "ground beef": 225, "beef": 140, "pork": 140, "bacon": 150,
+    "guanciale": 150, "pancetta": 150, "sausage": 150, "salmon": 140, "cod": 140, "tuna": 154, "shrimp": 145,
+    "tofu": 252, "tempeh": 166, "chickpea": 164, "bean": 172, "lentil": 198, "rice": 185, "pasta": 100,
+    "spaghetti": 100, "penne": 100, "rigatoni": 100, "egg noodle": 38, "rice noodle": 90, "quinoa": 170,
+    "oat": 81, "breadcrumb": 108, "panko": 50, "garlic": 136, "shallot": 160, "onion": 160, "scallion": 100,
+    "leek": 89, "carrot": 128, "celery": 101, "bell pepper": 149, "jalapeno": 90, "tomato": 180,
+    "cherry tomato": 149, "tomato paste": 262, "zucchini": 124, "eggplant": 82, "broccoli": 91,
+    "cauliflower": 107, "spinach": 30, "kale": 67, "mushroom": 70, "potato": 150, "sweet potato": 133,
+    "butternut squash": 140, "corn": 154, "pea": 145, "avocado": 150, "orange zest": 96, "ginger": 96,
+    "walnut": 117, "almond": 143, "pine nut": 135, "peanut butter": 258, "basil": 24, "parsley": 60,
+    "cilantro": 16, "thyme": 48, "rosemary": 48, "oregano": 48, "bay leaf": 29, "cumin": 96, "paprika": 109,
+    "chili flake": 86, "turmeric": 108, "garam masala": 96, "cinnamon": 125, "nutmeg": 106, "pepper": 110,
+    "salt": 292, "soy sauce": 255, "tamari": 255, "fish sauce": 288, "worcestershire sauce": 275,
+    "balsamic vinegar": 255, "mustard": 249,
+}
+
+# Grams of one counted item ("4 eggs", "3 cloves garlic", "2 slices bacon")
+EACH_GRAMS = {
+    "egg": 50, "egg yolk": 17, "egg white": 33, "flax egg": 52, "aquafaba": 45, "chicken": 175,
+    "chicken thigh": 110, "bacon": 12, "sausage": 75, "salmon": 170, "cod": 180, "tofu": 400,
+    "garlic": 3, "shallot": 44, "onion": 110, "scallion": 15, "leek": 89, "carrot": 61, "celery": 40,
+    "bell pepper": 119, "jalapeno": 14, "tomato": 123, "cherry tomato": 17, "zucchini": 196,
+    "eggplant": 458, "cauliflower": 575, "mushroom": 18, "potato": 213, "sweet potato": 130,
+    "corn": 90, "avocado": 150, "lemon": 84, "lime": 67, "orange": 131, "bay leaf": 0.2,
+    "ginger": 15, "chocolate": 10,
+}
+
+# Unit -> grams, or cups for volume measures
+MASS_UNITS = {
+    "g": 1, "gram": 1, "grams": 1, "kg": 1000, "mg": 0.001, "oz": 28.35, "ounce": 28.35, "ounces": 28.35,
+    "lb": 453.6, "lbs": 453.6, "pound": 453.6, "pounds": 453.6,
+}
+VOLUME_UNITS = {
+    "cup": 1, "cups": 1, "tbsp": 1 / 16, "tablespoon": 1 / 16, "tablespoons": 1 / 16, "tsp": 1 / 48,
+    "teaspoon": 1 / 48, "teaspoons": 1 / 48, "ml": 1 / 236.6, "l": 1000 / 236.6, "pint": 2, "quart": 4,
+    "gallon": 16, "pinch": 1 / 768, "dash": 1 / 384,
+}
+COUNT_UNITS = {"", "clove", "cloves", "slice", "slices", "piece", "pieces"}
+# Typical net weight of a container
+PACKAGE_GRAMS = {"can": 400, "cans": 400, "jar": 340, "jars": 340, "package": 450, "packages": 450}
+WATER_CUP_GRAMS = 240
+
+# Catalogue rows are multiplied in blocks to bound the dense quantity matrix
+_BLOCK = 8192
+_RANGE_WORDS = [
+    ("max", r"<=|<|\bunder\b|\bbelow\b|\bless than\b|\bfewer than\b|\bat most\b|\bup to\b|\bmax(?:imum)?\b|\bno more than\b"),
+    ("min", r">=|>|\bover\b|\babove\b|\bmore than\b|\bat least\b|\bmin(?:imum)?\b"),
+]
+_NUMBER = re.compile(r"\d+(?:\.\d+)?")
+_UNMEASURED = re.compile(r"^\s*(?:[-•*]\s*)?\D")
+_ALIASES = {
+    "calorie": "calories", "calories": "calories", "kcal": "calories", "cal": "calories", "cals": "calories",
+    "energy": "calories", "protein": "protein", "proteins": "protein", "fat": "fat", "fats": "fat",
+    "carb": "carbs", "carbs": "carbs", "carbohydrate": "carbs", "carbohydrates": "carbs", "fiber": "fiber",
+    "fibre": "fiber", "sugar": "sugar", "sugars": "sugar", "sodium": "sodium",
+}
+
+
+def _quantity(text: str) -> float | None:
+    """ "2 1/4" -> 2.25, "2 / 3" -> 0.67, "2-3" -> 2.5 (the middle of a range); None if unreadable """
+    if "-" in text:
+        low, high = (_quantity(part) for part in text.split("-", 1))
+        return None if low is None or high is None else (low + high) / 2
+    try:
+        return float(sum((Fraction(part) for part in re.sub(r"\s*/\s*", "/", text).split()), Fraction(0)))
+    except (ValueError, ZeroDivisionError):
+        return None
+
+
+class NutrientTable:
+    """Foods x nutrients matrix (per gram) and the food and weight of each ingredient line"""
+
+    def __init__(
+        self,
+        foods: Mapping[str, Sequence[float]] = FOODS,
+        cup_grams: Mapping[str, float] = CUP_GRAMS,
+        each_grams: Mapping[str, float] = EACH_GRAMS,
+    ):
+        self.foods = list(foods)
+        self.row = {food: i for i, food in enumerate(self.foods)}
+        self.matrix = np.array([foods[food] for food in self.foods], dtype=np.float64) / 100
+        self.cup_grams = dict(cup_grams)
+        self.each_grams = dict(each_grams)
+        self._phrases = PhraseTable(self.row)
+        # Lines repeat across a catalogue, so each is parsed once
+        self.parse = lru_cache(maxsize=65536)(self._parse)
+
+    def food(self, name: str) -> str | None:
+        """The table food an ingredient name refers to (its first known phrase)"""
+        found = self._phrases.matches(name)
+        return found[0][0] if found else None
+
+    def grams(self, ingredient: IngredientInfo, food: str) -> float | None:
+        """Weight of a parsed ingredient; None when its unit cannot be converted"""
+        amount = _quantity(ingredient.quantity)
+        if amount is None:
+            return None
+        unit = ingredient.unit
+        if unit in MASS_UNITS:
+            return amount * MASS_UNITS[unit]
+        if unit in VOLUME_UNITS:
+            return amount * VOLUME_UNITS[unit] * self.cup_grams.get(food, WATER_CUP_GRAMS)
+        if unit in PACKAGE_GRAMS:
+            return amount * PACKAGE_GRAMS[unit]
+        if unit in COUNT_UNITS and food in self.each_grams:
+            return amount * self.each_grams[food]
+        return None
+
+    def _parse(self, line: str) -> tuple[int, float]:
+        """(table row, grams) of an ingredient line; row -1 if it is not counted"""
+        if _UNMEASURED.match(line):
+            # "Salt for pasta water", "Black pepper to taste"
+            return -1, 0.0
+        ingredient = IngredientExtractor._parse_ingredient_line(line)
+        food = self.food(ingredient.name)
+        grams = self.grams(ingredient, food) if food is not None else None
+        if grams is None:
+            return -1, 0.0
+        return self.row[food], grams
+
+    def quantities(self, ingredients: Iterable[str]) -> tuple[np.ndarray, list[str]]:
+        """Grams of each table food in an ingredient list, and the lines not counted"""
+        vector = np.zeros(len(self.foods))
+        uncounted = []
+        for line in ingredients:
+            row, grams = self.parse(line)
+            if row < 0:
+                uncounted.append(line)
+            else:
+                vector[row] += grams
+        return vector, uncounted
+
+    def nutrients(self, recipe: Recipe) -> "Nutrition":
+        """Nutrients of one recipe"""
+        vector, uncounted = self.quantities(recipe.ingredients)
+        return Nutrition(vector @ self.matrix, max(recipe.servings, 1), uncounted)
+
+    def batch(self, recipes: Sequence[Recipe]) -> np.ndarray:
+        """Nutrient totals of many recipes, one row each: quantities @ matrix, block by block"""
+        totals = np.zeros((len(recipes), len(NUTRIENTS)))
+        parse = self.parse
+        for start in range(0, len(recipes), _BLOCK):
+            block = [recipe.ingredients for recipe in recipes[start:start + _BLOCK]]
+            counts = np.fromiter(map(len, block), dtype=np.int64, count=len(block))
+            lines = chain.from_iterable(block)
+            parsed = np.fromiter(chain.from_iterable(map(parse, lines)), dtype=np.float64).reshape(-1, 2)
+            foods = parsed[:, 0].astype(np.int64)
+            counted = foods >= 0
+            # Flat (recipe, food) cell of every counted line; duplicates add up, like two lines of butter
+            cells = np.repeat(np.arange(len(block)), counts)[counted] * len(self.foods) + foods[counted]
+            quantities = np.bincount(cells, weights=parsed[counted, 1], minlength=len(block) * len(self.foods))
+            totals[start:start + len(block)] = quantities.reshape(len(block), len(self.foods)) @ self.matrix
+        return totals
+
+
+@dataclass
+class Nutrition:
+    """Nutrients of one recipe"""
+    # Totals in NUTRIENTS order
+    total: np.ndarray
+    servings: int
+    # Ingredient lines without a known food or a convertible quantity
+    uncounted: list[str]
+
+    @property
+    def per_serving(self) -> np.ndarray:
+        return self.total / self.servings
+
+    def as_dict(self, per_serving: bool = True) -> dict[str, float]:
+        values = self.per_serving if per_serving else self.total
+        return {name: float(value) for name, value in zip(NUTRIENTS, values)}
+
+
+class NutritionIndex:
+    """Per-serving nutrients of a whole catalogue, one row per recipe
+
+    Built in one batch; ``refresh`` reuses the rows of recipes that did
+    not change, so an edit to a large catalogue only recomputes that recipe.
+    """
+
+    def __init__(self, recipes: Mapping[str, Recipe], table: NutrientTable | None = None, _rows=None):
+        self.table = table or default_table()
+        self.recipes = recipes
+        self.ids = list(recipes)
+        if _rows is None:
+            values = [recipes[recipe_id] for recipe_id in self.ids]
+            _rows = self.table.batch(values) / np.array([max(recipe.servings, 1) for recipe in values])[:, None]
+        self.per_serving = _rows
+        self._position = {recipe_id: i for i, recipe_id in enumerate(self.ids)}
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def refresh(self, recipes: Mapping[str, Recipe]) -> "NutritionIndex":
+        """An index of ``recipes`` computing rows only for recipes that are new or edited"""
+        old, position = self.recipes, self._position
+        ids = list(recipes)
+        reused = np.fromiter(
+            (position.get(recipe_id, -1) if recipes[recipe_id] is old.get(recipe_id) else -1 for recipe_id in ids),
+            dtype=np.int64, count=len(ids),
+        )
+        rows = self.per_serving[np.maximum(reused, 0)] if len(self.ids) else np.zeros((len(ids), len(NUTRIENTS)))
+        stale = np.flatnonzero(reused < 0)
+        if len(stale):
+            values = [recipes[ids[i]] for i in stale]
+            rows[stale] = self.table.batch(values) / np.array([max(recipe.servings, 1) for recipe in values])[:, None]
+        return NutritionIndex(recipes, self.table, rows)
+
+    def get(self, recipe_id: str) -> dict[str, float] | None:
+        """Per-serving nutrients of one recipe"""
+        i = self._position.get(recipe_id)
+        if i is None:
+            return None
+        return {name: float(value) for name, value in zip(NUTRIENTS, self.per_serving[i])}
+
+    def filter_ids(self, ranges: Mapping[str, tuple[float, float]]) -> list[str]:
+        """Ids of recipes whose per-serving nutrients fall in every (low, high) range, in catalogue order"""
+        mask = np.ones(len(self.ids), dtype=bool)
+        for nutrient, (low, high) in ranges.items():
+            if nutrient not in NUTRIENTS:
+                raise ValueError(f"Unknown nutrient: {nutrient}. Available: {', '.join(NUTRIENTS)}")
+            column = self.per_serving[:, NUTRIENTS.index(nutrient)]
+            mask &= (column >= low) & (column <= high)
+        return [self.ids[i] for i in np.flatnonzero(mask)]
+
+    def filter(self, ranges: Mapping[str, tuple[float, float]]) -> list[Recipe]:
+        return [self.recipes[recipe_id] for recipe_id in self.filter_ids(ranges)]
+
+
+def parse_ranges(text: str) -> dict[str, tuple[float, float]]:
+    """Per-serving (low, high) bounds from e.g. "under 500 calories, protein >= 20, fat 10-20"
+
+    Clauses are separated by commas, ";", "and" or "with"; bounds are inclusive.
+    """
+    ranges: dict[str, tuple[float, float]] = {}
+    text = re.sub(r"\bbetween\s+(\d+(?:\.\d+)?)\s*(?:g|mg|kcal)?\s+and\s+", r"\1-", text.lower())
+    for clause in re.split(r",|;|\band\b|\bwith\b", text):
+        if not clause.strip():
+            continue
+        names = {_ALIASES[word] for word in re.findall(r"[a-z]+", clause) if word in _ALIASES}
+        if len(names) != 1:
+            raise ValueError(f"Name one nutrient per range: '{clause.strip()}'. Available: {', '.join(NUTRIENTS)}")
+        nutrient = names.pop()
+        values = [float(value) for value in _NUMBER.findall(clause)]
+        low, high = ranges.get(nutrient, (0.0, float("inf")))
+        if len(values) == 2:
+            low, high = max(low, min(values)), min(high, max(values))
+        elif len(values) == 1:
+            bound = next((kind for kind, pattern in _RANGE_WORDS if re.search(pattern, clause)), None)
+            if bound is None:
+                raise ValueError(f"Say whether '{clause.strip()}' is a minimum or a maximum, e.g. 'under' or 'at least'")
+            if bound == "max":
+                high = min(high, values[0])
+            else:
+                low = max(low, values[0])
+        else:
+            raise ValueError(f"No amount given for {nutrient}: '{clause.strip()}'")
+        ranges[nutrient] = (low, high)
+    return ranges
+
+
+def format_amount(nutrient: str, value: float) -> str:
+    """ "612 kcal", "28.1 g", "950 mg" """
+    unit = NUTRIENT_UNITS[nutrient]
+    return f"{value:.0f} {unit}" if unit != "g" else f"{value:.1f} {unit}"
+
+
+def describe_ranges(ranges: Mapping[str, tuple[float, float]]) -> str:
+    """ "calories ≤ 500 kcal, protein ≥ 20 g, fat 10-25 g" """
+    parts = []
+    for name, (low, high) in ranges.items():
+        unit = NUTRIENT_UNITS[name]
+        if low > 0 and high != float("inf"):
+            parts.append(f"{name} {low:g}-{high:g} {unit}")
+        elif high != float("inf"):
+            parts.append(f"{name} ≤ {high:g} {unit}")
+        else:
+            parts.append(f"{name} ≥ {low:g} {unit}")
+    return ", ".join(parts)
+
+
+def format_macros(values: Mapping[str, float]) -> str:
+    """ "612 kcal, 28.1 g protein, 65.0 g carbs, 30.2 g fat" """
+    return ", ".join(
+        format_amount(name, values[name]) + ("" if name == "calories" else f" {name}")
+        for name in ("calories", "protein", "carbs", "fat")
+    )
+
+
+_DEFAULT: NutrientTable | None = None
+
+
+def default_table() -> NutrientTable:
+    """The bundled nutrient table, built on first use"""
+    global _DEFAULT
+    if _DEFAULT is None:
+        _DEFAULT = NutrientTable()
+    return _DEFAULT
@@ -0,0 +1,174 @@
+"""
+Multiprocess sharded recipe search for very large catalogues
+The catalogue is split into contiguous ranges, one per worker process, so
+each query runs on every core at once. Shards are handed to the workers as
+pickle files (not through the pipe) and each worker indexes its own range;
+the coordinator merges the per-shard id lists, which are already in
+catalogue order, and resolves them against its own copy of the catalogue.
+Benchmark with: python -m benchmarks.sharded_search --recipes 200000
+"""
+
+import multiprocessing
+import os
+import pickle
+import tempfile
+import threading
+from typing import Mapping, Sequence
+
+from cooking_tools import Recipe, RecipeDatabase, RecipeSnapshot
+
+
+def match_ids(snapshot: RecipeSnapshot, query: str, require: Sequence[str] = (), limit: int | None = None) -> list[str]:
+    """Ids of recipes matching ``query`` and every term in ``require``, in catalogue order"""
+    ids = snapshot.search_ids(query)
+    for term in require:
+        allowed = set(snapshot.search_ids(term))
+        ids = [recipe_id for recipe_id in ids if recipe_id in allowed]
+    return ids if limit is None else ids[:limit]
+
+
+def _serve(connection, path: str):
+    """Worker loop: index one shard, then answer search batches until told to stop"""
+    try:
+        with open(path, "rb") as f:
+            snapshot = RecipeDatabase(pickle.load(f)).snapshot()
+        connection.send(("ok", len(snapshot)))
+    except Exception as e:
+        connection.send(("error", f"{type(e).__name__}: {e}"))
+        return
+    while True:
+        try:
+            request = connection.recv()
+        except EOFError:
+            return
+        if request is None:
+            return
+        queries, require, limit = request
+        try:
+            connection.send(("ok", [match_ids(snapshot, query, require, limit) for query in queries]))
+        except Exception as e:
+            connection.send(("error", f"{type(e).__name__}: {e}"))
+
+
+class ShardedRecipeSearch:
+    """Searches a catalogue split across worker processes
+
+    Read-only and built from a fixed catalogue (e.g. ``db.snapshot()``);
+    build a new one to pick up later edits. Offers the read methods of
+    ``RecipeDatabase``, so it can stand in for ``CookingToolbox.recipe_db``.
+    """
+
+    def __init__(self, recipes: Mapping[str, Recipe], shards: int | None = None):
+        self.recipes = recipes
+        self.shards = max(1, min(shards or os.cpu_count() or 1, len(recipes) or 1))
+        self._lock = threading.Lock()
+        self._workers = []
+        self._tagged: RecipeSnapshot | None = None
+        context = multiprocessing.get_context("spawn")
+        ids = list(recipes)
+        with tempfile.TemporaryDirectory(prefix="recipe-shards-") as directory:
+            for shard in range(self.shards):
+                path = os.path.join(directory, f"shard-{shard}.pickle")
+                start, stop = len(ids) * shard // self.shards, len(ids) * (shard + 1) // self.shards
+                with open(path, "wb") as f:
+                    pickle.dump({recipe_id: recipes[recipe_id] for recipe_id in ids[start:stop]}, f, pickle.HIGHEST_PROTOCOL)
+                connection, child = context.Pipe()
+                process = context.Process(target=_serve, args=(child, path), name=f"recipe-shard-{shard}", daemon=True)
+                process.start()
+                child.close()
+                self._workers.append((process, connection))
+            try:
+                # Wait until every worker has loaded its file
+                self._gather()
+            except Exception:
+                self.close()
+                raise
+
+    @staticmethod
+    def _receive(connection):
+        try:
+            status, payload = connection.recv()
+        except EOFError:
+            raise RuntimeError("Recipe shard exited unexpectedly") from None
+        if status != "ok":
+            raise RuntimeError(f"Recipe shard failed: {payload}")
+        return payload
+
+    def _gather(self) -> list:
+        """One reply per shard; every pipe is drained before an error is raised
+
+        Raising on the first failed shard would leave the other replies in
+        their pipes, to be read as the answers to the next request.
+        """
+        replies, error = [], None
+        for _, connection in self._workers:
+            try:
+                replies.append(self._receive(connection))
+            except RuntimeError as e:
+                error = error or e
+        if error is not None:
+            raise error
+        return replies
+
+    def search_many_ids(
+        self, queries: Sequence[str], require: Sequence[str] = (), limit: int | None = None
+    ) -> list[list[str]]:
+        """Answer a batch of queries with one round trip per shard"""
+        request = (list(queries), tuple(require), limit)
+        with self._lock:
+            for _, connection in self._workers:
+                connection.send(request)
+            replies = self._gather()
+        results = []
+        for i in range(len(queries)):
+            # Shards hold consecutive ranges, so concatenating keeps catalogue order
+            ids = [recipe_id for reply in replies for recipe_id in reply[i]]
+            results.append(ids if limit is None else ids[:limit])
+        return results
+
+    def search_many(
+        self, queries: Sequence[str], require: Sequence[str] = (), limit: int | None = None
+    ) -> list[list[Recipe]]:
+        """Recipes for each query of a batch"""
+        return [[self.recipes[recipe_id] for recipe_id in ids] for ids in self.search_many_ids(queries, require, limit)]
+
+    def search_ids(self, query: str, require: Sequence[str] = (), limit: int | None = None) -> list[str]:
+        return self.search_many_ids([query], require, limit)[0]
+
+    def search_recipes(self, query: str, require: Sequence[str] = (), limit: int | None = None) -> list[Recipe]:
+        """Search recipes by name or ingredients on every shard"""
+        return self.search_many([query], require, limit)[0]
+
+    def filter_ids(self, tags: Sequence[str], exclude: Sequence[str] = ()) -> list[str]:
+        """Tag filters are a few bitmap operations, so they run here rather than on the shards"""
+        if self._tagged is None:
+            self._tagged = self.recipes if isinstance(self.recipes, RecipeSnapshot) else RecipeDatabase(self.recipes).snapshot()
+        return self._tagged.filter_ids(tags, exclude)
+    
+    def filter_recipes(self, tags: Sequence[str], exclude: Sequence[str] = ()) -> list[Recipe]:
+        return [self.recipes[recipe_id] for recipe_id in self.filter_ids(tags, exclude)]
+    
+    def get_recipe(self, recipe_id: str) -> Recipe | None:
+        return self.recipes.get(recipe_id)
+
+    def list_all_recipes(self) -> list[Recipe]:
+        return list(self.recipes.values())
+
+    def close(self):
+        for process, connection in self._workers:
+            try:
+                connection.send(None)
+            except (BrokenPipeError, OSError):
+                pass
+            connection.close()
+        for process, _ in self._workers:
+            process.join(timeout=5)
+            if process.is_alive():
+                process.kill()
+        self._workers = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
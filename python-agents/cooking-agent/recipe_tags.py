@@ -0,0 +1,282 @@
+"""
+Recipe tags derived from ingredients
+Dietary attributes (vegan, gluten-free, ...), cuisine, meal type and "quick"
+worked out from a precomputed ingredient -> attribute table when a recipe is
+added to the catalogue. RecipeDatabase keeps one bitmap per tag over the
+whole catalogue, so combined filters are bitwise operations.
+"""
+
+import re
+from functools import lru_cache
+from typing import TYPE_CHECKING, Generic, Mapping, TypeVar
+
+if TYPE_CHECKING:
+    from cooking_tools import Recipe
+
+# What an ingredient contains, as bit flags
+MEAT, FISH, DAIRY, EGG, HONEY, GLUTEN, NUTS = (1 << i for i in range(7))
+
+# Dietary tag -> flags a recipe must not contain
+DIETS = {
+    "vegan": MEAT | FISH | DAIRY | EGG | HONEY,
+    "vegetarian": MEAT | FISH,
+    "pescatarian": MEAT,
+    "gluten-free": GLUTEN,
+    "dairy-free": DAIRY,
+    "nut-free": NUTS,
+}
+
+# Ingredient words and phrases (singular) -> flags; longer phrases win, so
+# "coconut milk" is not dairy and "peanut butter" is nuts only
+CONTAINS = {
+    **dict.fromkeys((
+        "bacon", "guanciale", "pancetta", "prosciutto", "ham", "sausage", "chorizo", "salami", "pepperoni",
+        "chicken", "beef", "pork", "lamb", "turkey", "duck", "veal", "venison", "meat", "gelatin", "lard",
+        "chicken stock", "beef stock", "chicken broth", "beef broth",
+    ), MEAT),
+    **dict.fromkeys((
+        "fish", "salmon", "tuna", "cod", "halibut", "trout", "anchovy", "sardine", "shrimp", "prawn",
+        "crab", "lobster", "scallop", "mussel", "clam", "oyster", "squid", "fish sauce", "worcestershire sauce",
+    ), FISH),
+    **dict.fromkeys((
+        "butter", "milk", "cream", "cheese", "yogurt", "buttermilk", "ghee", "parmesan", "pecorino",
+        "mozzarella", "ricotta", "feta", "cheddar", "mascarpone", "gruyere", "paneer", "whey", "pecorino romano",
+        "milk chocolate", "chocolate chip",
+    ), DAIRY),
+    **dict.fromkeys(("egg", "egg yolk", "egg white", "mayonnaise", "meringue"), EGG),
+    "honey": HONEY,
+    **dict.fromkeys((
+        "flour", "bread", "breadcrumb", "panko", "pasta", "spaghetti", "penne", "rigatoni", "linguine",
+        "fettuccine", "lasagna", "macaroni", "noodle", "couscous", "bulgur", "barley", "rye", "semolina",
+        "seitan", "cracker", "tortilla", "pita", "beer", "soy sauce", "oat",
+    ), GLUTEN),
+    "egg noodle": EGG | GLUTEN,
+    **dict.fromkeys((
+        "almond", "walnut", "pecan", "cashew", "peanut", "hazelnut", "pistachio", "macadamia", "pine nut",
+        "peanut butter", "almond milk", "almond flour",
+    ), NUTS),
+    **dict.fromkeys((
+        "coconut milk", "coconut cream", "oat milk", "soy milk", "rice milk", "rice flour", "corn tortilla",
+        "butter bean", "peanut oil", "cream of tartar", "dark chocolate", "vegetable stock", "vegetable broth",
+        "rice noodle", "gluten free", "tamari", "nutmeg", "eggplant",
+        # Substitutes (see substitutions.py) whose words would otherwise match
+        "gluten free flour", "gluten free pasta", "gluten free spaghetti", "gluten free breadcrumb",
+        "gluten free bread", "chickpea flour", "vegan butter", "vegan cheese", "vegan parmesan",
+        "vegan mayonnaise", "flax egg", "coconut yogurt", "soy yogurt", "mushroom stock", "oat cream",
+        "certified gluten free oat", "sunflower seed butter", "dark chocolate chip",
+    ), 0),
+    "cashew cream": NUTS,
+}
+
+# Cuisine -> ingredient or dish words that point to it
+CUISINES = {
+    "italian": (
+        "italian", "spaghetti", "penne", "rigatoni", "linguine", "lasagna", "pasta", "risotto", "pizza",
+        "carbonara", "pecorino", "pecorino romano", "parmesan", "mozzarella", "ricotta", "mascarpone", "guanciale", "pancetta",
+        "prosciutto", "arborio", "basil", "balsamic",
+    ),
+    "asian": (
+        "asian", "thai", "chinese", "japanese", "korean", "soy sauce", "tamari", "sesame oil", "fish sauce",
+        "rice vinegar", "miso", "tofu", "tempeh", "rice noodle", "jasmine rice", "stir fry", "teriyaki",
+        "ginger", "lemongrass",
+    ),
+    "mexican": (
+        "mexican", "taco", "burrito", "quesadilla", "enchilada", "tortilla", "corn tortilla", "salsa",
+        "jalapeno", "chipotle", "cilantro", "black bean",
+    ),
+    "indian": (
+        "indian", "curry", "tikka", "masala", "garam masala", "dal", "paneer", "ghee", "turmeric",
+        "basmati rice", "cardamom",
+    ),
+}
+
+# Meal type -> dish words in the recipe name; anything else is a main
+MEALS = {
+    "breakfast": (
+        "breakfast", "pancake", "waffle", "omelette", "omelet", "frittata", "granola", "porridge",
+        "oatmeal", "french toast", "scramble",
+    ),
+    "dessert": (
+        "dessert", "cookie", "cake", "cupcake", "cheesecake", "brownie", "tart", "pudding", "ice cream",
+        "muffin", "crumble", "cobbler", "mousse",
+    ),
+    "snack": ("snack", "dip", "skewer", "bite", "popcorn"),
+    "side": ("salad", "slaw", "side"),
+}
+
+# Recipes ready in this many minutes (prep plus cook) are tagged "quick"
+QUICK_MINUTES = 30
+
+# Every tag a recipe can be given automatically
+TAGS = (*DIETS, *CUISINES, *MEALS, "main", "quick")
+
+# phrase -> (flags, cuisines, meal types), precomputed from the tables above
+_TABLE: dict[str, tuple[int, tuple[str, ...], tuple[str, ...]]] = {}
+for _phrase, _flags in CONTAINS.items():
+    _TABLE[_phrase] = (_flags, (), ())
+for _attribute, _phrases, _slot in [
+    *((cuisine, phrases, 1) for cuisine, phrases in CUISINES.items()),
+    *((meal, phrases, 2) for meal, phrases in MEALS.items()),
+]:
+    for _phrase in _phrases:
+        _entry = list(_TABLE.get(_phrase, (0, (), ())))
+        _entry[_slot] += (_attribute,)
+        _TABLE[_phrase] = tuple(_entry)
+
+_WORD = re.compile(r"[a-z]+")
+_DURATION = re.compile(r"(\d+(?:\.\d+)?)\s*(h|hr|hrs|hour|hours|m|min|mins|minute|minutes)\b")
+# Interned tag sets: catalogues share a few hundred distinct ones
+_INTERNED: dict[frozenset[str], frozenset[str]] = {}
+
+V = TypeVar("V")
+
+
+class PhraseTable(Generic[V]):
+    """Finds known phrases in free text, longest first, ignoring plurals"""
+
+    def __init__(self, phrases: Mapping[str, V]):
+        self.phrases = dict(phrases)
+        self.longest = max((len(phrase.split()) for phrase in self.phrases), default=1)
+        self.words = {word for phrase in self.phrases for word in phrase.split()}
+
+    def singular(self, word: str) -> str:
+        """``word`` as spelled in the table: "cookies" -> "cookie", "anchovies" -> "anchovy" """
+        if word in self.words or not word.endswith("s"):
+            return word
+        for candidate in (word[:-1], word[:-2], word[:-3] + "y"):
+            if candidate in self.words:
+                return candidate
+        return word
+
+    def matches(self, text: str) -> list[tuple[str, V, int, int]]:
+        """(phrase, value, start, end) for each phrase found in ``text``, in order"""
+        spans = [(match.start(), match.end(), self.singular(match.group())) for match in _WORD.finditer(text.lower())]
+        found = []
+        i = 0
+        while i < len(spans):
+            for length in range(min(self.longest, len(spans) - i), 0, -1):
+                phrase = " ".join(word for _, _, word in spans[i:i + length])
+                if phrase in self.phrases:
+                    found.append((phrase, self.phrases[phrase], spans[i][0], spans[i + length - 1][1]))
+                    i += length
+                    break
+            else:
+                i += 1
+        return found
+
+
+_PHRASES = PhraseTable(_TABLE)
+
+
+def _entries(text: str) -> list[tuple[int, tuple[str, ...], tuple[str, ...]]]:
+    """Table entries for the phrases in ``text``, longest match first"""
+    return [entry for _, entry, _, _ in _PHRASES.matches(text)]
+
+
+@lru_cache(maxsize=65536)
+def _ingredient(line: str) -> tuple[int, tuple[str, ...]]:
+    """Flags and cuisine hints of one ingredient line (lines repeat across recipes)"""
+    flags = 0
+    cuisines: tuple[str, ...] = ()
+    for entry_flags, entry_cuisines, _ in _entries(line):
+        flags |= entry_flags
+        cuisines += entry_cuisines
+    return flags, cuisines
+
+
+def compatible_diets(ingredient: str) -> frozenset[str]:
+    """Diets an ingredient (or ingredient line) fits"""
+    return _diets(_ingredient(ingredient)[0])
+
+
+@lru_cache(maxsize=None)
+def _diets(flags: int) -> frozenset[str]:
+    return frozenset(diet for diet, forbidden in DIETS.items() if not flags & forbidden)
+
+
+@lru_cache(maxsize=4096)
+def minutes(duration: str) -> float | None:
+    """Minutes in a duration such as "1 hour 15 minutes"; None if there are none"""
+    total = None
+    for amount, unit in _DURATION.findall(duration.lower()):
+        total = (total or 0) + float(amount) * (60 if unit.startswith("h") else 1)
+    return total
+
+
+@lru_cache(maxsize=65536)
+def _name(words: str) -> tuple[int, tuple[str, ...], frozenset[str]]:
+    """Flags, cuisine hints and meal types of a recipe name (given as its words)"""
+    flags = 0
+    cuisines: tuple[str, ...] = ()
+    meals: set[str] = set()
+    for entry_flags, entry_cuisines, meal_types in _entries(words):
+        flags |= entry_flags
+        cuisines += entry_cuisines
+        meals.update(meal_types)
+    return flags, cuisines, frozenset(meals or ("main",))
+
+
+@lru_cache(maxsize=None)
+def _tags(flags: int, cuisine: str | None, meals: frozenset[str], quick: bool) -> frozenset[str]:
+    tags = set(_diets(flags))
+    if cuisine is not None:
+        tags.add(cuisine)
+    if quick:
+        tags.add("quick")
+    return frozenset(tags | meals)
+
+
+def derive_tags(recipe: "Recipe") -> frozenset[str]:
+    """Tags worked out from a recipe's ingredients, name and times"""
+    flags = 0
+    votes: dict[str, int] = {}
+    for line in recipe.ingredients:
+        line_flags, cuisines = _ingredient(line)
+        flags |= line_flags
+        for cuisine in cuisines:
+            votes[cuisine] = votes.get(cuisine, 0) + 1
+    # "Butter Chicken" is not vegetarian whatever its ingredient list says
+    name_flags, cuisines, meals = _name(" ".join(_WORD.findall(recipe.name.lower())))
+    flags |= name_flags
+    for cuisine in cuisines:
+        # The dish name says more than any one ingredient
+        votes[cuisine] = votes.get(cuisine, 0) + 2
+    cuisine = None
+    if votes:
+        best = max(votes.values())
+        leaders = [cuisine for cuisine, count in votes.items() if count == best]
+        # A tie means the recipe does not clearly belong to one cuisine
+        if len(leaders) == 1:
+            cuisine = leaders[0]
+    prep, cook = minutes(recipe.prep_time), minutes(recipe.cook_time)
+    quick = prep is not None and cook is not None and prep + cook <= QUICK_MINUTES
+    return _tags(flags, cuisine, meals, quick)
+
+
+def tags_for(recipe: "Recipe") -> frozenset[str]:
+    """A recipe's own tags plus the derived ones, lowercased"""
+    tags = derive_tags(recipe)
+    if recipe.tags:
+        tags = tags.union(tag.lower() for tag in recipe.tags)
+        tags = _INTERNED.setdefault(tags, tags)
+    return tags
+
+
+def parse_tags(text: str) -> tuple[list[str], list[str]]:
+    """Required and excluded tags from e.g. "vegan, quick and italian, not dessert"
+
+    Terms are separated by commas, "and", "&" or "+"; "not x", "no x" and
+    "-x" exclude a tag, and "gluten free" means "gluten-free".
+    """
+    required: list[str] = []
+    excluded: list[str] = []
+    for term in re.split(r",|&|\+|\band\b", text.lower()):
+        term = re.sub(r"\s+free\b", "-free", " ".join(term.split()))
+        if not term:
+            continue
+        negated = re.match(r"(?:not|no|without)\s+|-", term)
+        if negated:
+            excluded.append(term[negated.end():].strip())
+        else:
+            required.append(term)
+    return required, excluded
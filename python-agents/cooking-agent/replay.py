@@ -0,0 +1,200 @@
+"""
+Conversation recording and replay for the Cooking AI Agent
+TraceRecorder writes each chat turn's input, model replies and tool batches
+(with their latencies) to a JSON-lines trace; ReplayBackend serves the
+recorded model replies back so a trace can re-drive the agent offline.
+Enable recording with COOKING_AGENT_RECORD=/path/to/trace.jsonl; replay with
+python -m benchmarks.replay_trace /path/to/trace.jsonl
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import Any, Callable
+
+from backends import AgentBackend, BackendReply, ToolCall
+
+
+def digest(text: str) -> str:
+    """Short content hash used to compare replayed outputs with recorded ones"""
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()[:16]
+
+
+class TraceRecorder:
+    """Appends trace records to a JSON-lines file, or keeps them in memory
+
+    Records are buffered and written once per finished turn. One recorder
+    can be shared by many agents; each gets a ``SessionRecorder``.
+    """
+
+    def __init__(self, path: str | None = None):
+        self.path = path
+        self.records: list[dict[str, Any]] = []
+        self._pending: list[str] = []
+        self._lock = threading.Lock()
+        self._file = open(path, "a", encoding="utf-8") if path else None
+
+    @classmethod
+    def from_env(cls) -> "TraceRecorder | None":
+        path = os.getenv("COOKING_AGENT_RECORD")
+        return cls(path) if path else None
+
+    def session(self, backend: str, tools: list[str]) -> "SessionRecorder":
+        """Start recording a new agent session"""
+        session = SessionRecorder(self, uuid.uuid4().hex[:12])
+        self.write({"type": "session", "session": session.id, "backend": backend, "tools": tools, "ts": time.time()})
+        return session
+
+    def write(self, record: dict[str, Any], flush: bool = False):
+        with self._lock:
+            if self._file is None:
+                self.records.append(record)
+                return
+            self._pending.append(json.dumps(record))
+            if flush:
+                self._file.write("\n".join(self._pending) + "\n")
+                self._file.flush()
+                self._pending.clear()
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                if self._pending:
+                    self._file.write("\n".join(self._pending) + "\n")
+                    self._pending.clear()
+                self._file.close()
+                self._file = None
+
+
+class SessionRecorder:
+    """Records one agent's turns; the agent runs one turn at a time"""
+
+    def __init__(self, recorder: TraceRecorder, session_id: str):
+        self.recorder = recorder
+        self.id = session_id
+        self.turn_index = -1
+        self.round = 0
+
+    def turn(self, user_message: str, run: Callable[[str], str]) -> str:
+        self.turn_index += 1
+        self.round = 0
+        start = time.perf_counter()
+        output = run(user_message)
+        self.recorder.write({
+            "type": "turn", "session": self.id, "turn": self.turn_index, "input": user_message,
+            "output_digest": digest(output), "seconds": time.perf_counter() - start,
+        }, flush=True)
+        return output
+
+    def llm(self, complete: Callable[[], BackendReply], messages: int) -> BackendReply:
+        start = time.perf_counter()
+        reply = complete()
+        self.recorder.write({
+            "type": "llm", "session": self.id, "turn": self.turn_index, "round": self.round,
+            "messages": messages, "seconds": time.perf_counter() - start, "reply": reply.to_message(),
+        })
+        self.round += 1
+        return reply
+
+    def tools(self, calls: list[ToolCall], run: Callable[[], list[str]]) -> list[str]:
+        start = time.perf_counter()
+        results = run()
+        self.recorder.write({
+            "type": "tools", "session": self.id, "turn": self.turn_index, "round": self.round - 1,
+            "calls": [{"name": call.name, "arguments": call.arguments} for call in calls],
+            "result_bytes": [len(result.encode("utf-8")) for result in results],
+            "seconds": time.perf_counter() - start,
+        })
+        return results
+
+
+class RecordingBackend(AgentBackend):
+    """Wraps a backend and records every completion"""
+
+    def __init__(self, backend: AgentBackend, session: SessionRecorder):
+        self.backend = backend
+        self.session = session
+        self.name = backend.name
+
+    def warm_up(self):
+        self.backend.warm_up()
+
+    def complete(self, messages: list[dict[str, Any]], tools: list[dict[str, Any]]) -> BackendReply:
+        return self.session.llm(lambda: self.backend.complete(messages, tools), len(messages))
+
+
+@dataclass
+class RecordedTurn:
+    """One turn of a trace"""
+    input: str
+    output_digest: str
+    seconds: float
+    replies: list[dict[str, Any]] = field(default_factory=list)
+    llm_seconds: list[float] = field(default_factory=list)
+    tool_seconds: float = 0.0
+
+
+@dataclass
+class RecordedSession:
+    """One agent session of a trace, turns in order"""
+    id: str
+    backend: str
+    turns: list[RecordedTurn] = field(default_factory=list)
+
+
+def load_trace(source: str | list[dict[str, Any]]) -> list[RecordedSession]:
+    """Sessions from a trace file (or in-memory records), in recording order"""
+    if isinstance(source, str):
+        with open(source, encoding="utf-8") as f:
+            records = [json.loads(line) for line in f if line.strip()]
+    else:
+        records = source
+    sessions: dict[str, RecordedSession] = {}
+    # Model replies and tool batches are written before their turn record
+    pending: dict[str, RecordedTurn] = {}
+    for record in records:
+        session_id = record["session"]
+        if record["type"] == "session":
+            sessions[session_id] = RecordedSession(session_id, record.get("backend", ""))
+            continue
+        turn = pending.setdefault(session_id, RecordedTurn("", "", 0.0))
+        if record["type"] == "llm":
+            turn.replies.append(record["reply"])
+            turn.llm_seconds.append(record["seconds"])
+        elif record["type"] == "tools":
+            turn.tool_seconds += record["seconds"]
+        elif record["type"] == "turn":
+            turn.input = record["input"]
+            turn.output_digest = record["output_digest"]
+            turn.seconds = record["seconds"]
+            sessions.setdefault(session_id, RecordedSession(session_id, "")).turns.append(pending.pop(session_id))
+    return list(sessions.values())
+
+
+class ReplayBackend(AgentBackend):
+    """Serves a recorded session's model replies in order
+
+    With ``latency_scale`` each reply is delayed by its recorded latency
+    times the scale (1.0 reproduces the live model's timing); by default
+    replies return immediately so only the agent's own costs are measured.
+    """
+
+    name = "replay"
+
+    def __init__(self, session: RecordedSession, latency_scale: float = 0.0):
+        self.replies = [(reply, seconds) for turn in session.turns for reply, seconds in zip(turn.replies, turn.llm_seconds)]
+        self.latency_scale = latency_scale
+        self.position = 0
+
+    def complete(self, messages: list[dict[str, Any]], tools: list[dict[str, Any]]) -> BackendReply:
+        if self.position >= len(self.replies):
+            raise RuntimeError("Replay diverged: the agent requested more completions than were recorded")
+        reply, seconds = self.replies[self.position]
+        self.position += 1
+        if self.latency_scale:
+            time.sleep(seconds * self.latency_scale)
+        return BackendReply.from_message(reply)
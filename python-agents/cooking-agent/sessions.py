@@ -0,0 +1,338 @@
+"""
+Conversation session storage for the Cooking AI Agent
+Pluggable stores that persist each session's messages, and a
+ConversationHistory that keeps only the recent window in memory and loads
+older messages from its store on demand.
+Enable with COOKING_AGENT_SESSIONS=sqlite:///path/to/sessions.db (or memory)
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Iterator
+
+from metrics import REGISTRY
+
+SESSION_FLUSH_LATENCY = REGISTRY.histogram("cooking_session_flush_seconds", "Time to write one batch of session messages")
+SESSION_MESSAGES = REGISTRY.counter("cooking_session_messages_total", "Session messages written to storage")
+SESSIONS_EXPIRED = REGISTRY.counter("cooking_sessions_expired_total", "Sessions removed by expiry")
+
+# Messages kept in memory per session (COOKING_AGENT_HISTORY_WINDOW)
+DEFAULT_WINDOW = 40
+
+
+class SessionStore:
+    """Base class for session storage
+
+    Messages of a session are numbered from 0 in append order; a session has
+    one writer at a time, which passes the number of its first new message.
+    """
+
+    def append(self, session_id: str, start: int, messages: list[dict[str, Any]]):
+        """Store ``messages`` as numbers ``start``, ``start + 1``, ..."""
+        raise NotImplementedError
+
+    def load(self, session_id: str, start: int = 0, stop: int | None = None) -> list[dict[str, Any]]:
+        """Messages numbered ``start`` up to (excluding) ``stop``, in order"""
+        raise NotImplementedError
+
+    def count(self, session_id: str) -> int:
+        """Number of stored messages (0 for an unknown session)"""
+        raise NotImplementedError
+
+    def tail(self, session_id: str, limit: int | None) -> tuple[int, list[dict[str, Any]]]:
+        """Message count and the last ``limit`` messages (all when ``None``)"""
+        total = self.count(session_id)
+        start = 0 if limit is None else max(0, total - limit)
+        return total, self.load(session_id, start, total)
+
+    def delete(self, session_id: str):
+        raise NotImplementedError
+
+    def expire(self, max_age: float, now: float | None = None) -> int:
+        """Delete sessions idle for more than ``max_age`` seconds; return how many"""
+        raise NotImplementedError
+
+    def flush(self):
+        """Write any buffered messages (optional)"""
+
+    def close(self):
+        self.flush()
+
+
+class MemorySessionStore(SessionStore):
+    """Process-local store; sessions are lost on restart"""
+
+    def __init__(self):
+        self._sessions: dict[str, list[dict[str, Any]]] = {}
+        self._updated: dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def append(self, session_id: str, start: int, messages: list[dict[str, Any]]):
+        with self._lock:
+            stored = self._sessions.setdefault(session_id, [])
+            del stored[start:]
+            stored.extend(messages)
+            self._updated[session_id] = time.time()
+        SESSION_MESSAGES.inc(len(messages))
+
+    def load(self, session_id: str, start: int = 0, stop: int | None = None) -> list[dict[str, Any]]:
+        with self._lock:
+            return list(self._sessions.get(session_id, [])[start:stop])
+
+    def count(self, session_id: str) -> int:
+        with self._lock:
+            return len(self._sessions.get(session_id, []))
+
+    def delete(self, session_id: str):
+        with self._lock:
+            self._sessions.pop(session_id, None)
+            self._updated.pop(session_id, None)
+
+    def expire(self, max_age: float, now: float | None = None) -> int:
+        cutoff = (now if now is not None else time.time()) - max_age
+        with self._lock:
+            expired = [session_id for session_id, updated in self._updated.items() if updated < cutoff]
+            for session_id in expired:
+                del self._sessions[session_id]
+                del self._updated[session_id]
+        SESSIONS_EXPIRED.inc(len(expired))
+        return len(expired)
+
+
+class SQLiteSessionStore(SessionStore):
+    """SQLite store in WAL mode with batched writes
+
+    Appends are buffered and written in one transaction once ``batch_size``
+    messages are pending or ``flush_interval`` seconds have passed (a
+    background thread flushes idle buffers). Reads flush first, so a
+    session always sees its own writes.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS sessions (
+            id TEXT PRIMARY KEY,
+            updated REAL NOT NULL,
+            messages INTEGER NOT NULL
+        ) WITHOUT ROWID;
+        CREATE INDEX IF NOT EXISTS sessions_updated ON sessions (updated);
+        CREATE TABLE IF NOT EXISTS messages (
+            session_id TEXT NOT NULL,
+            seq INTEGER NOT NULL,
+            message TEXT NOT NULL,
+            PRIMARY KEY (session_id, seq)
+        ) WITHOUT ROWID;
+    """
+
+    def __init__(self, path: str, batch_size: int = 256, flush_interval: float = 0.5):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._lock = threading.RLock()
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(self.SCHEMA)
+        self._pending: list[tuple[str, int, str]] = []
+        self._pending_sessions: dict[str, tuple[float, int]] = {}
+        self._closed = threading.Event()
+        self._flusher = None
+        if flush_interval > 0:
+            self._flusher = threading.Thread(target=self._flush_loop, name="cooking-session-flush", daemon=True)
+            self._flusher.start()
+
+    def _flush_loop(self):
+        while not self._closed.wait(self.flush_interval):
+            self.flush()
+
+    def append(self, session_id: str, start: int, messages: list[dict[str, Any]]):
+        rows = [(session_id, start + i, json.dumps(message)) for i, message in enumerate(messages)]
+        with self._lock:
+            self._pending.extend(rows)
+            self._pending_sessions[session_id] = (time.time(), start + len(messages))
+            if len(self._pending) >= self.batch_size:
+                self._flush()
+
+    def flush(self):
+        with self._lock:
+            if self._pending_sessions and not self._closed.is_set():
+                self._flush()
+
+    def _flush(self):
+        if not self._pending_sessions:
+            return
+        with SESSION_FLUSH_LATENCY.time():
+            self._db.execute("BEGIN")
+            try:
+                self._db.executemany("INSERT OR REPLACE INTO messages VALUES (?, ?, ?)", self._pending)
+                # A rewrite from an earlier message leaves the session shorter: drop the old tail
+                self._db.executemany(
+                    "DELETE FROM messages WHERE session_id = ? AND seq >= ?",
+                    [(session_id, count) for session_id, (_, count) in self._pending_sessions.items()],
+                )
+                self._db.executemany(
+                    "INSERT INTO sessions VALUES (?, ?, ?) "
+                    "ON CONFLICT (id) DO UPDATE SET updated = excluded.updated, messages = excluded.messages",
+                    [(session_id, updated, count) for session_id, (updated, count) in self._pending_sessions.items()],
+                )
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+            self._db.execute("COMMIT")
+        SESSION_MESSAGES.inc(len(self._pending))
+        self._pending.clear()
+        self._pending_sessions.clear()
+
+    def load(self, session_id: str, start: int = 0, stop: int | None = None) -> list[dict[str, Any]]:
+        with self._lock:
+            self._flush()
+            rows = self._db.execute(
+                "SELECT message FROM messages WHERE session_id = ? AND seq >= ? AND seq < ? ORDER BY seq",
+                (session_id, start, stop if stop is not None else 2 ** 62),
+            ).fetchall()
+        return [json.loads(message) for (message,) in rows]
+
+    def count(self, session_id: str) -> int:
+        with self._lock:
+            pending = self._pending_sessions.get(session_id)
+            if pending is not None:
+                return pending[1]
+            row = self._db.execute("SELECT messages FROM sessions WHERE id = ?", (session_id,)).fetchone()
+        return row[0] if row else 0
+
+    def tail(self, session_id: str, limit: int | None) -> tuple[int, list[dict[str, Any]]]:
+        with self._lock:
+            self._flush()
+            row = self._db.execute("SELECT messages FROM sessions WHERE id = ?", (session_id,)).fetchone()
+            total = row[0] if row else 0
+            start = 0 if limit is None else max(0, total - limit)
+            rows = self._db.execute(
+                "SELECT message FROM messages WHERE session_id = ? AND seq >= ? AND seq < ? ORDER BY seq",
+                (session_id, start, total),
+            ).fetchall()
+        return total, [json.loads(message) for (message,) in rows]
+
+    def delete(self, session_id: str):
+        with self._lock:
+            self._flush()
+            self._db.execute("BEGIN")
+            self._db.execute("DELETE FROM messages WHERE session_id = ?", (session_id,))
+            self._db.execute("DELETE FROM sessions WHERE id = ?", (session_id,))
+            self._db.execute("COMMIT")
+
+    def expire(self, max_age: float, now: float | None = None) -> int:
+        cutoff = (now if now is not None else time.time()) - max_age
+        with self._lock:
+            self._flush()
+            self._db.execute("BEGIN")
+            try:
+                self._db.execute(
+                    "DELETE FROM messages WHERE session_id IN (SELECT id FROM sessions WHERE updated < ?)", (cutoff,)
+                )
+                expired = self._db.execute("DELETE FROM sessions WHERE updated < ?", (cutoff,)).rowcount
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+            self._db.execute("COMMIT")
+        SESSIONS_EXPIRED.inc(expired)
+        return expired
+
+    def close(self):
+        with self._lock:
+            if self._closed.is_set():
+                return
+            self._flush()
+            self._closed.set()
+            self._db.close()
+        if self._flusher is not None:
+            self._flusher.join()
+
+
+def create_session_store(url: str | None = None) -> SessionStore | None:
+    """Create the store configured by ``COOKING_AGENT_SESSIONS``
+
+    - ``memory``: process-local
+    - ``sqlite:///path/to/sessions.db``: SQLite file (``sqlite://`` alone: in-memory database)
+
+    Returns ``None`` when unset, in which case the agent keeps a plain list.
+    """
+    url = url or os.getenv("COOKING_AGENT_SESSIONS")
+    if not url:
+        return None
+    if url == "memory":
+        return MemorySessionStore()
+    if url == "sqlite://":
+        return SQLiteSessionStore(":memory:")
+    if url.startswith("sqlite:///") and len(url) > len("sqlite:///"):
+        return SQLiteSessionStore(url[len("sqlite:///"):])
+    raise ValueError(f"Unknown session store: {url}. Available: memory, sqlite:///path")
+
+
+class ConversationHistory:
+    """A session's messages: the last ``window`` in memory, the rest in ``store``
+
+    Behaves like the list it replaces for appending, ``len``, indexing and
+    iteration; ``copy()`` returns only the in-memory window, which is what
+    the model sees. Creating one for an existing session id resumes it.
+    """
+
+    def __init__(self, store: SessionStore, session_id: str, window: int | None = DEFAULT_WINDOW):
+        self.store = store
+        self.session_id = session_id
+        self.window = window
+        self._total, self._recent = store.tail(session_id, window)
+
+    @property
+    def offset(self) -> int:
+        """Number of the first message held in memory"""
+        return self._total - len(self._recent)
+
+    def append(self, message: dict[str, Any]):
+        self.store.append(self.session_id, self._total, [message])
+        self._recent.append(message)
+        self._total += 1
+        if self.window is not None and len(self._recent) > self.window:
+            del self._recent[0]
+
+    def copy(self) -> list[dict[str, Any]]:
+        return list(self._recent)
+
+    def older(self, count: int) -> list[dict[str, Any]]:
+        """The ``count`` messages before the in-memory window, loaded from the store"""
+        return self.store.load(self.session_id, max(0, self.offset - count), self.offset)
+
+    def clear(self):
+        self.store.delete(self.session_id)
+        self._total = 0
+        self._recent.clear()
+
+    def __len__(self) -> int:
+        return self._total
+
+    def __getitem__(self, index: int) -> dict[str, Any]:
+        if isinstance(index, slice):
+            start, stop, step = index.indices(self._total)
+            if step != 1:
+                indexes = range(start, stop, step)
+                if not indexes:
+                    return []
+                low = min(indexes)
+                return self[low:max(indexes) + 1][indexes[0] - low::step]
+            older = self.store.load(self.session_id, start, min(stop, self.offset)) if start < self.offset else []
+            return older + self._recent[max(start - self.offset, 0):max(stop - self.offset, 0)]
+        if index < 0:
+            index += self._total
+        if not 0 <= index < self._total:
+            raise IndexError("conversation history index out of range")
+        if index >= self.offset:
+            return self._recent[index - self.offset]
+        return self.store.load(self.session_id, index, index + 1)[0]
+
+    def __iter__(self) -> Iterator[dict[str, Any]]:
+        """All messages, oldest first, paging older ones in from the store"""
+        page = self.window or 100
+        for start in range(0, self.offset, page):
+            yield from self.store.load(self.session_id, start, min(start + page, self.offset))
+        yield from list(self._recent)
@@ -0,0 +1,272 @@
+"""
+Local stub model server for the Cooking AI Agent
+Serves OpenAI/DeepSeek-compatible /chat/completions responses without a live
+model, emitting deterministic tool calls from the rule-based router. Latency
+distributions, injected errors, SSE streaming and 429 throttling make it a
+stand-in for the real API in load tests.
+Run with: python stub_server.py --port 8089 --latency 0.05 [--distribution lognormal --jitter 0.5]
+          [--error-rate 0.01] [--rate-limit 50] [--token-latency 0.01]
+"""
+
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any
+
+from backends import RuleBasedBackend
+
+LATENCY_DISTRIBUTIONS = ("uniform", "normal", "lognormal", "exponential")
+# Statuses returned for injected errors
+ERROR_STATUSES = (500, 502, 503)
+
+
+class StubModelServer:
+    """OpenAI-compatible stub server with configurable latency and faults
+
+    Every response is delayed by a sample from ``distribution`` drawn from a
+    seeded RNG, so runs are reproducible:
+
+    - ``uniform``: ``latency`` plus a uniform jitter in ``[0, jitter)``
+    - ``normal``: mean ``latency``, standard deviation ``jitter``
+    - ``lognormal``: median ``latency``, log-space sigma ``jitter`` (long tail)
+    - ``exponential``: mean ``latency``
+
+    ``error_rate`` of the requests fail with a 5xx status. With
+    ``rate_limit`` (requests/sec, bursts of ``burst``) excess requests get a
+    429 with ``Retry-After``. Requests with ``"stream": true`` are answered
+    with server-sent events, one chunk per word every ``token_latency``
+    seconds.
+    """
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        seed: int = 0,
+        distribution: str = "uniform",
+        error_rate: float = 0.0,
+        rate_limit: float | None = None,
+        burst: int | None = None,
+        token_latency: float = 0.0,
+    ):
+        if distribution not in LATENCY_DISTRIBUTIONS:
+            raise ValueError(f"Unknown latency distribution: {distribution}. Available: {', '.join(LATENCY_DISTRIBUTIONS)}")
+        self.latency = latency
+        self.jitter = jitter
+        self.distribution = distribution
+        self.error_rate = error_rate
+        self.rate_limit = rate_limit
+        self.burst = burst or max(1, int(rate_limit or 1))
+        self.token_latency = token_latency
+        self.router = RuleBasedBackend()
+        self.requests_served = 0
+        self.errors_injected = 0
+        self.throttled = 0
+        self._tokens = float(self.burst)
+        self._refilled = time.monotonic()
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._httpd = ThreadingHTTPServer((host, port), self._make_handler())
+        self._httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        """Base URL for ``OpenAICompatibleBackend`` (``.../v1``)"""
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def start(self) -> "StubModelServer":
+        """Serve requests on a background thread"""
+        self._thread = threading.Thread(
+            target=self._httpd.serve_forever, name="stub-model-server", daemon=True
+        )
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """Shut the server down"""
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self) -> "StubModelServer":
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def _sample_latency(self) -> float:
+        if self.distribution == "normal":
+            return max(0.0, self._random.gauss(self.latency, self.jitter))
+        if self.distribution == "lognormal":
+            return self.latency * self._random.lognormvariate(0.0, self.jitter)
+        if self.distribution == "exponential":
+            return self._random.expovariate(1 / self.latency) if self.latency else 0.0
+        return self.latency + (self._random.random() * self.jitter if self.jitter else 0.0)
+
+    def _admit(self) -> bool:
+        """Take a token from the rate-limit bucket"""
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._refilled) * self.rate_limit)
+        self._refilled = now
+        if self._tokens < 1:
+            return False
+        self._tokens -= 1
+        return True
+
+    def _plan(self) -> tuple[float, int]:
+        """(delay, status) for the next request"""
+        with self._lock:
+            self.requests_served += 1
+            if self.rate_limit and not self._admit():
+                self.throttled += 1
+                return 0.0, 429
+            delay = self._sample_latency()
+            if self.error_rate and self._random.random() < self.error_rate:
+                self.errors_injected += 1
+                return delay, self._random.choice(ERROR_STATUSES)
+        return delay, 200
+
+    def _reply(self, request: dict[str, Any]):
+        tools = [t.get("function", t) for t in request.get("tools") or []]
+        return self.router.complete(request.get("messages", []), tools)
+
+    def completion(self, request: dict[str, Any]) -> dict[str, Any]:
+        """Build a chat completion response for a request body"""
+        reply = self._reply(request)
+        return {
+            "id": f"chatcmpl-stub-{self.requests_served}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": request.get("model", "cooking-stub"),
+            "choices": [{
+                "index": 0,
+                "message": reply.to_message(),
+                "finish_reason": "tool_calls" if reply.tool_calls else "stop",
+            }],
+            "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+        }
+
+    def completion_chunks(self, request: dict[str, Any]) -> list[dict[str, Any]]:
+        """The streamed form of ``completion``: role, one chunk per word, finish"""
+        reply = self._reply(request)
+        message = reply.to_message()
+        base = {
+            "id": f"chatcmpl-stub-{self.requests_served}",
+            "object": "chat.completion.chunk",
+            "created": int(time.time()),
+            "model": request.get("model", "cooking-stub"),
+        }
+
+        def chunk(delta: dict[str, Any], finish_reason: str | None = None) -> dict[str, Any]:
+            return {**base, "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}]}
+
+        first = {"role": "assistant"}
+        if message.get("tool_calls"):
+            first["tool_calls"] = [{"index": i, **call} for i, call in enumerate(message["tool_calls"])]
+        chunks = [chunk(first)]
+        content = message.get("content")
+        words = content.split(" ") if content else []
+        chunks.extend(chunk({"content": word if i == 0 else " " + word}) for i, word in enumerate(words))
+        chunks.append(chunk({}, "tool_calls" if reply.tool_calls else "stop"))
+        return chunks
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # Headers and body are written separately; avoid Nagle stalls
+            disable_nagle_algorithm = True
+
+            def do_POST(self):
+                if not self.path.rstrip("/").endswith("/chat/completions"):
+                    self._send(404, {"error": {"message": f"Unknown path: {self.path}"}})
+                    return
+                try:
+                    length = int(self.headers.get("Content-Length", 0))
+                    request = json.loads(self.rfile.read(length) or b"{}")
+                except ValueError as e:
+                    self._send(400, {"error": {"message": f"Invalid JSON: {str(e)}"}})
+                    return
+
+                delay, status = server._plan()
+                if status == 429:
+                    self._send(429, {"error": {"message": "Rate limit reached", "type": "rate_limit_error"}}, {"Retry-After": "1"})
+                    return
+                time.sleep(delay)
+                if status != 200:
+                    self._send(status, {"error": {"message": "Injected server error", "type": "server_error"}})
+                elif request.get("stream"):
+                    self._stream(server.completion_chunks(request))
+                else:
+                    self._send(200, server.completion(request))
+
+            def _send(self, status: int, body: dict[str, Any], headers: dict[str, str] | None = None):
+                data = json.dumps(body).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(data)
+
+            def _stream(self, chunks: list[dict[str, Any]]):
+                """Server-sent events over chunked transfer encoding"""
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Cache-Control", "no-cache")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+                events = [f"data: {json.dumps(chunk)}\n\n".encode("utf-8") for chunk in chunks]
+                events.append(b"data: [DONE]\n\n")
+                for i, event in enumerate(events):
+                    if i and server.token_latency:
+                        time.sleep(server.token_latency)
+                    self.wfile.write(b"%x\r\n%s\r\n" % (len(event), event))
+                    self.wfile.flush()
+                self.wfile.write(b"0\r\n\r\n")
+
+            def log_message(self, format, *args):
+                pass  # Keep benchmark output clean
+
+        return Handler
+
+
+def main():
+    """Run the stub server in the foreground"""
+    parser = argparse.ArgumentParser(description="Local stub model server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--latency", type=float, default=0.0, help="Base latency in seconds")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Max extra random latency in seconds")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--distribution", choices=LATENCY_DISTRIBUTIONS, default="uniform")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered with a 5xx")
+    parser.add_argument("--rate-limit", type=float, help="Requests/sec before answering 429")
+    parser.add_argument("--burst", type=int, help="Rate-limit bucket size (default: one second's worth)")
+    parser.add_argument("--token-latency", type=float, default=0.0, help="Seconds between streamed chunks")
+    args = parser.parse_args()
+
+    server = StubModelServer(
+        args.host, args.port, args.latency, args.jitter, args.seed,
+        distribution=args.distribution, error_rate=args.error_rate, rate_limit=args.rate_limit,
+        burst=args.burst, token_latency=args.token_latency,
+    )
+    print(f"🧪 Stub model server listening on {server.url}")
+    try:
+        server._httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server._httpd.server_close()
+
+
+if __name__ == "__main__":
+    main()
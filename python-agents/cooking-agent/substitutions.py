@@ -0,0 +1,313 @@
+"""
+Ingredient substitution graph
+Ingredient -> substitutes with a ratio, the diets the substitute suits and a
+confidence, loaded once into an adjacency index so a lookup is a dict access,
+and a one-pass rewrite of a recipe's ingredient lines for a diet.
+"""
+
+import re
+from dataclasses import dataclass, field, replace
+from fractions import Fraction
+from typing import Iterable
+
+from recipe_tags import DIETS, PhraseTable, compatible_diets
+
+# (ingredient, substitute, ratio, confidence, context): ``ratio`` is how much
+# substitute replaces one unit of the ingredient, in the same unit
+SUBSTITUTIONS = [
+    # Dairy
+    ("butter", "vegan butter", 1, 0.95, ""),
+    ("butter", "coconut oil", 1, 0.85, "solid at room temperature; best in baking"),
+    ("butter", "olive oil", 0.75, 0.75, "savory cooking; not for creaming with sugar"),
+    ("milk", "oat milk", 1, 0.9, ""),
+    ("milk", "soy milk", 1, 0.9, ""),
+    ("milk", "almond milk", 1, 0.85, "thinner; slightly nutty"),
+    ("buttermilk", "soy milk", 1, 0.8, "add 1 tbsp lemon juice per cup and rest 5 minutes"),
+    ("heavy cream", "coconut cream", 1, 0.85, "adds a coconut note"),
+    ("heavy cream", "cashew cream", 1, 0.8, "blend soaked cashews with water"),
+    ("heavy cream", "oat cream", 1, 0.75, "does not whip"),
+    ("cream", "coconut cream", 1, 0.85, "adds a coconut note"),
+    ("cream", "oat cream", 1, 0.75, "does not whip"),
+    ("sour cream", "coconut yogurt", 1, 0.8, ""),
+    ("yogurt", "coconut yogurt", 1, 0.85, ""),
+    ("yogurt", "soy yogurt", 1, 0.85, ""),
+    ("greek yogurt", "soy yogurt", 1, 0.8, "strain for a thicker texture"),
+    ("cheese", "vegan cheese", 1, 0.7, ""),
+    ("cream cheese", "cashew cream", 1, 0.7, "blend thick for spreading"),
+    ("parmesan", "nutritional yeast", 0.5, 0.75, "savory, cheesy flavor; does not melt"),
+    ("pecorino", "nutritional yeast", 0.5, 0.75, "savory, cheesy flavor; does not melt"),
+    ("pecorino romano", "nutritional yeast", 0.5, 0.75, "savory, cheesy flavor; does not melt"),
+    ("parmesan", "vegan parmesan", 1, 0.8, ""),
+    ("mozzarella", "vegan cheese", 1, 0.7, "choose a melting variety"),
+    ("ricotta", "tofu", 1, 0.75, "crumble firm tofu with lemon juice and salt"),
+    ("feta", "tofu", 1, 0.6, "marinate in brine and lemon"),
+    ("ghee", "coconut oil", 1, 0.85, ""),
+    ("milk chocolate", "dark chocolate", 1, 0.85, "check the label for milk solids"),
+    ("chocolate chip", "dark chocolate chip", 1, 0.8, "check the label for milk solids"),
+    # Eggs and honey
+    ("egg", "flax egg", 1, 0.75, "1 tbsp ground flaxseed + 3 tbsp water each; binding in baking"),
+    ("egg", "aquafaba", 1, 0.7, "3 tbsp chickpea liquid each; whips like egg white"),
+    ("egg", "silken tofu", 0.25, 0.6, "1/4 cup puréed per egg; custards and sauces"),
+    ("egg yolk", "silken tofu", 0.25, 0.55, "puréed, for richness in sauces"),
+    ("egg white", "aquafaba", 1, 0.8, "2 tbsp per white"),
+    ("mayonnaise", "vegan mayonnaise", 1, 0.95, ""),
+    ("honey", "maple syrup", 1, 0.9, ""),
+    ("honey", "agave syrup", 1, 0.85, "sweeter; use a little less"),
+    # Meat and fish
+    ("bacon", "smoked tofu", 1, 0.7, "crisp in oil with a pinch of smoked paprika"),
+    ("bacon", "turkey bacon", 1, 0.8, "leaner; fry in a little oil"),
+    ("guanciale", "smoked tofu", 1, 0.65, "crisp in oil with a pinch of smoked paprika"),
+    ("guanciale", "pancetta", 1, 0.9, ""),
+    ("pancetta", "smoked tofu", 1, 0.65, "crisp in oil with a pinch of smoked paprika"),
+    ("pancetta", "bacon", 1, 0.85, "smokier"),
+    ("ground beef", "lentils", 1, 0.7, "cooked; sauces and fillings"),
+    ("ground beef", "ground turkey", 1, 0.85, ""),
+    ("chicken", "tofu", 1, 0.7, "extra-firm, pressed"),
+    ("chicken", "chickpeas", 1, 0.65, "stews and curries"),
+    ("chicken breast", "tofu", 1, 0.7, "extra-firm, pressed"),
+    ("chicken thigh", "tempeh", 1, 0.65, ""),
+    ("pork shoulder", "jackfruit", 1, 0.6, "young green jackfruit, shredded"),
+    ("sausage", "mushrooms", 1, 0.6, "sautéed with fennel seed and smoked paprika"),
+    ("chicken stock", "vegetable stock", 1, 0.9, ""),
+    ("beef stock", "mushroom stock", 1, 0.85, ""),
+    ("fish sauce", "soy sauce", 1, 0.75, "add a squeeze of lime"),
+    ("fish sauce", "tamari", 1, 0.75, "add a squeeze of lime"),
+    ("worcestershire sauce", "tamari", 1, 0.7, "add a dash of vinegar"),
+    ("anchovy", "capers", 1, 0.65, "chopped, for the salty bite"),
+    ("shrimp", "king oyster mushrooms", 1, 0.55, "sliced into coins"),
+    ("salmon fillet", "tofu", 1, 0.5, "marinated; different texture"),
+    ("gelatin", "agar agar", 0.5, 0.75, "sets firmer; boil to activate"),
+    # Gluten
+    ("flour", "gluten-free flour", 1, 0.85, "a 1:1 blend with xanthan gum"),
+    ("all purpose flour", "gluten-free flour", 1, 0.85, "a 1:1 blend with xanthan gum"),
+    ("bread flour", "gluten-free flour", 1, 0.7, "a bread blend; expect a denser crumb"),
+    ("flour", "rice flour", 1, 0.7, "thickening and frying"),
+    ("breadcrumb", "gluten-free breadcrumb", 1, 0.9, ""),
+    ("panko", "crushed cornflakes", 1, 0.75, ""),
+    ("spaghetti", "gluten-free spaghetti", 1, 0.9, ""),
+    ("spaghetti", "zucchini noodles", 1, 0.6, "spiralized; cook briefly"),
+    ("pasta", "gluten-free pasta", 1, 0.9, ""),
+    ("penne", "gluten-free pasta", 1, 0.9, ""),
+    ("rigatoni", "gluten-free pasta", 1, 0.9, ""),
+    ("noodle", "rice noodle", 1, 0.85, ""),
+    ("egg noodle", "rice noodle", 1, 0.8, ""),
+    ("couscous", "quinoa", 1, 0.8, ""),
+    ("bread", "gluten-free bread", 1, 0.85, ""),
+    ("soy sauce", "tamari", 1, 0.95, ""),
+    ("soy sauce", "coconut aminos", 1, 0.8, "sweeter and less salty"),
+    ("oat", "certified gluten-free oats", 1, 0.95, ""),
+    ("beer", "gluten-free beer", 1, 0.85, ""),
+    # Nuts
+    ("peanut butter", "sunflower seed butter", 1, 0.85, ""),
+    ("almond", "sunflower seed", 1, 0.7, ""),
+    ("walnut", "pumpkin seed", 1, 0.7, ""),
+    ("pine nut", "sunflower seed", 1, 0.7, "toasted"),
+    ("almond milk", "oat milk", 1, 0.9, ""),
+    ("almond flour", "oat flour", 1, 0.6, "less rich; add a little fat"),
+    ("cashew cream", "coconut cream", 1, 0.8, ""),
+    # Pantry
+    ("cornstarch", "arrowroot", 1, 0.9, "add at the end; do not boil long"),
+    ("brown sugar", "granulated sugar", 1, 0.8, "add 1 tbsp molasses per cup"),
+    ("white wine", "vegetable stock", 1, 0.7, "add a splash of lemon juice"),
+    ("red wine", "vegetable stock", 1, 0.65, "add a splash of red wine vinegar"),
+    ("buttermilk", "milk", 1, 0.8, "add 1 tbsp lemon juice per cup and rest 5 minutes"),
+]
+
+_QUANTITY = re.compile(r"^\s*(\d+\s+\d+/\d+|\d+/\d+|\d+(?:\.\d+)?)")
+
+
+@dataclass(frozen=True)
+class Substitute:
+    """One edge of the graph: ``ratio`` units of ``name`` replace one unit of the ingredient"""
+    name: str
+    ratio: float
+    confidence: float
+    # Diets a recipe can keep with this substitute (from its ingredient flags)
+    diets: frozenset[str]
+    context: str = ""
+
+
+@dataclass
+class Rewrite:
+    """A recipe rewritten for a diet"""
+    ingredients: list[str]
+    # (original line, rewritten line, substitutes used)
+    changes: list[tuple[str, str, list[Substitute]]]
+    # Lines that still break the diet: no suitable substitute is known
+    unresolved: list[str]
+    # Instructions naming the substitutes
+    instructions: list[str] = field(default_factory=list)
+    # Graph ingredient -> the substitute that replaced it
+    chosen: dict[str, Substitute] = field(default_factory=dict)
+
+
+def _amount(text: str) -> Fraction:
+    return sum((Fraction(part) for part in text.split()), Fraction(0))
+
+
+def _format_amount(amount: Fraction) -> str:
+    if amount >= 10:
+        return str(round(amount))
+    amount = amount.limit_denominator(8)
+    whole, part = divmod(amount.numerator, amount.denominator)
+    if not part:
+        return str(whole)
+    fraction = f"{part}/{amount.denominator}"
+    return f"{whole} {fraction}" if whole else fraction
+
+
+def format_ratio(ratio: float) -> str:
+    """"1:1", "3/4:1", ... (substitute : ingredient)"""
+    return f"{_format_amount(Fraction(ratio).limit_denominator(100))}:1"
+
+
+def scale_quantity(line: str, ratio: float) -> str:
+    """``line`` with its leading quantity multiplied by ``ratio`` ("1 cup" x 0.75 -> "3/4 cup")"""
+    match = _QUANTITY.match(line)
+    if match is None or ratio == 1:
+        return line
+    scaled = _amount(match.group(1)) * Fraction(ratio).limit_denominator(100)
+    return line[:match.start(1)] + _format_amount(scaled) + line[match.end(1):]
+
+
+class SubstitutionGraph:
+    """Adjacency index over substitution edges
+
+    ``edges`` maps each ingredient to its substitutes, best first, and
+    ``by_diet`` holds the same lists already filtered for every diet, so
+    both lookups are a single dict access. Free text ("2 cups softened
+    butter") is resolved to graph ingredients by longest phrase match.
+    """
+
+    def __init__(self, substitutions: Iterable[tuple[str, str, float, float, str]] = SUBSTITUTIONS):
+        adjacency: dict[str, list[Substitute]] = {}
+        diets_of: dict[str, frozenset[str]] = {}
+        for ingredient, name, ratio, confidence, context in substitutions:
+            if name not in diets_of:
+                diets_of[name] = compatible_diets(name)
+            adjacency.setdefault(ingredient, []).append(Substitute(name, ratio, confidence, diets_of[name], context))
+        self.edges: dict[str, tuple[Substitute, ...]] = {
+            ingredient: tuple(sorted(substitutes, key=lambda substitute: -substitute.confidence))
+            for ingredient, substitutes in adjacency.items()
+        }
+        self.by_diet: dict[tuple[str, str], tuple[Substitute, ...]] = {
+            (ingredient, diet): tuple(substitute for substitute in substitutes if diet in substitute.diets)
+            for ingredient, substitutes in self.edges.items() for diet in DIETS
+        }
+        self._phrases = PhraseTable(self.edges)
+
+    def __len__(self) -> int:
+        return len(self.edges)
+
+    def substitutes(self, ingredient: str, diets: Iterable[str] = ()) -> tuple[Substitute, ...]:
+        """Substitutes for a graph ingredient, best first, suiting every diet in ``diets``"""
+        diets = list(diets)
+        if not diets:
+            return self.edges.get(ingredient, ())
+        found = self.by_diet.get((ingredient, diets[0]), ())
+        if len(diets) > 1:
+            found = tuple(substitute for substitute in found if substitute.diets.issuperset(diets))
+        return found
+
+    def find(self, text: str) -> list[str]:
+        """Graph ingredients mentioned in ``text``"""
+        return [phrase for phrase, *_ in self._phrases.matches(text)]
+
+    def lookup(self, text: str, diets: Iterable[str] = ()) -> tuple[str, tuple[Substitute, ...]] | None:
+        """The ingredient named in ``text`` and its substitutes; None if the graph does not know it
+
+        When ``text`` names several ingredients ("pecorino romano cheese") the first one wins.
+        """
+        found = self.find(text)
+        if not found:
+            return None
+        return found[0], self.substitutes(found[0], diets)
+
+    def rewrite(self, ingredients: list[str], diets: Iterable[str], instructions: list[str] = ()) -> Rewrite:
+        """Replace every ingredient that breaks ``diets`` with its best suitable substitute
+
+        One pass over the lines; ``instructions`` then name the substitutes
+        wherever they mentioned a replaced ingredient.
+        """
+        diets = frozenset(diets)
+        unknown = diets.difference(DIETS)
+        if unknown:
+            raise ValueError(f"Unknown diet: {', '.join(sorted(unknown))}. Available: {', '.join(DIETS)}")
+        lines, changes, unresolved = [], [], []
+        chosen: dict[str, Substitute] = {}
+
+        def choose(group: list[str], text: str) -> Substitute | None:
+            if compatible_diets(text) >= diets:
+                return None
+            best = next((found[0] for found in map(lambda phrase: self.substitutes(phrase, diets), group) if found), None)
+            if best is not None:
+                # Steps often use the shorter form: "all purpose flour" -> "flour"
+                # (but "peanut butter" leaves plain "butter" alone when it suits the diet)
+                for phrase in group:
+                    words = phrase.split()
+                    for head in (" ".join(words[i:]) for i in range(1, len(words))):
+                        if head in self.edges and not compatible_diets(head) >= diets:
+                            chosen.setdefault(head, best)
+                chosen.update(dict.fromkeys(group, best))
+            return best
+
+        for line in ingredients:
+            if compatible_diets(line) >= diets:
+                lines.append(line)
+                continue
+            rewritten, used = self._replace(line, choose)
+            if len(used) == 1:
+                rewritten = scale_quantity(rewritten, used[0].ratio)
+            if used:
+                changes.append((line, rewritten, used))
+            if not compatible_diets(rewritten) >= diets:
+                unresolved.append(rewritten)
+            lines.append(rewritten)
+        steps = [self._replace(step, lambda group, text: chosen.get(group[0]))[0] for step in instructions]
+        return Rewrite(lines, changes, unresolved, steps, chosen)
+
+    def _replace(self, line: str, choose) -> tuple[str, list[Substitute]]:
+        """``line`` with each ingredient replaced by ``choose(phrases, text)`` (None: keep it)"""
+        # Adjacent matches ("pecorino romano" + "cheese") name one ingredient
+        groups: list[list[tuple[str, int, int]]] = []
+        for phrase, _, start, end in self._phrases.matches(line):
+            if groups and not line[groups[-1][-1][2]:start].strip():
+                groups[-1].append((phrase, start, end))
+            else:
+                groups.append([(phrase, start, end)])
+        used: list[Substitute] = []
+        replacements: list[tuple[int, int, str]] = []
+        for group in groups:
+            start, end = group[0][1], group[-1][2]
+            best = choose([phrase for phrase, _, _ in group], line[start:end])
+            if best is None:
+                continue
+            name = best.name.title() if line[start].isupper() else best.name
+            # Keep a plural: "4 eggs" -> "4 flax eggs"
+            if line[end - 1:end].lower() == "s" and group[-1][0][-1] != "s" and not name.endswith("s"):
+                name += "s"
+            replacements.append((start, end, name))
+            if best not in used:
+                used.append(best)
+        for start, end, name in reversed(replacements):
+            line = line[:start] + name + line[end:]
+        # "smoked tofu or smoked tofu" -> "smoked tofu"
+        return re.sub(r"\b(\w[\w ]*?) or \1\b", r"\1", line), used
+
+    def adapt(self, recipe, diets: Iterable[str]):
+        """A copy of ``recipe`` rewritten for ``diets``, and the ``Rewrite`` describing it"""
+        result = self.rewrite(recipe.ingredients, diets, recipe.instructions)
+        # "Chocolate Chip Cookies" -> "Dark Chocolate Chip Cookies"
+        name = self._replace(recipe.name, lambda group, text: result.chosen.get(group[0]))[0]
+        return replace(recipe, name=name, ingredients=result.ingredients, instructions=result.instructions), result
+
+
+_DEFAULT: SubstitutionGraph | None = None
+
+
+def default_graph() -> SubstitutionGraph:
+    """The bundled substitution graph, built on first use"""
+    global _DEFAULT
+    if _DEFAULT is None:
+        _DEFAULT = SubstitutionGraph()
+    return _DEFAULT
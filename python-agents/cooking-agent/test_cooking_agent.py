@@ -3,6 +3,12 @@ Unit tests for the Cooking AI Agent
 Run with: python -m pytest test_cooking_agent.py
 """
 
+import asyncio
+import json
+import os
+import sys
+import time
+
 import pytest
 from cooking_tools import (
     Recipe, IngredientInfo, RecipeDatabase, 
@@ -45,6 +51,155 @@ class TestRecipeDatabase:
         recipe = db.get_recipe("pasta_carbonara")
         assert recipe is not None
         assert recipe.name == "Pasta Carbonara"
+    
+    def test_add_update_delete(self):
+        """Test that mutations are searchable immediately and bump the version"""
+        db = RecipeDatabase()
+        version = db.version
+        db.add_recipe("saffron_risotto", Recipe("Saffron Risotto", ["1 pinch saffron", "300g arborio rice"], ["Stir"]))
+        assert [r.name for r in db.search_recipes("saffron")] == ["Saffron Risotto"]
+        db.update_recipe("saffron_risotto", Recipe("Lemon Risotto", ["1 lemon", "300g arborio rice"], ["Stir"]))
+        assert db.search_recipes("saffron") == []
+        assert db.list_all_recipes()[-1].name == "Lemon Risotto"
+        db.delete_recipe("pasta_carbonara")
+        assert db.search_recipes("carbonara") == [] and db.get_recipe("pasta_carbonara") is None
+        assert db.version == version + 3
+        with pytest.raises(ValueError, match="Unknown recipe"):
+            db.delete_recipe("pasta_carbonara")
+        with pytest.raises(ValueError, match="already exists"):
+            db.add_recipe("saffron_risotto", Recipe("Again", [], []))
+    
+    def test_snapshot_isolation(self):
+        """Test that a held snapshot is unaffected by later commits"""
+        db = RecipeDatabase()
+        snapshot = db.snapshot()
+        db.delete_recipe("chocolate_chip_cookies")
+        db.add_recipe("brownies", Recipe("Brownies", ["200g dark chocolate"], ["Bake"]))
+        assert [r.name for r in snapshot.search("chocolate")] == ["Chocolate Chip Cookies"]
+        assert [r.name for r in db.search_recipes("chocolate")] == ["Brownies"]
+        assert len(snapshot) == len(db.recipes) == 3
+    
+    def test_transaction_is_atomic(self):
+        """Test that a transaction commits all changes at once, or none"""
+        db = RecipeDatabase()
+        with db.transaction() as tx:
+            tx.add("toast", Recipe("Toast", ["1 slice bread"], ["Toast it"]))
+            tx.delete("vegetable_stir_fry")
+        assert db.version == 2 and db.get_recipe("toast") is not None
+        with pytest.raises(ValueError):
+            with db.transaction() as tx:
+                tx.delete("toast")
+                tx.update("missing", Recipe("Missing", [], []))
+        assert db.version == 2 and db.get_recipe("toast") is not None
+    
+    def test_index_matches_scan(self):
+        """Test indexed search against a plain scan across compactions"""
+        import random
+        from benchmarks.catalogue import generate_recipes
+        db = RecipeDatabase()
+        db.add_recipes(generate_recipes(500))
+        rng = random.Random(0)
+        for i in range(3 * RecipeDatabase.COMPACT_AFTER):
+            recipe_id = rng.choice(list(db.recipes))
+            recipe = db.get_recipe(recipe_id)
+            if i % 3 == 0:
+                db.delete_recipe(recipe_id)
+                db.add_recipe(f"{recipe_id}_v{i}", recipe)
+            else:
+                db.update_recipe(recipe_id, Recipe(recipe.name, recipe.ingredients[1:] + ["1 pinch saffron"], []))
+            if i % 97 == 0:
+                for query in ["saffron", "garlic", "1/2", "ga", "pasta 1", ""]:
+                    expected = [r for r in db.list_all_recipes()
+                                if query in r.name.lower() or any(query in x.lower() for x in r.ingredients)]
+                    assert db.search_recipes(query) == expected
+        assert len(db.recipes) == len(list(db.recipes)) == 503
+    
+    def test_search_during_writes(self):
+        """Test that searches stay consistent while another thread commits"""
+        import threading
+        db = RecipeDatabase()
+        done = threading.Event()
+        
+        def write():
+            for i in range(2000):
+                db.add_recipe(f"stew_{i}", Recipe(f"Stew {i}", ["2 carrots"], []))
+                if i % 2:
+                    db.delete_recipe(f"stew_{i}")
+            done.set()
+        
+        writer = threading.Thread(target=write)
+        writer.start()
+        while not done.is_set():
+            snapshot = db.snapshot()
+            stews = snapshot.search("stew")
+            assert len(stews) == len(snapshot) - 3
+        writer.join()
+        assert len(db.search_recipes("stew")) == 1000
+    
+    def test_derived_tags(self):
+        """Test dietary, cuisine, meal and time tags derived on import"""
+        db = RecipeDatabase()
+        assert db.get_tags("vegetable_stir_fry") == [
+            "asian", "dairy-free", "main", "nut-free", "pescatarian", "quick", "vegan", "vegetarian"
+        ]
+        assert db.get_tags("pasta_carbonara") == ["italian", "main", "nut-free", "quick"]
+        assert "dessert" in db.get_tags("chocolate_chip_cookies")
+        db.add_recipe("dal", Recipe("Red Lentil Dal", ["1 cup red lentils", "1 tsp turmeric", "400ml coconut milk"],
+                                    [], "10 minutes", "1 hour", tags=["Weeknight"]))
+        assert db.get_tags("dal") == [
+            "dairy-free", "gluten-free", "indian", "main", "nut-free", "pescatarian", "vegan", "vegetarian", "weeknight"
+        ]
+        with pytest.raises(ValueError, match="Unknown recipe"):
+            db.get_tags("missing")
+    
+    def test_tag_filters_match_scan(self):
+        """Test tag bitmaps against a plain scan across edits and compactions"""
+        import random
+        from benchmarks.catalogue import generate_recipes
+        from recipe_tags import tags_for
+        db = RecipeDatabase(generate_recipes(400))
+        rng = random.Random(1)
+        filters = [(["vegan"], []), (["vegetarian", "quick"], ["dessert"]), (["italian", "main"], []), ([], ["nut-free"])]
+        for i in range(2 * RecipeDatabase.COMPACT_AFTER):
+            recipe_id = rng.choice(list(db.recipes))
+            recipe = db.get_recipe(recipe_id)
+            if i % 3 == 0:
+                db.delete_recipe(recipe_id)
+                db.add_recipe(f"{recipe_id}_v{i}", recipe)
+            else:
+                db.update_recipe(recipe_id, Recipe(recipe.name, recipe.ingredients[1:] + ["2 slices bacon"], []))
+            if i % 61 == 0:
+                for tags, exclude in filters:
+                    expected = [r for r in db.list_all_recipes()
+                                if set(tags) <= tags_for(r) and not set(exclude) & tags_for(r)]
+                    assert db.filter_recipes(tags, exclude) == expected
+
+
+class TestShardedSearch:
+    """Test multiprocess sharded recipe search"""
+    
+    def test_matches_single_process(self):
+        """Test that merged shard results equal an in-process search"""
+        from benchmarks.catalogue import generate_recipes
+        from recipe_shards import ShardedRecipeSearch
+        db = RecipeDatabase(generate_recipes(300))
+        snapshot = db.snapshot()
+        with ShardedRecipeSearch(snapshot, shards=3) as search:
+            assert search.shards == 3
+            for query in ["garlic", "pasta", "1/2 cup", "saffron"]:
+                assert search.search_recipes(query) == db.search_recipes(query)
+            garlic_and_butter = [r for r in db.search_recipes("garlic") if r in db.search_recipes("butter")]
+            assert search.search_recipes("garlic", require=["butter"]) == garlic_and_butter
+            assert search.search_recipes("garlic", limit=5) == db.search_recipes("garlic")[:5]
+            batch = search.search_many(["eggs", "rice"], limit=3)
+            assert batch == [db.search_recipes("eggs")[:3], db.search_recipes("rice")[:3]]
+            assert search.get_recipe(next(iter(snapshot))) is not None
+            assert search.filter_recipes(["vegetarian", "quick"]) == db.filter_recipes(["vegetarian", "quick"])
+            # A failed request must not leave replies behind for the next one
+            with pytest.raises(RuntimeError, match="Recipe shard failed"):
+                search.search_ids(None)
+            assert search.search_recipes("garlic") == db.search_recipes("garlic")
+            assert search.search_recipes("flour") == db.search_recipes("flour")
 
 
 class TestIngredientExtractor:
@@ -81,6 +236,13 @@ class TestIngredientExtractor:
         assert ingredient.name == "flour"
         assert ingredient.notes == "sifted"
     
+    def test_parse_mixed_numbers_and_descriptors(self):
+        """Test mixed-number quantities and words that are not units"""
+        flour = IngredientExtractor._parse_ingredient_line("2 1/4 cups all-purpose flour")
+        assert (flour.quantity, flour.unit, flour.name) == ("2 1/4", "cups", "all-purpose flour")
+        eggs = IngredientExtractor._parse_ingredient_line("4 large eggs")
+        assert (eggs.quantity, eggs.unit, eggs.name) == ("4", "", "large eggs")
+    
     def test_format_ingredients(self):
         """Test formatting ingredients for display"""
         ingredients = [
@@ -92,6 +254,137 @@ class TestIngredientExtractor:
         assert "softened" in formatted
 
 
+class TestSubstitutions:
+    """Test the ingredient substitution graph"""
+    
+    def test_lookup(self):
+        """Test substitutes for free-text ingredients, best first, filtered by diet"""
+        from substitutions import default_graph
+        graph = default_graph()
+        name, substitutes = graph.lookup("1 cup softened butter")
+        assert name == "butter" and substitutes[0].name == "vegan butter"
+        assert [s.confidence for s in substitutes] == sorted((s.confidence for s in substitutes), reverse=True)
+        assert graph.lookup("100g Pecorino Romano cheese")[0] == "pecorino romano"
+        assert "almond milk" not in [s.name for s in graph.substitutes("milk", ["vegan", "nut-free"])]
+        assert graph.substitutes("guanciale", ["vegan"]) == graph.by_diet["guanciale", "vegan"]
+        assert graph.lookup("2 tbsp sesame oil") is None
+    
+    def test_adapt_recipe(self):
+        """Test rewriting a whole recipe for a diet in one pass"""
+        from recipe_tags import tags_for
+        from substitutions import default_graph
+        carbonara = RecipeDatabase().get_recipe("pasta_carbonara")
+        adapted, rewrite = default_graph().adapt(carbonara, ["vegan"])
+        assert "vegan" in tags_for(adapted) and not rewrite.unresolved
+        assert "4 large flax eggs" in adapted.ingredients
+        assert "50g nutritional yeast" in [line.lower() for line in adapted.ingredients]
+        assert "Cut smoked tofu into small cubes and fry until crispy" in adapted.instructions
+        assert carbonara.ingredients[1] == "200g guanciale or bacon"
+        
+        # Steps say "flour" where the ingredient list says "all-purpose flour"
+        cookies, _ = default_graph().adapt(RecipeDatabase().get_recipe("chocolate_chip_cookies"), ["gluten-free"])
+        assert "Mix gluten-free flour, baking soda, and salt" in cookies.instructions
+        assert "Gradually blend in gluten-free flour mixture" in cookies.instructions
+        # A replaced "peanut butter" does not drag plain butter along
+        rewrite = default_graph().rewrite(["1 cup peanut butter", "2 tbsp butter"], ["nut-free"], ["Beat butter"])
+        assert rewrite.instructions == ["Beat butter"]
+        with pytest.raises(ValueError, match="Unknown diet"):
+            default_graph().rewrite(carbonara.ingredients, ["keto"])
+    
+    def test_scale_quantity(self):
+        """Test scaling the leading quantity of an ingredient line"""
+        from substitutions import format_ratio, scale_quantity
+        assert scale_quantity("1 cup butter", 0.75) == "3/4 cup butter"
+        assert scale_quantity("1 1/2 cups milk", 0.5) == "3/4 cups milk"
+        assert scale_quantity("200g cheese", 0.5) == "100g cheese"
+        assert scale_quantity("a pinch of salt", 0.5) == "a pinch of salt"
+        assert format_ratio(0.25) == "1/4:1"
+
+
+class TestNutrition:
+    """Test nutrient estimates and catalogue-wide macro filters"""
+    
+    def test_grams(self):
+        """Test converting weights, volumes and counts to grams of a table food"""
+        from nutrition import default_table
+        table = default_table()
+        assert table.parse("400g spaghetti") == (table.row["spaghetti"], 400)
+        assert table.parse("1 cup softened butter") == (table.row["butter"], 227)
+        assert table.parse("4 large eggs") == (table.row["egg"], 200)
+        assert table.parse("3 cloves garlic, minced") == (table.row["garlic"], 9)
+        assert table.parse("2 1/4 cups all-purpose flour")[1] == pytest.approx(281.25)
+        assert table.parse("Black pepper to taste")[0] == -1
+        assert table.parse("2 cups unobtainium")[0] == -1
+        assert table.parse("2 / 3 cup milk") == (table.row["milk"], pytest.approx(240 * 2 / 3))
+        assert table.parse("1 1/0 cup milk") == (-1, 0.0)
+    
+    def test_recipe_nutrition(self):
+        """Test that recipe nutrients are the quantity vector times the nutrient matrix"""
+        from nutrition import default_table
+        table = default_table()
+        recipe = Recipe("Toast", ["100g bread flour", "10g butter", "a little jam"], [], servings=2)
+        nutrition = table.nutrients(recipe)
+        calories = (361 * 100 + 717 * 10) / 100
+        assert nutrition.as_dict(per_serving=False)["calories"] == pytest.approx(calories)
+        assert nutrition.as_dict()["calories"] == pytest.approx(calories / 2)
+        assert nutrition.uncounted == ["a little jam"]
+    
+    def test_catalogue_batch(self):
+        """Test that the batch over a catalogue matches per-recipe estimates and filters by range"""
+        from benchmarks.catalogue import catalogue
+        from nutrition import NutritionIndex, default_table
+        db = catalogue(300)
+        index = NutritionIndex(db.recipes)
+        table = default_table()
+        for recipe_id in list(db.recipes)[::37]:
+            recipe = db.get_recipe(recipe_id)
+            assert index.get(recipe_id) == pytest.approx(table.nutrients(recipe).as_dict())
+        expected = [
+            recipe_id for recipe_id in db.recipes
+            if index.get(recipe_id)["calories"] <= 600 and index.get(recipe_id)["protein"] >= 15
+        ]
+        assert index.filter_ids({"calories": (0, 600), "protein": (15, float("inf"))}) == expected
+        
+        db.update_recipe("pasta_carbonara", Recipe("Sugar", ["1 cup sugar"], [], servings=1))
+        db.delete_recipe("vegetable_stir_fry")
+        refreshed = index.refresh(db.recipes)
+        assert refreshed.get("pasta_carbonara")["calories"] == pytest.approx(774)
+        assert refreshed.get("vegetable_stir_fry") is None
+        assert refreshed.per_serving == pytest.approx(NutritionIndex(db.recipes).per_serving)
+    
+    def test_parse_ranges(self):
+        """Test macro ranges in free text"""
+        from nutrition import parse_ranges
+        assert parse_ranges("under 500 calories with at least 20g protein") == {
+            "calories": (0, 500), "protein": (20, float("inf"))
+        }
+        assert parse_ranges("fat between 10 and 25g; sodium < 600mg") == {"fat": (10, 25), "sodium": (0, 600)}
+        with pytest.raises(ValueError, match="minimum or a maximum"):
+            parse_ranges("calories 500")
+        with pytest.raises(ValueError, match="one nutrient"):
+            parse_ranges("under 500")
+
+
+class TestRecipeTags:
+    """Test tag derivation and parsing"""
+    
+    def test_longest_phrase_wins(self):
+        """Test that ingredient phrases override their single words"""
+        from recipe_tags import derive_tags
+        curry = derive_tags(Recipe("Chickpea Curry", ["400ml coconut milk", "2 tbsp peanut butter", "1 eggplant"], []))
+        assert {"vegan", "dairy-free", "indian"} <= curry
+        assert "nut-free" not in curry
+        assert "vegetarian" not in derive_tags(Recipe("Butter Chicken", ["2 onions"], []))
+    
+    def test_parse_tags(self):
+        """Test required and excluded tags in free text"""
+        from recipe_tags import minutes, parse_tags
+        assert parse_tags("Vegan, quick and italian") == (["vegan", "quick", "italian"], [])
+        assert parse_tags("gluten free + not dessert, -nut-free") == (["gluten-free"], ["dessert", "nut-free"])
+        assert minutes("1 hour 15 minutes") == 75
+        assert minutes("Unknown") is None
+
+
 class TestCookingToolbox:
     """Test cooking toolbox functionality"""
     
@@ -104,9 +397,86 @@ class TestCookingToolbox:
     def test_search_recipes_fallback_tag(self):
         """Test recipe search fallback on tag"""
         toolbox = CookingToolbox()
-        # Assuming search_recipes handles tags as well
         result = toolbox.search_recipes("vegan")
-        assert result
+        assert "Vegetable Stir Fry" in result
+        assert "Carbonara" not in result
+    
+    def test_substitution_tools(self):
+        """Test the substitution and recipe adaptation tools"""
+        toolbox = CookingToolbox()
+        result = toolbox.substitute_ingredient("eggs", "vegan")
+        assert "Substitutes for Egg (vegan)" in result and "flax egg" in result
+        assert "Unknown diet: keto" in toolbox.substitute_ingredient("eggs", "keto")
+        adapted = toolbox.adapt_recipe("cookies", "vegan, gluten free")
+        assert "## Dark Chocolate Chip Cookies (vegan, gluten-free)" in adapted
+        assert "🔄 2 large eggs → 2 large flax eggs" in adapted
+        assert "already vegan" in toolbox.adapt_recipe("stir fry", "vegan")
+    
+    def test_nutrition_tools(self):
+        """Test the nutrition and nutrient range tools"""
+        toolbox = CookingToolbox()
+        result = toolbox.get_nutrition("carbonara")
+        assert "Nutrition for Pasta Carbonara (per serving, 4 servings)" in result
+        assert "Not counted: Black pepper to taste; Salt for pasta water" in result
+        result = toolbox.filter_by_nutrition("under 500 calories with at least 5g protein")
+        assert "Found 1 recipe(s) with calories ≤ 500 kcal, protein ≥ 5 g" in result
+        assert "Vegetable Stir Fry" in result
+        assert "minimum or a maximum" in toolbox.filter_by_nutrition("calories 500")
+        
+        index = toolbox.nutrition_index()
+        assert toolbox.nutrition_index() is index
+        toolbox.recipe_db.add_recipe("salad", Recipe("Green Salad", ["2 cups spinach", "1 tbsp olive oil"], [], servings=2))
+        assert "Green Salad" in toolbox.filter_by_nutrition("under 100 calories")
+        toolbox.recipe_db.add_recipe("odd", Recipe("Odd Milk", ["1 1/0 cup milk", "1 cup milk"], [], servings=1))
+        assert "Not counted: 1 1/0 cup milk" in toolbox.get_nutrition("Odd Milk")
+        assert "Odd Milk" in toolbox.filter_by_nutrition("under 200 calories")
+    
+    def test_filter_recipes(self):
+        """Test filtering recipes by combined tags"""
+        toolbox = CookingToolbox()
+        result = toolbox.filter_recipes("vegetarian and quick, not dessert")
+        assert "Found 1 recipe(s)" in result and "Vegetable Stir Fry" in result
+        assert "No recipes tagged 'vegan, italian'" in toolbox.filter_recipes("vegan, italian")
+        assert "🏷️  Tags: italian, main" in toolbox.get_recipe_details("carbonara")
+    
+    def test_search_cache(self):
+        """Test that repeated searches hit the cache until the database changes"""
+        toolbox = CookingToolbox()
+        first = toolbox.search_recipes("Pasta")
+        assert toolbox.search_recipes("  pasta ") == first
+        assert toolbox.search_cache.stats()["hits"] == 1
+        toolbox.recipe_db.add_recipe("pasta_salad", Recipe("Pasta Salad", ["200g penne"], ["Toss"]))
+        assert "Pasta Salad" in toolbox.search_recipes("pasta")
+        stats = toolbox.search_cache.stats()
+        assert stats["misses"] == 2 and stats["invalidations"] == 1
+        assert "No recipes found for 'Saffron'" in toolbox.search_recipes("Saffron")
+        assert "No recipes found for 'saffron '" in toolbox.search_recipes("saffron ")
+    
+    def test_search_cache_bounds(self):
+        """Test LRU eviction by entry count and byte budget, and stale results"""
+        from cooking_tools import SearchCache
+        db = RecipeDatabase()
+        cache = SearchCache(max_entries=2, max_bytes=4096)
+        for query in ["a", "b", "c"]:
+            cache.get(db, db.version, query)
+            cache.put(db, db.version, query, ["pasta_carbonara"], query * 10)
+        assert cache.get(db, db.version, "a") is None
+        assert cache.get(db, db.version, "c") == (("pasta_carbonara",), "cccccccccc")
+        cache.put(db, db.version, "big", [], "x" * 5000)
+        assert cache.get(db, db.version, "big") is None
+        cache.put(db, db.version - 1, "old", [], "stale")
+        assert cache.get(db, db.version, "old") is None
+        assert cache.stats()["evictions"] == 1 and cache.bytes <= 4096
+    
+    def test_search_cache_size_from_env(self, monkeypatch, capsys):
+        """Test that an invalid cache size falls back to the default with a warning"""
+        from cooking_tools import SearchCache
+        monkeypatch.setenv("COOKING_AGENT_SEARCH_CACHE_MB", "0")
+        assert SearchCache.from_env().max_entries == 0
+        for value in ("lots", "-1", "nan"):
+            monkeypatch.setenv("COOKING_AGENT_SEARCH_CACHE_MB", value)
+            assert CookingToolbox().search_cache.max_bytes == 16 * 1024 * 1024
+            assert f"Ignoring COOKING_AGENT_SEARCH_CACHE_MB={value!r}" in capsys.readouterr().out
     
     def test_get_recipe_details(self):
         """Test getting recipe details"""
@@ -179,6 +549,682 @@ class TestRecipe:
         assert recipe.cook_time == "10 minutes"
 
 
+class TestStartup:
+    """Test cold-start behaviour of the agent entry point"""
+    
+    # Generous budget: CI machines are slow, a regression is an order of magnitude
+    FIRST_RESPONSE_BUDGET_SECONDS = 5.0
+    
+    def test_import_main_defers_heavy_sdks(self):
+        """Test that importing main.py does not import the agent SDK or dotenv"""
+        from benchmarks.startup import importtime_breakdown
+        modules = {t.module for t in importtime_breakdown("main")}
+        assert "main" in modules
+        assert not any(m.startswith(("azure", "dotenv")) for m in modules)
+    
+    def test_import_main_defers_heavy_stdlib(self):
+        """Test that sessions, tool host, executor and exporters load on first use"""
+        from benchmarks.startup import importtime_breakdown
+        modules = {t.module for t in importtime_breakdown("main")}
+        heavy = {"asyncio", "http.server", "socketserver", "sqlite3", "urllib.request"}
+        assert not heavy & modules
+        assert not {"replay", "sessions", "tool_executor", "tool_host"} & modules
+    
+    def test_time_to_first_response(self):
+        """Test that the REPL answers the first prompt within budget"""
+        from benchmarks.startup import time_to_first_response
+        elapsed = time_to_first_response("hello")
+        assert elapsed < self.FIRST_RESPONSE_BUDGET_SECONDS
+    
+    def test_agent_builds_toolbox_in_background(self, monkeypatch):
+        """Test that the toolbox is available once warm-up finishes"""
+        monkeypatch.setenv("COOKING_AGENT_BACKEND", "rules")
+        from main import CookingAIAgent
+        agent = CookingAIAgent()
+        assert "Carbonara" in agent.chat("how do I cook carbonara?")
+
+
+class TestBenchmarkCatalogue:
+    """Test the synthetic catalogues used by the benchmark suite"""
+    
+    def test_synthetic_catalogue(self):
+        """Test that benchmark catalogues are deterministic and searchable"""
+        from benchmarks.catalogue import catalogue, generate_recipes
+        assert generate_recipes(50, seed=1) == generate_recipes(50, seed=1)
+        db = catalogue(200)
+        assert len(db.recipes) == 203
+        assert db.search_recipes("garlic")
+
+
+class TestBackends:
+    """Test pluggable model backends"""
+    
+    def test_rule_backend_emits_tool_call(self):
+        """Test that the rule backend routes a request to a tool"""
+        from backends import RuleBasedBackend
+        reply = RuleBasedBackend().complete([{"role": "user", "content": "give me pasta tips"}], [])
+        assert reply.content is None
+        assert reply.tool_calls[0].name == "cooking_tips"
+        assert reply.tool_calls[0].arguments == {"topic": "pasta"}
+    
+    def test_rule_backend_routes_substitutions(self):
+        """Test that substitution and adaptation requests reach their tools"""
+        from backends import RuleBasedBackend
+        route = RuleBasedBackend()._route
+        assert route("What can I use instead of butter?") == (
+            "substitute_ingredient", {"ingredient": "What can I use instead of butter?", "diet": ""}
+        )
+        assert route("make the carbonara gluten free") == (
+            "adapt_recipe", {"recipe_name": "Pasta Carbonara", "diet": "gluten-free"}
+        )
+        assert route("how do I cook carbonara?")[0] == "get_recipe_details"
+    
+    def test_rule_backend_routes_nutrition(self):
+        """Test that nutrition questions reach the nutrition tools"""
+        from backends import RuleBasedBackend
+        route = RuleBasedBackend()._route
+        assert route("How many calories in the cookies?") == ("get_nutrition", {"recipe_name": "Chocolate Chip Cookies"})
+        assert route("recipes under 500 calories") == ("filter_by_nutrition", {"ranges": "recipes under 500 calories"})
+    
+    def test_rule_backend_answers_with_tool_results(self):
+        """Test that tool results become the final answer"""
+        from backends import RuleBasedBackend
+        messages = [
+            {"role": "user", "content": "list recipes"},
+            {"role": "tool", "tool_call_id": "call_1_0", "content": "Available recipes"},
+        ]
+        reply = RuleBasedBackend().complete(messages, [])
+        assert reply.content == "Available recipes"
+        assert not reply.tool_calls
+    
+    def test_tool_call_round_trip(self):
+        """Test OpenAI wire format conversion of tool calls"""
+        from backends import BackendReply, ToolCall
+        reply = BackendReply(tool_calls=[ToolCall("call_1", "search_recipes", {"query": "pasta"})])
+        parsed = BackendReply.from_message(reply.to_message())
+        assert parsed.tool_calls == reply.tool_calls
+    
+    def test_malformed_tool_arguments(self, monkeypatch):
+        """Test that unparseable tool arguments become a tool error, not a crash"""
+        from backends import BackendReply, ToolCall
+        call = ToolCall.from_dict({"id": "call_1", "function": {"name": "search_recipes", "arguments": '{"query": '}})
+        assert call.arguments == {} and "Invalid JSON arguments for search_recipes" in call.error
+        assert "must be a JSON object" in ToolCall.from_dict({"function": {"name": "x", "arguments": "[1]"}}).error
+        
+        monkeypatch.setenv("COOKING_AGENT_BACKEND", "rules")
+        from main import CookingAIAgent
+        agent = CookingAIAgent(background_init=False)
+        reply = BackendReply.from_message({"role": "assistant", "tool_calls": [
+            {"id": "call_1", "function": {"name": "search_recipes", "arguments": "{oops"}}
+        ]})
+        assert agent.process_tool_calls(reply.tool_calls)[0].startswith("Error executing tool: Invalid JSON arguments")
+    
+    def test_unknown_backend(self, monkeypatch, capsys):
+        """Test that an unknown backend name is rejected with the valid names"""
+        from backends import create_backend
+        with pytest.raises(ValueError):
+            create_backend("nonexistent")
+        
+        monkeypatch.setenv("COOKING_AGENT_BACKEND", "nonexistent")
+        from main import CookingAIAgent
+        with pytest.raises(SystemExit):
+            CookingAIAgent(background_init=False)
+        assert "one of: rules, github, deepseek, stub" in capsys.readouterr().out
+    
+    def test_agent_against_stub_server(self):
+        """Test a full turn through the OpenAI-compatible stub server"""
+        from backends import OpenAICompatibleBackend
+        from main import CookingAIAgent
+        from stub_server import StubModelServer
+        with StubModelServer() as server:
+            backend = OpenAICompatibleBackend(server.url, api_key="stub", model="cooking-stub")
+            agent = CookingAIAgent(backend=backend, background_init=False)
+            assert "Carbonara" in agent.chat("how do I cook carbonara?")
+            assert "Hello" in agent.chat("hello")
+            # One request for the tool call, one for the answer, one for "hello"
+            assert server.requests_served == 3
+
+
+class TestToolExecutor:
+    """Test concurrent tool execution"""
+    
+    @staticmethod
+    def _sleeper(seconds, output):
+        def tool(args):
+            time.sleep(seconds)
+            return output
+        return tool
+    
+    def test_batch_runs_concurrently_in_order(self):
+        """Test that a batch costs the slowest tool and keeps call order"""
+        from tool_executor import ToolExecutor, ToolTask
+        tasks = [
+            ToolTask("slow", self._sleeper(0.3, "first")),
+            ToolTask("fast", self._sleeper(0.0, "second")),
+            ToolTask("medium", self._sleeper(0.2, "third")),
+        ]
+        start = time.perf_counter()
+        results = ToolExecutor().run(tasks)
+        assert results == ["first", "second", "third"]
+        assert time.perf_counter() - start < 0.45
+    
+    def test_timeout_and_errors(self):
+        """Test per-tool timeouts and exceptions become error strings"""
+        from tool_executor import ToolExecutor, ToolTask
+        
+        def broken(args):
+            raise ValueError("boom")
+        
+        results = ToolExecutor().run([
+            ToolTask("stuck", self._sleeper(1.0, "late"), timeout=0.1),
+            ToolTask("broken", broken),
+        ])
+        assert "timed out" in results[0]
+        assert results[1] == "Error executing tool: boom"
+    
+    def test_single_tool_timeout(self):
+        """Test that a lone sync tool is held to its timeout too"""
+        from tool_executor import ToolExecutor, ToolTask
+        executor = ToolExecutor(default_timeout=0.1)
+        assert "timed out after 0.1s" in executor.run([ToolTask("stuck", self._sleeper(1.0, "late"))])[0]
+        assert ToolExecutor(default_timeout=None).run([ToolTask("quick", self._sleeper(0.0, "ok"))]) == ["ok"]
+    
+    def test_async_tools(self):
+        """Test that coroutine tools share one event loop with timeouts"""
+        from tool_executor import ToolExecutor, ToolTask
+        
+        async def fetch(args):
+            await asyncio.sleep(args["delay"])
+            return f"fetched {args['delay']}"
+        
+        results = ToolExecutor().run([
+            ToolTask("fetch", fetch, {"delay": 0.05}),
+            ToolTask("fetch", fetch, {"delay": 1.0}, timeout=0.1),
+            ToolTask("sync", self._sleeper(0.0, "sync")),
+        ])
+        assert results[0] == "fetched 0.05"
+        assert "timed out" in results[1]
+        assert results[2] == "sync"
+    
+    def test_agent_batch_tool_calls(self, monkeypatch):
+        """Test that the agent executes a turn's tool calls as one batch"""
+        monkeypatch.setenv("COOKING_AGENT_BACKEND", "rules")
+        from backends import ToolCall
+        from main import CookingAIAgent
+        agent = CookingAIAgent(background_init=False)
+        results = agent.process_tool_calls([
+            ToolCall("call_1", "search_recipes", {"query": "carbonara"}),
+            ToolCall("call_2", "cooking_tips", {"topic": "pasta"}),
+            ToolCall("call_3", "unknown_tool", {}),
+        ])
+        assert "Found" in results[0]
+        assert "💡" in results[1]
+        assert results[2] == "Unknown tool: unknown_tool"
+
+
+class TestToolHost:
+    """Test the shared tool host"""
+    
+    @staticmethod
+    def _host():
+        from cooking_tools import CookingToolbox
+        from tool_host import ToolHost, cooking_toolset, litbot_toolset, load_litbot_toolbox
+        host = ToolHost()
+        toolbox = CookingToolbox()
+        host.add(cooking_toolset(lambda: toolbox))
+        host.add(litbot_toolset(load_litbot_toolbox()))
+        return host
+    
+    def test_namespaced_calls(self):
+        """Test that cooking and LITBOT tools are served under their namespaces"""
+        host = self._host()
+        names = {tool["name"] for tool in host.list_tools()}
+        assert {"cooking.search_recipes", "litbot.get_system_status"} <= names
+        assert "Carbonara" in host.call("cooking.list_recipes")
+        assert "MRR:" in host.call("litbot.get_system_status")
+        assert host.call("cooking.missing") == "Unknown tool: cooking.missing"
+    
+    def test_client_over_socket(self):
+        """Test calls and batches through a client connected to a served host"""
+        from tool_host import ToolClient, remote_toolset
+        server = self._host().serve("127.0.0.1:0")
+        client = ToolClient("%s:%d" % server.server_address)
+        try:
+            assert "Found" in client.call("cooking.search_recipes", {"query": "carbonara"})
+            results = client.call_many([
+                ("cooking.cooking_tips", {"topic": "pasta"}),
+                ("litbot.analyze_metric", {"metric_name": "revenue_mrr"}),
+            ])
+            assert "💡" in results[0]
+            assert results[1].startswith("Analysis of MRR")
+            toolset = remote_toolset(client, "cooking")
+            assert {schema["name"] for schema in toolset.schemas} >= {"search_recipes", "list_recipes"}
+            assert "Carbonara" in toolset.handlers["list_recipes"]({})
+        finally:
+            client.close()
+            server.shutdown()
+            server.server_close()
+    
+    def test_bad_requests_get_error_replies(self):
+        """Test that malformed lines are answered with an error and keep the connection open"""
+        import socket
+        from tool_host import ToolHost
+        server = ToolHost().serve("127.0.0.1:0")
+        try:
+            with socket.create_connection(server.server_address, timeout=5) as sock:
+                lines = sock.makefile("rwb")
+                for line in (b"[]", b"1", b"{oops", b'{"id": 7, "method": "list_tools"}'):
+                    lines.write(line + b"\n")
+                    lines.flush()
+                replies = [json.loads(lines.readline()) for _ in range(4)]
+        finally:
+            server.shutdown()
+            server.server_close()
+        assert replies[0] == {"id": None, "error": "Invalid request: expected a JSON object, got list"}
+        assert replies[1]["error"].endswith("got int")
+        assert replies[2]["error"].startswith("Invalid JSON")
+        assert replies[3] == {"id": 7, "result": []}
+    
+    def test_agent_uses_remote_host(self, monkeypatch):
+        """Test that an agent pointed at a tool host calls tools remotely"""
+        server = self._host().serve("127.0.0.1:0")
+        try:
+            monkeypatch.setenv("COOKING_AGENT_BACKEND", "rules")
+            monkeypatch.setenv("COOKING_AGENT_TOOL_HOST", "%s:%d" % server.server_address)
+            from main import CookingAIAgent
+            agent = CookingAIAgent(background_init=False)
+            assert "Carbonara" in agent.chat("how do I cook carbonara?")
+        finally:
+            server.shutdown()
+            server.server_close()
+
+
+class TestMetrics:
+    """Test metrics collection and export"""
+    
+    def test_disabled_registry_records_nothing(self):
+        """Test that a disabled registry ignores observations"""
+        from metrics import MetricsRegistry
+        registry = MetricsRegistry(enabled=False)
+        registry.counter("calls_total").inc(tool="search")
+        with registry.histogram("latency_seconds").time(tool="search"):
+            pass
+        assert registry.to_dict()["calls_total"]["series"] == []
+        assert registry.histogram("latency_seconds").count(tool="search") == 0
+    
+    def test_prometheus_and_json_export(self):
+        """Test Prometheus text and JSON dumps of counters and histograms"""
+        from metrics import MetricsRegistry
+        registry = MetricsRegistry(enabled=True)
+        registry.counter("errors_total", "Errors").inc(kind="timeout")
+        histogram = registry.histogram("latency_seconds", "Latency", buckets=(0.1, 1.0))
+        for value in (0.05, 0.5, 0.5, 2.0):
+            histogram.observe(value, tool="search")
+        
+        text = registry.render_prometheus()
+        assert "# TYPE errors_total counter" in text
+        assert 'errors_total{kind="timeout"} 1' in text
+        assert 'latency_seconds_bucket{tool="search",le="1"} 3' in text
+        assert 'latency_seconds_bucket{tool="search",le="+Inf"} 4' in text
+        assert 'latency_seconds_count{tool="search"} 4' in text
+        
+        registry.counter("failures_total", "Failures\nby \\ reason").inc(reason='bad "quote"\\path\nline')
+        text = registry.render_prometheus()
+        assert 'failures_total{reason="bad \\"quote\\"\\\\path\\nline"} 1' in text
+        assert "# HELP failures_total Failures\\nby \\\\ reason" in text
+        
+        series = json.loads(registry.to_json())["latency_seconds"]["series"][0]
+        assert series["count"] == 4
+        assert 0.1 <= series["p50"] <= 1.0
+    
+    def test_agent_records_tool_latency(self, monkeypatch):
+        """Test that tool calls and turns are timed when metrics are enabled"""
+        monkeypatch.setenv("COOKING_AGENT_BACKEND", "rules")
+        from metrics import REGISTRY
+        from main import CookingAIAgent
+        monkeypatch.setattr(REGISTRY, "enabled", True)
+        REGISTRY.reset()
+        agent = CookingAIAgent(background_init=False)
+        agent.chat("give me pasta tips")
+        agent.process_tool_call("nonexistent", {})
+        
+        assert REGISTRY.get("cooking_tool_duration_seconds").count(tool="cooking_tips") == 1
+        assert REGISTRY.get("cooking_agent_turn_seconds").count() == 1
+        assert REGISTRY.get("cooking_tool_errors_total").value(tool="nonexistent", kind="unknown") == 1
+        REGISTRY.reset()
+    
+    def test_deepseek_client_metrics(self):
+        """Test DeepSeekClient latency and payload metrics against the stub server"""
+        sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+        from deepseek_client import DeepSeekClient
+        from metrics import MetricsRegistry
+        from stub_server import StubModelServer
+        registry = MetricsRegistry(enabled=True)
+        with StubModelServer() as server:
+            client = DeepSeekClient(
+                api_key="test", api_url=f"{server.url}/chat/completions", metrics=registry
+            )
+            assert "Hello" in client.simple_chat("hello")
+        
+        latency = registry.get("deepseek_request_duration_seconds")
+        assert latency.count(model="deepseek-chat", status=200) == 1
+        assert registry.get("deepseek_request_bytes").count(model="deepseek-chat") == 1
+
+
+class TestDeepSeekLoad:
+    """Test the fake DeepSeek API and the load harness"""
+    
+    @staticmethod
+    def _client(server, **kwargs):
+        sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+        from deepseek_client import DeepSeekClient
+        return DeepSeekClient(api_key="test", api_url=f"{server.url}/chat/completions", **kwargs)
+    
+    def test_latency_distributions(self):
+        """Test that every distribution is seeded and non-negative"""
+        from stub_server import LATENCY_DISTRIBUTIONS, StubModelServer
+        for distribution in LATENCY_DISTRIBUTIONS:
+            samples = []
+            for _ in range(2):
+                server = StubModelServer(latency=0.05, jitter=0.5, distribution=distribution)
+                samples.append([server._sample_latency() for _ in range(200)])
+                server._httpd.server_close()
+            assert samples[0] == samples[1]
+            assert min(samples[0]) >= 0
+        with pytest.raises(ValueError):
+            StubModelServer(distribution="pareto")
+    
+    def test_injected_errors_and_throttling(self):
+        """Test 5xx injection and 429 responses past the rate limit"""
+        from stub_server import StubModelServer
+        with StubModelServer(error_rate=1.0) as server:
+            with pytest.raises(RuntimeError, match="DeepSeek API error 50"):
+                self._client(server).simple_chat("hello")
+            assert server.errors_injected == 1
+        with StubModelServer(rate_limit=0.001, burst=1) as server:
+            client = self._client(server)
+            assert "Hello" in client.simple_chat("hello")
+            with pytest.raises(RuntimeError, match="DeepSeek API error 429"):
+                client.simple_chat("hello")
+            assert server.throttled == 1
+    
+    def test_streaming(self):
+        """Test that streamed deltas reassemble the non-streamed reply"""
+        from stub_server import StubModelServer
+        messages = [{"role": "user", "content": "hello"}]
+        with StubModelServer() as server:
+            client = self._client(server)
+            chunks = list(client.chat_stream(messages))
+            assert len(chunks) > 1
+            assert "".join(chunks) == client.chat_completion(messages)["content"]
+    
+    def test_streaming_malformed_chunk(self, monkeypatch):
+        """Test that a malformed SSE chunk fails as an API error and counts in load runs"""
+        from benchmarks.load_deepseek import run_load
+        from stub_server import StubModelServer
+        with StubModelServer() as server:
+            client = self._client(server)
+            monkeypatch.setattr(server, "completion_chunks", lambda request: ["not json"])
+            with pytest.raises(RuntimeError, match="malformed stream chunk"):
+                list(client.chat_stream([{"role": "user", "content": "hello"}]))
+            result = run_load(client, rps=50, duration=0.1, concurrency=2, stream=True)
+        assert result.errors == {"malformed_chunk": 5}
+    
+    def test_load_run(self):
+        """Test a short open-loop run over one pooled session"""
+        from benchmarks.load_deepseek import error_kind, percentile, run_load
+        from stub_server import StubModelServer
+        with StubModelServer(latency=0.01) as server:
+            client = self._client(server, pool_size=8)
+            result = run_load(client, rps=50, duration=0.4, concurrency=8)
+        assert result.requests == 20
+        assert not result.errors
+        assert 0.01 <= percentile(result.latencies, 50) <= percentile(result.latencies, 99)
+        assert error_kind(RuntimeError("DeepSeek API error 429: slow down")) == "http_429"
+        assert percentile([3, 1, 2, 4], 50) == 2
+
+
+class TestReplay:
+    """Test conversation recording and replay"""
+    
+    MESSAGES = ["hello", "how do I cook carbonara?", "search for pasta"]
+    
+    def _record(self, path):
+        from backends import RuleBasedBackend
+        from main import CookingAIAgent
+        from replay import TraceRecorder
+        recorder = TraceRecorder(str(path))
+        agent = CookingAIAgent(backend=RuleBasedBackend(), background_init=False, recorder=recorder)
+        outputs = [agent.chat(message) for message in self.MESSAGES]
+        recorder.close()
+        return outputs
+    
+    def test_trace_round_trip(self, tmp_path):
+        """Test that a recorded trace loads back turn by turn"""
+        from replay import digest, load_trace
+        outputs = self._record(tmp_path / "trace.jsonl")
+        sessions = load_trace(str(tmp_path / "trace.jsonl"))
+        assert len(sessions) == 1
+        turns = sessions[0].turns
+        assert [turn.input for turn in turns] == self.MESSAGES
+        assert [turn.output_digest for turn in turns] == [digest(output) for output in outputs]
+        assert all(len(turn.replies) == len(turn.llm_seconds) >= 1 for turn in turns)
+        assert turns[1].tool_seconds > 0  # carbonara looks up the recipe
+    
+    def test_replay_reproduces_outputs(self, tmp_path):
+        """Test that replaying a trace yields the recorded outputs"""
+        from benchmarks.replay_trace import replay
+        from replay import load_trace
+        self._record(tmp_path / "trace.jsonl")
+        result = replay(load_trace(str(tmp_path / "trace.jsonl")), repeat=2)
+        assert result.turns == 2 * len(self.MESSAGES)
+        assert not result.mismatches
+        assert len(result.replayed["agent"]) == result.turns
+    
+    def test_replay_divergence(self, tmp_path):
+        """Test that running past the recorded replies is reported"""
+        from main import CookingAIAgent
+        from replay import ReplayBackend, load_trace
+        self._record(tmp_path / "trace.jsonl")
+        session = load_trace(str(tmp_path / "trace.jsonl"))[0]
+        agent = CookingAIAgent(backend=ReplayBackend(session), background_init=False)
+        for message in self.MESSAGES:
+            agent.chat(message)
+        assert "Replay diverged" in agent.chat("one more")
+
+
+class TestSessions:
+    """Test persistent conversation sessions"""
+    
+    def test_sqlite_batched_writes(self, tmp_path):
+        """Test that buffered appends are visible, flushed and persisted"""
+        from sessions import SQLiteSessionStore
+        path = str(tmp_path / "sessions.db")
+        store = SQLiteSessionStore(path, batch_size=100, flush_interval=0)
+        store.append("a", 0, [{"role": "user", "content": "hi"}, {"role": "assistant", "content": "hello"}])
+        assert store.count("a") == 2
+        assert store._pending
+        assert store.load("a", 1) == [{"role": "assistant", "content": "hello"}]
+        assert not store._pending
+        store.append("a", 2, [{"role": "user", "content": "bye"}])
+        store.close()
+        
+        store = SQLiteSessionStore(path)
+        assert store.tail("a", 2) == (3, [{"role": "assistant", "content": "hello"}, {"role": "user", "content": "bye"}])
+        assert store.count("missing") == 0
+        store.close()
+    
+    def test_sqlite_rewrite_truncates(self):
+        """Test that rewriting history from an earlier message drops the old tail"""
+        from sessions import MemorySessionStore, SQLiteSessionStore
+        messages = [{"role": "user", "content": str(i)} for i in range(4)]
+        for store in (MemorySessionStore(), SQLiteSessionStore(":memory:", flush_interval=0)):
+            store.append("a", 0, messages)
+            store.flush()
+            store.append("a", 1, [{"role": "assistant", "content": "x"}])
+            assert store.load("a") == [messages[0], {"role": "assistant", "content": "x"}]
+            assert store.count("a") == 2
+            store.close()
+    
+    def test_history_window(self):
+        """Test that only the window stays in memory and older messages load lazily"""
+        from sessions import ConversationHistory, MemorySessionStore
+        store = MemorySessionStore()
+        history = ConversationHistory(store, "s", window=4)
+        messages = [{"role": "user", "content": str(i)} for i in range(10)]
+        for message in messages:
+            history.append(message)
+        assert len(history) == 10
+        assert history.copy() == messages[6:]
+        assert history[0] == messages[0] and history[-1] == messages[9]
+        assert history[4:8] == messages[4:8]
+        for index in (slice(None, None, -1), slice(8, 2, -2), slice(1, None, 3), slice(2, 5, -1)):
+            assert history[index] == messages[index]
+        assert list(history) == messages
+        assert history.older(3) == messages[3:6]
+        assert ConversationHistory(store, "s", window=2).copy() == messages[8:]
+        history.clear()
+        assert len(history) == 0 and store.count("s") == 0
+    
+    def test_agent_resumes_session(self, tmp_path):
+        """Test that an agent picks up a stored conversation by id"""
+        from backends import RuleBasedBackend
+        from main import CookingAIAgent
+        from sessions import SQLiteSessionStore
+        store = SQLiteSessionStore(str(tmp_path / "sessions.db"))
+        agent = CookingAIAgent(backend=RuleBasedBackend(), background_init=False, sessions=store, session_id="abc")
+        agent.chat("hello")
+        agent.chat("search for pasta")
+        store.close()
+        
+        store = SQLiteSessionStore(str(tmp_path / "sessions.db"))
+        agent = CookingAIAgent(backend=RuleBasedBackend(), background_init=False, sessions=store, session_id="abc")
+        assert len(agent.conversation_history) == 4
+        assert agent.conversation_history[2] == {"role": "user", "content": "search for pasta"}
+        store.close()
+    
+    def test_expire(self, tmp_path):
+        """Test bulk removal of idle sessions"""
+        from sessions import MemorySessionStore, SQLiteSessionStore
+        for store in (MemorySessionStore(), SQLiteSessionStore(str(tmp_path / "sessions.db"))):
+            store.append("old", 0, [{"role": "user", "content": "hi"}])
+            cutoff = time.time() + 1
+            assert store.expire(3600) == 0
+            assert store.expire(0, now=cutoff) == 1
+            assert store.count("old") == 0
+            store.close()
+    
+    def test_create_session_store(self, tmp_path):
+        """Test store selection from COOKING_AGENT_SESSIONS-style URLs"""
+        from sessions import MemorySessionStore, SQLiteSessionStore, create_session_store
+        assert isinstance(create_session_store("memory"), MemorySessionStore)
+        store = create_session_store(f"sqlite:///{tmp_path / 'sessions.db'}")
+        assert isinstance(store, SQLiteSessionStore)
+        store.close()
+        assert (tmp_path / "sessions.db").exists()
+        create_session_store("sqlite://").close()
+        for url in ("redis://localhost", "sqlite://foo.db", "sqlite:///"):
+            with pytest.raises(ValueError, match="Unknown session store"):
+                create_session_store(url)
+
+
+class SpanCollector:
+    """In-memory trace exporter for tests"""
+    
+    def __init__(self):
+        self.spans = []
+    
+    def export(self, spans):
+        self.spans.extend(spans)
+
+
+class TestTracing:
+    """Test structured tracing of agent turns"""
+    
+    @pytest.fixture
+    def collector(self, monkeypatch):
+        from tracing import TRACER
+        collector = SpanCollector()
+        monkeypatch.setattr(TRACER, "sample_rate", 1.0)
+        monkeypatch.setattr(TRACER, "exporters", [collector])
+        return collector
+    
+    def test_turn_span_tree(self, collector, monkeypatch):
+        """Test that a turn nests response, LLM and tool spans"""
+        monkeypatch.setenv("COOKING_AGENT_BACKEND", "rules")
+        from main import CookingAIAgent
+        from tracing import TRACER
+        agent = CookingAIAgent(background_init=False)
+        agent.chat("give me baking tips")
+        TRACER.flush()
+        
+        spans = {s.name: s for s in collector.spans}
+        assert spans["agent.turn"].parent_id is None
+        assert spans["agent.response"].parent_id == spans["agent.turn"].span_id
+        assert spans["tool.call"].parent_id == spans["agent.response"].span_id
+        assert spans["tool.call"].attributes["tool"] == "cooking_tips"
+        assert spans["agent.response"].attributes["rounds"] == 2
+        assert len({s.trace_id for s in collector.spans}) == 1
+    
+    def test_sample_rate_from_env(self, monkeypatch, capsys):
+        """Test that an invalid sample rate disables tracing with a warning and others are clamped"""
+        from tracing import tracer_from_env
+        for value, rate in (("0.25", 0.25), ("5", 1.0), ("-1", 0.0), ("inf", 1.0)):
+            monkeypatch.setenv("COOKING_AGENT_TRACE_SAMPLE_RATE", value)
+            assert tracer_from_env().sample_rate == rate
+        for value in ("abc", "nan", ""):
+            monkeypatch.setenv("COOKING_AGENT_TRACE_SAMPLE_RATE", value)
+            assert tracer_from_env().sample_rate == 0.0
+            assert f"Ignoring COOKING_AGENT_TRACE_SAMPLE_RATE={value!r}" in capsys.readouterr().out
+    
+    def test_unsampled_traces_are_not_exported(self):
+        """Test that children of an unsampled root record nothing"""
+        from tracing import Tracer
+        collector = SpanCollector()
+        tracer = Tracer(sample_rate=1e-12, exporters=[collector])
+        with tracer.span("root"):
+            with tracer.span("child") as child:
+                assert not child.recording
+        tracer.flush()
+        assert collector.spans == []
+    
+    def test_error_status_and_exporters(self, tmp_path):
+        """Test error status, JSON-lines output and OTLP encoding"""
+        from tracing import JsonLinesExporter, OTLPHttpExporter, Tracer
+        path = tmp_path / "spans.jsonl"
+        tracer = Tracer(sample_rate=1.0, exporters=[JsonLinesExporter(str(path))])
+        with pytest.raises(ValueError):
+            with tracer.span("root", user="abc"):
+                raise ValueError("bad input")
+        tracer.flush()
+        
+        record = json.loads(path.read_text().splitlines()[0])
+        assert record["status"] == "error"
+        assert "bad input" in record["status_message"]
+        
+        otlp = OTLPHttpExporter().to_otlp([])
+        assert otlp["resourceSpans"][0]["scopeSpans"][0]["spans"] == []
+    
+    def test_deepseek_span(self, collector):
+        """Test that DeepSeekClient.chat records request/response sizes"""
+        sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+        from deepseek_client import DeepSeekClient
+        from stub_server import StubModelServer
+        from tracing import TRACER
+        with StubModelServer() as server:
+            client = DeepSeekClient(
+                api_key="test", api_url=f"{server.url}/chat/completions", tracer=TRACER
+            )
+            client.simple_chat("hello")
+        TRACER.flush()
+        
+        span = collector.spans[0]
+        assert span.name == "deepseek.chat"
+        assert span.attributes["status"] == 200
+        assert span.attributes["request_bytes"] > 0
+        assert span.attributes["response_bytes"] > 0
+
+
 # Integration tests
 class TestIntegration:
     """Integration tests for the agent"""
@@ -0,0 +1,155 @@
+"""
+Concurrent tool execution for the Cooking AI Agent
+Runs the tool calls of one agent turn in parallel with per-tool timeouts
+"""
+
+import asyncio
+import contextvars
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from dataclasses import dataclass, field
+from typing import Any, Callable
+
+from metrics import REGISTRY, SIZE_BUCKETS
+from tracing import TRACER
+
+TOOL_LATENCY = REGISTRY.histogram("cooking_tool_duration_seconds", "Tool execution time by tool")
+TOOL_OUTPUT_BYTES = REGISTRY.histogram("cooking_tool_output_bytes", "Tool output size by tool", SIZE_BUCKETS)
+TOOL_ERRORS = REGISTRY.counter("cooking_tool_errors_total", "Failed tool calls by tool and kind")
+
+
+@dataclass
+class ToolTask:
+    """A single tool invocation: ``func(arguments)``, sync or async"""
+    name: str
+    func: Callable[[dict[str, Any]], Any]
+    arguments: dict[str, Any] = field(default_factory=dict)
+    timeout: float | None = None
+
+    @property
+    def is_async(self) -> bool:
+        return asyncio.iscoroutinefunction(self.func)
+
+
+class ToolExecutor:
+    """Execute a batch of tool tasks concurrently
+
+    Synchronous tools (CPU-light, local I/O) run on a shared thread pool;
+    coroutine tools (network I/O) run together on one event loop. Results
+    are returned in the order the tasks were given, whatever order they
+    finish in, so a batch costs roughly its slowest tool.
+
+    Every timed task goes through the pool so its timeout holds; only a lone
+    synchronous task without a timeout runs inline on the caller's thread.
+    """
+
+    def __init__(self, max_workers: int = 8, default_timeout: float | None = 30.0):
+        self.max_workers = max_workers
+        self.default_timeout = default_timeout
+        self._pool = None
+        self._pool_lock = threading.Lock()
+
+    @property
+    def pool(self) -> ThreadPoolExecutor:
+        """Thread pool, created on first concurrent batch"""
+        if self._pool is None:
+            with self._pool_lock:
+                if self._pool is None:
+                    self._pool = ThreadPoolExecutor(
+                        max_workers=self.max_workers, thread_name_prefix="cooking-tool"
+                    )
+        return self._pool
+
+    def shutdown(self):
+        """Release the worker threads"""
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    def run(self, tasks: list[ToolTask]) -> list[str]:
+        """Run ``tasks`` and return their outputs in input order"""
+        if not tasks:
+            return []
+        if len(tasks) == 1 and not tasks[0].is_async and self._timeout(tasks[0]) is None:
+            return [self._call(tasks[0])]
+
+        results: list[str | None] = [None] * len(tasks)
+        sync_futures = []
+        async_indexes = []
+        for index, task in enumerate(tasks):
+            if task.is_async:
+                async_indexes.append(index)
+            else:
+                # Run in a copy of the caller's context so tool spans nest under the turn
+                context = contextvars.copy_context()
+                sync_futures.append((index, self.pool.submit(context.run, self._call, task)))
+
+        # The event loop gets its own worker so async and sync tools overlap
+        async_future = None
+        if async_indexes:
+            context = contextvars.copy_context()
+            async_future = self.pool.submit(
+                context.run, asyncio.run, self._run_async([tasks[i] for i in async_indexes])
+            )
+
+        started = time.monotonic()
+        for index, future in sync_futures:
+            timeout = self._timeout(tasks[index])
+            remaining = None if timeout is None else max(0.0, started + timeout - time.monotonic())
+            try:
+                results[index] = future.result(timeout=remaining)
+            except FutureTimeoutError:
+                future.cancel()
+                TOOL_ERRORS.inc(tool=tasks[index].name, kind="timeout")
+                results[index] = self._timeout_message(tasks[index], timeout)
+
+        if async_future is not None:
+            for index, output in zip(async_indexes, async_future.result()):
+                results[index] = output
+
+        return results
+
+    def _timeout(self, task: ToolTask) -> float | None:
+        return task.timeout if task.timeout is not None else self.default_timeout
+
+    def _timeout_message(self, task: ToolTask, timeout: float | None) -> str:
+        return f"Error executing tool: {task.name} timed out after {timeout:g}s"
+
+    def _record(self, task: ToolTask, start: float, output: str, span: Any):
+        if REGISTRY.enabled or span.recording:
+            output_bytes = len(output.encode("utf-8"))
+            TOOL_LATENCY.observe(time.perf_counter() - start, tool=task.name)
+            TOOL_OUTPUT_BYTES.observe(output_bytes, tool=task.name)
+            span.set_attribute("output_bytes", output_bytes)
+
+    def _error(self, task: ToolTask, kind: str, message: str, span: Any) -> str:
+        TOOL_ERRORS.inc(tool=task.name, kind=kind)
+        span.set_attributes(error=kind)
+        return message
+
+    def _call(self, task: ToolTask) -> str:
+        with TRACER.span("tool.call", tool=task.name) as span:
+            start = time.perf_counter()
+            try:
+                output = task.func(task.arguments)
+            except Exception as e:
+                output = self._error(task, "exception", f"Error executing tool: {str(e)}", span)
+            self._record(task, start, output, span)
+            return output
+
+    async def _run_async(self, tasks: list[ToolTask]) -> list[str]:
+        async def call(task: ToolTask) -> str:
+            with TRACER.span("tool.call", tool=task.name) as span:
+                timeout = self._timeout(task)
+                start = time.perf_counter()
+                try:
+                    output = await asyncio.wait_for(task.func(task.arguments), timeout)
+                except asyncio.TimeoutError:
+                    return self._error(task, "timeout", self._timeout_message(task, timeout), span)
+                except Exception as e:
+                    output = self._error(task, "exception", f"Error executing tool: {str(e)}", span)
+                self._record(task, start, output, span)
+                return output
+
+        return await asyncio.gather(*(call(task) for task in tasks))
@@ -0,0 +1,389 @@
+"""
+Shared tool host for the Cooking AI Agent and LITBOT
+Loads toolboxes as namespaced tool sets ("cooking.search_recipes",
+"litbot.analyze_metric"), runs calls on one ToolExecutor and serves them to
+other processes over a local JSON-lines socket, so several agents can share
+one warm toolbox.
+
+Usage: python tool_host.py [--listen 127.0.0.1:8790 | --listen /tmp/tools.sock] [--no-litbot]
+"""
+
+import argparse
+import importlib.util
+import itertools
+import json
+import os
+import queue
+import socket
+import socketserver
+import sys
+import threading
+from dataclasses import dataclass, field
+from typing import Any, Callable
+
+from tool_executor import TOOL_ERRORS, ToolExecutor, ToolTask
+
+DEFAULT_ADDRESS = "127.0.0.1:8790"
+# LITBOT's toolbox lives at the repository root (also named cooking_tools.py)
+LITBOT_TOOLS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "cooking_tools.py")
+
+
+@dataclass
+class ToolSet:
+    """Tool schemas for the model plus handlers taking the argument dict"""
+    namespace: str
+    schemas: list[dict]
+    handlers: dict[str, Callable[[dict[str, Any]], Any]]
+    timeouts: dict[str, float] = field(default_factory=dict)
+
+
+def _tcp_address(address: str) -> tuple[str, int] | None:
+    """``(host, port)`` for "host:port"; None for a Unix socket path"""
+    if ":" in address and os.path.sep not in address:
+        hostname, port = address.rsplit(":", 1)
+        return hostname, int(port)
+    return None
+
+
+def _schema(name: str, description: str, properties: dict | None = None, required: list[str] | None = None) -> dict:
+    parameters: dict[str, Any] = {"type": "object", "properties": properties or {}}
+    if required:
+        parameters["required"] = required
+    return {"name": name, "description": description, "parameters": parameters}
+
+
+def _string(description: str) -> dict:
+    return {"type": "string", "description": description}
+
+
+COOKING_TOOLS = [
+    _schema(
+        "search_recipes", "Search for recipes by name or ingredients",
+        {"query": _string("Search query (recipe name or ingredient)")}, ["query"],
+    ),
+    _schema(
+        "filter_recipes", "Find recipes by dietary, cuisine or meal tags, e.g. vegan, gluten-free, italian, dessert, quick",
+        {"tags": _string("Tags joined with commas or 'and'; prefix with 'not' to exclude, e.g. 'vegan, quick, not dessert'")},
+        ["tags"],
+    ),
+    _schema(
+        "get_recipe_details", "Get full details of a specific recipe including ingredients and instructions",
+        {"recipe_name": _string("Name of the recipe to retrieve")}, ["recipe_name"],
+    ),
+    _schema(
+        "extract_ingredients", "Extract and organize ingredients from provided recipe text",
+        {"text": _string("Recipe text containing ingredients")}, ["text"],
+    ),
+    _schema(
+        "substitute_ingredient", "Substitutes for an ingredient with ratio and confidence, optionally for a diet",
+        {
+            "ingredient": _string("Ingredient to replace, e.g. butter or 2 large eggs"),
+            "diet": _string("Optional diet the substitute must suit: vegan, vegetarian, gluten-free, dairy-free, ..."),
+        },
+        ["ingredient"],
+    ),
+    _schema(
+        "adapt_recipe", "Rewrite a recipe for a diet by substituting every ingredient that breaks it",
+        {
+            "recipe_name": _string("Name of the recipe to adapt"),
+            "diet": _string("Diet(s), e.g. vegan or 'gluten-free, dairy-free'"),
+        },
+        ["recipe_name", "diet"],
+    ),
+    _schema(
+        "get_nutrition", "Estimated calories, protein, fat, carbs, fiber, sugar and sodium of a recipe per serving",
+        {"recipe_name": _string("Name of the recipe")}, ["recipe_name"],
+    ),
+    _schema(
+        "filter_by_nutrition", "Find recipes by per-serving nutrient ranges",
+        {"ranges": _string("Ranges joined with commas, e.g. 'under 500 calories, at least 20g protein, fat 10-25'")},
+        ["ranges"],
+    ),
+    _schema("list_recipes", "List all available recipes in the database"),
+    _schema(
+        "cooking_tips", "Get cooking tips for specific techniques or topics",
+        {"topic": _string("Cooking topic (e.g., pasta, stir-fry, baking, general)")}, ["topic"],
+    ),
+]
+
+
+def cooking_toolset(get_toolbox: Callable[[], Any]) -> ToolSet:
+    """Cooking tools; ``get_toolbox`` is called per call so it may block on warm-up"""
+    return ToolSet("cooking", COOKING_TOOLS, {
+        "search_recipes": lambda args: get_toolbox().search_recipes(args.get("query", "")),
+        "filter_recipes": lambda args: get_toolbox().filter_recipes(args.get("tags", "")),
+        "get_recipe_details": lambda args: get_toolbox().get_recipe_details(args.get("recipe_name", "")),
+        "extract_ingredients": lambda args: get_toolbox().extract_ingredients_from_text(args.get("text", "")),
+        "substitute_ingredient": lambda args: get_toolbox().substitute_ingredient(
+            args.get("ingredient", ""), args.get("diet", "")
+        ),
+        "adapt_recipe": lambda args: get_toolbox().adapt_recipe(args.get("recipe_name", ""), args.get("diet", "")),
+        "get_nutrition": lambda args: get_toolbox().get_nutrition(args.get("recipe_name", "")),
+        "filter_by_nutrition": lambda args: get_toolbox().filter_by_nutrition(args.get("ranges", "")),
+        "list_recipes": lambda args: get_toolbox().list_available_recipes(),
+        "cooking_tips": lambda args: get_toolbox().get_cooking_tips(args.get("topic", "general")),
+    })
+
+
+LITBOT_TOOLS = [
+    _schema("get_system_status", "Current value and status of every LitLabs system metric"),
+    _schema(
+        "get_status_delta", "Status lines that changed since a status version",
+        {"since_version": {"type": "integer", "description": "Last version seen (0 for everything)"}},
+    ),
+    _schema(
+        "analyze_metric", "Analyze one metric against its recent history",
+        {"metric_name": _string("Metric key, e.g. revenue_mrr, churn_rate, api_latency")}, ["metric_name"],
+    ),
+    _schema(
+        "analyze_trend", "Summarize how a metric moved over a period",
+        {"metric_name": _string("Metric key"), "period": _string("Period such as 12h, 30d or 26w")}, ["metric_name"],
+    ),
+    _schema("health_sweep", "Score every tracked metric and list the ones needing attention"),
+    _schema("get_alerts", "Firing alerts and the most recent alert events"),
+    _schema(
+        "query_knowledge_base", "Search the internal business knowledge base",
+        {"topic": _string("What to look up"), "mode": _string("keyword, semantic or hybrid")}, ["topic"],
+    ),
+    _schema(
+        "generate_business_report", "Generate a business report",
+        {"report_type": _string("daily or weekly"), "period": _string("Optional period override, e.g. 90d")}, ["report_type"],
+    ),
+]
+
+
+def load_litbot_toolbox(path: str | None = None):
+    """Import the repository-root LITBOT toolbox by file path and build it
+
+    Both toolboxes live in files named ``cooking_tools.py``, so LITBOT's is
+    loaded under the module name ``litbot_tools``.
+    """
+    path = os.path.abspath(path or os.getenv("LITBOT_TOOLS_PATH", LITBOT_TOOLS_PATH))
+    module = sys.modules.get("litbot_tools")
+    if module is None:
+        root = os.path.dirname(path)
+        if root not in sys.path:
+            # Appended, not prepended: the root must not shadow this package's modules
+            sys.path.append(root)
+        spec = importlib.util.spec_from_file_location("litbot_tools", path)
+        module = importlib.util.module_from_spec(spec)
+        sys.modules["litbot_tools"] = module
+        try:
+            spec.loader.exec_module(module)
+        except BaseException:
+            del sys.modules["litbot_tools"]
+            raise
+    return module.LitBotToolbox()
+
+
+def litbot_toolset(toolbox: Any) -> ToolSet:
+    """LITBOT business-intelligence tools"""
+    return ToolSet("litbot", LITBOT_TOOLS, {
+        "get_system_status": lambda args: toolbox.get_system_status(),
+        "get_status_delta": lambda args: toolbox.get_status_delta(int(args.get("since_version", 0))),
+        "analyze_metric": lambda args: toolbox.analyze_metric(args.get("metric_name", "")),
+        "analyze_trend": lambda args: toolbox.analyze_trend(args.get("metric_name", ""), args.get("period", "30d")),
+        "health_sweep": lambda args: toolbox.health_sweep(),
+        "get_alerts": lambda args: toolbox.get_alerts(),
+        "query_knowledge_base": lambda args: toolbox.query_knowledge_base(args.get("topic", ""), args.get("mode", "keyword")),
+        "generate_business_report": lambda args: toolbox.generate_business_report(args.get("report_type", "daily"), args.get("period")),
+    })
+
+
+class ToolHost:
+    """Registry of namespaced tool sets sharing one executor"""
+
+    def __init__(self, executor: ToolExecutor | None = None):
+        self.executor = executor or ToolExecutor()
+        self.toolsets: dict[str, ToolSet] = {}
+        self._tasks: dict[str, tuple[Callable, float | None]] = {}
+
+    def add(self, toolset: ToolSet):
+        """Register a tool set; its tools become ``<namespace>.<name>``"""
+        self.toolsets[toolset.namespace] = toolset
+        for schema in toolset.schemas:
+            name = schema["name"]
+            self._tasks[f"{toolset.namespace}.{name}"] = (toolset.handlers[name], toolset.timeouts.get(name))
+
+    def list_tools(self) -> list[dict]:
+        """Schemas of all tools under their qualified names"""
+        return [
+            {**schema, "name": f"{namespace}.{schema['name']}"}
+            for namespace, toolset in self.toolsets.items()
+            for schema in toolset.schemas
+        ]
+
+    def _task(self, name: str, arguments: dict) -> ToolTask:
+        entry = self._tasks.get(name)
+        if entry is None:
+            TOOL_ERRORS.inc(tool=name, kind="unknown")
+            return ToolTask(name, lambda args: f"Unknown tool: {name}", arguments)
+        handler, timeout = entry
+        return ToolTask(name, handler, arguments, timeout)
+
+    def call(self, name: str, arguments: dict | None = None) -> str:
+        """Run one tool"""
+        return self.executor.run([self._task(name, arguments or {})])[0]
+
+    def call_many(self, calls: list[tuple[str, dict]]) -> list[str]:
+        """Run several tools concurrently, results in call order"""
+        return self.executor.run([self._task(name, arguments or {}) for name, arguments in calls])
+
+    def handle(self, request: dict) -> dict:
+        """Answer one RPC request: ``{"id", "method", "params"}``"""
+        if not isinstance(request, dict):
+            return {"id": None, "error": f"Invalid request: expected a JSON object, got {type(request).__name__}"}
+        response: dict[str, Any] = {"id": request.get("id")}
+        try:
+            method, params = request["method"], request.get("params") or {}
+            if method == "call":
+                response["result"] = self.call(params["name"], params.get("arguments"))
+            elif method == "call_many":
+                response["result"] = self.call_many([(c["name"], c.get("arguments")) for c in params["calls"]])
+            elif method == "list_tools":
+                response["result"] = self.list_tools()
+            else:
+                response["error"] = f"Unknown method: {method}"
+        except (KeyError, TypeError) as e:
+            response["error"] = f"Invalid request: {e}"
+        return response
+
+    def serve(self, address: str = DEFAULT_ADDRESS) -> socketserver.BaseServer:
+        """Serve RPC on ``host:port`` (TCP) or a filesystem path (Unix socket)"""
+        host = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def setup(self):
+                super().setup()
+                if self.connection.family != getattr(socket, "AF_UNIX", None):
+                    self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+            def handle(self):
+                # One connection carries any number of newline-delimited requests
+                for line in self.rfile:
+                    try:
+                        response = host.handle(json.loads(line))
+                    except ValueError as e:
+                        response = {"id": None, "error": f"Invalid JSON: {e}"}
+                    self.wfile.write(json.dumps(response).encode("utf-8") + b"\n")
+                    self.wfile.flush()
+
+        tcp_address = _tcp_address(address)
+        if tcp_address:
+            server = socketserver.ThreadingTCPServer(tcp_address, Handler)
+        else:
+            if os.path.exists(address):
+                os.unlink(address)
+            server = socketserver.ThreadingUnixStreamServer(address, Handler)
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, name="tool-host", daemon=True).start()
+        return server
+
+
+class ToolClient:
+    """Client for a ``ToolHost`` server; safe to share between threads
+
+    Each in-flight call uses its own pooled connection, so concurrent tool
+    calls from one agent are not serialized.
+    """
+
+    def __init__(self, address: str = DEFAULT_ADDRESS, timeout: float = 60.0):
+        self.address = address
+        self.timeout = timeout
+        self._connections: queue.SimpleQueue = queue.SimpleQueue()
+        self._ids = itertools.count(1)
+
+    def _connect(self):
+        tcp_address = _tcp_address(self.address)
+        if tcp_address:
+            sock = socket.create_connection(tcp_address, timeout=self.timeout)
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        else:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.settimeout(self.timeout)
+            sock.connect(self.address)
+        return sock, sock.makefile("rb")
+
+    def _request(self, method: str, params: dict | None = None) -> Any:
+        try:
+            connection = self._connections.get_nowait()
+        except queue.Empty:
+            connection = self._connect()
+        sock, reader = connection
+        try:
+            request = {"id": next(self._ids), "method": method, "params": params or {}}
+            sock.sendall(json.dumps(request).encode("utf-8") + b"\n")
+            line = reader.readline()
+            if not line:
+                raise ConnectionError("Tool host closed the connection")
+        except BaseException:
+            reader.close()
+            sock.close()
+            raise
+        self._connections.put(connection)
+        response = json.loads(line)
+        if "error" in response:
+            raise RuntimeError(response["error"])
+        return response["result"]
+
+    def list_tools(self) -> list[dict]:
+        return self._request("list_tools")
+
+    def call(self, name: str, arguments: dict | None = None) -> str:
+        return self._request("call", {"name": name, "arguments": arguments or {}})
+
+    def call_many(self, calls: list[tuple[str, dict]]) -> list[str]:
+        return self._request("call_many", {"calls": [{"name": n, "arguments": a} for n, a in calls]})
+
+    def close(self):
+        while True:
+            try:
+                sock, reader = self._connections.get_nowait()
+            except queue.Empty:
+                return
+            reader.close()
+            sock.close()
+
+
+def remote_toolset(client: ToolClient, namespace: str) -> ToolSet:
+    """A host's tool set as a local one whose handlers call over RPC"""
+    prefix = namespace + "."
+    schemas = [
+        {**schema, "name": schema["name"][len(prefix):]}
+        for schema in client.list_tools()
+        if schema["name"].startswith(prefix)
+    ]
+    handlers = {
+        schema["name"]: (lambda args, qualified=prefix + schema["name"]: client.call(qualified, args))
+        for schema in schemas
+    }
+    return ToolSet(namespace, schemas, handlers)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve cooking and LITBOT tools to local agent processes")
+    parser.add_argument("--listen", default=os.getenv("COOKING_AGENT_TOOL_HOST", DEFAULT_ADDRESS))
+    parser.add_argument("--no-litbot", action="store_true", help="Serve only the cooking tools")
+    args = parser.parse_args()
+
+    from cooking_tools import CookingToolbox
+
+    host = ToolHost()
+    cooking = CookingToolbox()
+    host.add(cooking_toolset(lambda: cooking))
+    if not args.no_litbot:
+        try:
+            host.add(litbot_toolset(load_litbot_toolbox()))
+        except (ImportError, OSError) as e:
+            print(f"⚠️  LITBOT tools unavailable: {e}")
+    server = host.serve(args.listen)
+    print(f"🔧 Serving {len(host.list_tools())} tools on {args.listen} (Ctrl+C to stop)")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+        host.executor.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,297 @@
+"""
+Structured tracing for the Cooking AI Agent
+Nested spans (turn → model response → tool / LLM call) with head sampling,
+exported to a JSON-lines file and/or an OTLP/HTTP (JSON) collector.
+Configure with COOKING_AGENT_TRACE_SAMPLE_RATE, COOKING_AGENT_TRACE_FILE and
+COOKING_AGENT_OTLP_ENDPOINT; tracing is off unless the sample rate is > 0.
+"""
+
+import contextvars
+import json
+import math
+import os
+import queue
+import random
+import threading
+import time
+from typing import Any
+
+
+class Span:
+    """A timed, attributed unit of work within a trace"""
+
+    recording = True
+
+    def __init__(self, tracer: "Tracer", name: str, parent: "Span | None", attributes: dict[str, Any]):
+        self.tracer = tracer
+        self.name = name
+        self.trace_id = parent.trace_id if parent else f"{random.getrandbits(128):032x}"
+        self.span_id = f"{random.getrandbits(64):016x}"
+        self.parent_id = parent.span_id if parent else None
+        self.root = parent.root if parent else self
+        self.attributes = dict(attributes)
+        self.status = "ok"
+        self.status_message = ""
+        self.start_ns = 0
+        self.end_ns = 0
+        self._token = None
+        if parent is None:
+            # Finished spans of this trace, flushed when the root ends
+            self._finished: list["Span"] = []
+            self._flushed = False
+
+    def set_attribute(self, key: str, value: Any):
+        self.attributes[key] = value
+
+    def set_attributes(self, **attributes):
+        self.attributes.update(attributes)
+
+    def __enter__(self) -> "Span":
+        self.start_ns = time.time_ns()
+        self._token = _current_span.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.end_ns = time.time_ns()
+        _current_span.reset(self._token)
+        if exc is not None:
+            self.status = "error"
+            self.status_message = f"{exc_type.__name__}: {exc}"
+        self.tracer._finish(self)
+        return False
+
+    @property
+    def duration_ms(self) -> float:
+        return (self.end_ns - self.start_ns) / 1e6
+
+    def to_dict(self) -> dict[str, Any]:
+        """Flat JSON-friendly representation"""
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start_ns": self.start_ns,
+            "end_ns": self.end_ns,
+            "duration_ms": round(self.duration_ms, 3),
+            "status": self.status,
+            "status_message": self.status_message,
+            "attributes": self.attributes,
+        }
+
+
+class _NonRecordingSpan:
+    """Stand-in for spans of unsampled traces; also marks its children unsampled"""
+
+    recording = False
+
+    def set_attribute(self, key: str, value: Any):
+        pass
+
+    def set_attributes(self, **attributes):
+        pass
+
+    def __enter__(self) -> "_NonRecordingSpan":
+        self._token = _current_span.set(self)
+        return self
+
+    def __exit__(self, *exc_info):
+        _current_span.reset(self._token)
+        return False
+
+
+class _NoopSpan(_NonRecordingSpan):
+    """Shared span used when tracing is disabled entirely (touches no state)"""
+
+    def __enter__(self) -> "_NoopSpan":
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+_NOOP_SPAN = _NoopSpan()
+_current_span: contextvars.ContextVar = contextvars.ContextVar("cooking_agent_span", default=None)
+
+
+def current_span() -> Span | None:
+    """The active recording span, if any"""
+    span = _current_span.get()
+    return span if span is not None and span.recording else None
+
+
+class JsonLinesExporter:
+    """Append finished spans to a file, one JSON object per line"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def export(self, spans: list[Span]):
+        lines = "".join(json.dumps(span.to_dict(), default=str) + "\n" for span in spans)
+        with self._lock, open(self.path, "a", encoding="utf-8") as f:
+            f.write(lines)
+
+
+def _otlp_value(value: Any) -> dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+class OTLPHttpExporter:
+    """POST spans to an OpenTelemetry collector using OTLP/HTTP with JSON encoding"""
+
+    def __init__(self, endpoint: str = "http://localhost:4318/v1/traces", service_name: str = "cooking-agent", timeout: float = 5.0):
+        self.endpoint = endpoint
+        self.service_name = service_name
+        self.timeout = timeout
+
+    def to_otlp(self, spans: list[Span]) -> dict[str, Any]:
+        """Build an ``ExportTraceServiceRequest`` body"""
+        return {
+            "resourceSpans": [{
+                "resource": {"attributes": [
+                    {"key": "service.name", "value": {"stringValue": self.service_name}},
+                ]},
+                "scopeSpans": [{
+                    "scope": {"name": "cooking-agent.tracing"},
+                    "spans": [{
+                        "traceId": span.trace_id,
+                        "spanId": span.span_id,
+                        "parentSpanId": span.parent_id or "",
+                        "name": span.name,
+                        "kind": 1,  # SPAN_KIND_INTERNAL
+                        "startTimeUnixNano": str(span.start_ns),
+                        "endTimeUnixNano": str(span.end_ns),
+                        "attributes": [
+                            {"key": key, "value": _otlp_value(value)}
+                            for key, value in span.attributes.items()
+                        ],
+                        # STATUS_CODE_OK = 1, STATUS_CODE_ERROR = 2
+                        "status": {
+                            "code": 2 if span.status == "error" else 1,
+                            "message": span.status_message,
+                        },
+                    } for span in spans],
+                }],
+            }],
+        }
+
+    def export(self, spans: list[Span]):
+        import urllib.request
+        request = urllib.request.Request(
+            self.endpoint,
+            data=json.dumps(self.to_otlp(spans)).encode("utf-8"),
+            headers={"Content-Type": "application/json"},
+            method="POST",
+        )
+        with urllib.request.urlopen(request, timeout=self.timeout):
+            pass
+
+
+class Tracer:
+    """Creates spans and hands finished traces to exporters
+
+    Sampling is decided once per trace at the root span; children of an
+    unsampled root are non-recording. Exports run on a background thread so
+    they never add latency to a turn.
+    """
+
+    def __init__(self, sample_rate: float = 0.0, exporters: list[Any] | None = None):
+        self.sample_rate = sample_rate
+        self.exporters = list(exporters or [])
+        self._queue: queue.Queue | None = None
+        self._worker_lock = threading.Lock()
+        self._finish_lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.sample_rate > 0 and bool(self.exporters)
+
+    def span(self, name: str, **attributes):
+        """Context manager for a child of the current span (or a new root)"""
+        if not self.enabled:
+            return _NOOP_SPAN
+        parent = _current_span.get()
+        if parent is None:
+            if self.sample_rate < 1.0 and random.random() >= self.sample_rate:
+                return _NonRecordingSpan()
+        elif not parent.recording:
+            return _NonRecordingSpan()
+        return Span(self, name, parent, attributes)
+
+    def _finish(self, span: Span):
+        root = span.root
+        with self._finish_lock:
+            if span is root:
+                root._finished.append(span)
+                root._flushed = True
+                spans = root._finished
+            elif root._flushed:
+                # Child outlived its root (e.g. a timed-out tool thread)
+                spans = [span]
+            else:
+                root._finished.append(span)
+                return
+        self._enqueue(spans)
+
+    def _enqueue(self, spans: list[Span]):
+        if self._queue is None:
+            with self._worker_lock:
+                if self._queue is None:
+                    self._queue = queue.Queue()
+                    threading.Thread(target=self._export_loop, name="trace-exporter", daemon=True).start()
+        self._queue.put(spans)
+
+    def _export_loop(self):
+        while True:
+            spans = self._queue.get()
+            try:
+                for exporter in self.exporters:
+                    try:
+                        exporter.export(spans)
+                    except Exception:
+                        pass  # Tracing must never break the agent
+            finally:
+                self._queue.task_done()
+
+    def flush(self):
+        """Block until all finished traces have been exported"""
+        if self._queue is not None:
+            self._queue.join()
+
+
+def _sample_rate_from_env() -> float:
+    """``COOKING_AGENT_TRACE_SAMPLE_RATE`` clamped to [0, 1]; 0 when unset or invalid"""
+    value = os.getenv("COOKING_AGENT_TRACE_SAMPLE_RATE")
+    if value is None:
+        return 0.0
+    try:
+        rate = float(value)
+        if math.isnan(rate):
+            raise ValueError(value)
+    except ValueError:
+        print(f"⚠️  Ignoring COOKING_AGENT_TRACE_SAMPLE_RATE={value!r}: not a number, using 0")
+        return 0.0
+    return min(max(rate, 0.0), 1.0)
+
+
+def tracer_from_env() -> Tracer:
+    """Build a tracer from COOKING_AGENT_TRACE_* / COOKING_AGENT_OTLP_ENDPOINT"""
+    exporters: list[Any] = []
+    trace_file = os.getenv("COOKING_AGENT_TRACE_FILE")
+    if trace_file:
+        exporters.append(JsonLinesExporter(trace_file))
+    otlp_endpoint = os.getenv("COOKING_AGENT_OTLP_ENDPOINT")
+    if otlp_endpoint:
+        exporters.append(OTLPHttpExporter(otlp_endpoint))
+    return Tracer(_sample_rate_from_env(), exporters)
+
+
+# Process-wide tracer used by the agent, tools and backends
+TRACER = tracer_from_env()
@@ -6,8 +6,14 @@ No hardcoded secrets - uses env vars only
 
 import os
 import json
-from typing import Optional, List, Dict, Any
+import time
+from contextlib import nullcontext
+from typing import Optional, List, Dict, Any, Iterator
 import requests
+from requests.adapters import HTTPAdapter
+
+# Bytes; request/response payload size buckets
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576)
 
 
 class DeepSeekMessage:
@@ -26,7 +32,16 @@ class DeepSeekClient:
 
     API_URL = "https://api.deepseek.com/chat/completions"
 
-    def __init__(self, api_key: Optional[str] = None, timeout: int = 60):
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        timeout: int = 60,
+        api_url: Optional[str] = None,
+        metrics: Any = None,
+        tracer: Any = None,
+        session: Optional[requests.Session] = None,
+        pool_size: int = 10,
+    ):
         self.api_key = api_key or os.getenv("DEEPSEEK_API_KEY")
         if not self.api_key:
             raise RuntimeError(
@@ -34,6 +49,39 @@ class DeepSeekClient:
                 "Add it to .env.local or set environment variable."
             )
         self.timeout = timeout
+        # Overridable so the client can be pointed at a local compatible server
+        self.api_url = api_url or os.getenv("DEEPSEEK_API_URL", self.API_URL)
+        # Optional metrics registry (counter()/histogram() interface, e.g.
+        # cooking-agent/metrics.py); nothing is recorded without one
+        self.metrics = metrics
+        if metrics is not None:
+            self._latency = metrics.histogram(
+                "deepseek_request_duration_seconds", "DeepSeek API latency by model and status"
+            )
+            self._request_bytes = metrics.histogram(
+                "deepseek_request_bytes", "DeepSeek request payload size", SIZE_BUCKETS
+            )
+            self._response_bytes = metrics.histogram(
+                "deepseek_response_bytes", "DeepSeek response payload size", SIZE_BUCKETS
+            )
+            self._errors = metrics.counter(
+                "deepseek_errors_total", "Failed DeepSeek API calls by kind"
+            )
+        # Optional tracer (span() interface, e.g. cooking-agent/tracing.py)
+        self.tracer = tracer
+        # One session for all calls: keep-alive connections instead of a new
+        # TCP (and TLS) handshake per request. pool_size bounds the
+        # connections kept per host, so set it to the expected concurrency.
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+        self.session = session
+
+    def close(self) -> None:
+        """Close pooled connections"""
+        self.session.close()
 
     def chat(
         self,
@@ -65,13 +113,160 @@ class DeepSeekClient:
         Raises:
             RuntimeError: If API call fails
         """
+        message = self.chat_completion(
+            [msg.to_dict() for msg in messages],
+            model=model,
+            temperature=temperature,
+            max_tokens=max_tokens,
+            top_p=top_p,
+            frequency_penalty=frequency_penalty,
+            presence_penalty=presence_penalty,
+            stop=stop,
+        )
+        content = message.get("content")
+
+        if not content:
+            raise RuntimeError("No content in DeepSeek response")
+
+        return content
+
+    def chat_completion(
+        self,
+        messages: List[Dict[str, Any]],
+        model: str = "deepseek-chat",
+        temperature: float = 0.7,
+        tools: Optional[List[Dict[str, Any]]] = None,
+        max_tokens: Optional[int] = None,
+        top_p: Optional[float] = None,
+        frequency_penalty: Optional[float] = None,
+        presence_penalty: Optional[float] = None,
+        stop: Optional[List[str]] = None,
+    ) -> Dict[str, Any]:
+        """
+        Call DeepSeek Chat API with raw message dicts
+
+        Unlike chat(), messages may include tool results and the reply may
+        contain ``tool_calls`` instead of content.
+
+        Args:
+            messages: OpenAI-style message dicts
+            model: Model name (default: deepseek-chat)
+            temperature: Sampling temperature (0.0-2.0)
+            tools: OpenAI-style function tool definitions
+            max_tokens: Maximum tokens to generate
+            top_p: Nucleus sampling parameter
+            frequency_penalty: Frequency penalty (-2.0-2.0)
+            presence_penalty: Presence penalty (-2.0-2.0)
+            stop: Stop sequences
+
+        Returns:
+            The assistant message dict of the first choice
+
+        Raises:
+            RuntimeError: If API call fails
+        """
+        payload = self._payload(
+            messages, model, temperature, tools, max_tokens, top_p,
+            frequency_penalty, presence_penalty, stop,
+        )
+        headers = self._headers()
+        body = json.dumps(payload).encode("utf-8")
+        span_cm = (
+            self.tracer.span("deepseek.chat", model=model, request_bytes=len(body))
+            if self.tracer is not None
+            else nullcontext()
+        )
+
+        with span_cm as span:
+            return self._post(model, headers, body, span)
+
+    def chat_stream(
+        self,
+        messages: List[Dict[str, Any]],
+        model: str = "deepseek-chat",
+        temperature: float = 0.7,
+        max_tokens: Optional[int] = None,
+        stop: Optional[List[str]] = None,
+    ) -> Iterator[str]:
+        """
+        Call DeepSeek Chat API with ``stream: true``
+
+        Args:
+            messages: OpenAI-style message dicts
+            model: Model name (default: deepseek-chat)
+            temperature: Sampling temperature (0.0-2.0)
+            max_tokens: Maximum tokens to generate
+            stop: Stop sequences
+
+        Yields:
+            Content deltas as the server sends them
+
+        Raises:
+            RuntimeError: If API call fails
+        """
+        payload = self._payload(messages, model, temperature, None, max_tokens, None, None, None, stop)
+        payload["stream"] = True
+        body = json.dumps(payload).encode("utf-8")
+        start = time.perf_counter()
+
+        try:
+            with self.session.post(
+                self.api_url,
+                headers=self._headers(),
+                data=body,
+                timeout=self.timeout,
+                stream=True,
+            ) as response:
+                if response.status_code >= 400:
+                    self._record(model, start, body, response.status_code, len(response.content))
+                    raise RuntimeError(
+                        f"DeepSeek API error {response.status_code}: {response.text}"
+                    )
+                received = 0
+                for line in response.iter_lines():
+                    received += len(line)
+                    if not line.startswith(b"data: "):
+                        continue
+                    data = line[len(b"data: "):]
+                    if data == b"[DONE]":
+                        break
+                    try:
+                        delta = json.loads(data).get("choices", [{}])[0].get("delta", {})
+                    except (ValueError, AttributeError, IndexError) as e:
+                        if self.metrics is not None:
+                            self._errors.inc(kind="malformed_chunk")
+                        raise RuntimeError(f"DeepSeek API sent a malformed stream chunk: {str(e)}")
+                    if delta.get("content"):
+                        yield delta["content"]
+                self._record(model, start, body, response.status_code, received)
+
+        except requests.RequestException as e:
+            if self.metrics is not None:
+                self._errors.inc(kind=type(e).__name__)
+            raise RuntimeError(f"DeepSeek API request failed: {str(e)}")
+
+    @staticmethod
+    def _payload(
+        messages: List[Dict[str, Any]],
+        model: str,
+        temperature: float,
+        tools: Optional[List[Dict[str, Any]]],
+        max_tokens: Optional[int],
+        top_p: Optional[float],
+        frequency_penalty: Optional[float],
+        presence_penalty: Optional[float],
+        stop: Optional[List[str]],
+    ) -> Dict[str, Any]:
+        """Request body with only the optional parameters that were given"""
         payload: Dict[str, Any] = {
             "model": model,
-            "messages": [msg.to_dict() for msg in messages],
+            "messages": messages,
             "temperature": temperature,
         }
 
         # Add optional parameters if provided
+        if tools:
+            payload["tools"] = tools
         if max_tokens is not None:
             payload["max_tokens"] = max_tokens
         if top_p is not None:
@@ -82,19 +277,30 @@ class DeepSeekClient:
             payload["presence_penalty"] = presence_penalty
         if stop is not None:
             payload["stop"] = stop
+        return payload
 
-        headers = {
+    def _headers(self) -> Dict[str, str]:
+        return {
             "Authorization": f"Bearer {self.api_key}",
             "Content-Type": "application/json",
         }
 
+    def _post(self, model: str, headers: Dict[str, str], body: bytes, span: Any) -> Dict[str, Any]:
+        """Send one request and return the first choice's message"""
+        start = time.perf_counter()
+
         try:
-            response = requests.post(
-                self.API_URL,
+            response = self.session.post(
+                self.api_url,
                 headers=headers,
-                json=payload,
+                data=body,
                 timeout=self.timeout,
             )
+            self._record(model, start, body, response.status_code, len(response.content))
+            if span is not None:
+                span.set_attributes(
+                    status=response.status_code, response_bytes=len(response.content)
+                )
 
             if response.status_code >= 400:
                 error_text = response.text
@@ -103,16 +309,23 @@ class DeepSeekClient:
                 )
 
             data = response.json()
-            content = data.get("choices", [{}])[0].get("message", {}).get("content")
-
-            if not content:
-                raise RuntimeError("No content in DeepSeek response")
-
-            return content
+            return data.get("choices", [{}])[0].get("message", {})
 
         except requests.RequestException as e:
+            if self.metrics is not None:
+                self._errors.inc(kind=type(e).__name__)
             raise RuntimeError(f"DeepSeek API request failed: {str(e)}")
 
+    def _record(self, model: str, start: float, body: bytes, status: int, response_bytes: int) -> None:
+        """Record latency, payload sizes and HTTP errors for one call"""
+        if self.metrics is None:
+            return
+        self._latency.observe(time.perf_counter() - start, model=model, status=status)
+        self._request_bytes.observe(len(body), model=model)
+        self._response_bytes.observe(response_bytes, model=model)
+        if status >= 400:
+            self._errors.inc(kind=f"http_{status}")
+
     def generate_code(
         self,
         prompt: str,
@@ -0,0 +1,780 @@
+"""
+Unit tests for the LITBOT 4.0 tools
+Run with: python -m pytest test_litbot_tools.py
+"""
+
+import json
+import socket
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+
+from cooking_tools import LitBotToolbox
+from litbot_alerts import AlertEngine, AlertRule
+from litbot_anomaly import score_batch, score_series
+from litbot_batch import SharedRollups, run_batch
+from litbot_embeddings import HashingEmbedder, SemanticRetriever, VectorIndex
+from litbot_ingest import MetricIngestor, _point, parse_line
+from litbot_reports import ReportDefinition, ReportEngine, ReportField
+from litbot_search import KnowledgeIndex, stem, tokenize
+from litbot_status import StatusSnapshot
+from litbot_timeseries import RAW_DTYPE, RingBuffer, TimeSeriesStore, parse_period
+
+
+class TestTimeSeriesStore:
+    """Test the ring-buffer time-series store"""
+
+    def test_ring_buffer_evicts_oldest(self):
+        """Test that a full ring keeps the newest records in order"""
+        ring = RingBuffer(5, RAW_DTYPE)
+        for i in range(8):
+            ring.append((i, i * 10))
+        assert list(ring.ordered()["ts"]) == [3, 4, 5, 6, 7]
+        assert list(ring.range(4, 7)["value"]) == [40, 50, 60]
+
+    def test_ring_buffer_bulk_extend_wraps(self):
+        """Test vectorized extend across the end of the buffer"""
+        ring = RingBuffer(4, RAW_DTYPE)
+        records = np.zeros(3, dtype=RAW_DTYPE)
+        records["ts"] = [1, 2, 3]
+        ring.extend(records)
+        records["ts"] = [4, 5, 6]
+        ring.extend(records)
+        assert list(ring.ordered()["ts"]) == [3, 4, 5, 6]
+
+    def test_rollups(self):
+        """Test 1m/1h rollups over two hours of 10s points"""
+        store = TimeSeriesStore()
+        ts = np.arange(0, 7200, 10.0)
+        store.extend("api_latency", ts, np.full(len(ts), 100.0))
+        store.append("api_latency", 400.0, ts=7200)
+
+        hourly = store.range("api_latency", resolution="1h")
+        assert list(hourly["count"]) == [360, 360, 1]
+        assert hourly["max"][-1] == 400.0
+        assert len(store.range("api_latency", 3600, 7200, resolution="1m")) == 60
+        assert store.latest("api_latency") == (7200.0, 400.0)
+
+    def test_open_bucket_merges_appends(self):
+        """Test that appends within one bucket update the same rollup row"""
+        store = TimeSeriesStore()
+        for ts, value in [(10, 1.0), (20, 5.0), (30, 3.0)]:
+            store.append("m", value, ts=ts)
+        bucket = store.range("m", resolution="1m")
+        assert len(bucket) == 1
+        assert (bucket["count"][0], bucket["min"][0], bucket["max"][0], bucket["last"][0]) == (3, 1.0, 5.0, 3.0)
+
+    def test_rejects_out_of_order_points(self):
+        """Test that the series stays append-only"""
+        store = TimeSeriesStore()
+        store.append("m", 1.0, ts=100)
+        assert not store.append("m", 2.0, ts=50)
+        assert store.extend("m", [90, 110, 105], [1, 2, 3]) == 2
+
+    def test_save_and_load(self, tmp_path):
+        """Test round-tripping a store through its on-disk format"""
+        store = TimeSeriesStore(raw_capacity=100)
+        store.extend("revenue_mrr", np.arange(200.0), np.arange(200.0))
+        path = tmp_path / "metrics.npz"
+        store.save(str(path))
+
+        loaded = TimeSeriesStore.load(str(path))
+        assert np.array_equal(loaded.range("revenue_mrr"), store.range("revenue_mrr"))
+        assert np.array_equal(loaded.range("revenue_mrr", resolution="1m"), store.range("revenue_mrr", resolution="1m"))
+        assert loaded.latest("revenue_mrr") == (199.0, 199.0)
+
+    def test_parse_period(self):
+        """Test period strings"""
+        assert parse_period("90m") == 5400
+        assert parse_period("2w") == 14 * 86400
+        with pytest.raises(ValueError):
+            parse_period("soon")
+
+
+class TestAnomalyDetection:
+    """Test vectorized anomaly scoring"""
+
+    def test_spike_and_drop(self):
+        """Test that a jump far outside the baseline is flagged"""
+        rng = np.random.default_rng(0)
+        baseline = 100 + rng.normal(0, 1, 200)
+        assert score_series("m", np.r_[baseline, 100.5]).status == "healthy"
+        spike = score_series("m", np.r_[baseline, 130])
+        assert spike.status == "spike" and spike.anomalous
+        assert score_series("m", np.r_[baseline, 70]).status == "drop"
+
+    def test_trend_and_trend_break(self):
+        """Test growth and a reversal of direction"""
+        growing = score_series("m", np.linspace(100, 150, 100))
+        assert growing.status == "growing"
+        assert growing.change > 0
+        reversal = np.r_[np.linspace(100, 200, 150), np.linspace(200, 150, 50)]
+        assert score_series("m", reversal).trend_break
+
+    def test_short_history_is_unscored(self):
+        """Test that a few points are not enough to judge"""
+        assert score_series("m", np.array([1.0, 2.0, 3.0])).status is None
+
+    def test_batch_matches_single(self):
+        """Test that batch scoring of ragged series matches per-series scoring"""
+        rng = np.random.default_rng(1)
+        series = [rng.normal(50, 5, n) for n in (10, 300, 40)]
+        batch = score_batch(["a", "b", "c"], series, window=64)
+        for score, values in zip(batch, series):
+            single = score_series(score.metric, values, window=64)
+            assert score.status == single.status
+            assert score.zscore == pytest.approx(single.zscore)
+
+
+class TestStatusSnapshot:
+    """Test the incrementally maintained status snapshot"""
+
+    def test_only_dirty_lines_rerender(self):
+        """Test that a write re-renders just the affected metric"""
+        store = TimeSeriesStore()
+        for i in range(1000):
+            store.append(f"m{i}", i, ts=1)
+        rendered = []
+
+        def render_line(metric):
+            rendered.append(metric)
+            return f"{metric}={store.latest(metric)[1]:g}"
+
+        snapshot = StatusSnapshot(store, render_line)
+        assert len(snapshot.render().splitlines()) == 1000
+        rendered.clear()
+        store.append("m5", 99, ts=2)
+        assert "m5=99" in snapshot.render()
+        assert rendered == ["m5"]
+
+    def test_changes_since(self):
+        """Test version numbers and deltas"""
+        store = TimeSeriesStore()
+        store.append("a", 1, ts=1)
+        store.append("b", 1, ts=1)
+        snapshot = StatusSnapshot(store, lambda m: f"{m}={store.latest(m)[1]:g}")
+        version, changes = snapshot.changes_since(0)
+        assert set(changes) == {"a", "b"}
+        assert snapshot.changes_since(version) == (version, {})
+
+        store.append("b", 2, ts=2)
+        store.append("c", 3, ts=2)
+        store.append("a", 1, ts=3)  # Same value: line unchanged, no new version
+        new_version, changes = snapshot.changes_since(version)
+        assert new_version == version + 2
+        assert changes == {"b": "b=2", "c": "c=3"}
+
+    def test_component_lines(self):
+        """Test that watched component lines follow the metrics and are versioned"""
+        store = TimeSeriesStore()
+        store.append("a", 1, ts=1)
+        state = {"queue": 0}
+        snapshot = StatusSnapshot(store, lambda m: f"{m}={store.latest(m)[1]:g}")
+        snapshot.watch("queue", lambda: f"queue={state['queue']}")
+        assert snapshot.render() == "a=1\n\nqueue=0"
+        version = snapshot.version
+        assert snapshot.changes_since(version) == (version, {})
+        state["queue"] = 3
+        assert snapshot.changes_since(version) == (version + 1, {"queue": "queue=3"})
+        assert snapshot.render().endswith("queue=3")
+
+
+class TestKnowledgeIndex:
+    """Test the BM25 knowledge-base index"""
+
+    def test_tokenize_and_stem(self):
+        """Test that inflections share a stem and stopwords are dropped"""
+        assert stem("pricing") == stem("priced") == stem("prices") == stem("price")
+        assert stem("classes") == stem("class")
+        assert tokenize("How do I run the reports?") == ["run", "report"]
+
+    def test_ranking_and_snippet(self):
+        """Test that the most relevant passage ranks first with a focused snippet"""
+        index = KnowledgeIndex()
+        index.add_document("billing", "Invoices are sent monthly. Refunds take five days.")
+        index.add_document("refund_policy", "Refunds are issued within 14 days. Refunds over $500 need approval.")
+        index.add_document("onboarding", "New users get a guided tour. " + "filler " * 60 + "Refund questions go to support.")
+        hits = index.search("refund")
+        assert [hit.doc_id for hit in hits][0] == "refund_policy"
+        onboarding = next(hit for hit in hits if hit.doc_id == "onboarding")
+        assert onboarding.snippet.startswith("...")
+        assert "Refund questions" in onboarding.snippet
+
+    def test_incremental_updates(self):
+        """Test update and removal of documents"""
+        index = KnowledgeIndex()
+        index.add_document("faq", "Stripe handles payments.")
+        assert not index.add_document("faq", "Stripe handles payments.")
+        index.add_document("faq", "Payments run through Paddle.")
+        assert index.search("stripe") == []
+        assert index.search("paddle")[0].doc_id == "faq"
+        index.remove_document("faq")
+        assert index.search("paddle") == []
+        assert index.postings == {}
+
+    def test_save_load_and_directory_sync(self, tmp_path):
+        """Test persistence and syncing with a directory of files"""
+        wiki = tmp_path / "wiki"
+        (wiki / "sales").mkdir(parents=True)
+        (wiki / "sales" / "pricing.md").write_text("Pro costs $99 per month.\n\nAgency costs $299.")
+        (wiki / "team.txt").write_text("The growth team owns TikTok campaigns.")
+        index = KnowledgeIndex()
+        assert index.load_directory(str(wiki)) == 2
+        assert index.load_directory(str(wiki)) == 0
+
+        path = str(tmp_path / "kb.npz")
+        index.save(path)
+        loaded = KnowledgeIndex.load(path)
+        hit = loaded.search("agency cost")[0]
+        assert (hit.doc_id, hit.passage) == ("sales/pricing.md", "Agency costs $299.")
+
+        (wiki / "team.txt").unlink()
+        assert loaded.load_directory(str(wiki)) == 1
+        assert "team.txt" not in loaded
+
+    def test_search_during_writes(self):
+        """Test that searches stay consistent while another thread indexes"""
+        import threading
+        index = KnowledgeIndex()
+        retriever = SemanticRetriever(index)
+        done = threading.Event()
+
+        def write():
+            try:
+                for i in range(500):
+                    index.add_document(f"runbook_{i}", f"Restart the deploy worker {i}. Check the deploy queue.")
+                    if i % 2:
+                        index.remove_document(f"runbook_{i}")
+            finally:
+                done.set()
+
+        writer = threading.Thread(target=write)
+        writer.start()
+        while not done.is_set():
+            for hit in index.search("deploy worker", k=10) + retriever.hybrid_search("deploy worker", k=10):
+                assert hit.doc_id.startswith("runbook_")
+        writer.join()
+        assert len(index) == 250
+        assert len(index.search("deploy", k=1000)) == 250
+
+
+class TestSemanticRetrieval:
+    """Test embeddings, the vector index and hybrid ranking"""
+
+    def test_hashing_embedder(self):
+        """Test unit-length float32 vectors where related text scores higher"""
+        vectors = HashingEmbedder().embed(["subscription pricing", "subscribe price plans", "server latency"])
+        assert vectors.dtype == np.float32
+        assert np.allclose(np.linalg.norm(vectors, axis=1), 1.0)
+        assert vectors[0] @ vectors[1] > vectors[0] @ vectors[2]
+
+    def test_vector_index_exact_and_ivf(self, tmp_path):
+        """Test that IVF search finds the same nearest rows as brute force"""
+        rng = np.random.default_rng(0)
+        centers = rng.normal(size=(20, 64))
+        data = centers[rng.integers(0, 20, 2000)] + rng.normal(scale=0.1, size=(2000, 64))
+        data = (data / np.linalg.norm(data, axis=1, keepdims=True)).astype(np.float32)
+        index = VectorIndex(64, path=str(tmp_path / "vectors.npy"), capacity=16)
+        index.add(list(range(2000)), data)
+        exact = index.search(data[7], k=3)
+        assert exact[0][0] == 7
+        index.build_ivf(nlist=20)
+        assert [key for key, _ in index.search(data[7], k=3)] == [key for key, _ in exact]
+
+        index.remove(7)
+        assert 7 not in index and index.search(data[7], k=1)[0][0] != 7
+        index.flush()
+        reopened = VectorIndex.open(str(tmp_path / "vectors.npy"))
+        assert len(reopened) == 1999
+        assert reopened.search(data[8], k=1)[0][0] == 8
+
+    def test_semantic_and_hybrid_search(self):
+        """Test lazy sync with the knowledge index and fused ranking"""
+        index = KnowledgeIndex()
+        index.add_document("pricing_strategy", "Tiered plans: Starter $29, Pro $99, Agency $299.")
+        index.add_document("tech_stack", "Next.js, Firebase and Stripe.")
+        retriever = SemanticRetriever(index)
+        assert retriever.search("price of plans")[0].doc_id == "pricing_strategy"
+        assert retriever.hybrid_search("stripe")[0].doc_id == "tech_stack"
+        index.remove_document("tech_stack")
+        assert all(hit.doc_id != "tech_stack" for hit in retriever.hybrid_search("stripe"))
+        assert len(retriever.vectors) == 1
+
+    def test_concurrent_first_queries_embed_once(self):
+        """Test that threads sharing a toolbox build one retriever without duplicate rows"""
+        toolbox = LitBotToolbox()
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            retrievers = list(pool.map(lambda _: toolbox.retriever, range(8)))
+            list(pool.map(lambda q: toolbox.query_knowledge_base(q, mode="hybrid"), ["pricing"] * 16))
+        assert all(r is retrievers[0] for r in retrievers)
+        assert sorted(toolbox.retriever.vectors.keys) == sorted(toolbox.knowledge_index.passages)
+
+    def test_saved_vectors_rebuilt_for_new_build(self, tmp_path):
+        """Test that vectors saved for one knowledge-index build are not reused by another"""
+        path = str(tmp_path / "vectors.npy")
+        first = KnowledgeIndex()
+        first.add_document("pricing_strategy", "Tiered plans: Starter $29, Pro $99, Agency $299.")
+        retriever = SemanticRetriever(first, vectors=VectorIndex(HashingEmbedder().dim, path=path))
+        retriever.sync()
+        retriever.vectors.flush()
+
+        # Same passage ids, different passages
+        second = KnowledgeIndex()
+        second.add_document("tech_stack", "Next.js, Firebase and Stripe.")
+        retriever = SemanticRetriever(second, vectors=VectorIndex.open(path))
+        assert retriever.vectors.build == first.build
+        assert retriever.search("stripe")[0].doc_id == "tech_stack"
+        assert retriever.vectors.build == second.build and len(retriever.vectors) == 1
+        assert retriever.search("price of plans") == []
+
+    def test_saved_vectors_survive_index_reload(self, tmp_path):
+        """Test that vectors saved for an index are reused after the index is saved and loaded"""
+        path = str(tmp_path / "vectors.npy")
+        index = KnowledgeIndex()
+        index.add_document("pricing_strategy", "Tiered plans: Starter $29, Pro $99, Agency $299.")
+        index.add_document("tech_stack", "Next.js, Firebase and Stripe.")
+        retriever = SemanticRetriever(index, vectors=VectorIndex(HashingEmbedder().dim, path=path))
+        assert retriever.sync() == 2
+        retriever.vectors.flush()
+        index.save(str(tmp_path / "index.npz"))
+
+        reloaded = KnowledgeIndex.load(str(tmp_path / "index.npz"))
+        assert reloaded.build == index.build
+        retriever = SemanticRetriever(reloaded, vectors=VectorIndex.open(path))
+        assert retriever.sync() == 0 and len(retriever.vectors) == 2
+        assert retriever.search("stripe")[0].doc_id == "tech_stack"
+
+
+class TestLitBotToolbox:
+    """Test LITBOT toolbox functionality"""
+
+    def test_system_status_uses_latest_values(self):
+        """Test that recorded points show up in the status overview"""
+        toolbox = LitBotToolbox()
+        toolbox.record_metric("active_users", 1500)
+        status = toolbox.get_system_status()
+        assert "Active Users: 1500users" in status
+        assert "MRR: 12500USD" in status
+
+    def test_system_status_reports_components(self):
+        """Test that ingestion, index and alerting state come from the live components"""
+        toolbox = LitBotToolbox()
+        status = toolbox.get_system_status()
+        assert "Ingestion: stopped" in status and "Vector Index: not built" in status
+        assert f"Knowledge Index: 4 documents, 4 passages (revision {toolbox.knowledge_index.revision})" in status
+        ingestor = toolbox.start_ingestion()
+        try:
+            ingestor._stop.set()
+            ingestor._thread.join()
+            ingestor.submit("active_users", 1500)
+            status = toolbox.get_system_status()
+            assert "Ingestion: flush thread not running, 1 queued, 0 flushed" in status
+            assert "Alerts: running, 0 firing" in status
+            version = toolbox.status.version
+            ingestor.submit("active_users", 1600)
+            delta = toolbox.get_status_delta(version)
+            assert "1 changed" in delta and "2 queued" in delta
+        finally:
+            toolbox.stop_ingestion()
+        toolbox.query_knowledge_base("pricing", mode="semantic")
+        toolbox.add_knowledge("refunds", "Refunds are processed within 5 days.")
+        assert "Vector Index: 4 vectors (resync pending)" in toolbox.get_system_status()
+
+    def test_status_delta(self):
+        """Test polling the status for changes"""
+        toolbox = LitBotToolbox()
+        toolbox.get_system_status()
+        version = toolbox.status.version
+        assert "no changes" in toolbox.get_status_delta(version)
+        toolbox.record_metric("churn_rate", 1.9)
+        delta = toolbox.get_status_delta(version)
+        assert "1 changed" in delta
+        assert "Churn Rate: 1.9%" in delta
+        assert "MRR" not in delta
+
+    def test_query_knowledge_base(self):
+        """Test ranked knowledge-base lookups"""
+        toolbox = LitBotToolbox()
+        assert toolbox.query_knowledge_base("pricing").startswith("[PRICING_STRATEGY]")
+        assert "[TECH_STACK]" in toolbox.query_knowledge_base("Stripe")
+        assert toolbox.query_knowledge_base("quantum") == "No specific knowledge found on this topic."
+        toolbox.add_knowledge("refunds", "Refunds are processed within 5 days.")
+        assert "[REFUNDS]" in toolbox.query_knowledge_base("refund")
+        assert toolbox.query_knowledge_base("subscription prices", mode="semantic").startswith("[PRICING_STRATEGY]")
+        assert "Unknown search mode" in toolbox.query_knowledge_base("pricing", mode="fuzzy")
+
+    def test_business_reports(self):
+        """Test built-in reports computed from the store"""
+        toolbox = LitBotToolbox()
+        daily = toolbox.generate_business_report("daily")
+        assert "MRR: $12,500.00" in daily
+        assert "New Users: +12" in daily
+        assert "System Health: 100%" in daily
+        weekly = toolbox.generate_business_report("weekly", period="30d")
+        assert "Top Feature: AI Mockup Generator" in weekly
+        assert "Churn: 2.1%" in weekly
+        assert toolbox.generate_business_report("monthly").startswith("Unknown report type")
+
+    def test_analyze_trend(self):
+        """Test trend analysis over recorded history"""
+        store = TimeSeriesStore()
+        start = time.time() - 10 * 86400
+        for day in range(10):
+            store.append("revenue_mrr", 10000 + day * 100, ts=start + day * 86400)
+        toolbox = LitBotToolbox(store)
+        result = toolbox.analyze_trend("revenue_mrr", "30d")
+        assert "Trend of MRR" in result
+        assert "1h buckets" in result
+        assert "Change: +" in result
+
+    def test_analyze_trend_insufficient_history(self):
+        """Test trend analysis with a single data point"""
+        toolbox = LitBotToolbox()
+        assert "Not enough history" in toolbox.analyze_trend("churn_rate", "7d")
+        assert "not found" in toolbox.analyze_trend("unknown_metric")
+
+    def test_analyze_metric_from_history(self):
+        """Test that the status comes from recorded data when there is enough of it"""
+        toolbox = LitBotToolbox()
+        assert "Status: GOOD" in toolbox.analyze_metric("api_latency")
+        ts = time.time() + np.arange(1, 101)
+        toolbox.store.extend("api_latency", ts, np.r_[np.full(99, 120.0), 900.0])
+        result = toolbox.analyze_metric("api_latency")
+        assert "Status: SPIKE" in result
+        assert "Investigate immediately" in result
+
+    def test_metric_direction(self):
+        """Test that trends are judged by whether the metric should rise or fall"""
+        toolbox = LitBotToolbox()
+        ts = time.time() + np.arange(1, 101)
+        toolbox.store.extend("active_users", ts, np.linspace(1450, 2000, 100))
+        toolbox.store.extend("api_latency", ts, np.linspace(400, 120, 100))
+        users, latency = toolbox.score_metrics(["active_users", "api_latency"])
+        assert users.status == "growing"
+        assert latency.status == "improving"
+        assert "Maintain current trajectory" in toolbox.analyze_metric("api_latency")
+        assert toolbox._system_health(0, 0) == "100"
+        assert "0 flagged" in toolbox.health_sweep()
+
+        toolbox = LitBotToolbox()
+        toolbox.store.extend("api_latency", ts, np.linspace(120, 900, 100))
+        assert toolbox.score_metrics(["api_latency"])[0].status == "worsening"
+        assert "Investigate immediately" in toolbox.analyze_metric("api_latency")
+        assert toolbox._system_health(0, 0) == "80"
+        assert "API Latency: WORSENING" in toolbox.health_sweep()
+
+    def test_health_sweep(self):
+        """Test a sweep across many series in one pass"""
+        store = TimeSeriesStore(raw_capacity=512)
+        ts = np.arange(300.0)
+        for i in range(50):
+            store.extend(f"series_{i}", ts, np.full(300, 10.0 + i))
+        store.append("series_7", 500.0, ts=300)
+        sweep = LitBotToolbox(store).health_sweep()
+        assert "59 metrics" in sweep
+        assert "1 flagged" in sweep
+        assert "series_7: SPIKE" in sweep
+
+
+class TestAlertEngine:
+    """Test incremental alert rule evaluation"""
+
+    def test_threshold_dedup_and_cooldown(self):
+        """Test that a breach fires once, resolves, and respects the cooldown"""
+        store = TimeSeriesStore()
+        engine = AlertEngine(store, [AlertRule("slow", "api_latency", op=">", value=500, cooldown=60)])
+        fired = []
+        engine.subscribe(fired.append)
+        store.extend("api_latency", [1, 2, 3], [120, 800, 130])
+        assert [(a.state, a.value) for a in fired] == [("firing", 800), ("resolved", 130)]
+        store.append("api_latency", 900, ts=30)
+        assert len(fired) == 2 and engine.suppressed == 1
+        store.append("api_latency", 700, ts=70)
+        store.append("api_latency", 750, ts=80)
+        assert [(a.state, a.ts) for a in fired[2:]] == [("firing", 70)]
+        assert engine.deduplicated == 1
+        store.append("api_latency", 100, ts=90)
+        assert fired[-1].state == "resolved"
+        assert not engine.active()
+
+    def test_unrelated_metrics_skip_evaluation(self):
+        """Test that only rules touching the updated metric run"""
+        store = TimeSeriesStore()
+        rules = [AlertRule(f"rule_{i}", f"metric_{i}", value=i) for i in range(2000)]
+        rules.append(AlertRule("any_feature", "feature_usage.*", op="<", value=1))
+        engine = AlertEngine(store, rules)
+        store.append("other", 1e9, ts=1)
+        assert engine.evaluations == 0
+        store.append("metric_7", 8, ts=1)
+        store.append("feature_usage.money_plays", 0, ts=1)
+        assert engine.evaluations == 2
+        assert {a.rule for a in engine.active()} == {"rule_7", "any_feature"}
+
+    def test_rate_of_change(self):
+        """Test a drop relative to the value one window earlier"""
+        store = TimeSeriesStore()
+        engine = AlertEngine(store, [AlertRule("mrr_drop", "revenue_mrr", kind="rate", op="<", value=-0.1, window="1h")])
+        store.extend("revenue_mrr", [0, 1800], [10000, 9500])
+        assert not engine.active()
+        store.append("revenue_mrr", 8500, ts=3600)
+        alert = engine.active()[0]
+        assert alert.value == pytest.approx(-0.15)
+        assert "-15.0%" in alert.message
+
+    def test_absence(self):
+        """Test that a silent metric fires on tick and resolves on data"""
+        store = TimeSeriesStore()
+        store.append("heartbeat", 1, ts=100)
+        engine = AlertEngine(store, [AlertRule("no_heartbeat", "heartbeat", kind="absence", window=60)])
+        assert engine.tick(150) == []
+        store.append("heartbeat", 1, ts=140)
+        assert engine.tick(190) == []
+        assert [a.rule for a in engine.tick(200)] == ["no_heartbeat"]
+        assert engine.tick(500) == []
+        store.append("heartbeat", 1, ts=510)
+        assert engine.history[-1].state == "resolved"
+        assert not engine.active()
+
+    def test_invalid_rule(self):
+        """Test that rules are validated when declared"""
+        with pytest.raises(ValueError):
+            AlertRule("bad", "x", kind="median")
+        with pytest.raises(ValueError):
+            AlertRule("bad", "x", op="==")
+
+    def test_toolbox_alerts(self):
+        """Test built-in rules surfacing in the toolbox"""
+        toolbox = LitBotToolbox()
+        assert toolbox.get_alerts() == "No active alerts."
+        toolbox.record_metric("server_load", 97)
+        alerts = toolbox.get_alerts()
+        assert "1 active alert(s)" in alerts
+        assert "[CRITICAL] server_overload" in alerts
+        result = toolbox.analyze_metric("server_load")
+        assert "Alert: [CRITICAL] server_overload" in result
+        assert "Investigate immediately" in result
+
+
+class TestMetricIngestor:
+    """Test streaming metric ingestion"""
+
+    def test_submit_and_flush(self):
+        """Test that buffered points reach the store on flush"""
+        store = TimeSeriesStore()
+        ingestor = MetricIngestor(store)
+        ingestor.submit("server_load", 40, ts=1)
+        ingestor.submit_batch([("server_load", 42, 2), ("api_latency", 130, 2)])
+        assert ingestor.pending() == 3
+        assert ingestor.flush() == 3
+        assert store.latest("server_load") == (2.0, 42.0)
+        ingestor.submit("server_load", 41, ts=0)
+        assert ingestor.flush() == 0
+        assert ingestor.points_rejected == 1
+        assert store.latest("api_latency") == (2.0, 130.0)
+
+    def test_bad_points(self):
+        """Test that malformed points are refused, and a bad batch does not stop the flush thread"""
+        with pytest.raises(ValueError):
+            _point({"metric": "server_load", "value": 1, "ts": "abc"})
+        assert _point(["server_load", "2", "3"]) == ("server_load", 2.0, 3.0)
+        store = TimeSeriesStore()
+        with MetricIngestor(store, flush_interval=0.01) as ingestor:
+            ingestor.submit_batch([("server_load", 1.0, "abc")])
+            ingestor.submit("server_load", 42, ts=5)
+            deadline = time.time() + 5
+            while ingestor.pending() and time.time() < deadline:
+                time.sleep(0.01)
+            assert ingestor.running
+        assert ingestor.flush_errors == 1 and "server_load" in ingestor.last_error
+        assert store.latest("server_load") == (5.0, 42.0)
+
+    def test_listener_errors(self):
+        """Test that a failing store listener does not count stored points as rejected"""
+        store = TimeSeriesStore()
+        seen = []
+
+        def broken(metric, timestamps, values):
+            raise RuntimeError("listener down")
+
+        store.add_listener(broken)
+        store.add_listener(lambda metric, timestamps, values: seen.append(len(values)))
+        ingestor = MetricIngestor(store)
+        for i in range(10):
+            ingestor.submit("server_load", 40 + i, ts=i)
+        assert ingestor.flush() == 10
+        assert (ingestor.points_flushed, ingestor.points_rejected) == (10, 0)
+        assert (ingestor.flush_errors, ingestor.listener_errors) == (0, 1)
+        assert "listener down" in ingestor.last_error
+        assert seen == [10]
+        assert len(store.range("server_load")) == 10
+
+    def test_non_finite_points(self):
+        """Test that NaN and infinite timestamps or values are refused on every path"""
+        for bad in ("nan", "inf", "-inf"):
+            with pytest.raises(ValueError):
+                _point({"metric": "server_load", "value": 1, "ts": bad})
+            with pytest.raises(ValueError):
+                _point(["server_load", bad])
+            with pytest.raises(ValueError):
+                parse_line(f"server_load:1|{bad}")
+            with pytest.raises(ValueError):
+                parse_line(f"server_load:{bad}")
+        ingestor = MetricIngestor(TimeSeriesStore())
+        with pytest.raises(ValueError):
+            ingestor.submit("server_load", 1, ts=float("nan"))
+        with pytest.raises(ValueError):
+            ingestor.submit("server_load", float("inf"), ts=1)
+
+        # Points that bypass validation are dropped by the store and do not poison it
+        store = TimeSeriesStore()
+        assert store.extend("m", [1, float("nan"), 2, 3], [1, 2, float("inf"), 4]) == 2
+        assert store.latest("m") == (3.0, 4.0)
+        assert store.append("m", 5, ts=4)
+        assert np.isfinite(store.range("m", resolution="1m")["sum"]).all()
+
+        toolbox = LitBotToolbox()
+        ingestor = toolbox.start_ingestion(http_port=0)
+        try:
+            host, port = ingestor._servers[0].server_address[:2]
+            for body in (b'[{"metric": "server_load", "value": 1, "ts": NaN}]',
+                         b'[{"metric": "server_load", "value": Infinity}]'):
+                request = urllib.request.Request(f"http://{host}:{port}/ingest", data=body, method="POST")
+                with pytest.raises(urllib.error.HTTPError) as error:
+                    urllib.request.urlopen(request, timeout=5)
+                assert error.value.code == 400
+            assert ingestor.points_received == 0
+        finally:
+            toolbox.stop_ingestion()
+
+    def test_parse_line(self):
+        """Test the UDP line protocol"""
+        assert parse_line("api_latency:125.5|1700000000") == ("api_latency", 125.5, 1700000000.0)
+        assert parse_line("churn_rate:2.3") == ("churn_rate", 2.3, None)
+        with pytest.raises(ValueError):
+            parse_line("garbage")
+
+    def test_http_and_udp_listeners(self):
+        """Test both network ingestion paths end to end"""
+        toolbox = LitBotToolbox()
+        ingestor = toolbox.start_ingestion(http_port=0, udp_port=0)
+        try:
+            http_host, http_port = ingestor._servers[0].server_address[:2]
+            body = json.dumps({"points": [{"metric": "active_users", "value": 1600}]}).encode("utf-8")
+            request = urllib.request.Request(f"http://{http_host}:{http_port}/ingest", data=body, method="POST")
+            with urllib.request.urlopen(request, timeout=5) as response:
+                assert json.loads(response.read()) == {"accepted": 1}
+
+            with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+                sock.sendto(b"server_load:77\nbad line\n", ingestor._servers[1].server_address)
+            deadline = time.time() + 5
+            while toolbox.current_value("server_load") != 77 and time.time() < deadline:
+                time.sleep(0.01)
+        finally:
+            toolbox.stop_ingestion()
+        assert toolbox.current_value("active_users") == 1600
+        assert toolbox.current_value("server_load") == 77
+
+    def test_throughput(self):
+        """Test that batched ingestion sustains tens of thousands of points/sec"""
+        store = TimeSeriesStore()
+        ingestor = MetricIngestor(store)
+        points = [(f"metric_{i % 100}", float(i), float(i)) for i in range(100_000)]
+        start = time.perf_counter()
+        ingestor.submit_batch(points)
+        ingestor.flush()
+        assert 100_000 / (time.perf_counter() - start) > 20_000
+        assert ingestor.points_flushed == 100_000
+
+
+class TestReportEngine:
+    """Test rollup-based report generation"""
+
+    def test_aggregates_and_growth(self):
+        """Test aggregates over a period against the previous one"""
+        store = TimeSeriesStore()
+        day = 86400
+        end = 20 * day
+        for i in range(14):
+            store.append("revenue_mrr", 1000 + i * 10, ts=end - (14 - i) * day + 60)
+            store.append("signups", 5, ts=end - (14 - i) * day + 60)
+        store.append("feature_usage.export", 50, ts=end - day)
+        store.append("feature_usage.chat", 80, ts=end - day)
+        engine = ReportEngine(store, labels={"feature_usage.chat": "AI Chat"})
+        engine.register(ReportDefinition(
+            name="custom",
+            period="7d",
+            template="MRR $mrr ($growth) signups $signups top $top",
+            fields={
+                "mrr": ReportField("revenue_mrr", "last", ".0f"),
+                "growth": ReportField("revenue_mrr", "growth", "+.1%"),
+                "signups": ReportField("signups", "sum", ".0f"),
+                "top": ReportField("feature_usage.", "top", limit=2),
+            },
+        ))
+        assert engine.render("custom", end=end) == "MRR 1130 (+6.6%) signups 35 top AI Chat, export"
+        assert engine.render("custom", period="14d", end=end).startswith("MRR 1130 (n/a) signups 70")
+
+    def test_cache(self):
+        """Test that renders are cached until the store receives new points"""
+        store = TimeSeriesStore()
+        store.append("m", 1, ts=100)
+        engine = ReportEngine(store)
+        engine.register(ReportDefinition("r", "m=$m", {"m": ReportField("m", format=".0f")}))
+        end = ReportEngine.period_end(100)
+        assert engine.render("r", end=end) == "m=1"
+        assert engine.render("r", end=end) == "m=1"
+        assert (engine.cache_hits, engine.cache_misses) == (1, 1)
+        store.append("m", 2, ts=200)
+        assert engine.render("r", end=end) == "m=2"
+        # A rejected (too old) point changes nothing and keeps the cache
+        assert not store.append("m", 3, ts=150)
+        assert engine.render("r", end=end) == "m=2"
+        assert (engine.cache_hits, engine.cache_misses) == (2, 2)
+
+    def test_first_mean(self):
+        """Test that first_mean is the mean of the earliest bucket"""
+        store = TimeSeriesStore()
+        store.extend("m", [0, 10, 70], [1, 3, 8])
+        engine = ReportEngine(store)
+        engine.register(ReportDefinition("r", "$f", {"f": ReportField("m", "first_mean", ".1f")}, period="1h"))
+        assert engine.render("r", end=3600) == "2.0"
+
+
+class TestBatchReports:
+    """Test the multi-tenant batch report job"""
+
+    @staticmethod
+    def _store(mrr: float) -> TimeSeriesStore:
+        store = TimeSeriesStore()
+        ts = np.arange(0, 86400, 3600.0)
+        store.extend("revenue_mrr", ts, np.full(len(ts), mrr))
+        store.extend("new_users", ts, np.ones(len(ts)))
+        return store
+
+    def test_shared_rollups_view(self):
+        """Test that a tenant view answers range queries like the store"""
+        store = self._store(100)
+        rollups = SharedRollups.pack({"acme": store})
+        try:
+            view = rollups.view("acme")
+            assert view.metrics() == ["new_users", "revenue_mrr"]
+            assert np.array_equal(view.range("revenue_mrr", 3600, 7200, "1m"), store.range("revenue_mrr", 3600, 7200, "1m"))
+        finally:
+            rollups.close(unlink=True)
+
+    def test_run_batch(self, tmp_path):
+        """Test rendering every tenant's reports on a process pool"""
+        stores = {"acme": self._store(100), "globex": self._store(250)}
+        result = run_batch(stores, ["daily"], str(tmp_path), workers=2, end=86400)
+        assert result.errors == {}
+        assert set(result.timings) == {"acme", "globex"}
+        assert "MRR: $250.00" in result.reports["globex"]["daily"]
+        assert "New Users: +24" in result.reports["acme"]["daily"]
+        assert "System Health: 100%" in result.reports["acme"]["daily"]
+        with open(result.output_path, encoding="utf-8") as f:
+            lines = [json.loads(line) for line in f]
+        assert {(line["tenant"], line["report"]) for line in lines} == {("acme", "daily"), ("globex", "daily")}